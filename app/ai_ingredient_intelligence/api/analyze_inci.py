@@ -30,6 +30,8 @@ from app.ai_ingredient_intelligence.logic.bis_rag import (
 from app.ai_ingredient_intelligence.logic.url_scraper import URLScraper
 from app.ai_ingredient_intelligence.logic.cas_api import get_synonyms_batch, get_synonyms_for_ingredient
 
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, get_llm_client, is_llm_available
+
 # Claude AI setup for intelligent matching
 try:
     import anthropic
@@ -43,13 +45,32 @@ claude_model = os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-s
 
 if ANTHROPIC_AVAILABLE and claude_api_key:
     try:
-        claude_client = anthropic.Anthropic(api_key=claude_api_key)
+        # Shared AsyncAnthropic client from the LLM gateway (pooled, non-blocking)
+        claude_client = get_llm_client()
     except Exception as e:
         print(f"Warning: Could not initialize Claude client: {e}")
         claude_client = None
 else:
     claude_client = None
+from app.ai_ingredient_intelligence.logic.compare_pipeline import (
+    COMPARE_MAX_BROWSER_SESSIONS,
+    COMPARE_MAX_LLM_CALLS,
+    CompareLimits,
+    fill_missing_fields,
+)
+from app.ai_ingredient_intelligence.logic.llm_response_cache import track_llm_cache
 from app.ai_ingredient_intelligence.utils.inci_parser import parse_inci_string
+from app.ai_ingredient_intelligence.logic.ingredient_index import normalize_product_ingredient
+from app.ai_ingredient_intelligence.logic.match_scoring import MARKET_RESEARCH_TOP_K, get_ingredient_matrix
+from app.ai_ingredient_intelligence.logic.market_research_pages import (
+    MARKET_RESEARCH_STREAM_MAX_PAGES,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    load_query,
+    materialize_page,
+    save_query,
+)
 from app.ai_ingredient_intelligence.models.schemas import (
     AnalyzeInciRequest,
     AnalyzeInciResponse,
@@ -77,6 +98,7 @@ from app.ai_ingredient_intelligence.models.schemas import (
     CompareHistoryDetailResponse,  # ⬅️ new schema for getting compare history detail
     MarketResearchRequest,  # ⬅️ new schema for market research
     MarketResearchResponse,  # ⬅️ new schema for market research response
+    MarketResearchPageResponse,  # ⬅️ one page of market research matches + cursor
     AnalyzeInciWithReportResponse,  # ⬅️ combined response for merged endpoint
     MarketResearchProduct,  # ⬅️ new schema for market research product
     MarketResearchHistoryItem,  # ⬅️ full schema for market research history (detail endpoint)
@@ -764,7 +786,8 @@ async def extract_ingredients_from_url(
     
     Request body:
     {
-        "url": "https://example.com/product/..."
+        "url": "https://example.com/product/...",
+        "refresh": false (optional, re-scrape even if this product's extraction is cached)
     }
     
     Returns:
@@ -797,7 +820,7 @@ async def extract_ingredients_from_url(
         
         # Extract ingredients from URL
         print(f"Scraping URL: {url}")
-        extraction_result = await scraper.extract_ingredients_from_url(url)
+        extraction_result = await scraper.extract_ingredients_from_url(url, refresh=bool(payload.get("refresh", False)))
         
         ingredients = extraction_result["ingredients"]
         extracted_text = extraction_result["extracted_text"]
@@ -906,12 +929,40 @@ async def extract_ingredients_from_url(
             )
 
 
+# Background tasks that outlive a request (e.g. CAS lookups the matcher didn't need).
+# Holding a reference keeps them from being garbage collected mid-flight.
+_background_tasks = set()
+
+
+def _keep_in_background(task: asyncio.Task):
+    """Let a task finish after the response (it still warms caches)"""
+    if task.done():
+        return
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _timed(stage: str, timings: Dict[str, float], coro):
+    """Await coro and record its wall time under timings[stage]"""
+    stage_start = time.time()
+    try:
+        return await coro
+    finally:
+        timings[stage] = round(time.time() - stage_start, 3)
+
+
 # Core analysis function that can be called directly (without HTTP/authentication)
 async def analyze_ingredients_core(ingredients: List[str]) -> AnalyzeInciResponse:
     """
     Core ingredient analysis logic that can be called directly.
     This function performs the analysis without history saving or authentication.
     
+    Stages run as a dependency-aware pipeline:
+    - CAS synonyms, BIS cautions and matching (Steps 0-2) start immediately
+    - Only the matcher's synonym step (Step 3) waits on CAS
+    - Category and distributor enrichment overlap each other and BIS
+    Per-stage timings are returned in processing_breakdown.
+    
     Args:
         ingredients: List of ingredient names to analyze
         
@@ -919,38 +970,57 @@ async def analyze_ingredients_core(ingredients: List[str]) -> AnalyzeInciRespons
         AnalyzeInciResponse with analysis results
     """
     start = time.time()
+    timings: Dict[str, float] = {}
+    synonyms_task = None
+    bis_task = None
     
     try:
         if not ingredients:
             raise ValueError("No ingredients provided")
         
-        # 🔹 Get synonyms from CAS API for better matching
-        print("Retrieving synonyms from CAS API...")
-        synonyms_map = await get_synonyms_batch(ingredients)
-        print(f"Found synonyms for {len([k for k, v in synonyms_map.items() if v])} ingredients")
+        # 🔹 Independent stages start right away
+        print("Retrieving synonyms from CAS API and BIS cautions (in background)...")
+        synonyms_task = asyncio.create_task(_timed("cas_synonyms", timings, get_synonyms_batch(ingredients)))
+        bis_task = asyncio.create_task(_timed("bis_cautions", timings, get_bis_cautions_for_ingredients(ingredients)))
         
-        # Match ingredients using new flow
-        matched_raw, general_ingredients, ingredient_tags, unable_to_decode = await match_inci_names(ingredients, synonyms_map)
+        # Match ingredients using new flow (awaits synonyms_task only if Step 3 needs it)
+        matched_raw, general_ingredients, ingredient_tags, unable_to_decode = await _timed(
+            "matching", timings, match_inci_names(ingredients, synonyms_task)
+        )
         
-        # 🔹 Get BIS cautions for all ingredients (runs in parallel with matching)
-        print("Retrieving BIS cautions...")
-        bis_cautions = await get_bis_cautions_for_ingredients(ingredients)
-        if bis_cautions:
-            print(f"[OK] Retrieved BIS cautions for {len(bis_cautions)} ingredients: {list(bis_cautions.keys())}")
-        else:
-            print("[WARNING] No BIS cautions retrieved - this may indicate an issue with the BIS retriever")
+        # Convert to objects
+        items: List[AnalyzeInciItem] = [AnalyzeInciItem(**m) for m in matched_raw]
+        
+        # 🔹 Categories (INCI-based bifurcation) and distributors only need the matches,
+        # so they run concurrently with each other and with the BIS retrieval
+        print("Fetching ingredient categories and distributor information...")
+        bis_cautions, (inci_categories, items_processed), distributor_info = await asyncio.gather(
+            bis_task,
+            _timed("categories", timings, fetch_and_compute_categories(items)),
+            _timed("distributors", timings, fetch_distributors_for_branded_ingredients(items)),
+        )
         
     except Exception as e:
+        for task in (bis_task, synonyms_task):
+            if task is not None and not task.done():
+                task.cancel()
         print(f"Error in analyze_ingredients_core: {e}")
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
-
-    # Convert to objects
-    items: List[AnalyzeInciItem] = [AnalyzeInciItem(**m) for m in matched_raw]
-
-    # 🔹 Fetch categories for INCI-based bifurcation (only for general INCI, not branded)
-    print("Fetching ingredient categories for INCI-based bifurcation...")
-    inci_categories, items_processed = await fetch_and_compute_categories(items)
+    
+    # CAS results the matcher didn't need still get cached for next time
+    _keep_in_background(synonyms_task)
+    
+    if bis_cautions:
+        print(f"[OK] Retrieved BIS cautions for {len(bis_cautions)} ingredients: {list(bis_cautions.keys())}")
+    else:
+        print("[WARNING] No BIS cautions retrieved - this may indicate an issue with the BIS retriever")
     print(f"Found categories for {len(inci_categories)} INCI names")
+    if distributor_info:
+        print(f"Found distributors for {len(distributor_info)} branded ingredients")
+    else:
+        print("No distributor information found")
 
     # 🔹 Group ALL detected ingredients (branded + general) by matched_inci
     detected_dict = defaultdict(list)
@@ -968,7 +1038,6 @@ async def analyze_ingredients_core(ingredients: List[str]) -> AnalyzeInciRespons
     ]
     # Sort by number of INCI: more INCI first, then lower, single at last
     detected.sort(key=lambda x: len(x.inci_list), reverse=True)
-    detected.sort(key=lambda x: len(x.inci_list), reverse=True)
 
     # Filter out water-related BIS cautions
     filtered_bis_cautions = None
@@ -981,22 +1050,19 @@ async def analyze_ingredients_core(ingredients: List[str]) -> AnalyzeInciRespons
             if not is_water_related:
                 filtered_bis_cautions[ingredient] = cautions
 
-    # 🔹 Fetch distributor information for all branded ingredients in a single batch call
-    print("Fetching distributor information for branded ingredients...")
-    distributor_info = await fetch_distributors_for_branded_ingredients(items_processed)
-    if distributor_info:
-        print(f"Found distributors for {len(distributor_info)} branded ingredients")
-    else:
-        print("No distributor information found")
+    total_time = round(time.time() - start, 3)
+    timings["total"] = total_time
+    print(f"Analysis stage timings: {timings}")
 
     # Build response (deprecated fields are not included - they will be excluded by exclude_none=True in schema)
     response = AnalyzeInciResponse(
         detected=detected,  # All detected ingredients (branded + general) grouped by INCI
         unable_to_decode=unable_to_decode,
-        processing_time=round(time.time() - start, 3),
+        processing_time=total_time,
         bis_cautions=filtered_bis_cautions if filtered_bis_cautions else None,
         categories=inci_categories if inci_categories else None,  # INCI categories for bifurcation
         distributor_info=distributor_info if distributor_info else None,  # Distributor info for branded ingredients
+        processing_breakdown=dict(timings),
     )
     
     return response
@@ -1240,6 +1306,7 @@ async def analyze_inci_with_report(
     - Requires JWT token in Authorization header
     - User ID is automatically extracted from the JWT token
     """
+    cache_scope = track_llm_cache()
     try:
         # Step 1: Run analyze_inci (reuse existing logic)
         # Validate payload format
@@ -1287,6 +1354,7 @@ async def analyze_inci_with_report(
         
         # Parse report text into JSON structure
         report_json = parse_report_to_json(report_text)
+        report_json.cache_hit = cache_scope.cache_hit
         
         print(f"✅ Generated combined analysis and report")
         
@@ -1305,6 +1373,48 @@ async def analyze_inci_with_report(
         raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
 
 
+@router.post("/analyze-inci-with-report-stream")
+async def analyze_inci_with_report_stream(
+    payload: dict,
+    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
+):
+    """
+    Streaming variant of /analyze-inci-with-report (NDJSON, one event per line).
+    
+    Events:
+        {"type": "analysis", "data": { ... AnalyzeInciResponse ... }}
+        {"type": "token", "text": "..."}                  report text as it is generated
+        {"type": "section", "name": "analysis_table", "data": [...]}
+        {"type": "complete", "report": { ... FormulationReportResponse ... }}
+        {"type": "error", "detail": "..."}
+    
+    Request body: same as /analyze-inci-with-report
+    """
+    if "inci_names" not in payload:
+        raise HTTPException(status_code=400, detail="Missing required field: inci_names")
+    ingredients = parse_inci_string(payload["inci_names"])
+    if not ingredients:
+        raise HTTPException(status_code=400, detail="No valid ingredients found after parsing. Please check your input format.")
+    
+    from app.ai_ingredient_intelligence.api.formulation_report import ndjson_response, stream_report_events
+    
+    async def events():
+        analysis_response = await analyze_ingredients_core(ingredients)
+        yield {"type": "analysis", "data": analysis_response}
+        
+        branded_ingredients, not_branded_ingredients = _extract_branded_and_not_branded_ingredients(analysis_response)
+        async for event in stream_report_events(
+            ", ".join(ingredients),
+            branded_ingredients=branded_ingredients if branded_ingredients else None,
+            not_branded_ingredients=not_branded_ingredients if not_branded_ingredients else None,
+            bis_cautions=analysis_response.bis_cautions,
+            expected_benefits=payload.get("expected_benefits")
+        ):
+            yield event
+    
+    return ndjson_response(events())
+
+
 # URL-based ingredient analysis endpoint
 @router.post("/analyze-url", response_model=AnalyzeInciResponse)
 async def analyze_url(
@@ -1336,7 +1446,8 @@ async def analyze_url(
         "tag": "optional-tag" (optional),
         "notes": "User notes" (optional),
         "expected_benefits": "Expected benefits" (optional),
-        "history_id": "existing_history_id" (optional, if frontend already created history item)
+        "history_id": "existing_history_id" (optional, if frontend already created history item),
+        "refresh": false (optional, re-scrape even if this product's extraction is cached)
     }
     
     Authentication:
@@ -1347,7 +1458,8 @@ async def analyze_url(
         "tag": "optional-tag" (optional),
         "notes": "User notes" (optional),
         "expected_benefits": "Expected benefits" (optional),
-        "history_id": "existing_history_id" (optional, if frontend already created history item)
+        "history_id": "existing_history_id" (optional, if frontend already created history item),
+        "refresh": false (optional, re-scrape even if this product's extraction is cached)
     }
     
     Authentication:
@@ -1537,7 +1649,7 @@ async def analyze_url(
         
         # Extract ingredients from URL
         print(f"Scraping URL: {url}")
-        extraction_result = await scraper.extract_ingredients_from_url(url)
+        extraction_result = await scraper.extract_ingredients_from_url(url, refresh=bool(payload.get("refresh", False)))
         
         ingredients = extraction_result["ingredients"]
         extracted_text = extraction_result["extracted_text"]
@@ -1550,22 +1662,16 @@ async def analyze_url(
             )
         
         print(f"Extracted {len(ingredients)} ingredients from {platform}")
+        scrape_time = round(time.time() - start, 3)
         
-        # 🔹 Get synonyms from CAS API for better matching
-        print("Retrieving synonyms from CAS API...")
-        synonyms_map = await get_synonyms_batch(ingredients)
-        print(f"Found synonyms for {len([k for k, v in synonyms_map.items() if v])} ingredients")
-        
-        # Match ingredients using new flow
-        matched_raw, general_ingredients, ingredient_tags, unable_to_decode = await match_inci_names(ingredients, synonyms_map)
-        
-        # Get BIS cautions for all ingredients
-        print("Retrieving BIS cautions...")
-        bis_cautions = await get_bis_cautions_for_ingredients(ingredients)
-        
-        # Clean up scraper
+        # Clean up scraper before the (concurrent) analysis pipeline
         await scraper.close()
         
+        # Run the shared analysis pipeline (CAS, matching, BIS, categories, distributors)
+        response = await analyze_ingredients_core(ingredients)
+        response.processing_time = round(time.time() - start, 3)
+        response.processing_breakdown = {"scrape": scrape_time, **(response.processing_breakdown or {})}
+        
     except HTTPException:
         # Update history status to "failed" if we have history_id
         if history_id and user_id_value:
@@ -1643,61 +1749,6 @@ async def analyze_url(
         else:
             raise HTTPException(status_code=500, detail=f"{error_type}: {error_msg}")
 
-    # Convert to objects
-    items: List[AnalyzeInciItem] = [AnalyzeInciItem(**m) for m in matched_raw]
-
-    # 🔹 Fetch categories for INCI-based bifurcation (only for general INCI, not branded)
-    print("Fetching ingredient categories for INCI-based bifurcation...")
-    inci_categories, items_processed = await fetch_and_compute_categories(items)
-    print(f"Found categories for {len(inci_categories)} INCI names")
-
-    # 🔹 Group ALL detected ingredients (branded + general) by matched_inci
-    detected_dict = defaultdict(list)
-    for item in items_processed:
-        key = tuple(sorted(item.matched_inci))
-        detected_dict[key].append(item)
-
-    detected: List[InciGroup] = [
-        InciGroup(
-            inci_list=list(key),
-            items=val,
-            count=len(val)
-        )
-        for key, val in detected_dict.items()
-    ]
-    # Sort by number of INCI: more INCI first, then lower, single at last
-    detected.sort(key=lambda x: len(x.inci_list), reverse=True)
-    detected.sort(key=lambda x: len(x.inci_list), reverse=True)
-
-    # Filter out water-related BIS cautions
-    filtered_bis_cautions = None
-    if bis_cautions:
-        filtered_bis_cautions = {}
-        water_related_keywords = ['water', 'aqua']
-        for ingredient, cautions in bis_cautions.items():
-            ingredient_lower = ingredient.lower()
-            is_water_related = any(water_term in ingredient_lower for water_term in water_related_keywords)
-            if not is_water_related:
-                filtered_bis_cautions[ingredient] = cautions
-
-    # 🔹 Fetch distributor information for all branded ingredients in a single batch call
-    print("Fetching distributor information for branded ingredients...")
-    distributor_info = await fetch_distributors_for_branded_ingredients(items_processed)
-    if distributor_info:
-        print(f"Found distributors for {len(distributor_info)} branded ingredients")
-    else:
-        print("No distributor information found")
-
-    # Build response (deprecated fields are not included - they will be excluded by exclude_none=True in schema)
-    response = AnalyzeInciResponse(
-        detected=detected,  # All detected ingredients (branded + general) grouped by INCI
-        unable_to_decode=unable_to_decode,
-        processing_time=round(time.time() - start, 3),
-        bis_cautions=filtered_bis_cautions if filtered_bis_cautions else None,
-        categories=inci_categories if inci_categories else None,  # INCI categories for bifurcation
-        distributor_info=distributor_info if distributor_info else None,  # Distributor info for branded ingredients
-    )
-    
     # 🔹 Auto-save: Update history with "completed" status and analysis_result
     if history_id and user_id_value:
         try:
@@ -2788,10 +2839,16 @@ async def compare_products(
     3. Send all products to Claude for structured comparison
     4. Return comparison data with INCI, benefits, claims, price, and attributes
     
+    Products are preprocessed concurrently with at most COMPARE_MAX_BROWSER_SESSIONS
+    scrapes and COMPARE_MAX_LLM_CALLS LLM calls in flight (logic/compare_pipeline.py);
+    missing fields are filled by the comparison call itself, plus one batched call
+    for whatever is still missing.
+    
     Response:
     {
         "products": [ProductComparisonItem, ...],
-        "processing_time": float
+        "processing_time": float,
+        "processing_breakdown": {"extraction": ..., "product_1": ..., "comparison_llm": ..., "fill_llm": ..., "total": ...}
     }
     
     Response:
@@ -2801,7 +2858,6 @@ async def compare_products(
     }
     """
     start = time.time()
-    scraper = None
     
     try:
         # Parse products from payload
@@ -2822,26 +2878,24 @@ async def compare_products(
             if product["input_type"] not in ["url", "inci"]:
                 raise HTTPException(status_code=400, detail=f"Product {i+1} input_type must be 'url' or 'inci'")
         
-        # Initialize scraper if any product is a URL
-        needs_scraper = any(p["input_type"] == "url" for p in products_list)
-        if needs_scraper:
-            scraper = URLScraper()
+        timings: Dict[str, float] = {}
+        limits = CompareLimits()
+        # One scraper for the whole comparison: each URL scrape leases a warm Chrome
+        # from the shared browser pool (browser_pool.py) instead of launching its own
+        scraper = URLScraper()
         
         # Use the shared INCI parser utility
         from app.ai_ingredient_intelligence.utils.inci_parser import parse_inci_string
         
         # Helper function to process a single product
-        async def process_single_product(idx: int, product: dict, scraper_instance: Optional[URLScraper] = None) -> dict:
-            """Process a single product (URL or INCI) - can run in parallel"""
+        async def process_single_product(idx: int, product: dict) -> dict:
+            """Process a single product (URL or INCI) - runs concurrently, bounded by limits"""
             product_input = product["input"]
             product_type = product["input_type"]
             product_num = idx + 1
             
             print(f"Processing product {product_num} (type: {product_type})...")
             
-            # Use provided scraper or create a new one for this product
-            product_scraper = scraper_instance if scraper_instance else URLScraper()
-            
             product_data = {
                 "url_context": None,
                 "text": "",
@@ -2853,9 +2907,11 @@ async def compare_products(
                 if not product_input.startswith(("http://", "https://")):
                     raise HTTPException(status_code=400, detail=f"Product {product_num} must be a valid URL when input_type is 'url'")
                 product_data["url_context"] = product_input  # Store URL for Claude
-                extraction_result = await product_scraper.extract_ingredients_from_url(product_input)
+                async with limits.browser:
+                    extraction_result = await scraper.extract_ingredients_from_url(product_input)
                 product_data["text"] = extraction_result.get("extracted_text", "")
                 product_data["inci"] = extraction_result.get("ingredients", [])
+                # No separate name-detection call: the comparison prompt extracts the name from the text/URL
                 product_data["product_name"] = extraction_result.get("product_name")
                 # Debug logging
                 print(f"Product {product_num} extraction result:")
@@ -2865,57 +2921,32 @@ async def compare_products(
                 print(f"  - Source: {extraction_result.get('source', 'unknown')}")
                 print(f"  - Is estimated: {extraction_result.get('is_estimated', False)}")
                 print(f"  - Text length: {len(product_data['text'])} chars")
-                # Try to detect product name from text if not already extracted
-                if not product_data["product_name"] and product_data["text"]:
-                    try:
-                        product_data["product_name"] = await product_scraper.detect_product_name(product_data["text"], product_input)
-                    except:
-                        pass
             else:
-                # INCI input - parse directly first, then use Claude to clean if needed
+                # INCI input - parse directly first, then clean it (rule-based first, Claude only if needed)
                 product_data["text"] = product_input
                 product_data["inci"] = parse_inci_string(product_input)
-                # Use Claude to clean and validate INCI list if we have a scraper
-                if product_scraper and product_data["inci"]:
+                if product_data["inci"]:
                     try:
-                        cleaned_inci = await product_scraper.extract_ingredients_from_text(product_input)
+                        async with limits.llm:
+                            cleaned_inci = await scraper.extract_ingredients_from_text(product_input)
                         if cleaned_inci:
                             product_data["inci"] = cleaned_inci
                     except:
                         pass  # Fall back to parsed list
                 product_data["product_name"] = None
             
-            # Clean up scraper if we created a new one
-            if product_scraper != scraper_instance and product_scraper:
-                try:
-                    await product_scraper.close()
-                except:
-                    pass
-            
             return product_data
         
-        # Process all products in parallel for better performance
-        print(f"Processing {len(products_list)} products in parallel...")
-        # Create tasks for parallel processing
-        tasks = [
-            process_single_product(idx, product, scraper if needs_scraper else None)
+        # Process all products concurrently (bounded by COMPARE_MAX_BROWSER_SESSIONS / COMPARE_MAX_LLM_CALLS)
+        print(f"Processing {len(products_list)} products concurrently "
+              f"(max {COMPARE_MAX_BROWSER_SESSIONS} browser sessions, {COMPARE_MAX_LLM_CALLS} LLM calls)...")
+        processed_products = await _timed("extraction", timings, asyncio.gather(*[
+            _timed(f"product_{idx + 1}", timings, process_single_product(idx, product))
             for idx, product in enumerate(products_list)
-        ]
-        # Wait for all products to be processed
-        processed_products = await asyncio.gather(*tasks)
+        ]))
         
-        # If scraper wasn't initialized but we need Claude for comparison
-        if not scraper:
-            scraper = URLScraper()
-        
-        # Prepare data for Claude comparison
-        claude_client = scraper._get_claude_client() if scraper else None
-        if not claude_client:
-            claude_key = os.getenv("CLAUDE_API_KEY")
-            if not claude_key:
-                raise HTTPException(status_code=500, detail="CLAUDE_API_KEY environment variable is not set")
-            from anthropic import Anthropic
-            claude_client = Anthropic(api_key=claude_key)
+        if not is_llm_available():
+            raise HTTPException(status_code=500, detail="CLAUDE_API_KEY environment variable is not set")
         
         # Create comparison prompt for Claude
         from app.config import CLAUDE_MODEL
@@ -2956,7 +2987,7 @@ async def compare_products(
     "inci": ["list", "of", "all", "ingredients"],
     "benefits": ["list", "of", "all", "benefits", "mentioned"],
     "claims": ["list", "of", "all", "claims", "mentioned"],
-    "price": "extract price in format like '\u20B9999' or '$29.99' or 'INR 1,299', or null if not found",
+    "price": "extract price in format like '\u20B9999' or '$29.99' or 'INR 1,299', or 'Price not available' if not findable",
     "cruelty_free": true/false/null,
     "sulphate_free": true/false/null,
     "paraben_free": true/false/null,
@@ -3015,8 +3046,14 @@ CRITICAL INSTRUCTIONS:
    - IMPORTANT: Always check the INCI ingredients list provided above - if it contains the ingredient, set the corresponding attribute to FALSE
    - IMPORTANT: If the text explicitly claims "X-free", set it to TRUE even if you don't see the ingredient
 9. URL CONTEXT: If a URL is provided, use it to understand the source (e.g., nykaa.com, amazon.in, flipkart.com) and extract information accordingly. E-commerce sites typically have price, ratings, and detailed product information prominently displayed.
-10. Use null ONLY if information is truly not available after thorough search
-11. Return ONLY valid JSON, no additional text or explanations
+10. MISSING INFORMATION: Fill every field in this response - there is no second pass. When the text does not state a value, use your knowledge of the product and brand and your analysis of the INCI list:
+   - PRODUCT_NAME / BRAND_NAME: infer from the URL, the INCI list or the text
+   - PRICE: the current market price if you know it, otherwise "Price not available"
+   - BENEFITS: if none are stated, infer them from the INCI list (e.g., hyaluronic acid = hydration, vitamin C = brightening)
+   - CLAIMS: if none are stated, infer common claims from the ingredients and product type
+   - BOOLEAN ATTRIBUTES: use ingredient analysis and brand knowledge (many brands have known policies, e.g., The Ordinary = cruelty-free)
+11. Use null ONLY if a value truly cannot be determined even by inference
+12. Return ONLY valid JSON, no additional text or explanations
 
 Return the JSON comparison:"""
 
@@ -3024,17 +3061,14 @@ Return the JSON comparison:"""
         # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
         max_tokens = 4096 if "claude-3-opus-20240229" in model_name else 8192
         
-        # Run synchronous Claude API call in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: claude_client.messages.create(
+        # Async Claude call through the shared gateway (pooled, rate-limited, retried)
+        async with limits.llm:
+            response = await _timed("comparison_llm", timings, create_message(
                 model=model_name,
                 max_tokens=max_tokens,
                 temperature=0.1,
                 messages=[{"role": "user", "content": comparison_prompt}]
-            )
-        )
+            ))
         
         # Extract response content
         claude_response = response.content[0].text.strip()
@@ -3150,150 +3184,17 @@ Return the JSON comparison:"""
             
             final_products_data.append(claude_product_data)
         
-        # SECOND PASS: Fill missing fields using deep analysis
+        # SECOND PASS: the comparison call already fills what it can infer; products
+        # still missing fields share ONE batched fill call instead of one call each
         print("\n=== SECOND PASS: Filling Missing Fields ===")
-        
-        def identify_missing_fields(product_data: Dict, product_num: int) -> List[str]:
-            """Identify which fields are null or empty"""
-            missing = []
-            required_fields = {
-                "product_name": product_data.get("product_name"),
-                "brand_name": product_data.get("brand_name"),
-                "price": product_data.get("price"),
-                "benefits": product_data.get("benefits", []),
-                "claims": product_data.get("claims", []),
-                "cruelty_free": product_data.get("cruelty_free"),
-                "sulphate_free": product_data.get("sulphate_free"),
-                "paraben_free": product_data.get("paraben_free"),
-                "vegan": product_data.get("vegan"),
-                "organic": product_data.get("organic"),
-                "fragrance_free": product_data.get("fragrance_free"),
-                "non_comedogenic": product_data.get("non_comedogenic"),
-                "hypoallergenic": product_data.get("hypoallergenic"),
-            }
-            
-            for field, value in required_fields.items():
-                if value is None or (isinstance(value, list) and len(value) == 0):
-                    missing.append(field)
-            
-            if missing:
-                print(f"Product {product_num} missing fields: {', '.join(missing)}")
-            return missing
-        
-        # Helper function to fill missing fields for a single product
-        async def fill_missing_fields_for_product(idx: int, product_data: Dict, current_product: Dict, claude_client_instance, model_name: str) -> Dict:
-            """Fill missing fields for a single product - can run in parallel"""
-            product_num = idx + 1
-            missing_fields = identify_missing_fields(product_data, product_num)
-            
-            if not missing_fields:
-                return product_data
-            
-            print(f"Attempting to fill {len(missing_fields)} missing fields for Product {product_num}...")
-            fill_prompt = f"""You are an expert cosmetic product researcher. Use your knowledge base, web search capabilities, and deep analysis to find missing information about this product.
-
-Product Information:
-- Product Name: {product_data.get('product_name') or 'Unknown'}
-- Brand Name: {product_data.get('brand_name') or 'Unknown'}
-- INCI Ingredients: {', '.join(product_data.get('inci', [])) if product_data.get('inci') else 'Not available'}
-- Current Extracted Text: {current_product['text'][:5000] if current_product['text'] else 'Not available'}
-- Source URL: {current_product['url_context'] or 'Not provided'}
-- Current Benefits: {', '.join(product_data.get('benefits', [])) or 'None'}
-- Current Claims: {', '.join(product_data.get('claims', [])) or 'None'}
-
-MISSING FIELDS TO FILL:
-{', '.join(missing_fields)}
-
-INSTRUCTIONS:
-1. Use your knowledge base and reasoning to find information about this specific product
-2. If a URL is provided, use it to understand the product context
-3. For PRODUCT_NAME: If currently null, try to infer from brand name, INCI list, or URL
-4. For BRAND_NAME: If currently null, try to extract from product name, URL, or text
-5. For PRICE: Search for current market price. If not findable, use "Price not available" (not null)
-6. For BENEFITS: If empty, infer from INCI ingredients (e.g., hyaluronic acid = hydration, vitamin C = brightening)
-7. For CLAIMS: If empty, infer common claims based on ingredients and product type
-8. For BOOLEAN ATTRIBUTES (cruelty_free, vegan, organic, etc.):
-   - Use ingredient analysis: Check INCI list for indicators
-   - Use brand knowledge: Many brands have known policies (e.g., The Ordinary = cruelty-free)
-   - Use product type inference: Organic products often indicate organic status
-   - If truly cannot determine, use reasonable defaults based on product category
-   - NEVER return null - always provide true or false based on best available information
-
-Return ONLY a JSON object with the missing fields filled. Use this exact structure:
-{{
-  "product_name": "value or keep existing if not missing",
-  "brand_name": "value or keep existing if not missing",
-  "price": "value or 'Price not available' if not findable",
-  "benefits": ["list", "of", "benefits"],
-  "claims": ["list", "of", "claims"],
-  "cruelty_free": true/false,
-  "sulphate_free": true/false,
-  "paraben_free": true/false,
-  "vegan": true/false,
-  "organic": true/false,
-  "fragrance_free": true/false,
-  "non_comedogenic": true/false,
-  "hypoallergenic": true/false
-}}
-
-IMPORTANT: Only include fields that were in the MISSING FIELDS list above. For fields not in the missing list, you can omit them or use the existing values.
-CRITICAL: NEVER use null. Always provide a value (even if it's "Unknown" for text fields or false for booleans when uncertain).
-"""
-            
-            try:
-                # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
-                max_tokens = 4096 if "claude-3-opus-20240229" in model_name else 8192
-                
-                # Run synchronous Claude API call in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
-                fill_response = await loop.run_in_executor(
-                    None,
-                    lambda: claude_client_instance.messages.create(
-                        model=model_name,
-                        max_tokens=max_tokens,
-                        temperature=0.2,
-                        messages=[{"role": "user", "content": fill_prompt}]
-                    )
-                )
-                
-                fill_content = fill_response.content[0].text.strip()
-                if '{' in fill_content and '}' in fill_content:
-                    json_start = fill_content.find('{')
-                    json_end = fill_content.rfind('}') + 1
-                    json_str = fill_content[json_start:json_end]
-                    fill_data = json.loads(json_str)
-                    
-                    # Merge filled fields into product_data
-                    for field in missing_fields:
-                        if field in fill_data and fill_data[field] is not None:
-                            # Handle list fields
-                            if field in ["benefits", "claims"]:
-                                if isinstance(fill_data[field], list) and len(fill_data[field]) > 0:
-                                    product_data[field] = fill_data[field]
-                                    print(f"✓ Filled product{product_num}.{field} with {len(fill_data[field])} items")
-                            # Handle boolean fields - never allow null
-                            elif field in ["cruelty_free", "sulphate_free", "paraben_free", "vegan", "organic", "fragrance_free", "non_comedogenic", "hypoallergenic"]:
-                                if fill_data[field] is not None:
-                                    product_data[field] = fill_data[field]
-                                    print(f"✓ Filled product{product_num}.{field} = {fill_data[field]}")
-                            # Handle string fields
-                            else:
-                                if fill_data[field] and fill_data[field] != "null":
-                                    product_data[field] = fill_data[field]
-                                    print(f"✓ Filled product{product_num}.{field} = {fill_data[field]}")
-            except Exception as e:
-                print(f"Warning: Failed to fill missing fields for Product {product_num}: {e}")
-            
-            return product_data
-        
-        # Fill missing fields for all products in parallel
-        print(f"Filling missing fields for {len(final_products_data)} products in parallel...")
-        fill_tasks = [
-            fill_missing_fields_for_product(idx, product_data, processed_products[idx], claude_client, model_name)
-            for idx, product_data in enumerate(final_products_data)
-        ]
-        # Wait for all fill operations to complete
-        final_products_data = await asyncio.gather(*fill_tasks)
+        await fill_missing_fields(
+            final_products_data,
+            processed_products,
+            limits,
+            create=lambda **params: _timed("fill_llm", timings, create_message(**params)),
+            model=model_name,
+            max_tokens=max_tokens
+        )
         
         # Final pass: Ensure no null values remain
         print("\n=== FINAL PASS: Ensuring No Null Values ===")
@@ -3331,6 +3232,8 @@ CRITICAL: NEVER use null. Always provide a value (even if it's "Unknown" for tex
         
         # Calculate processing time
         processing_time = time.time() - start
+        timings["total"] = round(processing_time, 3)
+        print(f"Comparison stage timings: {timings}")
         
         # Convert to ProductComparisonItem objects
         product_items = [ProductComparisonItem(**product_data) for product_data in final_products_data]
@@ -3338,7 +3241,8 @@ CRITICAL: NEVER use null. Always provide a value (even if it's "Unknown" for tex
         # Build response
         response_data = {
             "products": product_items,
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "processing_breakdown": timings
         }
         
         return CompareProductsResponse(**response_data)
@@ -5032,7 +4936,7 @@ Return your analysis as JSON with the structure specified in the system prompt."
         # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
         max_tokens = 4096 if "claude-3-opus-20240229" in claude_model else 8192
         
-        response = claude_client.messages.create(
+        response = await create_message(
             model=claude_model,
             max_tokens=max_tokens,
             temperature=0.2,  # Lower temperature for more consistent classification
@@ -5179,7 +5083,7 @@ Return your ranking as JSON with the structure specified in the system prompt.""
         # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
         max_tokens = 4096 if "claude-3-opus-20240229" in claude_model else 8192
         
-        response = claude_client.messages.create(
+        response = await create_message(
             model=claude_model,
             max_tokens=max_tokens,
             temperature=0.2,
@@ -5748,37 +5652,15 @@ async def delete_market_research_history(
         )
 
 
-# Market Research endpoint - matches ingredients with externalProducts collection
-@router.post("/market-research", response_model=MarketResearchResponse)
-async def market_research(
-    payload: dict,
-    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
-):
+async def _resolve_market_research_input(payload: dict) -> Dict:
     """
-    Market Research: Match products from URL or INCI list with externalProducts collection.
+    Extracted ingredients and the actives to match for a /market-research request body.
     
-    IMPORTANT: Only matches ACTIVE ingredients. Shows all products that have at least one active ingredient match.
-    
-    Request body:
-    {
-        "url": "https://example.com/product/..." (required if input_type is "url"),
-        "inci": "Water, Glycerin, ..." (required if input_type is "inci"),
-        "input_type": "url" or "inci"
-    }
-    
-    Returns:
-    {
-        "products": [list of matched products with images and full details, sorted by active match percentage],
-        "extracted_ingredients": [list of ingredients extracted from input],
-        "total_matched": number of matched products (with at least one active ingredient match),
-        "processing_time": time taken,
-        "input_type": "url" or "inci"
-    }
-    
-    Note: Products are included if they match at least one active ingredient from the input.
-    Excipients and unknown ingredients are ignored for matching purposes.
+    Scrapes the URL (input_type "url") or parses the INCI list, categorizes the
+    ingredients against ingre_inci and, when none of them is an active, asks the
+    AI which ingredients to match. Shared by /market-research,
+    /market-research/page and /market-research-stream.
     """
-    start = time.time()
     scraper = None
     
     try:
@@ -5801,7 +5683,7 @@ async def market_research(
             # Initialize URL scraper and extract ingredients
             scraper = URLScraper()
             print(f"Scraping URL for market research: {url}")
-            extraction_result = await scraper.extract_ingredients_from_url(url)
+            extraction_result = await scraper.extract_ingredients_from_url(url, refresh=bool(payload.get("refresh", False)))
             
             # Get ingredients - could be list or string, ensure it's a list
             ingredients_raw = extraction_result.get("ingredients", [])
@@ -5838,11 +5720,6 @@ async def market_research(
                     detail="No valid ingredients found after parsing. Please check your input format."
                 )
         
-        # Query externalproducts collection (lowercase - as shown in MongoDB Compass)
-        external_products_col = db["externalproducts"]
-        collection_name = "externalproducts"
-        print(f"✅ Using collection: {collection_name}")
-        
         # For ingredient-based matching (url, inci)
         print(f"Extracted {len(ingredients)} ingredients for market research")
         print(f"Ingredients list: {ingredients}")
@@ -6003,431 +5880,113 @@ async def market_research(
                     print(f"  ⚠️  No normalized ingredients available for AI analysis.")
                 print(f"  Will skip product matching since no actives to match against.")
         
-        # CRITICAL: Always fetch ALL products with ingredients - don't rely on regex query
-        # The regex query might not work well with arrays, so we'll do matching in Python
+        # Match on normalized actives (AI-suggested ones come back in display case)
+        input_actives = list(dict.fromkeys(
+            normalize_product_ingredient(active) for active in input_actives if active and str(active).strip()
+        ))
+        
+        return {
+            "input_type": input_type,
+            "ingredients": ingredients,
+            "normalized_input_ingredients": normalized_input_ingredients,
+            "input_actives": input_actives,
+            "ai_analysis": ai_analysis_message,
+            "ai_product_type": ai_product_type,
+            "ai_reasoning": ai_reasoning,
+        }
+    finally:
+        if scraper:
+            try:
+                await scraper.close()
+            except:
+                pass
+
+
+# Market Research endpoint - matches ingredients with externalProducts collection
+@router.post("/market-research", response_model=MarketResearchResponse)
+async def market_research(
+    payload: dict,
+    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
+):
+    """
+    Market Research: Match products from URL or INCI list with externalProducts collection.
+    
+    IMPORTANT: Only matches ACTIVE ingredients. Shows all products that have at least one active ingredient match.
+    
+    Request body:
+    {
+        "url": "https://example.com/product/..." (required if input_type is "url"),
+        "inci": "Water, Glycerin, ..." (required if input_type is "inci"),
+        "input_type": "url" or "inci"
+    }
+    
+    Returns:
+    {
+        "products": [list of matched products with images and full details, sorted by active match percentage],
+        "extracted_ingredients": [list of ingredients extracted from input],
+        "total_matched": number of matched products (with at least one active ingredient match),
+        "processing_time": time taken,
+        "input_type": "url" or "inci"
+    }
+    
+    Note: Products are included if they match at least one active ingredient from the input.
+    Excipients and unknown ingredients are ignored for matching purposes.
+    """
+    start = time.time()
+    
+    try:
+        query = await _resolve_market_research_input(payload)
+        input_type = query["input_type"]
+        ingredients = query["ingredients"]
+        normalized_input_ingredients = query["normalized_input_ingredients"]
+        input_actives = query["input_actives"]
+        ai_analysis_message = query["ai_analysis"]
+        ai_product_type = query["ai_product_type"]
+        ai_reasoning = query["ai_reasoning"]
+        
+        # STEP 1: Score the whole catalog at once on the sparse product x INCI matrix
+        # (logic/match_scoring.py) and load only the top MARKET_RESEARCH_TOP_K products
         print(f"\n{'='*60}")
-        print("STEP 1: Fetching products from database...")
+        print("STEP 1: Scoring products on the ingredient matrix...")
         print(f"{'='*60}")
-        all_products = []
-        try:
-            # First, check how many products exist
-            print("Counting documents in collection...")
-            total_count = await external_products_col.count_documents({})
-            print(f"  Total documents: {total_count}")
-            
-            # Check for ingredients field in different ways
-            has_ingredients_count_1 = await external_products_col.count_documents({
-                "ingredients": {"$exists": True}
-            })
-            has_ingredients_count_2 = await external_products_col.count_documents({
-                "ingredients": {"$exists": True, "$ne": None}
-            })
-            has_ingredients_count_3 = await external_products_col.count_documents({
-                "ingredients": {"$exists": True, "$ne": None, "$ne": ""}
-            })
-            
-            print(f"  Products with ingredients field: {has_ingredients_count_1}")
-            print(f"  Products with ingredients (not null): {has_ingredients_count_2}")
-            print(f"  Products with ingredients (not null/empty): {has_ingredients_count_3}")
-            
-            # Try to get a sample product to see the structure
-            sample_product = await external_products_col.find_one({})
-            if sample_product:
-                print(f"\n  Sample product structure:")
-                print(f"    Keys: {list(sample_product.keys())[:10]}")
-                if "ingredients" in sample_product:
-                    sample_ing = sample_product["ingredients"]
-                    print(f"    Ingredients type: {type(sample_ing).__name__}")
-                    if isinstance(sample_ing, list):
-                        print(f"    Ingredients array length: {len(sample_ing)}")
-                        print(f"    First 3 ingredients: {sample_ing[:3]}")
-                    elif isinstance(sample_ing, str):
-                        print(f"    Ingredients string length: {len(sample_ing)}")
-                        print(f"    First 200 chars: {sample_ing[:200]}")
-            
-            # Fetch ALL products that have ingredients (no limit - we need to check everything)
-            print(f"\nFetching all products with ingredients...")
-            all_products = await external_products_col.find({
-                "ingredients": {"$exists": True, "$ne": None, "$ne": ""}
-            }).to_list(length=None)  # NO LIMIT - check all products
-            
-            print(f"✅ Fetched {len(all_products)} products to check")
-            
-            if len(all_products) == 0:
-                print(f"\n⚠️ WARNING: No products found in {collection_name} collection!")
-                print("   Possible reasons:")
-                print("   1. The collection is empty")
-                print("   2. Products don't have 'ingredients' field")
-                print("   3. All ingredients fields are null or empty")
-                print("   4. Collection name is incorrect")
-                
-                # Try fetching ANY products to see if collection has data
-                any_products = await external_products_col.find({}).limit(5).to_list(length=None)
-                if any_products:
-                    print(f"   Found {len(any_products)} products in collection, but none have ingredients field")
-                    print(f"   Sample product keys: {list(any_products[0].keys())[:10] if any_products else 'N/A'}")
-                
-                return MarketResearchResponse(
-                    products=[],
-                    extracted_ingredients=ingredients,
-                    total_matched=0,
-                    processing_time=round(time.time() - start, 2),
-                    input_type=input_type,
-                    ai_analysis=ai_analysis_message,
-                    ai_product_type=ai_product_type,
-                    ai_reasoning=ai_reasoning
-                )
-        except Exception as e:
-            print(f"\n❌ ERROR fetching products: {e}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to fetch products from database: {str(e)}"
-            )
-        
-        # Debug: Check a few sample products to see ingredient format
-        if all_products and len(all_products) > 0:
-            print(f"\n{'='*60}")
-            print("DEBUG: Sample Product Analysis")
-            print(f"{'='*60}")
-            for i, sample_product in enumerate(all_products[:3]):  # Check first 3 products
-                sample_ingredients = sample_product.get("ingredients", "")
-                product_name = sample_product.get("name") or sample_product.get("productName") or "Unknown"
-                print(f"\nSample Product {i+1}: {product_name[:50]}")
-                print(f"  Ingredients type: {type(sample_ingredients).__name__}")
-                if isinstance(sample_ingredients, str):
-                    print(f"  Ingredients (first 300 chars): {sample_ingredients[:300]}")
-                    # Try to parse it
-                    parsed = parse_inci_string(sample_ingredients[:300])
-                    print(f"  Parsed count: {len(parsed)} ingredients")
-                    if parsed:
-                        print(f"  First 3 parsed: {parsed[:3]}")
-                elif isinstance(sample_ingredients, list):
-                    print(f"  Ingredients array length: {len(sample_ingredients)}")
-                    if sample_ingredients:
-                        print(f"  First 5: {sample_ingredients[:5]}")
-            print(f"{'='*60}\n")
-        
-        # Match products based on ingredient overlap
         matched_products = []
-        print(f"\n{'='*60}")
-        print(f"Starting ingredient matching:")
-        print(f"  Input ingredients ({len(normalized_input_ingredients)}): {normalized_input_ingredients[:10]}{'...' if len(normalized_input_ingredients) > 10 else ''}")
-        print(f"  Products to check: {len(all_products)}")
-        print(f"{'='*60}\n")
-        
-        if len(all_products) == 0:
-            print("⚠️ WARNING: No products found in database to check!")
-            print("This might indicate:")
-            print("  1. The externalProducts collection is empty")
-            print("  2. No products have an 'ingredients' field")
-            print("  3. Database connection issue")
-            return MarketResearchResponse(
-                products=[],
-                extracted_ingredients=ingredients,
-                total_matched=0,
-                processing_time=round(time.time() - start, 2),
-                input_type=input_type
-            )
-        
-        print(f"🔍 Starting to check {len(all_products)} products for matches...")
-        print(f"  Active ingredients to match against: {len(input_actives)}")
+        total_matched_count = 0
         if input_actives:
-            print(f"  Active ingredients list: {input_actives[:10]}{'...' if len(input_actives) > 10 else ''}")
+            try:
+                index_start = time.time()
+                ingredient_matrix = await get_ingredient_matrix()
+                expansions = ingredient_matrix.vocabulary.expansions(input_actives)
+                top_scores, total_matched_count = ingredient_matrix.rank(
+                    expansions, normalized_input_ingredients, top_k=MARKET_RESEARCH_TOP_K
+                )
+                scored_ms = (time.time() - index_start) * 1000
+                print(f"  Actives: {input_actives[:10]}{'...' if len(input_actives) > 10 else ''}")
+                print(f"  Vocabulary terms matched: {sum(len(terms) for terms in expansions.values())}")
+                # Two queries for the whole top: the products, then the categories of their matched ingredients
+                matched_products = await materialize_page(top_scores, input_actives, expansions)
+                print(f"✅ {total_matched_count} of {len(ingredient_matrix)} products matched, scored in {scored_ms:.0f}ms; "
+                      f"loaded top {len(matched_products)}")
+            except Exception as e:
+                print(f"\n❌ ERROR fetching products: {e}")
+                import traceback
+                traceback.print_exc()
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to fetch products from database: {str(e)}"
+                )
         else:
-            print(f"  ⚠️  NO ACTIVE INGREDIENTS FOUND - will skip all products!")
-        matches_found = 0
+            print(f"  ⚠️  NO ACTIVE INGREDIENTS FOUND - will skip product matching!")
         
-        for idx, product in enumerate(all_products):
-            if (idx + 1) % 500 == 0:
-                print(f"  Processed {idx + 1}/{len(all_products)} products... ({matches_found} matches so far)")
-            
-            product_ingredients_raw = product.get("ingredients", "")
-            if not product_ingredients_raw:
-                continue
-            
-            # Parse ingredients - handle both string and array formats
-            product_ingredients = []
-            
-            if isinstance(product_ingredients_raw, list):
-                # If it's already a list, use it directly (cleaned format)
-                product_ingredients = [str(ing).strip() for ing in product_ingredients_raw if ing and str(ing).strip()]
-            elif isinstance(product_ingredients_raw, str):
-                # Extract ingredients from the string
-                ingredients_text = product_ingredients_raw.strip()
-                
-                # Skip if empty
-                if not ingredients_text:
-                    continue
-                
-                # Try to find the actual ingredient list (after "Full Ingredients List:" or "Ingredients:")
-                if "Full Ingredients List:" in ingredients_text:
-                    ingredients_text = ingredients_text.split("Full Ingredients List:")[-1].strip()
-                elif "Ingredients:" in ingredients_text:
-                    ingredients_text = ingredients_text.split("Ingredients:")[-1].strip()
-                
-                # Clean up escaped backslashes (\\\\ becomes \)
-                ingredients_text = ingredients_text.replace("\\\\", "\\")
-                # Replace backslashes with commas for parsing (Water\\Aqua\\Eau -> Water, Aqua, Eau)
-                ingredients_text = ingredients_text.replace("\\", ", ")
-                
-                # Parse the ingredients string using the same parser
-                product_ingredients = parse_inci_string(ingredients_text)
-            else:
-                continue
-            
-            if not product_ingredients:
-                continue
-            
-            # Normalize product ingredients (remove trailing punctuation for better matching)
-            normalized_product_ingredients = []
-            original_ingredient_map = {}  # Map normalized -> original for matching
-            for ing in product_ingredients:
-                if isinstance(ing, str):
-                    # Clean: strip, remove trailing punctuation, lowercase
-                    cleaned = ing.strip().rstrip('.,;!?').strip()
-                    if cleaned:
-                        normalized = cleaned.lower()
-                        normalized_product_ingredients.append(normalized)
-                        original_ingredient_map[normalized] = ing.strip()  # Keep original for display
-                elif isinstance(ing, dict) and "name" in ing:
-                    cleaned = str(ing["name"]).strip().rstrip('.,;!?').strip()
-                    if cleaned:
-                        normalized = cleaned.lower()
-                        normalized_product_ingredients.append(normalized)
-                        original_ingredient_map[normalized] = str(ing["name"]).strip()
-            
-            # MARKET RESEARCH: Only match active ingredients
-            # Skip this product if no active ingredients in input
-            if len(input_actives) == 0:
-                # No active ingredients to match, skip this product
-                continue
-            
-            # Find matching ingredients - ONLY match active ingredients
-            matched_ingredients = []
-            matched_active_indices = set()  # Track which active ingredients were matched
-            import re
-            
-            # Create a mapping from normalized active ingredient to its index in normalized_input_ingredients
-            active_to_index_map = {}
-            for idx, input_ing in enumerate(normalized_input_ingredients):
-                if input_ing in input_actives:
-                    active_to_index_map[input_ing] = idx
-            
-            # Only match active ingredients
-            for active_ing in input_actives:
-                input_clean = active_ing.strip()
-                if not input_clean:
-                    continue
-                
-                # Try to match this active ingredient with any product ingredient
-                matched_this_active = False
-                
-                for prod_ing in normalized_product_ingredients:
-                    prod_clean = prod_ing.strip()
-                    if not prod_clean:
-                        continue
-                    
-                    is_match = False
-                    
-                    # Multiple matching strategies (in order of preference):
-                    # 1. Exact match
-                    if input_clean == prod_clean:
-                        is_match = True
-                    # 2. Word boundary match - check if input is a complete word in product (most reliable)
-                    elif len(input_clean) > 3:
-                        # Use word boundaries for better matching
-                        word_boundary_pattern = r'\b' + re.escape(input_clean) + r'\b'
-                        if re.search(word_boundary_pattern, prod_clean, re.IGNORECASE):
-                            is_match = True
-                    # 3. Contains match (handles cases like "Niacinamide" matching "Niacinamide (Vitamin B3)")
-                    # But only if the input is substantial (at least 4 chars) to avoid false matches
-                    elif len(input_clean) >= 4:
-                        if input_clean in prod_clean or prod_clean in input_clean:
-                            is_match = True
-                    # 4. For short ingredients (3 chars or less), only exact match
-                    # This prevents false matches on very short strings
-                    
-                    if is_match:
-                        # Get original ingredient name from map
-                        original_ing = original_ingredient_map.get(prod_ing)
-                        if original_ing and original_ing not in matched_ingredients:
-                            matched_ingredients.append(original_ing)
-                            # Track the index of this active ingredient
-                            if active_ing in active_to_index_map:
-                                matched_active_indices.add(active_to_index_map[active_ing])
-                            matched_this_active = True
-                            if len(matched_products) < 10:  # Log for first 10 matches for debugging
-                                print(f"  ✓ Matched active: '{active_ing}' -> '{original_ing}' (product: {product.get('name', 'Unknown')[:30]})")
-                        break  # Found a match for this active ingredient, move to next
-                
-                # Debug: log if we couldn't match this active
-                if not matched_this_active and idx < 3:  # Log for first 3 products
-                    print(f"  ✗ Could not match active '{active_ing}' in product {product.get('name', 'Unknown')[:30]}")
-                    if len(normalized_product_ingredients) > 0:
-                        print(f"    Product has {len(normalized_product_ingredients)} ingredients, sample: {normalized_product_ingredients[:3]}")
-            
-            # Calculate match percentage based ONLY on active ingredients
-            matched_actives = []
-            for matched_idx in matched_active_indices:
-                if matched_idx < len(normalized_input_ingredients):
-                    matched_ing_normalized = normalized_input_ingredients[matched_idx]
-                    if matched_ing_normalized in input_actives:
-                        matched_actives.append(matched_ing_normalized)
-            
-            # Match percentage is based only on active ingredients
-            active_match_count = len(matched_actives)
-            total_active_ingredients = len(input_actives)
-            active_match_percentage = (active_match_count / total_active_ingredients * 100) if total_active_ingredients > 0 else 0
-            
-            # For compatibility, also calculate overall match (but we won't use it for filtering)
-            match_count = active_match_count
-            total_input_ingredients = len(input_actives)  # Only count actives
-            match_percentage = active_match_percentage  # Same as active match percentage
-            
-            # MARKET RESEARCH: Include any product that has at least one active ingredient match
-            # No percentage threshold - show all products with active ingredient matches
-            should_include = active_match_count > 0
-            
-            if len(matched_products) < 5:  # Debug for first 5
-                print(f"  Product match (active only): {active_match_percentage:.1f}% | Actives: {len(matched_actives)}/{len(input_actives)} | Include: {should_include}")
-            
-            # Include products that have at least one active ingredient match
-            if should_include:
-                matches_found += 1
-                
-                # Get product image - prioritize s3Image/s3Images, fallback to image/images
-                image = None
-                images = []
-                
-                # Try S3 images first (preferred)
-                if "s3Image" in product and product["s3Image"]:
-                    image = product["s3Image"]
-                    if isinstance(image, str):
-                        images = [image]
-                
-                if "s3Images" in product and product["s3Images"]:
-                    if isinstance(product["s3Images"], list) and len(product["s3Images"]) > 0:
-                        images = product["s3Images"]
-                        if not image and images:
-                            image = images[0]
-                
-                # Fallback to regular images if S3 not available
-                if not image and "image" in product and product["image"]:
-                    image = product["image"]
-                    if isinstance(image, str) and image not in images:
-                        images.insert(0, image)
-                
-                if "images" in product and product["images"]:
-                    if isinstance(product["images"], list):
-                        for img in product["images"]:
-                            if img and img not in images:
-                                images.append(img)
-                        if not image and images:
-                            image = images[0]
-                
-                # Since we only match active ingredients, all matched ingredients should be active
-                # But we verify by checking the INCI collection to get the actual active ingredient names
-                matched_ingredients_normalized = [ing.strip().lower() for ing in matched_ingredients]
-                active_ingredients = []
-                
-                if matched_ingredients_normalized:
-                    try:
-                        # Query INCI collection for categories to verify and get proper names
-                        inci_query = {
-                            "inciName_normalized": {"$in": matched_ingredients_normalized}
-                        }
-                        inci_cursor = inci_col.find(inci_query, {"inciName": 1, "inciName_normalized": 1, "category": 1})
-                        inci_results = await inci_cursor.to_list(length=None)
-                        
-                        # Build mapping of normalized name -> category and INCI name
-                        inci_category_map = {}
-                        inci_name_map = {}
-                        for inci_doc in inci_results:
-                            normalized = inci_doc.get("inciName_normalized", "").strip().lower()
-                            category = inci_doc.get("category", "")
-                            inci_name = inci_doc.get("inciName", "")
-                            if normalized and category:
-                                inci_category_map[normalized] = category
-                                inci_name_map[normalized] = inci_name
-                        
-                        # Collect active ingredients from matched ingredients
-                        for matched_ing in matched_ingredients:
-                            normalized = matched_ing.strip().lower()
-                            if normalized in inci_category_map:
-                                category = inci_category_map[normalized]
-                                if category == "Active":
-                                    # Use proper INCI name if available, otherwise use matched name
-                                    active_name = inci_name_map.get(normalized, matched_ing)
-                                    if active_name not in active_ingredients:
-                                        active_ingredients.append(active_name)
-                    except Exception as e:
-                        print(f"  Warning: Error checking active ingredients: {e}")
-                        # Fallback: use matched ingredients as active ingredients
-                        active_ingredients = matched_ingredients.copy()
-                else:
-                    # No matched ingredients, so no active ingredients
-                    active_ingredients = []
-                
-                # active_match_count is the number of input active ingredients that were matched
-                active_match_count = len(matched_actives)
-                
-                # Build product data using correct field names from schema
-                product_data = {
-                    "id": str(product.get("_id", "")),  # Use 'id' instead of '_id' for Pydantic
-                    "productName": product.get("name") or product.get("productName") or product.get("product_name"),
-                    "brand": product.get("brand") or product.get("brandName") or product.get("brand_name"),
-                    "ingredients": product_ingredients,  # Now it's a parsed list
-                    "image": image,
-                    "images": images,
-                    "price": product.get("price"),
-                    "salePrice": product.get("salePrice") or product.get("sale_price"),
-                    "description": product.get("description"),
-                    "matched_ingredients": matched_ingredients,  # All matched ingredients (should be active)
-                    "match_count": active_match_count,  # Number of input active ingredients matched
-                    "total_ingredients": len(product_ingredients),
-                    "match_percentage": round(active_match_percentage, 2),  # Active match percentage
-                    "match_score": round(active_match_percentage, 2),  # Use active match percentage as score
-                    "active_match_count": active_match_count,  # Number of active ingredients matched
-                    "active_ingredients": active_ingredients  # List of matched active ingredients (verified from INCI)
-                }
-                
-                # Add any other fields from the product (excluding unwanted fields)
-                # Exclude: countryOfOrigin, manufacturer, expiryDate, address, and similar fields
-                excluded_fields = {
-                    "countryOfOrigin", "manufacturer", "expiryDate", "expiry", 
-                    "address", "Address", "Expiry Date", "Country of Origin", 
-                    "Manufacturer", "Address:", "Expiry Date:", "Country of Origin:"
-                }
-                for key in ["category", "subcategory", "url"]:
-                    if key in product and key not in excluded_fields:
-                        product_data[key] = product[key]
-                
-                # Also filter out any unwanted fields that might be in the product dict
-                # Clean description if it contains unwanted info
-                if "description" in product_data and product_data["description"]:
-                    desc = product_data["description"]
-                    # Remove patterns like "Expiry Date: ...", "Country of Origin: ...", etc.
-                    import re
-                    patterns_to_remove = [
-                        r"Expiry Date:\s*[^\n]*",
-                        r"Country of Origin:\s*[^\n]*",
-                        r"Manufacturer:\s*[^\n]*",
-                        r"Address:\s*[^\n]*",
-                        r"&nbsp;",
-                    ]
-                    for pattern in patterns_to_remove:
-                        desc = re.sub(pattern, "", desc, flags=re.IGNORECASE)
-                    # Clean up extra whitespace
-                    desc = re.sub(r"\s+", " ", desc).strip()
-                    if desc:
-                        product_data["description"] = desc
-                    else:
-                        # If description becomes empty after cleaning, remove it
-                        product_data.pop("description", None)
-                
-                matched_products.append(product_data)
+
+        # Best matches first: only the top products were loaded, and the AI sees them in this order
+        matched_products.sort(
+            key=lambda x: (
+                x.get("match_percentage", 0),
+                x.get("active_match_count", 0),
+                x.get("weighted_jaccard", 0),
+            ),
+            reverse=True
+        )
         
         # AI-Powered Product Ranking (optional enhancement)
         # Use AI to re-rank products based on intelligent analysis
@@ -6455,8 +6014,7 @@ async def market_research(
             reverse=True
         )
         
-        # Limit to top 10 products
-        total_matched_count = len(matched_products)
+        # Limit to top 10 products (total_matched_count counts every product matching an active)
         matched_products = matched_products[:10]
         
         processing_time = time.time() - start
@@ -6467,7 +6025,6 @@ async def market_research(
         print(f"  Extracted ingredients: {len(ingredients)}")
         print(f"  Active ingredients to match: {len(input_actives)}")
         print(f"  Sample active ingredients: {input_actives[:5] if input_actives else 'None'}")
-        print(f"  Products in database: {len(all_products)}")
         print(f"  Total products matched: {total_matched_count}")
         print(f"  Showing top 10 products: {len(matched_products)}")
         if len(matched_products) > 0:
@@ -6478,13 +6035,10 @@ async def market_research(
             print(f"    - Matched active ingredients: {top_match.get('active_ingredients', [])[:5]}")
         else:
             print(f"  ⚠️  WARNING: No products matched with active ingredients!")
-            if len(all_products) > 0:
-                print(f"  Debug: Checked {len(all_products)} products but found no matches")
-                print(f"  Debug: Active ingredients searched: {input_actives[:5] if input_actives else 'None'}")
-                if len(input_actives) == 0:
-                    print(f"  Debug: No active ingredients found in input - market research requires active ingredients")
+            if input_actives:
+                print(f"  Debug: Active ingredients searched: {input_actives[:5]}")
             else:
-                print(f"  Debug: No products found in database to check")
+                print(f"  Debug: No active ingredients found in input - market research requires active ingredients")
         print(f"  Processing time: {processing_time:.2f}s")
         print(f"{'='*60}\n")
         
@@ -6515,9 +6069,157 @@ async def market_research(
             status_code=500,
             detail=f"Failed to perform market research: {str(e)}"
         )
-    finally:
-        if scraper:
-            try:
-                await scraper.close()
-            except:
-                pass
+
+
+async def _open_market_research_query(payload: dict) -> Tuple[Dict, str, int, Optional[float]]:
+    """
+    (resolved query, query id, offset, matrix build time) for a paginated request.
+    
+    A "cursor" resumes a saved query; otherwise the body is resolved like
+    /market-research and saved so its cursors can find it again.
+    """
+    cursor = payload.get("cursor")
+    if cursor:
+        try:
+            query_id, offset, built_at = decode_cursor(str(cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = await load_query(query_id)
+        if query is None:
+            raise HTTPException(status_code=410, detail="Cursor expired. Please run the market research again.")
+        return query, query_id, offset, built_at
+    
+    query = await _resolve_market_research_input(payload)
+    query_id = await save_query(query)
+    return query, query_id, 0, None
+
+
+async def _market_research_page(
+    query: Dict,
+    query_id: str,
+    offset: int,
+    page_size: int,
+    built_at: Optional[float] = None
+) -> Dict:
+    """One page of ranked matches for a resolved query, with the cursor of the next page"""
+    products = []
+    total_matched = 0
+    next_cursor = None
+    catalog_changed = False
+    input_actives = query["input_actives"]
+    if input_actives:
+        ingredient_matrix = await get_ingredient_matrix()
+        expansions = ingredient_matrix.vocabulary.expansions(input_actives)
+        scores, total_matched = ingredient_matrix.rank(
+            expansions, query["normalized_input_ingredients"], top_k=page_size, offset=offset
+        )
+        products = await materialize_page(scores, input_actives, expansions)
+        if offset + len(scores) < total_matched:
+            next_cursor = encode_cursor(query_id, offset + len(scores), ingredient_matrix.built_at)
+        catalog_changed = built_at is not None and built_at != ingredient_matrix.built_at
+    return {
+        "products": [MarketResearchProduct(**product) for product in products],
+        "total_matched": total_matched,
+        "offset": offset,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "catalog_changed": catalog_changed,
+    }
+
+
+def _market_research_query_fields(query: Dict) -> Dict:
+    return {
+        "extracted_ingredients": query["ingredients"],
+        "input_type": query["input_type"],
+        "ai_analysis": query["ai_analysis"],
+        "ai_product_type": query["ai_product_type"],
+        "ai_reasoning": query["ai_reasoning"],
+    }
+
+
+@router.post("/market-research/page", response_model=MarketResearchPageResponse)
+async def market_research_page(
+    payload: dict,
+    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
+):
+    """
+    Paginated variant of /market-research: one page of ranked matches and a cursor for the next.
+    
+    Request body (first page): same as /market-research, plus optional "page_size" (default 20, max 100)
+    Request body (next pages): {"cursor": "<next_cursor of the previous page>", "page_size": 20}
+    
+    Only the products of the requested page are loaded and checked against the
+    INCI collection, so response size and time to the first page do not grow
+    with the number of matches. Pages follow the matrix ranking (actives
+    covered, then idf-weighted Jaccard); the AI re-rank of /market-research
+    is not applied. next_cursor is null on the last page; catalog_changed is
+    true when the catalog was re-indexed since the cursor was issued.
+    """
+    start = time.time()
+    page_size = clamp_page_size(payload.get("page_size"))
+    
+    try:
+        query, query_id, offset, built_at = await _open_market_research_query(payload)
+        page = await _market_research_page(query, query_id, offset, page_size, built_at)
+        print(f"✅ Market research page: offset {offset}, {len(page['products'])} of {page['total_matched']} matches "
+              f"in {time.time() - start:.2f}s")
+        return MarketResearchPageResponse(
+            **page,
+            **_market_research_query_fields(query),
+            processing_time=round(time.time() - start, 2)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in market research page: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to perform market research: {str(e)}"
+        )
+
+
+@router.post("/market-research-stream")
+async def market_research_stream(
+    payload: dict,
+    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
+):
+    """
+    Streaming variant of /market-research/page (NDJSON, one event per line).
+    
+    Events:
+        {"type": "query", "extracted_ingredients": [...], "active_ingredients": [...], "input_type": ..., "ai_analysis": ...}
+        {"type": "page", "products": [...], "offset": 0, "total_matched": 123, "next_cursor": "..."}
+        {"type": "done", "next_cursor": "...", "processing_time": 1.2}
+        {"type": "error", "detail": "..."}
+    
+    Request body: same as /market-research/page, plus optional "pages"
+    (pages to stream before "done", default 1, max MARKET_RESEARCH_STREAM_MAX_PAGES).
+    The "query" event arrives as soon as the ingredients are extracted; the
+    UI fetches further pages with /market-research/page and next_cursor.
+    """
+    from app.ai_ingredient_intelligence.api.formulation_report import ndjson_response
+    
+    page_size = clamp_page_size(payload.get("page_size"))
+    try:
+        pages = max(1, min(int(payload.get("pages", 1)), MARKET_RESEARCH_STREAM_MAX_PAGES))
+    except (TypeError, ValueError):
+        pages = 1
+    
+    async def events():
+        start = time.time()
+        query, query_id, offset, built_at = await _open_market_research_query(payload)
+        yield {"type": "query", "active_ingredients": query["input_actives"], **_market_research_query_fields(query)}
+        
+        next_cursor = None
+        for _ in range(pages):
+            page = await _market_research_page(query, query_id, offset, page_size, built_at)
+            yield {"type": "page", **page}
+            next_cursor = page["next_cursor"]
+            if not next_cursor:
+                break
+            query_id, offset, built_at = decode_cursor(next_cursor)
+        yield {"type": "done", "next_cursor": next_cursor, "processing_time": round(time.time() - start, 2)}
+    
+    return ndjson_response(events())
@@ -1,15 +1,16 @@
 # app/ai_ingredient_intelligence/api/formulation_report.py
 import io
 import datetime
+import json
 import os
-import re
 import httpx
 import asyncio
 from fastapi import APIRouter, HTTPException, Response, Request, Body, Depends
 from fastapi import APIRouter, HTTPException, Response, Request, Body, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
-import anthropic
+from typing import Any, AsyncIterator, List, Optional, Dict, Tuple
 from jinja2 import Environment, FileSystemLoader
 from app.ai_ingredient_intelligence.models.schemas import FormulationReportResponse, FormulationSummary, ReportTableRow
 
@@ -42,7 +43,17 @@ if not claude_api_key:
 if not presenton_api_key:
     print("⚠️ Warning: PRESENTON_API_KEY environment variable not set")
 
-claude_client = anthropic.Anthropic(api_key=claude_api_key) if claude_api_key else None
+# All Claude calls go through the shared async gateway (never block the event loop)
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, is_llm_available
+from app.ai_ingredient_intelligence.logic.prompt_cache_manager import get_cache_manager
+from app.ai_ingredient_intelligence.logic.llm_response_cache import (
+    cached_response_text,
+    llm_cache_headers,
+    lookup_response_text,
+    store_response_text,
+    track_llm_cache,
+)
+from app.ai_ingredient_intelligence.logic.bis_caution_reformat import reformat_bis_cautions
 
 # Presenton API configuration
 PRESENTON_API_BASE_URL = "https://api.presenton.ai/api/v1"
@@ -763,14 +774,87 @@ def parse_report_to_json(report_text: str) -> FormulationReportResponse:
     )
 
 
-async def generate_report_text(
-    inci_str: str, 
-    branded_ingredients: Optional[List[str]] = None, 
+# Section headers of the report, in order, and the response field each one fills
+REPORT_SECTIONS = [
+    ("0) Executive Summary", "summary"),
+    ("1) Submitted INCI List", "inci_list"),
+    ("2) Analysis", "analysis_table"),
+    ("3) Compliance Panel", "compliance_panel"),
+    ("4) Preservative Efficacy Check", "preservative_efficacy"),
+    ("5) Risk Panel", "risk_panel"),
+    ("6) Cumulative Benefit Panel", "cumulative_benefit"),
+    ("7) Claim Panel", "claim_panel"),
+    ("8) Recommended pH Range", "recommended_ph_range"),
+    ("9) Expected Benefits Analysis", "expected_benefits_analysis"),
+]
+
+
+class IncrementalReportParser:
+    """
+    Incremental parse_report_to_json for streamed report text.
+
+    feed() takes text deltas and returns the sections that just finished.
+    A section is finished once the next section header line arrives; its
+    value comes from parse_report_to_json over the text received so far, so
+    streamed sections are exactly what the final parse produces. (The summary
+    may still gain its pH range from section 8 in the final report.)
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.emitted: List[str] = []
+        self._line_start = 0  # offset of the first line not yet scanned
+        self._current: Optional[str] = None  # field of the section being received
+
+    @staticmethod
+    def _section_field(line: str) -> Optional[str]:
+        for header, field in REPORT_SECTIONS:
+            if line.startswith(header):
+                return field
+        return None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add a text delta; returns [(field, value)] for sections completed by it"""
+        self.text += chunk
+        finished = []
+        while True:
+            newline = self.text.find("\n", self._line_start)
+            if newline == -1:
+                break
+            field = self._section_field(self.text[self._line_start:newline].strip())
+            if field is not None:
+                if self._current is not None and self._current not in self.emitted:
+                    report = parse_report_to_json(self.text[:self._line_start])
+                    finished.append((self._current, getattr(report, self._current)))
+                    self.emitted.append(self._current)
+                self._current = field
+            self._line_start = newline + 1
+        return finished
+
+    def finish(self) -> Tuple[List[Tuple[str, Any]], FormulationReportResponse]:
+        """Parse the complete text; returns the sections not emitted yet and the full report"""
+        report = parse_report_to_json(clean_ai_response(self.text))
+        remaining = [
+            (field, getattr(report, field)) for _, field in REPORT_SECTIONS
+            if field not in self.emitted and (field == self._current or getattr(report, field))
+        ]
+        self.emitted.extend(field for field, _ in remaining)
+        return remaining, report
+
+
+async def build_report_params(
+    inci_str: str,
+    branded_ingredients: Optional[List[str]] = None,
     not_branded_ingredients: Optional[List[str]] = None,
     bis_cautions: Optional[Dict[str, List[str]]] = None,
     expected_benefits: Optional[str] = None
-) -> str:
-    """Generate report text using Claude"""
+) -> Tuple[Dict, Optional[Dict[str, List[str]]]]:
+    """
+    Build the report request (shared by the blocking and streaming endpoints).
+
+    Returns:
+        (messages.create parameters without `system`, cleaned BIS cautions)
+    """
     
     # Build categorization context if provided
     categorization_info = ""
@@ -786,59 +870,9 @@ async def generate_report_text(
     cleaned_bis_cautions = {}
     if bis_cautions and len(bis_cautions) > 0:
         print(f"🧹 Cleaning and reformatting BIS cautions with Claude...")
-        if claude_client:
-            for ingredient, cautions in bis_cautions.items():
-                if cautions and len(cautions) > 0:
-                    try:
-                        # Ask Claude to reformat cautions into proper sentences
-                        reformat_prompt = f"""You are a regulatory compliance expert. Below are raw BIS (Bureau of Indian Standards) caution fragments extracted from documents for the ingredient: {ingredient}
-
-RAW CAUTION FRAGMENTS:
-{chr(10).join(f'{i+1}. {caution}' for i, caution in enumerate(cautions))}
-
-TASK: Reform each fragment into a complete, proper sentence that makes regulatory sense. 
-
-REQUIREMENTS:
-1. Each caution must be a complete, grammatically correct sentence
-2. Include all numerical values, percentages, limits, CAS numbers, and regulatory information
-3. Make it clear and professional (e.g., "Maximum concentration: 5% w/w" not just "5% w/w")
-4. If a fragment is incomplete or malformed, reconstruct it into a meaningful sentence based on context
-5. Remove fragments that are just CAS numbers, ingredient names, or incomplete text
-6. Each reformatted caution should be on a separate line, numbered 1., 2., 3., etc.
-
-Return ONLY the reformatted cautions, one per line, numbered. If a fragment cannot be made into a proper sentence, skip it.
-
-REFORMATTED CAUTIONS:"""
-
-                        response = claude_client.messages.create(
-                            model="claude-3-opus-20240229",
-                            max_tokens=4096,  # Maximum allowed for claude-3-opus-20240229
-                            temperature=0.1,
-                            messages=[{"role": "user", "content": reformat_prompt}]
-                        )
-                        
-                        reformatted_text = response.content[0].text.strip()
-                        # Parse the reformatted cautions (one per line, numbered)
-                        reformatted_cautions = []
-                        for line in reformatted_text.split('\n'):
-                            line = line.strip()
-                            if line and (line[0].isdigit() or line.startswith('1.') or line.startswith('2.') or line.startswith('3.') or line.startswith('4.') or line.startswith('5.')):
-                                # Remove numbering and clean
-                                cleaned = re.sub(r'^\d+\.\s*', '', line).strip()
-                                if cleaned and len(cleaned) > 10:  # Must be meaningful
-                                    reformatted_cautions.append(cleaned)
-                        
-                        if reformatted_cautions:
-                            cleaned_bis_cautions[ingredient] = reformatted_cautions
-                            print(f"   ✅ {ingredient}: Reformatted {len(reformatted_cautions)} caution(s) from {len(cautions)} fragments")
-                        else:
-                            # Fallback: use original if reformatting failed
-                            cleaned_bis_cautions[ingredient] = cautions
-                            print(f"   ⚠️ {ingredient}: Reformatting failed, using original {len(cautions)} caution(s)")
-                    except Exception as e:
-                        print(f"   ❌ Error reformatting cautions for {ingredient}: {e}")
-                        # Fallback to original
-                        cleaned_bis_cautions[ingredient] = cautions
+        if is_llm_available():
+            # All ingredients in a few batched requests; previously reworded sets come from cache
+            cleaned_bis_cautions = await reformat_bis_cautions(bis_cautions)
         else:
             # No Claude client, use original
             cleaned_bis_cautions = bis_cautions
@@ -899,8 +933,35 @@ REFORMATTED CAUTIONS:"""
     
     user_prompt = f"Generate report for this INCI list:\n{inci_str}{categorization_info}{bis_cautions_info}{expected_benefits_info}\n\nREMEMBER: Every table cell must have content. NO EMPTY CELLS!\n\nCRITICAL FOR BIS CAUTIONS - THIS IS MANDATORY:\n- If BIS cautions are provided above for an ingredient, you MUST include ALL of them - DO NOT SKIP ANY\n- Count the number of cautions provided for each ingredient and ensure ALL are included\n- Each caution must be on a SEPARATE LINE within the BIS Cautions column (use actual line breaks)\n- Number each caution starting with 1., 2., 3., 4., etc. on its own line\n- Do NOT combine multiple cautions into one line separated by commas or semicolons\n- Do NOT skip any cautions - if 4 are provided, include all 4; if 5 are provided, include all 5\n- Do NOT summarize or shorten - include the FULL text of each caution exactly as provided\n- Write each caution exactly as provided, preserving all numerical values, percentages, limits, and exact wording\n- Missing even one caution is a CRITICAL ERROR - verify you have included every single caution listed above\n\nCRITICAL: You MUST generate ALL 9 sections (or 8 if no expected benefits). Do NOT stop after section 2. Include sections 3-9:\n- 3) Compliance Panel\n- 4) Preservative Efficacy Check\n- 5) Risk Panel\n- 6) Cumulative Benefit Panel\n- 7) Claim Panel\n- 8) Recommended pH Range\n- 9) Expected Benefits Analysis (if expected benefits provided)"
     
+    api_params = {
+        "model": "claude-3-opus-20240229",
+        "max_tokens": 4096,  # Maximum allowed for claude-3-opus-20240229
+        "temperature": 0.1,
+        "messages": [
+            {"role": "user", "content": user_prompt}
+        ]
+    }
+    return api_params, bis_cautions
+
+
+async def generate_report_text(
+    inci_str: str, 
+    branded_ingredients: Optional[List[str]] = None, 
+    not_branded_ingredients: Optional[List[str]] = None,
+    bis_cautions: Optional[Dict[str, List[str]]] = None,
+    expected_benefits: Optional[str] = None
+) -> str:
+    """Generate report text using Claude"""
+    api_params, bis_cautions = await build_report_params(
+        inci_str,
+        branded_ingredients=branded_ingredients,
+        not_branded_ingredients=not_branded_ingredients,
+        bis_cautions=bis_cautions,
+        expected_benefits=expected_benefits
+    )
+    
     # Use Claude for report generation
-    if claude_client:
+    if is_llm_available():
         try:
             print("🔄 Generating report with Claude...")
             if bis_cautions and len(bis_cautions) > 0:
@@ -911,16 +972,16 @@ REFORMATTED CAUTIONS:"""
                         print(f"   - {ing}: {len(cautions)} caution(s)")
             
             # Use Claude API to generate report
-            message = claude_client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=4096,  # Maximum allowed for claude-3-opus-20240229
-                temperature=0.1,
-                system=SYSTEM_PROMPT,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
+            # SYSTEM_PROMPT is static, so it is sent as a cached block;
+            # an identical earlier request is answered from the response cache
+            report_text, _ = await cached_response_text(
+                {**api_params, "system": SYSTEM_PROMPT},
+                lambda: get_cache_manager().create_message(
+                    prompt_type="formulation_report",
+                    system_prompt=SYSTEM_PROMPT,
+                    **api_params
+                )
             )
-            report_text = message.content[0].text
             report_text = clean_ai_response(report_text)
             
             # Debug: Check if all sections are present
@@ -964,12 +1025,118 @@ REFORMATTED CAUTIONS:"""
     # If Claude not available
     raise HTTPException(status_code=500, detail="Claude API not available. Please check your CLAUDE_API_KEY environment variable.")
 
+async def stream_report_events(
+    inci_str: str,
+    branded_ingredients: Optional[List[str]] = None,
+    not_branded_ingredients: Optional[List[str]] = None,
+    bis_cautions: Optional[Dict[str, List[str]]] = None,
+    expected_benefits: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate the report while streaming it. Yields events:
+        {"type": "token", "text": ...}                 report text as Claude writes it
+        {"type": "section", "name": ..., "data": ...}  each section once its table is complete
+        {"type": "complete", "report": {...}}          the full FormulationReportResponse
+    """
+    cache_scope = track_llm_cache()
+    api_params, bis_cautions = await build_report_params(
+        inci_str,
+        branded_ingredients=branded_ingredients,
+        not_branded_ingredients=not_branded_ingredients,
+        bis_cautions=bis_cautions,
+        expected_benefits=expected_benefits
+    )
+    cache_params = {**api_params, "system": SYSTEM_PROMPT}
+    parser = IncrementalReportParser()
+
+    cached_text = await lookup_response_text(cache_params)
+    if cached_text is not None:
+        chunks = _single_chunk(cached_text)
+    else:
+        print("🔄 Streaming report with Claude...")
+        chunks = get_cache_manager().stream_message(
+            prompt_type="formulation_report",
+            system_prompt=SYSTEM_PROMPT,
+            **api_params
+        )
+
+    async for chunk in chunks:
+        yield {"type": "token", "text": chunk}
+        for name, data in parser.feed(chunk):
+            yield {"type": "section", "name": name, "data": data}
+    # Flush a final line without a trailing newline
+    for name, data in parser.feed("\n"):
+        yield {"type": "section", "name": name, "data": data}
+
+    remaining, report = parser.finish()
+    if not report.raw_text or not report.raw_text.strip():
+        raise HTTPException(status_code=500, detail="Report text generation returned empty result")
+    if cached_text is None:
+        await store_response_text(cache_params, parser.text.strip())
+    for name, data in remaining:
+        yield {"type": "section", "name": name, "data": data}
+    report.cache_hit = cache_scope.cache_hit
+    print(f"✅ Streamed report - Analysis rows: {len(report.analysis_table)}, sections: {parser.emitted}")
+    yield {"type": "complete", "report": report}
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def ndjson_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Serialize events as newline-delimited JSON; errors become a final {"type": "error"} event"""
+    async def body():
+        try:
+            async for event in events:
+                yield json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"type": "error", "detail": e.detail}) + "\n"
+        except Exception as e:
+            print(f"❌ Error while streaming report: {type(e).__name__}: {e}")
+            yield json.dumps({"type": "error", "detail": f"{type(e).__name__}: {e}"}) + "\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        # Disable proxy buffering (nginx) so events reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/formulation-report-stream")
+async def stream_report_json(
+    payload: FormulationReportRequest,
+    current_user: dict = Depends(verify_jwt_token)  # JWT token validation
+):
+    """
+    Streaming variant of /formulation-report-json (NDJSON, one event per line).
+
+    The first report text arrives within seconds instead of after the whole
+    report; each section is sent as soon as it is complete, followed by a
+    final "complete" event with the same structure /formulation-report-json returns.
+    """
+    if not payload.inciList or len(payload.inciList) == 0:
+        raise HTTPException(status_code=400, detail="No ingredients provided in inciList")
+    if not is_llm_available():
+        raise HTTPException(status_code=500, detail="Claude API not available. Please check your CLAUDE_API_KEY environment variable.")
+    
+    print(f"📋 Streaming report for {len(payload.inciList)} ingredients")
+    return ndjson_response(stream_report_events(
+        ", ".join(payload.inciList),
+        branded_ingredients=payload.brandedIngredients,
+        not_branded_ingredients=payload.notBrandedIngredients,
+        bis_cautions=payload.bisCautions,
+        expected_benefits=payload.expectedBenefits
+    ))
+
 @router.post("/formulation-report-json", response_model=FormulationReportResponse)
 async def generate_report_json(
     payload: FormulationReportRequest,
     current_user: dict = Depends(verify_jwt_token)  # JWT token validation
 ):
     """Generate report and return as structured JSON"""
+    cache_scope = track_llm_cache()
     try:
         # Validate input
         if not payload.inciList or len(payload.inciList) == 0:
@@ -1009,6 +1176,7 @@ async def generate_report_json(
         
         print(f"✅ Parsed report - INCI list: {len(report_json.inci_list)}, Analysis rows: {len(report_json.analysis_table)}")
         
+        report_json.cache_hit = cache_scope.cache_hit
         return report_json
         
     except HTTPException:
@@ -1025,6 +1193,7 @@ async def generate_report(
     request: Request,
     current_user: dict = Depends(verify_jwt_token)  # JWT token validation
 ):
+    cache_scope = track_llm_cache()
     try:
         inci_str = ", ".join(payload.inciList)
 
@@ -1120,18 +1289,24 @@ async def generate_report(
             retry_prompt = f"{SYSTEM_PROMPT}\n\nCRITICAL: The previous response had empty table cells, missing notes, missing ingredients, missing BIS cautions, or was missing sections. Regenerate with NO EMPTY CELLS, MEANINGFUL NOTES, ALL INGREDIENTS INCLUDED, ALL BIS CAUTIONS INCLUDED, AND ALL SECTIONS.\n\nGenerate report for this INCI list:\n{inci_str}{retry_categorization}{retry_bis_cautions}{retry_expected_benefits}\n\nEVERY SINGLE TABLE CELL MUST CONTAIN MEANINGFUL TEXT!\nINCLUDE ALL {ingredient_count} INGREDIENTS - DO NOT SKIP ANY!\n\nCRITICAL: You MUST generate ALL sections starting with section 0:\n- 0) Executive Summary (MANDATORY - must be first, format as table with Field | Value)\n- 1) Submitted INCI List\n- 2) Analysis\n- 3) Compliance Panel\n- 4) Preservative Efficacy Check\n- 5) Risk Panel\n- 6) Cumulative Benefit Panel\n- 7) Claim Panel\n- 8) Recommended pH Range\n- 9) Expected Benefits Analysis (if expected benefits provided)\n\nDO NOT skip section 0 (Executive Summary). You MUST include ALL sections!\n\nCRITICAL FOR BIS CAUTIONS:\n- If BIS cautions are provided above, you MUST include ALL of them for each ingredient\n- Count the cautions provided and ensure ALL are included - missing even one is an error\n- Each caution must be on a SEPARATE LINE with proper numbering (1., 2., 3., etc.)\n- Do NOT combine cautions into one line - each must be on its own line\n- Include the FULL text of each caution with exact numerical values\n\nExample of proper notes:\nAqua: Primary solvent, base ingredient\nGlycerin: Humectant, skin conditioning agent\nNiacinamide: Vitamin B3, brightening active\nProprietary Blend XYZ: Unknown proprietary ingredient, requires manufacturer clarification"
             
             # Regenerate with Claude
-            if claude_client:
+            if is_llm_available():
                 try:
-                    retry_message = claude_client.messages.create(
-                        model="claude-3-opus-20240229",
-                        max_tokens=4096,  # Maximum allowed for claude-3-opus-20240229
-                        temperature=0.1,
-                        system=SYSTEM_PROMPT,
-                        messages=[
+                    retry_params = {
+                        "model": "claude-3-opus-20240229",
+                        "max_tokens": 4096,  # Maximum allowed for claude-3-opus-20240229
+                        "temperature": 0.1,
+                        "messages": [
                             {"role": "user", "content": retry_prompt}
                         ]
+                    }
+                    report_text, _ = await cached_response_text(
+                        {**retry_params, "system": SYSTEM_PROMPT},
+                        lambda: get_cache_manager().create_message(
+                            prompt_type="formulation_report",
+                            system_prompt=SYSTEM_PROMPT,
+                            **retry_params
+                        )
                     )
-                    report_text = retry_message.content[0].text
                 except Exception as e:
                     print(f"❌ Claude retry failed: {type(e).__name__}: {e}")
                     raise HTTPException(status_code=500, detail=f"Claude retry failed: {str(e)}")
@@ -1189,7 +1364,7 @@ async def generate_report(
             "report_text": report_text
         })
 
-        return Response(content=html_content, media_type="text/html")
+        return Response(content=html_content, media_type="text/html", headers=llm_cache_headers(cache_scope))
 
     except Exception as e:
         print(f"❌ Error in generate_report: {type(e).__name__}: {e}")
@@ -1207,9 +1382,29 @@ async def get_report_status(current_user: dict = Depends(verify_jwt_token)):  #
         "last_generated": "Available" if last_report["text"] else "No report generated yet"
     }
 
+def _strip_code_fence(response_text: str) -> str:
+    """Remove a surrounding markdown code block if present"""
+    if response_text.startswith("```"):
+        # Extract JSON from code block
+        lines = response_text.split('\n')
+        if lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines[-1].startswith("```"):
+            lines = lines[:-1]
+        response_text = '\n'.join(lines)
+    return response_text
+
+def _parse_presenton_prompt(response_text: str) -> Optional[Dict]:
+    """Parsed Presenton prompt, or None if the text is not a JSON object"""
+    try:
+        presenton_prompt = json.loads(_strip_code_fence(response_text))
+    except json.JSONDecodeError:
+        return None
+    return presenton_prompt if isinstance(presenton_prompt, dict) else None
+
 async def generate_presenton_prompt(report_data: FormulationReportResponse) -> Dict:
     """Generate Presenton API JSON prompt using Claude from formulation report data"""
-    if not claude_client:
+    if not is_llm_available():
         raise HTTPException(status_code=500, detail="Claude API not available")
     
     # Convert report data to JSON string for Claude
@@ -1253,29 +1448,25 @@ Return the JSON object now:"""
     
     try:
         print("🤖 Generating Presenton prompt with Claude...")
-        message = claude_client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=4096,  # Maximum allowed for claude-3-opus-20240229
-            temperature=0.3,
-            messages=[
+        api_params = {
+            "model": "claude-3-opus-20240229",
+            "max_tokens": 4096,  # Maximum allowed for claude-3-opus-20240229
+            "temperature": 0.3,
+            "messages": [
                 {"role": "user", "content": claude_prompt}
             ]
+        }
+        # Only a response that parses into a usable prompt is cached
+        response_text, _ = await cached_response_text(
+            api_params,
+            lambda: create_message(**api_params),
+            validate=lambda text: set(_parse_presenton_prompt(text) or {}) >= {"instructions", "content"}
         )
         
-        response_text = message.content[0].text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```"):
-            # Extract JSON from code block
-            lines = response_text.split('\n')
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines[-1].startswith("```"):
-                lines = lines[:-1]
-            response_text = '\n'.join(lines)
-        
-        # Parse JSON
-        presenton_prompt = json.loads(response_text)
+        presenton_prompt = _parse_presenton_prompt(response_text)
+        if presenton_prompt is None:
+            # Parse again for the precise error
+            presenton_prompt = json.loads(_strip_code_fence(response_text))
         
         # Validate structure
         if "instructions" not in presenton_prompt or "content" not in presenton_prompt:
@@ -1300,6 +1491,7 @@ async def generate_ppt(
     current_user: dict = Depends(verify_jwt_token)  # JWT token validation
 ):
     """Generate PPT presentation using Presenton API from report JSON data"""
+    cache_scope = track_llm_cache()
     try:
         if not presenton_api_key:
             raise HTTPException(
@@ -1436,6 +1628,7 @@ async def generate_ppt(
             if edit_path:
                 headers["X-Presenton-Edit-Path"] = f"https://presenton.ai{edit_path}"
                 headers["X-Presenton-Presentation-Id"] = presentation_id
+            headers.update(llm_cache_headers(cache_scope))
             
             return Response(
                 content=pptx_bytes,
@@ -1551,6 +1744,7 @@ async def generate_pdf(
     current_user: dict = Depends(verify_jwt_token)  # JWT token validation
 ):
     """Generate PDF presentation using Presenton API from report JSON data"""
+    cache_scope = track_llm_cache()
     try:
         if not presenton_api_key:
             raise HTTPException(
@@ -1685,6 +1879,7 @@ async def generate_pdf(
             if edit_path:
                 headers["X-Presenton-Edit-Path"] = f"https://presenton.ai{edit_path}"
                 headers["X-Presenton-Presentation-Id"] = presentation_id
+            headers.update(llm_cache_headers(cache_scope))
             
             return Response(
                 content=pdf_bytes,
@@ -0,0 +1,265 @@
+# app/ai_ingredient_intelligence/logic/bis_caution_extract.py
+"""
+Caution extraction for BIS chunks, split into an index-time and a query-time pass.
+
+Index time (segment_chunk, called when PDFs are embedded):
+    Each chunk is split the three ways the extractor has always used
+    (sentences, lines, paragraphs). Only fragments containing a caution
+    keyword are kept, each tagged with which placements it qualifies for.
+    The result is stored as JSON in the chunk metadata ("caution_fragments").
+
+Query time (extract_ingredient_cautions):
+    For each retrieved chunk, the pre-tagged fragments are filtered by
+    whether they (or the chunk) mention the ingredient and ranked:
+    fragments mentioning the ingredient first (latest found first, as the
+    old insert(0) produced), then the rest in discovery order. No text is
+    re-split and no keyword list is scanned per fragment.
+
+Keyword detection is one compiled alternation; all regexes are compiled once.
+Chunks embedded before tagging existed are segmented lazily and memoized.
+
+Fragment record (compact keys, stored as JSON):
+    t: text
+    f: kept when the fragment mentions the ingredient
+    b: kept when it does not
+    c: sub-sentences of a long numbered paragraph, used instead of the
+       paragraph (when it mentions the ingredient, or the chunk does)
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from app.ai_ingredient_intelligence.logic.cache_store import LRUCache
+
+# Bump when segment_chunk changes so stale chunk metadata is re-segmented
+SEGMENTER_VERSION = 1
+
+# Expand search keywords for better coverage - focus on numerical limits
+CAUTION_KEYWORDS = [
+    'caution', 'warning', 'restriction', 'limit', 'maximum', 'minimum',
+    'prohibited', 'not allowed', 'should not', 'avoid', 'must not',
+    'instruction', 'requirement', 'mandatory', 'compliance', 'regulation',
+    'standard', 'guideline', 'specification', 'condition', 'precaution',
+    'percent', 'percentage', '%', 'w/w', 'w/v', 'concentration', 'amount',
+    'not exceed', 'shall not exceed', 'must not exceed', 'should not exceed',
+    'column', 'table', 'mg/kg', 'ppm', 'g/kg', 'mg/l', 'g/l'
+]
+
+# Substring semantics (same as `keyword in text.lower()`), in a single pass
+CAUTION_KEYWORD_PATTERN = re.compile(
+    "|".join(re.escape(keyword) for keyword in sorted(CAUTION_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE
+)
+# Pattern to match numerical values (percentages, limits, concentrations)
+NUMBER_PATTERN = re.compile(r'\d+\.?\d*\s*(?:%|percent|w/w|w/v|mg/kg|ppm|g/kg|mg/l|g/l|mg|g|kg|ml|l)?', re.IGNORECASE)
+# Number WITH a unit - a real numerical limit
+NUMERICAL_LIMIT_PATTERN = re.compile(r'\d+\.?\d*\s*(?:%|percent|w/w|w/v|mg/kg|ppm|g/kg|mg/l|g/l|mg|g|kg|ml|l)', re.IGNORECASE)
+ANY_NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+
+# Water-related ingredients should have NO cautions shown at all
+WATER_RELATED_INGREDIENTS = ['water', 'aqua']
+
+# Common ingredients that shouldn't have generic safety cautions (unless they have specific numerical limits)
+COMMON_INGREDIENTS_NO_GENERIC_CAUTIONS = [
+    'glycerin', 'glycerol', 'dimethicone',
+    'propylene glycol', 'butylene glycol', 'squalane', 'squalene'
+]
+
+GENERIC_SAFETY_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in [
+    'avoid contact with eyes',
+    'avoid contact with eye',
+    'keep away from eyes',
+    'keep away from eye',
+    'do not get in eyes',
+    'do not get in eye',
+    'not for use in eyes',
+    'for external use only',
+    'external use only'
+]), re.IGNORECASE)
+
+MAX_CAUTIONS_PER_INGREDIENT = 10
+
+# Lazily segmented chunks (vectorstores embedded before index-time tagging)
+_fragment_memo = LRUCache(maxsize=20000)
+_FRAGMENT_MEMO_TTL = 24 * 3600
+
+
+def has_caution_keyword(text: str) -> bool:
+    return CAUTION_KEYWORD_PATTERN.search(text) is not None
+
+
+def _short_fragment(text: str, min_len: int) -> Optional[Dict[str, Any]]:
+    """Sentence/line fragment: with a number it must be longer than min_len"""
+    has_number = NUMBER_PATTERN.search(text) is not None
+    front = (not has_number) or len(text) > min_len
+    back = has_number and len(text) > min_len
+    if not (front or back):
+        return None
+    return {"t": text, "f": front, "b": back}
+
+
+def _paragraph_fragment(text: str) -> Optional[Dict[str, Any]]:
+    if NUMBER_PATTERN.search(text) is None:
+        return {"t": text, "f": True, "b": False} if len(text) < 300 else None
+    if len(text) < 500:
+        return {"t": text, "f": True, "b": True}
+    # Split long paragraphs but keep sentences with numbers
+    subs = [
+        sent.strip() for sent in text.split('.')
+        if sent.strip() and len(sent.strip()) > 20 and NUMBER_PATTERN.search(sent.strip())
+    ]
+    return {"t": text, "f": False, "b": False, "c": subs} if subs else None
+
+
+def segment_chunk(content: str) -> List[Dict[str, Any]]:
+    """
+    Index-time pass: split a chunk into tagged caution fragments.
+    Order is discovery order: sentences, then lines, then paragraphs.
+    """
+    if not content or not has_caution_keyword(content):
+        return []
+
+    fragments: List[Dict[str, Any]] = []
+    # Strategy 1: complete sentences; Strategy 2: lines (tables); Strategy 3: paragraphs
+    for parts, make in (
+        (content.split('.'), lambda text: _short_fragment(text, 20)),
+        (content.split('\n'), lambda text: _short_fragment(text, 15)),
+        (content.split('\n\n'), _paragraph_fragment),
+    ):
+        for part in parts:
+            text = part.strip()
+            if text and has_caution_keyword(text):
+                fragment = make(text)
+                if fragment is not None:
+                    fragments.append(fragment)
+    return fragments
+
+
+def caution_metadata(content: str) -> Dict[str, Any]:
+    """Chunk metadata written at embedding time (Chroma metadata values must be scalars)"""
+    fragments = segment_chunk(content)
+    return {
+        "has_caution": bool(fragments),
+        "caution_fragments": json.dumps(fragments, ensure_ascii=False),
+        "caution_segmenter": SEGMENTER_VERSION,
+    }
+
+
+def chunk_fragments(doc: Any) -> List[Dict[str, Any]]:
+    """Pre-tagged fragments of a retrieved chunk (segmented lazily if it predates tagging)"""
+    metadata = doc.metadata or {}
+    if metadata.get("caution_segmenter") == SEGMENTER_VERSION and "caution_fragments" in metadata:
+        try:
+            return json.loads(metadata["caution_fragments"])
+        except (TypeError, ValueError):
+            pass
+
+    key = f"{metadata.get('source', '')}_{metadata.get('chunk_index', '')}_{hash(doc.page_content)}"
+    hit, fragments = _fragment_memo.get(key)
+    if not hit:
+        fragments = segment_chunk(doc.page_content)
+        _fragment_memo.set(key, fragments, _FRAGMENT_MEMO_TTL)
+    return fragments
+
+
+def rank_fragments(ingredient_lower: str, docs: List[Any]) -> List[str]:
+    """
+    Query-time pass: candidate cautions for one ingredient, ranked.
+    Fragments mentioning the ingredient come first (most recently found first),
+    followed by the remaining qualifying fragments in discovery order.
+    """
+    front: List[str] = []
+    back: List[str] = []
+    for doc in docs:
+        fragments = chunk_fragments(doc)
+        if not fragments:
+            continue
+        doc_mentions_ingredient = ingredient_lower in doc.page_content.lower()
+        for fragment in fragments:
+            if ingredient_lower in fragment["t"].lower():
+                if fragment["f"]:
+                    front.append(fragment["t"])
+                elif fragment.get("c"):
+                    front.extend(fragment["c"])
+            elif fragment["b"]:
+                back.append(fragment["t"])
+            elif fragment.get("c") and doc_mentions_ingredient:
+                back.extend(fragment["c"])
+    front.reverse()
+    return front + back
+
+
+def extract_ingredient_cautions(ingredient: str, all_docs: List[Any]) -> Optional[List[str]]:
+    """
+    Extract caution texts for one ingredient from its retrieved chunks.
+    Returns the final (max 10) cautions, or None when nothing relevant was found.
+    """
+    # Debug: Log retrieval stats
+    if len(all_docs) == 0:
+        print(f"⚠️ No documents retrieved for '{ingredient}' - BIS retriever may not have relevant data")
+    else:
+        print(f"🔍 Retrieved {len(all_docs)} document chunks for '{ingredient}'")
+
+    ingredient_lower = ingredient.lower()
+    cautions = rank_fragments(ingredient_lower, all_docs)
+    if not cautions:
+        return None
+
+    # Remove duplicates while preserving order, prioritizing cautions with numerical limits
+    unique_cautions = []
+    seen = set()
+    for want_number in (True, False):
+        for caution in cautions:
+            caution_normalized = caution.lower().strip()
+            if caution_normalized and caution_normalized not in seen:
+                if want_number and not NUMERICAL_LIMIT_PATTERN.search(caution):
+                    continue
+                seen.add(caution_normalized)
+                unique_cautions.append(caution)
+
+    # If water-related, skip all cautions
+    if any(water_term in ingredient_lower for water_term in WATER_RELATED_INGREDIENTS):
+        print(f"⚠️ Skipping BIS cautions for water-related ingredient: {ingredient}")
+        return None
+
+    is_common_ingredient = any(common in ingredient_lower for common in COMMON_INGREDIENTS_NO_GENERIC_CAUTIONS)
+
+    cleaned_cautions = []
+    filtered_count = 0
+    for caution in unique_cautions:
+        # Skip vague column references without numbers
+        if 'column' in caution.lower() and not ANY_NUMBER_PATTERN.search(caution):
+            filtered_count += 1
+            continue
+
+        # For common ingredients, skip generic safety cautions that don't have numerical limits
+        if is_common_ingredient and GENERIC_SAFETY_PATTERN.search(caution) and not NUMERICAL_LIMIT_PATTERN.search(caution):
+            filtered_count += 1
+            continue
+
+        # Ensure caution is meaningful (at least 15 characters - reduced threshold for better coverage)
+        if len(caution.strip()) >= 15:
+            cleaned_cautions.append(caution.strip())
+        else:
+            filtered_count += 1
+
+    # Debug: Log filtering stats
+    if filtered_count > 0:
+        print(f"   ℹ️ Filtered out {filtered_count} caution(s) (vague references, generic safety, or too short)")
+
+    if not cleaned_cautions:
+        print(f"⚠️ No valid cautions found for {ingredient} (searched {len(all_docs)} documents)")
+        # Debug: Check if documents had caution keywords but were filtered out
+        total_caution_keywords_found = sum(1 for doc in all_docs[:3] if has_caution_keyword(doc.page_content))
+        if total_caution_keywords_found > 0:
+            print(f"   ⚠️ Found caution keywords in {total_caution_keywords_found} document(s) but no valid cautions extracted - may be filtered by cleanup logic")
+        return None
+
+    # Limit to top 10 most relevant cautions to avoid overwhelming
+    final_cautions = cleaned_cautions[:MAX_CAUTIONS_PER_INGREDIENT]
+    print(f"✅ Retrieved {len(final_cautions)} caution(s) for {ingredient} (from {len(all_docs)} documents)")
+    # Debug: Show first caution preview
+    preview = final_cautions[0][:100] + "..." if len(final_cautions[0]) > 100 else final_cautions[0]
+    print(f"   Preview: {preview}")
+    return final_cautions
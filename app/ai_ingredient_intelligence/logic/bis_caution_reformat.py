@@ -0,0 +1,178 @@
+# app/ai_ingredient_intelligence/logic/bis_caution_reformat.py
+"""
+Batched rewording of raw BIS caution fragments into proper sentences.
+
+generate_report_text used to make one Opus call per ingredient (25
+ingredients = 25 serial round trips) before the report itself could start.
+reformat_bis_cautions() instead:
+
+- Serves every ingredient whose exact fragment list was reworded before
+  from a cache (memory + Mongo "bis_caution_cache", namespace "reworded").
+  The key is a hash of the ingredient and its fragments, so a fragment set
+  is reworded once and reused by every later report.
+- Packs the remaining ingredients into a few structured requests (up to
+  BIS_REFORMAT_BATCH_FRAGMENTS fragments each, so the JSON answer fits in
+  the output limit). Claude answers {"<id>": ["sentence", ...]} for all
+  ingredients of the batch at once.
+- Runs those batches concurrently (at most BIS_REFORMAT_CONCURRENCY).
+
+Any ingredient missing from a reply, or a batch that fails, falls back to
+its original fragments (not cached), exactly as the per-ingredient loop did.
+
+USAGE:
+    from app.ai_ingredient_intelligence.logic.bis_caution_reformat import reformat_bis_cautions
+    bis_cautions = await reformat_bis_cautions(bis_cautions)
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+
+BIS_REFORMAT_MODEL = os.getenv("BIS_REFORMAT_MODEL", "claude-3-opus-20240229")
+# Fragments per request; keeps the reply well inside claude-3-opus' 4096 output tokens
+BIS_REFORMAT_BATCH_FRAGMENTS = int(os.getenv("BIS_REFORMAT_BATCH_FRAGMENTS", "40"))
+BIS_REFORMAT_CONCURRENCY = int(os.getenv("BIS_REFORMAT_CONCURRENCY", "4"))
+BIS_REFORMAT_CACHE_TTL = int(os.getenv("BIS_REFORMAT_CACHE_TTL_SECONDS", str(365 * 24 * 3600)))
+# Bump when the rewording prompt or parsing changes
+BIS_REFORMAT_CACHE_VERSION = "v1"
+
+_reworded_cache = TwoTierCache(
+    "bis_caution_cache",
+    namespace="reworded",
+    ttl_seconds=BIS_REFORMAT_CACHE_TTL,
+    maxsize=int(os.getenv("BIS_REFORMAT_CACHE_MAXSIZE", "20000"))
+)
+
+REFORMAT_PROMPT = """You are a regulatory compliance expert. Below are raw BIS (Bureau of Indian Standards) caution fragments extracted from documents, grouped by ingredient.
+
+{ingredients}
+
+TASK: For EACH ingredient, reform each fragment into a complete, proper sentence that makes regulatory sense.
+
+REQUIREMENTS:
+1. Each caution must be a complete, grammatically correct sentence
+2. Include all numerical values, percentages, limits, CAS numbers, and regulatory information
+3. Make it clear and professional (e.g., "Maximum concentration: 5% w/w" not just "5% w/w")
+4. If a fragment is incomplete or malformed, reconstruct it into a meaningful sentence based on context
+5. Remove fragments that are just CAS numbers, ingredient names, or incomplete text
+6. Never move a caution to a different ingredient
+
+Return ONLY a JSON object mapping each ingredient's ID to the list of its reformatted cautions, e.g.
+{{"1": ["First caution sentence.", "Second caution sentence."], "2": ["..."]}}
+If a fragment cannot be made into a proper sentence, skip it. No markdown, no commentary."""
+
+
+def _cache_key(ingredient: str, cautions: List[str]) -> str:
+    payload = json.dumps([" ".join(ingredient.lower().split()), cautions], ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{BIS_REFORMAT_CACHE_VERSION}:{BIS_REFORMAT_MODEL}:{digest}"
+
+
+def plan_batches(items: List[Tuple[str, List[str]]], max_fragments: int = BIS_REFORMAT_BATCH_FRAGMENTS) -> List[List[Tuple[str, List[str]]]]:
+    """Group (ingredient, cautions) pairs into batches of at most max_fragments fragments (one ingredient is never split)"""
+    batches: List[List[Tuple[str, List[str]]]] = []
+    current: List[Tuple[str, List[str]]] = []
+    size = 0
+    for ingredient, cautions in items:
+        if current and size + len(cautions) > max_fragments:
+            batches.append(current)
+            current, size = [], 0
+        current.append((ingredient, cautions))
+        size += len(cautions)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_reformat_prompt(batch: List[Tuple[str, List[str]]]) -> str:
+    sections = []
+    for index, (ingredient, cautions) in enumerate(batch, 1):
+        fragments = "\n".join(f"{i + 1}. {caution}" for i, caution in enumerate(cautions))
+        sections.append(f"ID {index} - INGREDIENT: {ingredient}\nRAW CAUTION FRAGMENTS:\n{fragments}")
+    return REFORMAT_PROMPT.format(ingredients="\n\n".join(sections))
+
+
+def parse_reformat_response(batch: List[Tuple[str, List[str]]], parsed: Dict) -> Dict[str, List[str]]:
+    """Map a {"<id>": [sentences]} reply back to ingredients; unusable entries are left out"""
+    reformatted: Dict[str, List[str]] = {}
+    for index, (ingredient, _) in enumerate(batch, 1):
+        sentences = parsed.get(str(index))
+        if not isinstance(sentences, list):
+            continue
+        cleaned = [s.strip() for s in sentences if isinstance(s, str) and len(s.strip()) > 10]  # Must be meaningful
+        if cleaned:
+            reformatted[ingredient] = cleaned
+    return reformatted
+
+
+async def _reformat_batch(batch: List[Tuple[str, List[str]]]) -> Dict[str, List[str]]:
+    """One structured request for a batch of ingredients"""
+    from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, extract_json, extract_text, max_tokens_for
+
+    response = await create_message(
+        model=BIS_REFORMAT_MODEL,
+        max_tokens=max_tokens_for(BIS_REFORMAT_MODEL),
+        temperature=0.1,
+        messages=[{"role": "user", "content": build_reformat_prompt(batch)}]
+    )
+    return parse_reformat_response(batch, extract_json(extract_text(response), expect=dict))
+
+
+async def reformat_bis_cautions(bis_cautions: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """
+    Reword every ingredient's caution fragments into sentences.
+
+    Returns:
+        {ingredient: cautions} for ingredients that have cautions, reworded
+        where possible and the original fragments otherwise
+    """
+    items = [(ingredient, list(cautions)) for ingredient, cautions in (bis_cautions or {}).items() if cautions]
+    if not items:
+        return {}
+
+    cleaned: Dict[str, List[str]] = {}
+    keys = {ingredient: _cache_key(ingredient, cautions) for ingredient, cautions in items}
+    lookups = await asyncio.gather(*[_reworded_cache.get(keys[ingredient]) for ingredient, _ in items])
+    pending = []
+    for (ingredient, cautions), (hit, value) in zip(items, lookups):
+        if hit and value:
+            cleaned[ingredient] = value
+        else:
+            pending.append((ingredient, cautions))
+    if len(pending) < len(items):
+        print(f"   💾 {len(items) - len(pending)} ingredient(s) served from the reworded-caution cache")
+
+    if pending:
+        semaphore = asyncio.Semaphore(BIS_REFORMAT_CONCURRENCY)
+
+        async def run(batch):
+            async with semaphore:
+                try:
+                    return batch, await _reformat_batch(batch)
+                except Exception as e:
+                    print(f"   ❌ Error reformatting cautions for {len(batch)} ingredient(s): {type(e).__name__}: {e}")
+                    return batch, {}
+
+        batches = plan_batches(pending)
+        print(f"   🧹 Rewording cautions for {len(pending)} ingredient(s) in {len(batches)} request(s)")
+        for batch, reformatted in await asyncio.gather(*[run(batch) for batch in batches]):
+            for ingredient, cautions in batch:
+                if ingredient in reformatted:
+                    cleaned[ingredient] = reformatted[ingredient]
+                    await _reworded_cache.set(keys[ingredient], reformatted[ingredient])
+                    print(f"   ✅ {ingredient}: Reformatted {len(reformatted[ingredient])} caution(s) from {len(cautions)} fragments")
+                else:
+                    # Fallback: use original if reformatting failed
+                    cleaned[ingredient] = cautions
+                    print(f"   ⚠️ {ingredient}: Reformatting failed, using original {len(cautions)} caution(s)")
+
+    # Keep the caller's ingredient order
+    return {ingredient: cleaned[ingredient] for ingredient, _ in items}
+
+
+def get_reformat_cache_stats() -> Dict[str, object]:
+    return _reworded_cache.get_stats()
@@ -5,12 +5,12 @@ Retrieves caution information about ingredients from official BIS documents
 """
 import os
 import json
-import re
+import asyncio
+import hashlib
 import unicodedata
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 try:
     from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -18,6 +18,11 @@ except ImportError:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
 import fitz  # PyMuPDF
 
+from app.core.embeddings import get_embedding_model
+from app.ai_ingredient_intelligence.logic.bis_retrieval import BISRetrievalEngine, get_bis_executor
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+from app.ai_ingredient_intelligence.logic.bis_caution_extract import caution_metadata, extract_ingredient_cautions
+
 # Try to import rapidfuzz for fuzzy matching, fallback to basic matching if not available
 try:
     from rapidfuzz import fuzz, process
@@ -38,6 +43,23 @@ os.makedirs(BIS_CHROMA_DB_PATH, exist_ok=True)
 # Global cache for vectorstore instance (singleton pattern)
 _bis_vectorstore_cache: Optional[Chroma] = None
 _bis_vectorstore_initialized = False
+# Batched retrieval engine bound to the cached vectorstore
+_bis_engine_cache: Optional[BISRetrievalEngine] = None
+
+# Per-ingredient caution cache (memory + Mongo "bis_caution_cache" with TTL).
+# Keys are "<extraction version>:<manifest hash>:<normalized ingredient>", so
+# embedding new or modified PDFs (which rewrites the manifest) makes every old
+# entry unreachable; MongoDB drops them once their TTL passes.
+# Bump BIS_CAUTION_CACHE_VERSION whenever the extraction logic changes.
+BIS_CAUTION_CACHE_VERSION = "v1"
+BIS_CAUTION_CACHE_TTL = int(os.getenv("BIS_CAUTION_CACHE_TTL_SECONDS", str(90 * 24 * 3600)))
+_bis_caution_cache = TwoTierCache(
+    "bis_caution_cache",
+    namespace="cautions",
+    ttl_seconds=BIS_CAUTION_CACHE_TTL,
+    maxsize=int(os.getenv("BIS_CAUTION_CACHE_MAXSIZE", "50000"))
+)
+_bis_manifest_hash: Optional[str] = None
 
 
 def load_bis_manifest() -> Dict[str, float]:
@@ -65,6 +87,53 @@ def save_bis_manifest(manifest: Dict[str, float]):
         print(f"WARNING: Error saving BIS manifest: {e}")
 
 
+def get_bis_manifest_hash() -> str:
+    """Hash of embed_manifest.json (which PDFs are embedded, and their mtimes)"""
+    global _bis_manifest_hash
+    if _bis_manifest_hash is None:
+        manifest = load_bis_manifest()
+        _bis_manifest_hash = hashlib.sha256(
+            json.dumps(manifest, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+    return _bis_manifest_hash
+
+
+def invalidate_bis_caution_cache():
+    """
+    Forget cached cautions after the embedded PDF set changed.
+    The manifest hash is recomputed on next use, so Mongo entries written
+    for the previous manifest are never read again (they expire via TTL).
+    """
+    global _bis_manifest_hash
+    _bis_manifest_hash = None
+    _bis_caution_cache.clear_memory()
+    print("BIS caution cache invalidated (embedded PDFs changed)")
+
+
+def normalize_caution_key(ingredient: str) -> str:
+    """Cache key for an ingredient: lowercased, whitespace collapsed"""
+    return " ".join(ingredient.lower().split())
+
+
+def _caution_cache_key(ingredient: str) -> str:
+    return f"{BIS_CAUTION_CACHE_VERSION}:{get_bis_manifest_hash()}:{normalize_caution_key(ingredient)}"
+
+
+async def warm_bis_caution_cache() -> int:
+    """Load all cautions precomputed for the current manifest into memory"""
+    prefix = f"{BIS_CAUTION_CACHE_VERSION}:{get_bis_manifest_hash()}:"
+    loaded = await _bis_caution_cache.warm(prefix)
+    print(f"[OK] BIS caution cache warmed: {loaded} ingredient(s)")
+    return loaded
+
+
+def get_bis_caution_cache_stats() -> Dict[str, any]:
+    """Hit/miss counters for the per-ingredient BIS caution cache"""
+    stats = _bis_caution_cache.get_stats()
+    stats["manifest_hash"] = get_bis_manifest_hash()
+    return stats
+
+
 def get_pdf_modification_time(pdf_path: Path) -> float:
     """Get modification time of PDF file."""
     try:
@@ -108,9 +177,8 @@ def initialize_bis_vectorstore(force_reload: bool = False) -> Optional[Chroma]:
         return _bis_vectorstore_cache
     
     try:
-        embedding_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
-        )
+        # Shared with the chatbot vectorstore (one model copy per process)
+        embedding_model = get_embedding_model()
         
         # Load manifest to track embedded PDFs
         manifest = load_bis_manifest()
@@ -186,7 +254,9 @@ def initialize_bis_vectorstore(force_reload: bool = False) -> Optional[Chroma]:
                             metadata={
                                 "source": pdf_file.name,
                                 "chunk_index": i,
-                                "document_type": "BIS_Standard"
+                                "document_type": "BIS_Standard",
+                                # Pre-segmented, pre-tagged caution fragments (see bis_caution_extract.py)
+                                **caution_metadata(chunk)
                             }
                         ))
                     
@@ -204,6 +274,7 @@ def initialize_bis_vectorstore(force_reload: bool = False) -> Optional[Chroma]:
                 
                 # Save updated manifest
                 save_bis_manifest(manifest)
+                invalidate_bis_caution_cache()
                 print(f"Added {len(documents)} new chunks from {len(new_or_modified_pdfs)} PDF(s)")
             else:
                 print("WARNING: No documents extracted from new/modified PDFs")
@@ -232,9 +303,10 @@ def clear_bis_vectorstore_cache():
     Useful when you've added new PDFs and want to force re-initialization.
     Next call to get_bis_retriever() will reload the vectorstore.
     """
-    global _bis_vectorstore_cache, _bis_vectorstore_initialized
+    global _bis_vectorstore_cache, _bis_vectorstore_initialized, _bis_engine_cache
     _bis_vectorstore_cache = None
     _bis_vectorstore_initialized = False
+    _bis_engine_cache = None
     print("BIS vectorstore cache cleared")
 
 
@@ -258,15 +330,49 @@ def get_bis_retriever():
     return retriever
 
 
+async def get_bis_retrieval_engine() -> Optional[BISRetrievalEngine]:
+    """
+    Get the batched BIS retrieval engine for the cached vectorstore.
+    The (blocking) vectorstore load runs on the BIS thread pool, not the event loop.
+    """
+    global _bis_engine_cache
+    vectorstore = _bis_vectorstore_cache
+    if vectorstore is None:
+        loop = asyncio.get_running_loop()
+        vectorstore = await loop.run_in_executor(get_bis_executor(), initialize_bis_vectorstore)
+    if vectorstore is None:
+        return None
+    if _bis_engine_cache is None or _bis_engine_cache.vectorstore is not vectorstore:
+        _bis_engine_cache = BISRetrievalEngine(vectorstore)
+    return _bis_engine_cache
+
+
+def _extract_all_cautions(ingredients: List[str], docs_by_ingredient: Dict[str, List[Document]]) -> Dict[str, List[str]]:
+    """Run caution extraction for every ingredient (CPU-bound, called on the BIS thread pool)"""
+    cautions_map = {}
+    for ingredient in ingredients:
+        try:
+            cautions = extract_ingredient_cautions(ingredient, docs_by_ingredient.get(ingredient, []))
+            if cautions:
+                cautions_map[ingredient] = cautions
+        except Exception as e:
+            print(f"WARNING: Error retrieving BIS cautions for {ingredient}: {e}")
+            continue
+    return cautions_map
+
+
 async def get_bis_cautions_for_ingredients(ingredient_names: List[str]) -> Dict[str, List[str]]:
     """
     Get BIS caution information for given ingredients
     Returns dict mapping ingredient names to list of caution texts
     Retrieves ALL cautions/instructions without limiting the count
+    
+    All query variants are embedded in one batch and searched on a thread
+    pool (see bis_retrieval.py), so the event loop is never blocked.
     """
     try:
-        retriever = get_bis_retriever()
-        if retriever is None:
+        engine = await get_bis_retrieval_engine()
+        if engine is None:
             print("⚠️ WARNING: BIS retriever is None - BIS vectorstore may not be initialized or PDFs may be missing")
             print("   Check if BIS PDF files exist in the data directory and vectorstore is properly initialized")
             return {}
@@ -276,310 +382,51 @@ async def get_bis_cautions_for_ingredients(ingredient_names: List[str]) -> Dict[
         traceback.print_exc()
         return {}
     
-    cautions_map = {}
+    # Normalize ingredient names (strip whitespace, skip empty, drop duplicates)
+    ingredients = list(dict.fromkeys(
+        name.strip() for name in ingredient_names if name and name.strip()
+    ))
+    if not ingredients:
+        return {}
     
-    # Expand search keywords for better coverage - focus on numerical limits
-    caution_keywords = [
-        'caution', 'warning', 'restriction', 'limit', 'maximum', 'minimum',
-        'prohibited', 'not allowed', 'should not', 'avoid', 'must not',
-        'instruction', 'requirement', 'mandatory', 'compliance', 'regulation',
-        'standard', 'guideline', 'specification', 'condition', 'precaution',
-        'percent', 'percentage', '%', 'w/w', 'w/v', 'concentration', 'amount',
-        'not exceed', 'shall not exceed', 'must not exceed', 'should not exceed',
-        'column', 'table', 'mg/kg', 'ppm', 'g/kg', 'mg/l', 'g/l'
-    ]
+    # Serve what we can from the per-ingredient cache (valid for the current manifest)
+    cached: Dict[str, List[str]] = {}
+    misses: List[str] = []
+    for ingredient in ingredients:
+        hit, value = await _bis_caution_cache.get(_caution_cache_key(ingredient))
+        if hit:
+            cached[ingredient] = value or []
+        else:
+            misses.append(ingredient)
     
-    for ingredient in ingredient_names:
+    computed: Dict[str, List[str]] = {}
+    if misses:
         try:
-            # Normalize ingredient name (strip whitespace, handle empty)
-            ingredient = ingredient.strip() if ingredient else ""
-            if not ingredient:
-                continue
-            
-            # Extract main word(s) for fallback searches (e.g., "Salicylic" from "Salicylic Acid")
-            ingredient_words = ingredient.split()
-            main_word = ingredient_words[0] if ingredient_words else ingredient
-            
-            # Use multiple search queries for better coverage - be more specific
-            # Try exact ingredient name first, then variations, then main word
-            queries = [
-                f"{ingredient}",
-                f"{ingredient} caution",
-                f"{ingredient} warning",
-                f"{ingredient} restriction",
-                f"{ingredient} limit",
-                f"{ingredient} maximum",
-                f"{ingredient} concentration",
-                f"{ingredient} percentage",
-                f"{ingredient} w/w",
-                f"{ingredient} mg/kg",
-                f"{ingredient} regulation",
-                f"{ingredient} standard",
-                f"{ingredient} BIS",
-                f"{ingredient} instruction",
-                f"{ingredient} requirement"
-            ]
-            
-            # Add fallback queries with main word if ingredient has multiple words
-            if len(ingredient_words) > 1 and main_word.lower() not in ['water', 'aqua']:
-                queries.extend([
-                    f"{main_word}",
-                    f"{main_word} caution",
-                    f"{main_word} limit",
-                    f"{main_word} maximum"
-                ])
-            
-            all_docs = []
-            seen_doc_ids = set()
-            
-            # Collect documents from all queries - increase k for better coverage
-            for query in queries:
-                try:
-                    # Increase k to get more results
-                    docs = retriever.invoke(query)
-                    for doc in docs:
-                        # Use source + chunk_index as unique identifier
-                        doc_id = f"{doc.metadata.get('source', '')}_{doc.metadata.get('chunk_index', '')}"
-                        if doc_id not in seen_doc_ids:
-                            seen_doc_ids.add(doc_id)
-                            all_docs.append(doc)
-                except Exception as e:
-                    print(f"Warning: Error in query '{query}': {e}")
-                    continue
-            
-            # Debug: Log retrieval stats
-            if len(all_docs) == 0:
-                print(f"⚠️ No documents retrieved for '{ingredient}' - BIS retriever may not have relevant data")
-            else:
-                print(f"🔍 Retrieved {len(all_docs)} document chunks for '{ingredient}'")
-            
-            # Extract relevant information from all documents
-            cautions = []
-            ingredient_lower = ingredient.lower()
-            
-            # Pattern to match numerical values (percentages, limits, concentrations)
-            number_pattern = re.compile(r'\d+\.?\d*\s*(?:%|percent|w/w|w/v|mg/kg|ppm|g/kg|mg/l|g/l|mg|g|kg|ml|l)?', re.IGNORECASE)
-            
-            for doc in all_docs:
-                content = doc.page_content
-                content_lower = content.lower()
-                
-                # Check if document contains the ingredient (at least somewhere in the document)
-                doc_mentions_ingredient = ingredient_lower in content_lower
-                
-                # Check if document contains caution-related information
-                has_caution_keywords = any(keyword in content_lower for keyword in caution_keywords)
-                
-                if has_caution_keywords:
-                    # PRIORITY: Extract sentences/paragraphs with NUMBERS (limits, percentages, concentrations)
-                    # Strategy 1: Extract complete sentences with numbers and caution keywords
-                    # If document mentions ingredient, prioritize sentences with ingredient; otherwise include all caution sentences
-                    sentences = content.split('.')
-                    for sentence in sentences:
-                        sentence_clean = sentence.strip()
-                        if not sentence_clean:
-                            continue
-                            
-                        sentence_lower = sentence_clean.lower()
-                        has_number = bool(number_pattern.search(sentence_clean))
-                        has_caution_keyword = any(keyword in sentence_lower for keyword in caution_keywords)
-                        mentions_ingredient = ingredient_lower in sentence_lower
-                        
-                        # Include if:
-                        # 1. Has caution keyword AND mentions ingredient (high priority)
-                        # 2. Has caution keyword AND has number AND document mentions ingredient (medium priority)
-                        # 3. Has caution keyword AND has number (lower priority, but still relevant)
-                        if has_caution_keyword:
-                            if mentions_ingredient:
-                                # Highest priority: ingredient mentioned + caution keyword
-                                if has_number:
-                                    if len(sentence_clean) > 20:
-                                        cautions.insert(0, sentence_clean)  # Highest priority
-                                else:
-                                    cautions.insert(0, sentence_clean)  # High priority
-                            elif has_number and doc_mentions_ingredient:
-                                # Medium priority: number + caution + ingredient in doc
-                                if len(sentence_clean) > 20:
-                                    cautions.append(sentence_clean)
-                            elif has_number:
-                                # Lower priority: number + caution (might be relevant)
-                                if len(sentence_clean) > 20:
-                                    cautions.append(sentence_clean)
-                    
-                    # Strategy 2: Extract lines with numbers (for structured documents like tables)
-                    lines = content.split('\n')
-                    for line in lines:
-                        line_clean = line.strip()
-                        if not line_clean:
-                            continue
-                            
-                        line_lower = line_clean.lower()
-                        has_number = bool(number_pattern.search(line_clean))
-                        has_caution_keyword = any(keyword in line_lower for keyword in caution_keywords)
-                        mentions_ingredient = ingredient_lower in line_lower
-                        
-                        if has_caution_keyword:
-                            if mentions_ingredient:
-                                if has_number:
-                                    if len(line_clean) > 15:
-                                        cautions.insert(0, line_clean)
-                                else:
-                                    cautions.insert(0, line_clean)
-                            elif has_number and doc_mentions_ingredient:
-                                if len(line_clean) > 15:
-                                    cautions.append(line_clean)
-                            elif has_number:
-                                if len(line_clean) > 15:
-                                    cautions.append(line_clean)
-                    
-                    # Strategy 3: Extract paragraphs with numbers
-                    paragraphs = content.split('\n\n')
-                    for para in paragraphs:
-                        para_clean = para.strip()
-                        if not para_clean:
-                            continue
-                            
-                        para_lower = para_clean.lower()
-                        has_number = bool(number_pattern.search(para_clean))
-                        has_caution_keyword = any(keyword in para_lower for keyword in caution_keywords)
-                        mentions_ingredient = ingredient_lower in para_lower
-                        
-                        if has_caution_keyword:
-                            if mentions_ingredient:
-                                if has_number:
-                                    if len(para_clean) < 500:
-                                        cautions.insert(0, para_clean)
-                                    else:
-                                        # Split long paragraphs but keep sentences with numbers
-                                        para_sentences = para_clean.split('.')
-                                        for sent in para_sentences:
-                                            sent_clean = sent.strip()
-                                            if sent_clean and len(sent_clean) > 20:
-                                                if bool(number_pattern.search(sent_clean)):
-                                                    cautions.insert(0, sent_clean)
-                                else:
-                                    if len(para_clean) < 300:
-                                        cautions.insert(0, para_clean)
-                            elif has_number and doc_mentions_ingredient:
-                                if len(para_clean) < 500:
-                                    cautions.append(para_clean)
-                                else:
-                                    # Split long paragraphs
-                                    para_sentences = para_clean.split('.')
-                                    for sent in para_sentences:
-                                        sent_clean = sent.strip()
-                                        if sent_clean and len(sent_clean) > 20:
-                                            if bool(number_pattern.search(sent_clean)):
-                                                cautions.append(sent_clean)
-                            elif has_number:
-                                if len(para_clean) < 500:
-                                    cautions.append(para_clean)
-            
-            if cautions:
-                # Remove duplicates while preserving order, prioritizing cautions with numbers
-                unique_cautions = []
-                seen = set()
-                
-                # First pass: Add cautions with numbers (prioritized)
-                for caution in cautions:
-                    caution_normalized = caution.lower().strip()
-                    if caution_normalized and caution_normalized not in seen:
-                        has_number = bool(re.search(r'\d+\.?\d*\s*(?:%|percent|w/w|w/v|mg/kg|ppm|g/kg|mg/l|g/l|mg|g|kg|ml|l)', caution, re.IGNORECASE))
-                        if has_number:
-                            seen.add(caution_normalized)
-                            unique_cautions.append(caution)
-                
-                # Second pass: Add remaining cautions without numbers
-                for caution in cautions:
-                    caution_normalized = caution.lower().strip()
-                    if caution_normalized and caution_normalized not in seen:
-                        seen.add(caution_normalized)
-                        unique_cautions.append(caution)
-                
-                # Clean up: Remove vague references like "column given" and replace with actual context
-                cleaned_cautions = []
-                
-                # Water-related ingredients should have NO cautions shown at all
-                water_related_ingredients = ['water', 'aqua']
-                is_water_related = any(water_term in ingredient_lower for water_term in water_related_ingredients)
-                
-                # If water-related, skip all cautions
-                if is_water_related:
-                    print(f"⚠️ Skipping BIS cautions for water-related ingredient: {ingredient}")
-                    continue
-                
-                # Common ingredients that shouldn't have generic safety cautions (unless they have specific numerical limits)
-                common_ingredients_no_generic_cautions = [
-                    'glycerin', 'glycerol', 'dimethicone', 
-                    'propylene glycol', 'butylene glycol', 'squalane', 'squalene'
-                ]
-                
-                is_common_ingredient = any(common in ingredient_lower for common in common_ingredients_no_generic_cautions)
-                
-                filtered_count = 0
-                for caution in unique_cautions:
-                    # If caution mentions "column" but doesn't have actual numbers, try to find context
-                    if 'column' in caution.lower() and not re.search(r'\d+\.?\d*', caution):
-                        # Skip vague column references without numbers
-                        filtered_count += 1
-                        continue
-                    
-                    # For common ingredients, filter out generic safety cautions unless they have numerical limits
-                    if is_common_ingredient:
-                        caution_lower = caution.lower()
-                        # Skip generic safety cautions that don't have numerical values
-                        generic_safety_phrases = [
-                            'avoid contact with eyes',
-                            'avoid contact with eye',
-                            'keep away from eyes',
-                            'keep away from eye',
-                            'do not get in eyes',
-                            'do not get in eye',
-                            'not for use in eyes',
-                            'for external use only',
-                            'external use only'
-                        ]
-                        has_generic_phrase = any(phrase in caution_lower for phrase in generic_safety_phrases)
-                        has_numerical_limit = bool(re.search(r'\d+\.?\d*\s*(?:%|percent|w/w|w/v|mg/kg|ppm|g/kg|mg/l|g/l|mg|g|kg|ml|l)', caution, re.IGNORECASE))
-                        
-                        # Skip generic safety cautions that don't have numerical limits
-                        if has_generic_phrase and not has_numerical_limit:
-                            filtered_count += 1
-                            continue
-                    
-                    # Ensure caution is meaningful (at least 15 characters - reduced threshold for better coverage)
-                    if len(caution.strip()) >= 15:
-                        cleaned_cautions.append(caution.strip())
-                    else:
-                        filtered_count += 1
-                
-                # Debug: Log filtering stats
-                if filtered_count > 0:
-                    print(f"   ℹ️ Filtered out {filtered_count} caution(s) (vague references, generic safety, or too short)")
-                
-                if cleaned_cautions:
-                    # Limit to top 10 most relevant cautions to avoid overwhelming
-                    final_cautions = cleaned_cautions[:10]
-                    cautions_map[ingredient] = final_cautions
-                    print(f"✅ Retrieved {len(final_cautions)} caution(s) for {ingredient} (from {len(all_docs)} documents)")
-                    # Debug: Show first caution preview
-                    if final_cautions:
-                        preview = final_cautions[0][:100] + "..." if len(final_cautions[0]) > 100 else final_cautions[0]
-                        print(f"   Preview: {preview}")
-                else:
-                    print(f"⚠️ No valid cautions found for {ingredient} (searched {len(all_docs)} documents)")
-                    # Debug: Check if documents had caution keywords but were filtered out
-                    if all_docs:
-                        total_caution_keywords_found = 0
-                        for doc in all_docs[:3]:  # Check first 3 docs
-                            if any(keyword in doc.page_content.lower() for keyword in caution_keywords):
-                                total_caution_keywords_found += 1
-                        if total_caution_keywords_found > 0:
-                            print(f"   ⚠️ Found caution keywords in {total_caution_keywords_found} document(s) but no valid cautions extracted - may be filtered by cleanup logic")
+            docs_by_ingredient, failed = await engine.retrieve_with_failures(misses)
         except Exception as e:
-            print(f"WARNING: Error retrieving BIS cautions for {ingredient}: {e}")
-            continue
+            print(f"WARNING: Error retrieving BIS cautions: {e}")
+            docs_by_ingredient, failed = None, set()
+        
+        if docs_by_ingredient is not None:
+            loop = asyncio.get_running_loop()
+            computed = await loop.run_in_executor(get_bis_executor(), _extract_all_cautions, misses, docs_by_ingredient)
+            # Cache empty results too, so ingredients without cautions are not re-searched.
+            # Ingredients hit by a failed search batch are incomplete: never cache them.
+            for ingredient in misses:
+                if ingredient in failed:
+                    continue
+                await _bis_caution_cache.set(_caution_cache_key(ingredient), computed.get(ingredient, []))
+            if failed:
+                print(f"WARNING: BIS search failed for {len(failed)} ingredient(s); results not cached")
     
+    if cached:
+        print(f"BIS caution cache: {len(cached)} hit(s), {len(misses)} miss(es)")
+    
+    cautions_map = {}
+    for ingredient in ingredients:
+        cautions = cached.get(ingredient) or computed.get(ingredient)
+        if cautions:
+            cautions_map[ingredient] = cautions
     return cautions_map
 
 
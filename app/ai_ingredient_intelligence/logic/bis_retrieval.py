@@ -0,0 +1,244 @@
+# app/ai_ingredient_intelligence/logic/bis_retrieval.py
+"""
+Batched, non-blocking retrieval engine for BIS caution lookups.
+
+get_bis_cautions_for_ingredients used to run 15-19 synchronous MMR
+retriever.invoke() calls per ingredient, one after another, inside an
+async function. Every call embedded its query on CPU and blocked the
+event loop. For a 30-ingredient analysis that was ~500 serial round trips.
+
+This engine instead:
+- builds every query variant for every ingredient up front (deduplicated)
+- embeds them all with ONE embed_documents call
+- runs the vector searches in batches of BIS_SEARCH_BATCH_SIZE queries
+  (one Chroma collection.query per batch, MMR re-ranking done locally)
+- does all of the above on a small thread pool, never on the event loop
+- shares fetched chunks between query variants and ingredients, so each
+  chunk is materialized once per call
+
+Per-ingredient chunk order is the same as before: query variants in their
+original order, MMR results in rank order, first occurrence wins.
+
+USAGE:
+    engine = BISRetrievalEngine(vectorstore)
+    docs_by_ingredient = await engine.retrieve(["Salicylic Acid", "Niacinamide"])
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Same MMR settings the BIS retriever has always used
+BIS_SEARCH_K = 10
+BIS_SEARCH_FETCH_K = 20
+BIS_MMR_LAMBDA = 0.5
+
+# Query embeddings sent to the vector store per collection.query call
+BIS_SEARCH_BATCH_SIZE = int(os.getenv("BIS_SEARCH_BATCH_SIZE", "64"))
+# Threads used for embedding and vector search (kept off the event loop)
+BIS_SEARCH_WORKERS = int(os.getenv("BIS_SEARCH_WORKERS", "2"))
+
+_search_executor = ThreadPoolExecutor(max_workers=BIS_SEARCH_WORKERS, thread_name_prefix="bis-search")
+
+
+def get_bis_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by all blocking BIS work (vectorstore load, embedding, search)"""
+    return _search_executor
+
+
+def bis_query_variants(ingredient: str) -> List[str]:
+    """
+    Query variants searched for one ingredient.
+    Exact ingredient name first, then variations, then the main word.
+    """
+    # Extract main word(s) for fallback searches (e.g., "Salicylic" from "Salicylic Acid")
+    ingredient_words = ingredient.split()
+    main_word = ingredient_words[0] if ingredient_words else ingredient
+
+    queries = [
+        f"{ingredient}",
+        f"{ingredient} caution",
+        f"{ingredient} warning",
+        f"{ingredient} restriction",
+        f"{ingredient} limit",
+        f"{ingredient} maximum",
+        f"{ingredient} concentration",
+        f"{ingredient} percentage",
+        f"{ingredient} w/w",
+        f"{ingredient} mg/kg",
+        f"{ingredient} regulation",
+        f"{ingredient} standard",
+        f"{ingredient} BIS",
+        f"{ingredient} instruction",
+        f"{ingredient} requirement"
+    ]
+
+    # Add fallback queries with main word if ingredient has multiple words
+    if len(ingredient_words) > 1 and main_word.lower() not in ['water', 'aqua']:
+        queries.extend([
+            f"{main_word}",
+            f"{main_word} caution",
+            f"{main_word} limit",
+            f"{main_word} maximum"
+        ])
+    return queries
+
+
+def chunk_id(metadata: Optional[Dict[str, Any]]) -> str:
+    """Unique chunk identifier (source + chunk_index), same key used for de-duplication before"""
+    metadata = metadata or {}
+    return f"{metadata.get('source', '')}_{metadata.get('chunk_index', '')}"
+
+
+class BISRetrievalEngine:
+    """Batched MMR search over the BIS vectorstore, run on a thread pool"""
+
+    def __init__(
+        self,
+        vectorstore: Any,
+        k: int = BIS_SEARCH_K,
+        fetch_k: int = BIS_SEARCH_FETCH_K,
+        lambda_mult: float = BIS_MMR_LAMBDA,
+        batch_size: int = BIS_SEARCH_BATCH_SIZE
+    ):
+        self.vectorstore = vectorstore
+        self.k = k
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.batch_size = max(1, batch_size)
+
+    # ------------------------------------------------------------------
+    # Blocking helpers (run in the executor)
+    # ------------------------------------------------------------------
+
+    def _embed(self, queries: List[str]) -> List[List[float]]:
+        """One batched embedding call for every query"""
+        return self.vectorstore.embeddings.embed_documents(queries)
+
+    def _search_batch(self, embeddings: List[List[float]]) -> List[List[Tuple[str, Any]]]:
+        """
+        MMR search for a batch of query embeddings.
+        Returns, per query, [(chunk_id, Document)] in MMR rank order.
+        """
+        collection = getattr(self.vectorstore, "_collection", None)
+        if collection is None:
+            # Vector stores without a raw collection: one MMR search per query
+            results = []
+            for embedding in embeddings:
+                docs = self.vectorstore.max_marginal_relevance_search_by_vector(
+                    embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+                )
+                results.append([(chunk_id(doc.metadata), doc) for doc in docs])
+            return results
+
+        import numpy as np
+        from langchain_core.documents import Document
+        from langchain_chroma.vectorstores import maximal_marginal_relevance
+
+        # One round trip for the whole batch; MMR re-ranking is done locally
+        raw = collection.query(
+            query_embeddings=embeddings,
+            n_results=self.fetch_k,
+            include=["metadatas", "documents", "embeddings"]
+        )
+        results = []
+        for i, embedding in enumerate(embeddings):
+            candidate_embeddings = raw["embeddings"][i]
+            if candidate_embeddings is None or len(candidate_embeddings) == 0:
+                results.append([])
+                continue
+            selected = maximal_marginal_relevance(
+                np.array(embedding, dtype=np.float32),
+                candidate_embeddings,
+                k=self.k,
+                lambda_mult=self.lambda_mult
+            )
+            hits = []
+            for j in selected:
+                metadata = raw["metadatas"][i][j] or {}
+                hits.append((chunk_id(metadata), Document(page_content=raw["documents"][i][j], metadata=metadata)))
+            results.append(hits)
+        return results
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def retrieve(self, ingredients: List[str]) -> Dict[str, List[Any]]:
+        """
+        Retrieve candidate chunks for every ingredient.
+
+        Args:
+            ingredients: Normalized (stripped, non-empty) ingredient names
+
+        Returns:
+            Dict mapping ingredient -> de-duplicated list of Documents
+        """
+        docs_by_ingredient, _ = await self.retrieve_with_failures(ingredients)
+        return docs_by_ingredient
+
+    async def retrieve_with_failures(self, ingredients: List[str]) -> Tuple[Dict[str, List[Any]], Set[str]]:
+        """
+        Like retrieve(), but also reports which ingredients are incomplete.
+
+        A failed search batch is logged and skipped, so the ingredients whose
+        query variants were in it come back with partial (often empty) doc
+        lists. Callers that persist results must not treat those as final.
+
+        Returns:
+            (docs_by_ingredient, failed_ingredients)
+        """
+        if not ingredients:
+            return {}, set()
+
+        # Deduplicate query strings across ingredients (e.g. shared main words)
+        variants_by_ingredient = {ingredient: bis_query_variants(ingredient) for ingredient in ingredients}
+        unique_queries = list(dict.fromkeys(q for variants in variants_by_ingredient.values() for q in variants))
+
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(_search_executor, self._embed, unique_queries)
+
+        batches = [
+            embeddings[start:start + self.batch_size]
+            for start in range(0, len(embeddings), self.batch_size)
+        ]
+        batch_results = await asyncio.gather(*[
+            loop.run_in_executor(_search_executor, self._search_batch, batch) for batch in batches
+        ], return_exceptions=True)
+
+        # Shared chunk table: each chunk is kept once, whichever query found it first
+        chunks: Dict[str, Any] = {}
+        hits_by_query: Dict[str, List[str]] = {}
+        failed_queries: Set[str] = set()
+        for batch_index, result in enumerate(batch_results):
+            batch_queries = unique_queries[batch_index * self.batch_size:(batch_index + 1) * self.batch_size]
+            if isinstance(result, BaseException):
+                print(f"Warning: BIS vector search failed for {len(batch_queries)} queries: {result}")
+                failed_queries.update(batch_queries)
+                continue
+            for query, hits in zip(batch_queries, result):
+                ids = []
+                for cid, doc in hits:
+                    chunks.setdefault(cid, doc)
+                    ids.append(cid)
+                hits_by_query[query] = ids
+
+        docs_by_ingredient: Dict[str, List[Any]] = {}
+        for ingredient, variants in variants_by_ingredient.items():
+            seen_doc_ids = set()
+            docs = []
+            for query in variants:
+                for cid in hits_by_query.get(query, ()):
+                    if cid not in seen_doc_ids:
+                        seen_doc_ids.add(cid)
+                        docs.append(chunks[cid])
+            docs_by_ingredient[ingredient] = docs
+
+        failed_ingredients = {
+            ingredient for ingredient, variants in variants_by_ingredient.items()
+            if failed_queries.intersection(variants)
+        }
+        print(f"🔍 BIS retrieval: {len(ingredients)} ingredient(s), {len(unique_queries)} queries, "
+              f"{len(batches)} search batch(es), {len(chunks)} unique chunks")
+        return docs_by_ingredient, failed_ingredients
@@ -0,0 +1,370 @@
+# app/ai_ingredient_intelligence/logic/branded_index.py
+"""
+Process-wide in-memory index of branded ingredients for the INCI matcher.
+
+match_inci_names used to stream the full $lookup aggregate over
+ingre_branded_ingredients several times per request (Step 0 once per
+combination, Step 1, Step 2 and Step 3 once per unmatched ingredient).
+This module loads that aggregate ONCE and keeps:
+
+- docs:          branded docs in collection (natural) order
+- inci_sets:     precomputed normalized INCI set per branded doc
+- by_inci:       inverted map normalized INCI -> positions in docs
+- containment:   rarest-member ContainmentIndex for Step 1 subset matching
+- fuzzy_store:   deduplicated FuzzyCandidateStore for Step 2 fuzzy matching
+- general_inci:  normalized INCI -> inciName from ingre_inci (Step 4)
+
+Freshness:
+- A change stream on the three source collections applies branded
+  inserts/updates/deletes incrementally and marks the index stale when
+  ingre_inci or ingre_suppliers change (their names are joined in).
+- When change streams are unavailable (standalone MongoDB) a cheap
+  version stamp (estimated count + newest _id per collection) is checked
+  at most every BRANDED_INDEX_REFRESH_SECONDS and triggers a rebuild.
+
+USAGE:
+    index = await get_branded_index()
+    for doc in index.docs_contained_in(product_inci_set):
+        ...
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.ai_ingredient_intelligence.db.mongodb import db
+from app.ai_ingredient_intelligence.db.collections import (
+    branded_ingredients_col,
+    inci_col,
+    suppliers_col,
+)
+from app.ai_ingredient_intelligence.logic.containment_index import ContainmentIndex
+from app.ai_ingredient_intelligence.logic.fuzzy_store import FuzzyCandidateStore
+
+# How often (seconds) the version stamp is re-checked when no change stream is running
+INDEX_REFRESH_INTERVAL = int(os.getenv("BRANDED_INDEX_REFRESH_SECONDS", "300"))
+
+WATCHED_COLLECTIONS = ["ingre_branded_ingredients", "ingre_inci", "ingre_suppliers"]
+
+# Same projection the matcher has always used for branded ingredients
+BRANDED_PIPELINE = [
+    {
+        "$lookup": {
+            "from": "ingre_inci",
+            "localField": "inci_ids",
+            "foreignField": "_id",
+            "as": "inci_docs"
+        }
+    },
+    {
+        "$lookup": {
+            "from": "ingre_suppliers",
+            "localField": "supplier_id",
+            "foreignField": "_id",
+            "as": "supplier_docs"
+        }
+    },
+    {
+        "$project": {
+            "_id": 1,
+            "ingredient_name": 1,
+            "supplier_name": {"$arrayElemAt": ["$supplier_docs.supplierName", 0]},
+            "description": 1,
+            "enhanced_description": 1,  # Prefer enhanced_description for branded ingredients
+            "category_decided": 1,  # Include category_decided field
+            "functional_category_ids": 1,
+            "chemical_class_ids": 1,
+            "inci_list": "$inci_docs.inciName_normalized"
+        }
+    }
+]
+
+
+def brand_inci_set(doc: dict) -> FrozenSet[str]:
+    """Normalized INCI set of a branded doc (same normalization as the matcher)"""
+    return frozenset(i.strip().lower() for i in doc.get("inci_list", []) if i)
+
+
+class BrandedIngredientIndex:
+    """
+    In-memory inverted index over branded ingredients.
+
+    Positions in `docs` follow the collection's natural order so that every
+    lookup returns results in the same order the old full-collection scans did.
+    Deleted docs are tombstoned (set to None) to keep positions stable.
+    """
+
+    def __init__(self):
+        self.docs: List[Optional[dict]] = []
+        self.inci_sets: List[FrozenSet[str]] = []
+        self.by_inci: Dict[str, List[int]] = {}
+        self.position_by_id: Dict[Any, int] = {}
+        self.containment = ContainmentIndex()
+        self._fuzzy_store: Optional[FuzzyCandidateStore] = None
+        self.general_inci: Dict[str, List[str]] = {}
+        self.version: Optional[Tuple] = None
+        self.loaded_at: float = 0.0
+        self.last_checked: float = 0.0
+        self.stale: bool = False
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    # ------------------------------------------------------------------
+    # Loading / freshness
+    # ------------------------------------------------------------------
+
+    async def _compute_version(self) -> Tuple:
+        """Cheap version stamp: (estimated count, newest _id) per source collection"""
+        stamp = []
+        for col in (branded_ingredients_col, inci_col, suppliers_col):
+            count = await col.estimated_document_count()
+            newest = await col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            stamp.append((count, newest["_id"] if newest else None))
+        return tuple(stamp)
+
+    async def rebuild(self):
+        """Load the full aggregate once and rebuild all structures"""
+        start = time.time()
+        version = await self._compute_version()
+
+        docs: List[Optional[dict]] = []
+        inci_sets: List[FrozenSet[str]] = []
+        by_inci: Dict[str, List[int]] = {}
+        position_by_id: Dict[Any, int] = {}
+
+        async for doc in branded_ingredients_col.aggregate(BRANDED_PIPELINE):
+            pos = len(docs)
+            inci_set = brand_inci_set(doc)
+            docs.append(doc)
+            inci_sets.append(inci_set)
+            position_by_id[doc["_id"]] = pos
+            for inci in inci_set:
+                by_inci.setdefault(inci, []).append(pos)
+
+        general_inci: Dict[str, List[str]] = {}
+        cursor = inci_col.find({}, {"inciName": 1, "inciName_normalized": 1})
+        async for inci_doc in cursor:
+            normalized = (inci_doc.get("inciName_normalized") or "").lower()
+            if normalized:
+                general_inci.setdefault(normalized, []).append(inci_doc.get("inciName", ""))
+
+        # Swap in the new structures in one go
+        self.docs = docs
+        self.inci_sets = inci_sets
+        self.by_inci = by_inci
+        self.position_by_id = position_by_id
+        self.containment = ContainmentIndex.build(inci_sets)
+        self._fuzzy_store = FuzzyCandidateStore.build([doc.get("inci_list") for doc in docs])
+        self.general_inci = general_inci
+        self.version = version
+        self.loaded_at = self.last_checked = time.time()
+        self.stale = False
+
+        print(f"[OK] Branded index built: {len(docs)} branded ingredients, "
+              f"{len(by_inci)} branded INCI, {len(general_inci)} general INCI "
+              f"in {time.time() - start:.2f}s")
+
+    async def ensure_fresh(self):
+        """Build on first use, then rebuild only when marked stale or the version stamp changed"""
+        if self.loaded and not self.stale:
+            watching = self._watch_task is not None and not self._watch_task.done()
+            if watching or time.time() - self.last_checked < INDEX_REFRESH_INTERVAL:
+                return
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if not self.loaded or self.stale:
+                await self.rebuild()
+                return
+            if time.time() - self.last_checked < INDEX_REFRESH_INTERVAL:
+                return
+            version = await self._compute_version()
+            self.last_checked = time.time()
+            if version != self.version:
+                print("[INFO] Branded index version stamp changed, rebuilding...")
+                await self.rebuild()
+
+    def invalidate(self):
+        """Force a rebuild on next use (call after bulk writes to the source collections)"""
+        self.stale = True
+
+    # ------------------------------------------------------------------
+    # Incremental updates (change stream)
+    # ------------------------------------------------------------------
+
+    def _remove_position(self, pos: int):
+        for inci in self.inci_sets[pos]:
+            postings = self.by_inci.get(inci)
+            if postings and pos in postings:
+                postings.remove(pos)
+                if not postings:
+                    del self.by_inci[inci]
+        self.containment.remove(pos)
+        self.docs[pos] = None
+        self.inci_sets[pos] = frozenset()
+
+    async def apply_branded_change(self, change: dict):
+        """Apply a single change-stream event on ingre_branded_ingredients"""
+        doc_id = change.get("documentKey", {}).get("_id")
+        if doc_id is None:
+            return
+
+        pos = self.position_by_id.get(doc_id)
+        if pos is not None:
+            self._remove_position(pos)
+        # Candidate dedup depends on catalog order: rebuild lazily on next fuzzy lookup
+        self._fuzzy_store = None
+
+        if change.get("operationType") == "delete":
+            self.position_by_id.pop(doc_id, None)
+            return
+
+        pipeline = [{"$match": {"_id": doc_id}}] + BRANDED_PIPELINE
+        async for doc in branded_ingredients_col.aggregate(pipeline):
+            inci_set = brand_inci_set(doc)
+            if pos is None:
+                pos = len(self.docs)
+                self.docs.append(doc)
+                self.inci_sets.append(inci_set)
+                self.position_by_id[doc_id] = pos
+            else:
+                self.docs[pos] = doc
+                self.inci_sets[pos] = inci_set
+            self.containment.set(pos, inci_set)
+            for inci in inci_set:
+                postings = self.by_inci.setdefault(inci, [])
+                postings.append(pos)
+                postings.sort()
+
+    async def _watch(self):
+        try:
+            pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+            async with db.watch(pipeline) as stream:
+                print("[OK] Branded index watching change stream")
+                async for change in stream:
+                    coll = change.get("ns", {}).get("coll")
+                    if coll == "ingre_branded_ingredients" and self.loaded and not self.stale:
+                        await self.apply_branded_change(change)
+                    else:
+                        # INCI / supplier names are joined into every doc: rebuild lazily
+                        self.stale = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone servers don't support change streams; fall back to version stamps
+            print(f"[WARNING] Branded index change stream unavailable ({type(e).__name__}: {e}); "
+                  f"falling back to version stamp checks every {INDEX_REFRESH_INTERVAL}s")
+
+    def start_watching(self):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task is not None and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    # ------------------------------------------------------------------
+    # Queries used by match_inci_names (all return docs in collection order)
+    # ------------------------------------------------------------------
+
+    def docs_containing_all(self, inci_set: Iterable[str]) -> List[Tuple[dict, FrozenSet[str]]]:
+        """Branded docs whose INCI set contains every name in inci_set (Step 0)"""
+        names = list(inci_set)
+        if not names:
+            return []
+        postings = [self.by_inci.get(name) for name in names]
+        if not all(postings):
+            return []
+        postings.sort(key=len)
+        positions = set(postings[0])
+        for plist in postings[1:]:
+            positions.intersection_update(plist)
+        return [(self.docs[pos], self.inci_sets[pos]) for pos in sorted(positions)]
+
+    def docs_contained_in(self, product_inci_set: Set[str]) -> List[Tuple[dict, FrozenSet[str]]]:
+        """Branded docs whose (non-empty) INCI set is a subset of the product's (Step 1)"""
+        return [
+            (self.docs[pos], self.inci_sets[pos])
+            for pos in self.containment.contained_in(product_inci_set)
+        ]
+
+    @property
+    def fuzzy_store(self) -> FuzzyCandidateStore:
+        """Fuzzy candidate store for Step 2 (first-occurrence owner wins, like the old linear scan)"""
+        if self._fuzzy_store is None:
+            self._fuzzy_store = FuzzyCandidateStore.build(
+                [doc.get("inci_list") if doc is not None else None for doc in self.docs]
+            )
+        return self._fuzzy_store
+
+    def fuzzy_matches(self, queries: List[str], exclude: Set[str]) -> List[Optional[Tuple[str, float, dict]]]:
+        """Best (candidate, score, owning doc) per query in one batched lookup (Step 2)"""
+        matches: List[Optional[Tuple[str, float, dict]]] = []
+        for hit in self.fuzzy_store.best_matches(queries, exclude):
+            if hit is None:
+                matches.append(None)
+            else:
+                candidate, score, owner = hit
+                matches.append((candidate, score, self.docs[owner]))
+        return matches
+
+    def first_doc_intersecting(self, names: Set[str]) -> Optional[Tuple[dict, FrozenSet[str]]]:
+        """First branded doc (collection order) sharing any INCI with names (Step 3)"""
+        best: Optional[int] = None
+        for name in names:
+            postings = self.by_inci.get(name)
+            if postings and (best is None or postings[0] < best):
+                best = postings[0]
+        if best is None:
+            return None
+        return self.docs[best], self.inci_sets[best]
+
+    def lookup_general(self, names: Iterable[str]) -> List[Tuple[str, str]]:
+        """(normalized, inciName) pairs from ingre_inci for the given normalized names (Step 4)"""
+        found = []
+        for name in names:
+            for original in self.general_inci.get(name, ()):
+                found.append((name, original))
+        return found
+
+
+# Global index instance
+_branded_index: Optional[BrandedIngredientIndex] = None
+
+
+def get_branded_index_instance() -> BrandedIngredientIndex:
+    """Get the global index without loading it"""
+    global _branded_index
+    if _branded_index is None:
+        _branded_index = BrandedIngredientIndex()
+    return _branded_index
+
+
+async def get_branded_index() -> BrandedIngredientIndex:
+    """
+    Get the global branded index, building or refreshing it if needed.
+
+    Returns:
+        BrandedIngredientIndex instance ready for queries
+    """
+    index = get_branded_index_instance()
+    await index.ensure_fresh()
+    return index
+
+
+async def warm_branded_index():
+    """Build the index and start the change stream watcher (called on app startup)"""
+    index = get_branded_index_instance()
+    await index.ensure_fresh()
+    index.start_watching()
+    return index
@@ -0,0 +1,312 @@
+# app/ai_ingredient_intelligence/logic/browser_pool.py
+"""
+Process-level pool of warm headless Chrome instances for URLScraper.
+
+Every URLScraper() used to launch its own Chrome (2-5s plus a
+webdriver-manager download check) and a burst of URL requests launched one
+browser each. The pool instead:
+
+- Keeps at most BROWSER_POOL_SIZE browsers; the same bound caps concurrent
+  scrapes, extra requests wait (up to BROWSER_ACQUIRE_TIMEOUT_SECONDS)
+- Health-checks an idle browser before handing it out and replaces dead ones
+- Recycles a browser after BROWSER_MAX_PAGES leases, or once Chrome's
+  process tree grows past BROWSER_MAX_RSS_MB (needs psutil)
+- Isolates leases: the browser is handed back with stray windows closed and
+  cookies, cache and site storage wiped, on about:blank. The leased driver
+  records every origin it navigates to or lands on (redirects included) and
+  every tab's origin before it is closed; origins that set cookies during the
+  lease are added at check-in, and storage is cleared for all of them
+
+Environment:
+    BROWSER_POOL_SIZE                 max browsers / concurrent scrapes (2)
+    BROWSER_MAX_PAGES                 leases before a browser is recycled (50)
+    BROWSER_MAX_RSS_MB                recycle when Chrome uses more (1024)
+    BROWSER_ACQUIRE_TIMEOUT_SECONDS   max wait for a free browser (90)
+    BROWSER_POOL_WARM                 browsers launched at startup (0)
+
+USAGE:
+    from app.ai_ingredient_intelligence.logic.browser_pool import get_browser_pool
+    async with get_browser_pool().lease() as driver:
+        await loop.run_in_executor(None, driver.get, url)
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1024"))
+BROWSER_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT_SECONDS", "90"))
+BROWSER_POOL_WARM = int(os.getenv("BROWSER_POOL_WARM", "0"))
+
+
+def _default_factory():
+    from app.ai_ingredient_intelligence.logic.url_scraper import create_chrome_driver
+    return create_chrome_driver()
+
+
+def _is_healthy(driver) -> bool:
+    """A live browser answers a trivial command"""
+    try:
+        return bool(driver.window_handles) and driver.title is not None
+    except Exception:
+        return False
+
+
+def _origin(url: str) -> Optional[str]:
+    parsed = urlparse(url or "")
+    if parsed.scheme in ("http", "https") and parsed.netloc:
+        return f"{parsed.scheme}://{parsed.netloc}"
+    return None
+
+
+def _add_origin(origins: Set[str], url: str):
+    origin = _origin(url)
+    if origin:
+        origins.add(origin)
+
+
+def _cookie_origins(driver) -> Set[str]:
+    """Origins of every cookie in the browser: catches redirect hops and frames that set state"""
+    result = driver.execute_cdp_cmd("Network.getAllCookies", {}) or {}
+    origins = set()
+    for cookie in result.get("cookies", []):
+        domain = (cookie.get("domain") or "").lstrip(".")
+        if domain:
+            origins.add(f"https://{domain}")
+            origins.add(f"http://{domain}")
+    return origins
+
+
+class _RecordingDriver:
+    """
+    Leased view of a pooled driver that records the origins it visits.
+
+    Delegates everything to the real driver; get() records the requested and
+    the landed URL, close() records the closing tab's URL first.
+    """
+
+    def __init__(self, driver, origins: Set[str]):
+        self._driver = driver
+        self._origins = origins
+
+    def get(self, url: str):
+        _add_origin(self._origins, url)
+        try:
+            return self._driver.get(url)
+        finally:
+            _add_origin(self._origins, self._driver.current_url)
+
+    def close(self):
+        _add_origin(self._origins, self._driver.current_url)
+        return self._driver.close()
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def _reset_session(driver, origins: Set[str]):
+    """Close extra windows and wipe cookies, cache and storage so the next lease starts clean"""
+    origins.update(_cookie_origins(driver))
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        _add_origin(origins, driver.current_url)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    _add_origin(origins, driver.current_url)
+
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    for origin in origins:
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+    driver.get("about:blank")
+
+
+def _browser_rss_mb(driver) -> Optional[float]:
+    """Resident memory of chromedriver and all Chrome processes below it, or None if unknown"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class PooledBrowser:
+    """A pooled driver and its lease bookkeeping"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+        # Origins visited since the last reset (filled by _RecordingDriver), whose site storage must be wiped
+        self.origins: Set[str] = set()
+
+
+class BrowserPool:
+    """Bounded pool of warm browsers; lease() hands out one browser per scrape"""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_MAX_PAGES,
+        max_rss_mb: int = BROWSER_MAX_RSS_MB,
+        acquire_timeout: float = BROWSER_ACQUIRE_TIMEOUT_SECONDS,
+        factory: Optional[Callable[[], Any]] = None
+    ):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.acquire_timeout = acquire_timeout
+        self._factory = factory or _default_factory
+        # One permit per browser: bounds both live browsers and concurrent scrapes
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[PooledBrowser] = []
+        self._in_use = 0
+        self._closed = False
+        self._stats = {"launched": 0, "leases": 0, "reused": 0, "recycled": 0,
+                       "unhealthy": 0, "launch_errors": 0, "wait_seconds": 0.0}
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _launch(self) -> PooledBrowser:
+        started = time.perf_counter()
+        try:
+            driver = await self._run(self._factory)
+        except Exception:
+            self._stats["launch_errors"] += 1
+            raise
+        self._stats["launched"] += 1
+        print(f"🌐 Launched pooled browser in {time.perf_counter() - started:.1f}s "
+              f"({len(self._idle) + self._in_use + 1}/{self.size})")
+        return PooledBrowser(driver)
+
+    async def _checkout(self) -> PooledBrowser:
+        while self._idle:
+            browser = self._idle.pop()
+            if await self._run(_is_healthy, browser.driver):
+                self._stats["reused"] += 1
+                return browser
+            self._stats["unhealthy"] += 1
+            print("[WARNING] Pooled browser failed its health check, replacing it")
+            await self._discard(browser)
+        return await self._launch()
+
+    async def _discard(self, browser: PooledBrowser):
+        await self._run(_quit, browser.driver)
+
+    def _should_recycle(self, browser: PooledBrowser) -> Optional[str]:
+        if browser.pages >= self.max_pages:
+            return f"served {browser.pages} pages"
+        rss = _browser_rss_mb(browser.driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"using {rss:.0f} MB"
+        return None
+
+    async def _checkin(self, browser: PooledBrowser):
+        browser.pages += 1
+        if self._closed:
+            await self._discard(browser)
+            return
+        try:
+            await self._run(_reset_session, browser.driver, browser.origins)
+            browser.origins.clear()
+        except Exception as e:
+            self._stats["unhealthy"] += 1
+            print(f"[WARNING] Could not reset pooled browser ({type(e).__name__}: {e}), discarding it")
+            await self._discard(browser)
+            return
+        reason = self._should_recycle(browser)
+        if reason:
+            self._stats["recycled"] += 1
+            print(f"♻️ Recycling pooled browser ({reason})")
+            await self._discard(browser)
+            return
+        self._idle.append(browser)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Any]:
+        """
+        Borrow a browser for one scrape.
+
+        Raises:
+            RuntimeError: if the pool is closed or no browser frees up within acquire_timeout
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"All {self.size} browsers are busy; try again shortly")
+        self._stats["wait_seconds"] += time.perf_counter() - started
+        self._in_use += 1
+        browser = None
+        try:
+            browser = await self._checkout()
+            self._stats["leases"] += 1
+            yield _RecordingDriver(browser.driver, browser.origins)
+        finally:
+            try:
+                if browser is not None:
+                    await self._checkin(browser)
+            finally:
+                self._in_use -= 1
+                self._slots.release()
+
+    async def warm(self, count: int = 1):
+        """Launch browsers ahead of the first request"""
+        for _ in range(min(count, self.size) - len(self._idle) - self._in_use):
+            self._idle.append(await self._launch())
+
+    async def close(self):
+        """Quit all idle browsers; leased ones are quit when returned"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for browser in idle:
+            await self._discard(browser)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "size": self.size, "idle": len(self._idle), "in_use": self._in_use}
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Shared browser pool for this process"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+async def warm_browser_pool():
+    """Pre-launch BROWSER_POOL_WARM browsers (called on app startup)"""
+    if BROWSER_POOL_WARM > 0:
+        await get_browser_pool().warm(BROWSER_POOL_WARM)
+
+
+async def close_browser_pool():
+    """Quit pooled browsers (called on app shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
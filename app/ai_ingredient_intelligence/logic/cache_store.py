@@ -0,0 +1,268 @@
+# app/ai_ingredient_intelligence/logic/cache_store.py
+"""
+Two-tier cache (in-process LRU + MongoDB with TTL) and request coalescing.
+
+- LRUCache:       bounded in-process dict with per-entry expiry
+- TwoTierCache:   LRU in front of a Mongo collection whose TTL index on
+                  `expires_at` lets MongoDB drop stale entries by itself.
+                  With max_entries, the oldest Mongo entries of the
+                  namespace are trimmed once it grows past the cap.
+                  Values may be None to record negative results (e.g. 404s);
+                  `get` returns (hit, value) so a cached None is still a hit.
+- Coalescer:      concurrent callers asking for the same key share one
+                  in-flight computation instead of each hitting the network.
+
+USAGE:
+    cache = TwoTierCache("cas_cache", namespace="rn", ttl_seconds=30 * 86400)
+    hit, value = await cache.get(key)
+    if not hit:
+        value = await fetch()
+        await cache.set(key, value)
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Writes between size checks for caches with max_entries
+TRIM_CHECK_INTERVAL = 100
+
+
+class LRUCache:
+    """Bounded in-process cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        self._data[key] = (time.time() + ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoTierCache:
+    """In-process LRU backed by a MongoDB collection with a TTL index"""
+
+    def __init__(
+        self,
+        collection_name: str,
+        namespace: str,
+        ttl_seconds: float,
+        negative_ttl_seconds: Optional[float] = None,
+        maxsize: int = 10000,
+        use_mongo: bool = True,
+        max_entries: Optional[int] = None
+    ):
+        self.collection_name = collection_name
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds if negative_ttl_seconds is not None else ttl_seconds
+        self.memory = LRUCache(maxsize=maxsize)
+        self.use_mongo = use_mongo
+        self.max_entries = max_entries
+        self.mongo_hits = 0
+        self.trimmed = 0
+        self._writes_since_trim = 0
+        self._indexes_ready = False
+
+    def _collection(self):
+        # Imported lazily so the in-memory tier works without a database configured
+        from app.ai_ingredient_intelligence.db.mongodb import db
+        return db[self.collection_name]
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def ensure_indexes(self):
+        """TTL index so MongoDB removes expired entries on its own"""
+        if self._indexes_ready or not self.use_mongo:
+            return
+        try:
+            await self._collection().create_index("expires_at", expireAfterSeconds=0)
+            if self.max_entries:
+                await self._collection().create_index([("namespace", 1), ("created_at", 1)])
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"[WARNING] Could not create TTL index on {self.collection_name}: {e}")
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); value may be None for a cached negative result"""
+        full_key = self._key(key)
+        hit, value = self.memory.get(full_key)
+        if hit or not self.use_mongo:
+            return hit, value
+
+        try:
+            doc = await self._collection().find_one({"_id": full_key})
+        except Exception as e:
+            print(f"[WARNING] Cache read failed ({self.collection_name}): {e}")
+            return False, None
+        if not doc:
+            return False, None
+
+        expires_at = doc.get("expires_at")
+        if expires_at is not None:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if remaining <= 0:
+                return False, None
+        else:
+            remaining = self.ttl_seconds
+
+        value = doc.get("value")
+        self.memory.set(full_key, value, remaining)
+        self.mongo_hits += 1
+        return True, value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store value in both tiers (None is stored with the negative TTL)"""
+        if ttl_seconds is None:
+            ttl_seconds = self.negative_ttl_seconds if value is None else self.ttl_seconds
+        full_key = self._key(key)
+        self.memory.set(full_key, value, ttl_seconds)
+        if not self.use_mongo:
+            return
+
+        await self.ensure_indexes()
+        now = datetime.now(timezone.utc)
+        try:
+            await self._collection().update_one(
+                {"_id": full_key},
+                {"$set": {
+                    "value": value,
+                    "namespace": self.namespace,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=ttl_seconds),
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"[WARNING] Cache write failed ({self.collection_name}): {e}")
+            return
+
+        if self.max_entries:
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= TRIM_CHECK_INTERVAL:
+                self._writes_since_trim = 0
+                await self.trim()
+
+    async def trim(self) -> int:
+        """Delete the oldest Mongo entries of this namespace beyond max_entries"""
+        if not self.max_entries or not self.use_mongo:
+            return 0
+        try:
+            collection = self._collection()
+            excess = await collection.count_documents({"namespace": self.namespace}) - self.max_entries
+            if excess <= 0:
+                return 0
+            cursor = collection.find({"namespace": self.namespace}, {"_id": 1}).sort("created_at", 1).limit(excess)
+            ids = [doc["_id"] async for doc in cursor]
+            result = await collection.delete_many({"_id": {"$in": ids}})
+        except Exception as e:
+            print(f"[WARNING] Cache trim failed ({self.collection_name}): {e}")
+            return 0
+        self.trimmed += result.deleted_count
+        print(f"[OK] Trimmed {result.deleted_count} oldest entries from {self.collection_name} ({self.namespace})")
+        return result.deleted_count
+
+    async def delete(self, key: str):
+        full_key = self._key(key)
+        self.memory.delete(full_key)
+        if self.use_mongo:
+            try:
+                await self._collection().delete_one({"_id": full_key})
+            except Exception as e:
+                print(f"[WARNING] Cache delete failed ({self.collection_name}): {e}")
+
+    async def warm(self, key_prefix: str = "") -> int:
+        """Load every unexpired Mongo entry whose key starts with key_prefix into memory"""
+        if not self.use_mongo:
+            return 0
+        loaded = 0
+        now = datetime.now(timezone.utc)
+        try:
+            query = {"_id": {"$regex": f"^{re.escape(self._key(key_prefix))}"}, "expires_at": {"$gt": now}}
+            async for doc in self._collection().find(query, {"value": 1, "expires_at": 1}):
+                expires_at = doc["expires_at"]
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                self.memory.set(doc["_id"], doc.get("value"), (expires_at - now).total_seconds())
+                loaded += 1
+        except Exception as e:
+            print(f"[WARNING] Cache warm-up failed ({self.collection_name}): {e}")
+        return loaded
+
+    def clear_memory(self):
+        """Drop the in-process tier (Mongo entries stay until their TTL)"""
+        self.memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "namespace": self.namespace,
+            "memory_entries": len(self.memory),
+            "memory_hits": self.memory.hits,
+            "memory_misses": self.memory.misses,
+            "mongo_hits": self.mongo_hits,
+            "trimmed": self.trimmed,
+        }
+
+
+class Coalescer:
+    """Share one in-flight computation between concurrent callers asking for the same key"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited isn't logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
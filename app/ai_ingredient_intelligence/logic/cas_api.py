@@ -2,12 +2,23 @@
 """
 CAS Common Chemistry API integration for synonym detection
 Uses CAS numbers to find synonyms of ingredients
+
+Performance:
+- One shared, pooled HTTP/2 client for all CAS calls
+- Token-bucket rate limiter instead of fixed sleeps between batches
+- Concurrent callers asking for the same name / CAS RN share one request
+- Two-tier cache (in-process LRU + Mongo `cas_cache` with TTL) for
+  name -> CAS RN and CAS RN -> synonyms, including negative results (404s),
+  so repeat ingredients like Water and Glycerin never hit the network again
 """
 import os
+import time
 import httpx
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import asyncio
 
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache, Coalescer
+
 # CAS API Configuration
 CAS_API_BASE_URL = "https://commonchemistry.cas.org/api"
 CAS_API_KEY = os.getenv("CAS_API_KEY")
@@ -25,6 +36,108 @@ else:
     }
 
 
+# Throughput / concurrency limits for the CAS API
+CAS_API_RATE_PER_SECOND = float(os.getenv("CAS_API_RATE_PER_SECOND", "10"))
+CAS_API_BURST = int(os.getenv("CAS_API_BURST", "10"))
+CAS_API_MAX_CONCURRENCY = int(os.getenv("CAS_API_MAX_CONCURRENCY", "10"))
+
+# Cache lifetimes (CAS data changes very rarely)
+CAS_CACHE_TTL = int(os.getenv("CAS_CACHE_TTL_SECONDS", str(30 * 86400)))
+CAS_NEGATIVE_CACHE_TTL = int(os.getenv("CAS_NEGATIVE_CACHE_TTL_SECONDS", str(7 * 86400)))
+
+_name_cache = TwoTierCache("cas_cache", namespace="name", ttl_seconds=CAS_CACHE_TTL,
+                           negative_ttl_seconds=CAS_NEGATIVE_CACHE_TTL)
+_synonym_cache = TwoTierCache("cas_cache", namespace="rn", ttl_seconds=CAS_CACHE_TTL,
+                              negative_ttl_seconds=CAS_NEGATIVE_CACHE_TTL)
+_coalescer = Coalescer()
+
+# Shared pooled client (created lazily inside the running event loop)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared CAS HTTP client (HTTP/2 when the h2 package is installed)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        try:
+            _http_client = httpx.AsyncClient(http2=True, timeout=10.0, limits=limits, headers=CAS_API_HEADERS)
+        except ImportError:
+            # h2 not installed - pooled HTTP/1.1 keep-alive still avoids per-call handshakes
+            _http_client = httpx.AsyncClient(timeout=10.0, limits=limits, headers=CAS_API_HEADERS)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client (called on app shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_rate_limiter = TokenBucket(CAS_API_RATE_PER_SECOND, CAS_API_BURST)
+
+
+async def _cas_get(path: str, params: Dict[str, str]) -> httpx.Response:
+    """Rate-limited GET against the CAS API using the shared client"""
+    await _rate_limiter.acquire()
+    return await get_http_client().get(f"{CAS_API_BASE_URL}/{path}", params=params)
+
+
+async def _fetch_json(path: str, params: Dict[str, str], label: str) -> Tuple[str, Optional[Dict]]:
+    """
+    GET a CAS endpoint and classify the outcome.
+
+    Returns:
+        ("ok", json) on success, ("not_found", None) on 404 (safe to cache),
+        ("error", None) on any other failure (never cached)
+    """
+    try:
+        response = await _cas_get(path, params)
+        
+        if response.status_code == 404:
+            # Not found - this is normal, not an error
+            return "not_found", None
+        
+        if response.status_code != 200:
+            print(f"⚠️ CAS API {path} failed for {label}: {response.status_code} - {response.text}")
+            return "error", None
+        
+        return "ok", response.json()
+        
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return "not_found", None
+        print(f"⚠️ CAS API {path} HTTP error for {label}: {e}")
+        return "error", None
+    except Exception as e:
+        print(f"⚠️ Error calling CAS API {path} for {label}: {e}")
+        return "error", None
+
+
 async def search_cas_by_name(ingredient_name: str, offset: Optional[str] = None, size: Optional[str] = None) -> Optional[Dict]:
     """
     Search CAS Common Chemistry by ingredient name.
@@ -37,59 +150,36 @@ async def search_cas_by_name(ingredient_name: str, offset: Optional[str] = None,
     Returns:
         First matching substance detail with CAS RN and synonyms, or None if not found
     """
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Search by name (case-insensitive, supports wildcards)
-            search_url = f"{CAS_API_BASE_URL}/search"
-            params = {"q": ingredient_name}
-            
-            # Add optional pagination parameters
-            if offset:
-                params["offset"] = offset
-            if size:
-                params["size"] = size
-            
-            response = await client.get(
-                search_url,
-                params=params,
-                headers=CAS_API_HEADERS
-            )
-            
-            if response.status_code != 200:
-                if response.status_code == 404:
-                    # No results found - this is normal, not an error
-                    return None
-                print(f"⚠️ CAS API search failed for '{ingredient_name}': {response.status_code} - {response.text}")
-                return None
-            
-            data = response.json()
-            
-            # Get results (paginated, max 100 per page)
-            # Response format: {"count": "1", "results": [...]}
-            results = data.get("results", [])
-            if not results:
-                return None
-            
-            # Return first result (most relevant)
-            first_result = results[0]
-            
-            # Get detailed information including synonyms
-            cas_rn = first_result.get("rn")
-            if cas_rn:
-                detail = await get_cas_detail_by_rn(cas_rn)
-                if detail:
-                    return detail
-            
-            return first_result
-            
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            return None
-        print(f"⚠️ CAS API search HTTP error for '{ingredient_name}': {e}")
+    # Search by name (case-insensitive, supports wildcards)
+    params = {"q": ingredient_name}
+    
+    # Add optional pagination parameters
+    if offset:
+        params["offset"] = offset
+    if size:
+        params["size"] = size
+    
+    status, data = await _fetch_json("search", params, f"'{ingredient_name}'")
+    if status != "ok":
         return None
-    except Exception as e:
-        print(f"⚠️ Error searching CAS API for '{ingredient_name}': {e}")
+    
+    # Get results (paginated, max 100 per page)
+    # Response format: {"count": "1", "results": [...]}
+    results = data.get("results", [])
+    if not results:
         return None
+    
+    # Return first result (most relevant)
+    first_result = results[0]
+    
+    # Get detailed information including synonyms
+    cas_rn = first_result.get("rn")
+    if cas_rn:
+        detail = await get_cas_detail_by_rn(cas_rn)
+        if detail:
+            return detail
+    
+    return first_result
 
 
 async def get_cas_detail_by_rn(cas_rn: str) -> Optional[Dict]:
@@ -103,37 +193,10 @@ async def get_cas_detail_by_rn(cas_rn: str) -> Optional[Dict]:
     Returns:
         Substance details including synonyms, or None if not found
     """
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # API accepts CAS RN with or without dashes
-            # Keep original format (with dashes if present)
-            detail_url = f"{CAS_API_BASE_URL}/detail"
-            params = {"cas_rn": cas_rn}  # Parameter name is 'cas_rn' per Swagger spec
-            
-            response = await client.get(
-                detail_url,
-                params=params,
-                headers=CAS_API_HEADERS
-            )
-            
-            if response.status_code == 404:
-                # Not found - this is normal, not an error
-                return None
-            
-            if response.status_code != 200:
-                print(f"⚠️ CAS API detail failed for CAS RN '{cas_rn}': {response.status_code} - {response.text}")
-                return None
-            
-            return response.json()
-            
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            return None
-        print(f"⚠️ CAS API detail HTTP error for CAS RN '{cas_rn}': {e}")
-        return None
-    except Exception as e:
-        print(f"⚠️ Error getting CAS detail for '{cas_rn}': {e}")
-        return None
+    # API accepts CAS RN with or without dashes - keep original format
+    # Parameter name is 'cas_rn' per Swagger spec
+    _, detail = await _fetch_json("detail", {"cas_rn": cas_rn}, f"CAS RN '{cas_rn}'")
+    return detail
 
 
 async def get_cas_detail_by_uri(uri: str) -> Optional[Dict]:
@@ -146,34 +209,8 @@ async def get_cas_detail_by_uri(uri: str) -> Optional[Dict]:
     Returns:
         Substance details including synonyms, or None if not found
     """
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            detail_url = f"{CAS_API_BASE_URL}/detail"
-            params = {"uri": uri}
-            
-            response = await client.get(
-                detail_url,
-                params=params,
-                headers=CAS_API_HEADERS
-            )
-            
-            if response.status_code == 404:
-                return None
-            
-            if response.status_code != 200:
-                print(f"⚠️ CAS API detail failed for URI '{uri}': {response.status_code} - {response.text}")
-                return None
-            
-            return response.json()
-            
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            return None
-        print(f"⚠️ CAS API detail HTTP error for URI '{uri}': {e}")
-        return None
-    except Exception as e:
-        print(f"⚠️ Error getting CAS detail for URI '{uri}': {e}")
-        return None
+    _, detail = await _fetch_json("detail", {"uri": uri}, f"URI '{uri}'")
+    return detail
 
 
 async def get_cas_detail(cas_rn: Optional[str] = None, uri: Optional[str] = None) -> Optional[Dict]:
@@ -196,20 +233,8 @@ async def get_cas_detail(cas_rn: Optional[str] = None, uri: Optional[str] = None
         return None
 
 
-async def get_synonyms_by_cas(cas_rn: str) -> List[str]:
-    """
-    Get all synonyms for a given CAS Registry Number.
-    
-    Args:
-        cas_rn: CAS Registry Number (e.g., "50-00-0")
-    
-    Returns:
-        List of synonym names (including the primary name)
-    """
-    detail = await get_cas_detail_by_rn(cas_rn)
-    if not detail:
-        return []
-    
+def _extract_synonyms(detail: Dict) -> List[str]:
+    """Primary name + synonyms from a detail response, deduplicated case-insensitively"""
     synonyms = []
     
     # Extract synonyms from detail response
@@ -236,6 +261,61 @@ async def get_synonyms_by_cas(cas_rn: str) -> List[str]:
     return unique_synonyms
 
 
+async def resolve_cas_rn(ingredient_name: str) -> Optional[str]:
+    """
+    Resolve an ingredient name to its CAS Registry Number (cached, coalesced).
+    
+    "No results" and 404s are cached as negative results; transient errors are not.
+    """
+    key = ingredient_name.strip().lower()
+    if not key:
+        return None
+    
+    hit, cas_rn = await _name_cache.get(key)
+    if hit:
+        return cas_rn
+    
+    async def _resolve() -> Optional[str]:
+        status, data = await _fetch_json("search", {"q": ingredient_name}, f"'{ingredient_name}'")
+        if status == "error":
+            return None
+        
+        cas_rn = None
+        results = (data or {}).get("results", [])
+        if results:
+            # First result is the most relevant
+            cas_rn = results[0].get("rn") or results[0].get("cas_rn")
+        await _name_cache.set(key, cas_rn)
+        return cas_rn
+    
+    return await _coalescer.run(f"name:{key}", _resolve)
+
+
+async def get_synonyms_by_cas(cas_rn: str) -> List[str]:
+    """
+    Get all synonyms for a given CAS Registry Number (cached, coalesced).
+    
+    Args:
+        cas_rn: CAS Registry Number (e.g., "50-00-0")
+    
+    Returns:
+        List of synonym names (including the primary name)
+    """
+    hit, synonyms = await _synonym_cache.get(cas_rn)
+    if hit:
+        return list(synonyms or [])
+    
+    async def _fetch() -> List[str]:
+        status, detail = await _fetch_json("detail", {"cas_rn": cas_rn}, f"CAS RN '{cas_rn}'")
+        if status == "error":
+            return []
+        synonyms = _extract_synonyms(detail) if detail else []
+        await _synonym_cache.set(cas_rn, synonyms)
+        return synonyms
+    
+    return list(await _coalescer.run(f"rn:{cas_rn}", _fetch))
+
+
 async def get_synonyms_for_ingredient(ingredient_name: str) -> List[str]:
     """
     Get synonyms for an ingredient by searching CAS API.
@@ -243,17 +323,8 @@ async def get_synonyms_for_ingredient(ingredient_name: str) -> List[str]:
     Returns list of synonyms including the original name.
     """
     try:
-        # Search for the ingredient
-        search_result = await search_cas_by_name(ingredient_name)
-        if not search_result:
-            return []
-        
-        # Get CAS RN
-        cas_rn = search_result.get("rn")
-        if not cas_rn:
-            # Try to get from detail if available
-            cas_rn = search_result.get("cas_rn")
-        
+        # Resolve the CAS RN (search only - the detail call happens once, below)
+        cas_rn = await resolve_cas_rn(ingredient_name)
         if not cas_rn:
             return []
         
@@ -275,28 +346,34 @@ async def get_synonyms_batch(ingredient_names: List[str]) -> Dict[str, List[str]
     """
     Get synonyms for multiple ingredients in batch.
     Returns dict mapping ingredient name to list of synonyms.
+    
+    All names run concurrently (bounded by CAS_API_MAX_CONCURRENCY); the token
+    bucket in _cas_get keeps us under the API rate limit and cached names
+    return without any network call.
     """
-    results = {}
+    semaphore = asyncio.Semaphore(CAS_API_MAX_CONCURRENCY)
+    unique_names = list(dict.fromkeys(ingredient_names))
     
-    # Process in batches to avoid rate limiting
-    batch_size = 5
-    for i in range(0, len(ingredient_names), batch_size):
-        batch = ingredient_names[i:i + batch_size]
-        
-        # Process batch concurrently
-        tasks = [get_synonyms_for_ingredient(name) for name in batch]
-        batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for ingredient, synonyms in zip(batch, batch_results):
-            if isinstance(synonyms, Exception):
-                print(f"⚠️ Error getting synonyms for '{ingredient}': {synonyms}")
-                results[ingredient] = []
-            else:
-                results[ingredient] = synonyms
-        
-        # Small delay between batches to avoid rate limiting
-        if i + batch_size < len(ingredient_names):
-            await asyncio.sleep(0.5)
+    async def _bounded(name: str) -> List[str]:
+        async with semaphore:
+            return await get_synonyms_for_ingredient(name)
+    
+    batch_results = await asyncio.gather(*[_bounded(name) for name in unique_names], return_exceptions=True)
+    
+    results = {}
+    for ingredient, synonyms in zip(unique_names, batch_results):
+        if isinstance(synonyms, Exception):
+            print(f"⚠️ Error getting synonyms for '{ingredient}': {synonyms}")
+            results[ingredient] = []
+        else:
+            results[ingredient] = synonyms
     
     return results
 
+
+def get_cas_cache_stats() -> Dict[str, Dict]:
+    """Hit/miss statistics for the CAS caches"""
+    return {
+        "name_to_cas_rn": _name_cache.get_stats(),
+        "cas_rn_to_synonyms": _synonym_cache.get_stats(),
+    }
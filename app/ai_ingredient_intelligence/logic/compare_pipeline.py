@@ -0,0 +1,202 @@
+# app/ai_ingredient_intelligence/logic/compare_pipeline.py
+"""
+Bounded fan-out for /compare-products.
+
+Comparing N products used to cost N product preprocessing tasks each
+free to start scrapes and LLM calls, an LLM product-name detection per
+URL, the structured comparison call, and then one "fill missing fields"
+LLM call per product. Now:
+
+- URL products share one URLScraper whose scrapes lease warm browsers
+  from the process pool (browser_pool.py) - no per-product Chrome launch
+- CompareLimits caps, per request, how many browser sessions and LLM
+  calls are in flight, so one 4-product comparison cannot take every
+  pooled browser or LLM slot from other users
+- the comparison prompt itself fills what the page does not state
+  (price, benefits, claims, attributes, inferred from INCI and brand
+  knowledge); only products still missing fields afterwards go to a
+  single batched fill call
+- missing_fields() / merge_filled_fields() are the fill rules, shared by
+  both steps; fill_missing_fields() runs the batched fill call
+
+Environment:
+    COMPARE_MAX_BROWSER_SESSIONS   concurrent scrapes per comparison (2)
+    COMPARE_MAX_LLM_CALLS          concurrent LLM calls per comparison (2)
+
+USAGE:
+    limits = CompareLimits()
+    async with limits.browser:
+        result = await scraper.extract_ingredients_from_url(url)
+    missing = missing_fields(product)
+    merge_filled_fields(product, fill_data, missing)
+    filled = await fill_missing_fields(products, contexts, limits, create=create_message,
+                                       model=model, max_tokens=4096)
+"""
+
+import os
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+COMPARE_MAX_BROWSER_SESSIONS = int(os.getenv("COMPARE_MAX_BROWSER_SESSIONS", "2"))
+COMPARE_MAX_LLM_CALLS = int(os.getenv("COMPARE_MAX_LLM_CALLS", "2"))
+
+TEXT_FIELDS = ["product_name", "brand_name", "price"]
+LIST_FIELDS = ["benefits", "claims"]
+BOOLEAN_FIELDS = [
+    "cruelty_free", "sulphate_free", "paraben_free", "vegan",
+    "organic", "fragrance_free", "non_comedogenic", "hypoallergenic"
+]
+COMPARISON_FIELDS = TEXT_FIELDS + LIST_FIELDS + BOOLEAN_FIELDS
+
+
+class CompareLimits:
+    """Per-request semaphores for browser sessions and LLM calls"""
+
+    def __init__(
+        self,
+        browser_sessions: int = COMPARE_MAX_BROWSER_SESSIONS,
+        llm_calls: int = COMPARE_MAX_LLM_CALLS
+    ):
+        self.browser = asyncio.Semaphore(max(1, browser_sessions))
+        self.llm = asyncio.Semaphore(max(1, llm_calls))
+
+
+def missing_fields(product: Dict[str, Any]) -> List[str]:
+    """Comparison fields that are null or empty"""
+    missing = []
+    for field in COMPARISON_FIELDS:
+        value = product.get(field)
+        if value is None or (isinstance(value, list) and len(value) == 0):
+            missing.append(field)
+    return missing
+
+
+def merge_filled_fields(product: Dict[str, Any], fill_data: Dict[str, Any], fields: List[str]) -> List[str]:
+    """
+    Copy usable values for the given fields from fill_data into product.
+
+    Lists must be non-empty, booleans must be booleans and text must not be
+    empty or "null". Returns the fields that were filled.
+    """
+    filled = []
+    for field in fields:
+        value = fill_data.get(field)
+        if field in LIST_FIELDS:
+            usable = isinstance(value, list) and len(value) > 0
+        elif field in BOOLEAN_FIELDS:
+            usable = isinstance(value, bool)
+        else:
+            usable = bool(value) and value != "null"
+        if usable:
+            product[field] = value
+            filled.append(field)
+    return filled
+
+
+def _fill_section(number: int, product: Dict[str, Any], context: Dict[str, Any], missing: List[str]) -> str:
+    text = context.get("text")
+    return f"""Product {number}:
+- Product Name: {product.get('product_name') or 'Unknown'}
+- Brand Name: {product.get('brand_name') or 'Unknown'}
+- INCI Ingredients: {', '.join(product.get('inci', [])) if product.get('inci') else 'Not available'}
+- Current Extracted Text: {text[:3000] if text else 'Not available'}
+- Source URL: {context.get('url_context') or 'Not provided'}
+- Current Benefits: {', '.join(product.get('benefits') or []) or 'None'}
+- Current Claims: {', '.join(product.get('claims') or []) or 'None'}
+- MISSING FIELDS TO FILL: {', '.join(missing)}"""
+
+
+def build_fill_prompt(
+    products: List[Dict[str, Any]],
+    contexts: List[Dict[str, Any]],
+    incomplete: Dict[int, List[str]]
+) -> str:
+    """One prompt asking for the missing fields of every incomplete product, keyed "product<N>" """
+    fill_sections = []
+    fill_structure = []
+    for idx, missing in incomplete.items():
+        fill_sections.append(_fill_section(idx + 1, products[idx], contexts[idx], missing))
+        fill_structure.append(f'  "product{idx + 1}": {{ only the missing fields of Product {idx + 1} }}')
+
+    return f"""You are an expert cosmetic product researcher. Use your knowledge base and deep analysis to find missing information about these products.
+
+{chr(10).join(fill_sections)}
+
+INSTRUCTIONS:
+1. Use your knowledge base and reasoning to find information about each specific product
+2. If a URL is provided, use it to understand the product context
+3. For PRODUCT_NAME: try to infer from brand name, INCI list, or URL
+4. For BRAND_NAME: try to extract from product name, URL, or text
+5. For PRICE: Search for current market price. If not findable, use "Price not available" (not null)
+6. For BENEFITS: infer from INCI ingredients (e.g., hyaluronic acid = hydration, vitamin C = brightening)
+7. For CLAIMS: infer common claims based on ingredients and product type
+8. For BOOLEAN ATTRIBUTES (cruelty_free, vegan, organic, etc.):
+   - Use ingredient analysis: Check INCI list for indicators
+   - Use brand knowledge: Many brands have known policies (e.g., The Ordinary = cruelty-free)
+   - If truly cannot determine, use reasonable defaults based on product category
+   - NEVER return null - always provide true or false based on best available information
+
+Return ONLY a JSON object with the missing fields of each product filled, using this structure:
+{{
+{("," + chr(10)).join(fill_structure)}
+}}
+
+CRITICAL: NEVER use null. Always provide a value (even if it's "Unknown" for text fields or false for booleans when uncertain).
+"""
+
+
+async def fill_missing_fields(
+    products: List[Dict[str, Any]],
+    contexts: List[Dict[str, Any]],
+    limits: CompareLimits,
+    *,
+    create: Callable[..., Awaitable[Any]],
+    model: str,
+    max_tokens: int
+) -> Dict[int, List[str]]:
+    """
+    Fill the missing fields of all incomplete products with ONE LLM call.
+
+    Args:
+        products: Comparison products, updated in place
+        contexts: Per-product scrape context ('text', 'url_context'), aligned with products
+        create: create_message-compatible coroutine function
+
+    Returns:
+        Dict mapping product index -> fields that were filled
+    """
+    incomplete = {}
+    for idx, product in enumerate(products):
+        missing = missing_fields(product)
+        if missing:
+            print(f"Product {idx + 1} missing fields: {', '.join(missing)}")
+            incomplete[idx] = missing
+    if not incomplete:
+        return {}
+
+    filled_by_product: Dict[int, List[str]] = {}
+    try:
+        print(f"Filling missing fields for {len(incomplete)} products in one call...")
+        async with limits.llm:
+            fill_response = await create(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=0.2,
+                messages=[{"role": "user", "content": build_fill_prompt(products, contexts, incomplete)}]
+            )
+        fill_content = fill_response.content[0].text.strip()
+        if '{' in fill_content and '}' in fill_content:
+            json_start = fill_content.find('{')
+            json_end = fill_content.rfind('}') + 1
+            fill_data = json.loads(fill_content[json_start:json_end])
+            for idx, missing in incomplete.items():
+                product_fill = fill_data.get(f"product{idx + 1}")
+                if isinstance(product_fill, dict):
+                    filled = merge_filled_fields(products[idx], product_fill, missing)
+                    if filled:
+                        filled_by_product[idx] = filled
+                        print(f"✓ Filled product{idx + 1}: {', '.join(filled)}")
+    except Exception as e:
+        print(f"Warning: Failed to fill missing fields: {e}")
+    return filled_by_product
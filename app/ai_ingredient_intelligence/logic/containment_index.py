@@ -0,0 +1,104 @@
+# app/ai_ingredient_intelligence/logic/containment_index.py
+"""
+Subset-containment index for Step 1 of the INCI matcher.
+
+Step 1 asks: which branded ingredients have ALL of their INCI names present in
+the product? A branded set can only be contained in the product if its RAREST
+member is in the product, so every branded set is posted once, under its
+rarest INCI (lowest document frequency across the catalog). A query walks
+only the posting lists of the product's own INCI names and verifies each
+candidate with a subset check.
+
+Results are returned as sorted positions, i.e. in the same order as a linear
+scan over the catalog.
+
+USAGE:
+    index = ContainmentIndex.build(inci_sets)
+    positions = index.contained_in(product_inci_set)
+"""
+
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set
+
+
+class ContainmentIndex:
+    """Rarest-member posting lists over a list of INCI sets (positions are list indexes)"""
+
+    def __init__(self):
+        self.sets: List[FrozenSet[str]] = []
+        self.frequency: Counter = Counter()
+        self.postings: Dict[str, List[int]] = {}
+        self.key_by_position: Dict[int, str] = {}
+
+    @classmethod
+    def build(cls, inci_sets: Sequence[Iterable[str]]) -> "ContainmentIndex":
+        """Build the index from INCI sets in catalog order"""
+        index = cls()
+        index.sets = [frozenset(s) for s in inci_sets]
+        for inci_set in index.sets:
+            index.frequency.update(inci_set)
+        for pos, inci_set in enumerate(index.sets):
+            index._post(pos, inci_set)
+        return index
+
+    def _rarest(self, inci_set: FrozenSet[str]) -> str:
+        # Ties broken by name so the key choice is deterministic
+        return min(inci_set, key=lambda inci: (self.frequency[inci], inci))
+
+    def _post(self, pos: int, inci_set: FrozenSet[str]):
+        if not inci_set:
+            return
+        key = self._rarest(inci_set)
+        self.postings.setdefault(key, []).append(pos)
+        self.key_by_position[pos] = key
+
+    def contained_in(self, product_inci_set: Set[str]) -> List[int]:
+        """Positions of all non-empty sets fully contained in product_inci_set, in catalog order"""
+        found: List[int] = []
+        sets = self.sets
+        for inci in product_inci_set:
+            plist = self.postings.get(inci)
+            if not plist:
+                continue
+            for pos in plist:
+                if sets[pos] <= product_inci_set:
+                    found.append(pos)
+        found.sort()
+        return found
+
+    # ------------------------------------------------------------------
+    # Incremental maintenance (used by the branded index change stream)
+    # ------------------------------------------------------------------
+
+    def remove(self, pos: int):
+        """Drop the set at pos (position is kept as an empty tombstone)"""
+        if pos >= len(self.sets):
+            return
+        key = self.key_by_position.pop(pos, None)
+        if key is not None:
+            plist = self.postings.get(key, [])
+            if pos in plist:
+                plist.remove(pos)
+            if not plist:
+                self.postings.pop(key, None)
+        self.frequency.subtract(self.sets[pos])
+        self.sets[pos] = frozenset()
+
+    def set(self, pos: int, inci_set: Iterable[str]):
+        """Insert or replace the set at pos (pos == len(sets) appends)"""
+        inci_set = frozenset(inci_set)
+        if pos < len(self.sets):
+            self.remove(pos)
+            self.sets[pos] = inci_set
+        else:
+            self.sets.append(inci_set)
+        self.frequency.update(inci_set)
+        self._post(pos, inci_set)
+
+
+def linear_contained_in(inci_sets: Sequence[FrozenSet[str]], product_inci_set: Set[str]) -> List[int]:
+    """Reference linear scan (the pre-index Step 1 behaviour), used by tests and the benchmark"""
+    return [
+        pos for pos, inci_set in enumerate(inci_sets)
+        if inci_set and inci_set.issubset(product_inci_set)
+    ]
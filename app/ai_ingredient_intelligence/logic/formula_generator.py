@@ -58,24 +58,19 @@ from app.ai_ingredient_intelligence.db.mongodb import db
 from app.ai_ingredient_intelligence.db.collections import (
     branded_ingredients_col,
     inci_col,
-    functional_categories_col
 )
+from app.ai_ingredient_intelligence.logic.taxonomy_cache import get_taxonomy_cache, FUNCTIONAL_CATEGORIES
 from app.ai_ingredient_intelligence.logic.bis_rag import get_bis_cautions_for_ingredients
+# All Claude calls go through the shared async gateway (never block the event loop)
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message
 
 # Initialize Claude client (only if available)
 claude_api_key = os.getenv("CLAUDE_API_KEY")
 # Use CLAUDE_MODEL from env, fallback to default Sonnet 3.5
 claude_model = os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-sonnet-4-5-20250929"
 if ANTHROPIC_AVAILABLE and claude_api_key:
-    try:
-        claude_client = anthropic.Anthropic(api_key=claude_api_key)
-        print(f"Claude client initialized with model: {claude_model}")
-    except Exception as e:
-        print(f"Warning: Could not initialize Claude client: {e}")
-        claude_client = None
-        claude_model = None
+    print(f"Claude enabled with model: {claude_model}")
 else:
-    claude_client = None
     claude_model = None
     if not claude_api_key:
         print("Warning: CLAUDE_API_KEY not set. Claude optimization will be disabled.")
@@ -665,21 +660,9 @@ async def get_functional_category_ids(category_names: List[str]) -> List[ObjectI
     if not category_names:
         return []
     
-    # Normalize category names for matching
-    normalized_names = [name.strip().lower() for name in category_names]
-    
-    # Query functional categories collection
-    query = {
-        "$or": [
-            {"functionalName_normalized": {"$in": normalized_names}},
-            {"functionalName": {"$regex": "|".join(normalized_names), "$options": "i"}}
-        ]
-    }
-    
-    cursor = functional_categories_col.find(query, {"_id": 1})
-    category_ids = [doc["_id"] for doc in await cursor.to_list(length=None)]
-    
-    return category_ids
+    # Match normalized names / case-insensitive name pattern against the cached taxonomy
+    taxonomy = await get_taxonomy_cache()
+    return taxonomy.ids_matching_names(FUNCTIONAL_CATEGORIES, category_names)
 
 
 async def check_ingredient_exists_in_db(ingredient_name: str, inci_names: List[str]) -> Optional[Dict]:
@@ -952,7 +935,7 @@ async def select_ingredients_by_benefits(
     RETURNS:
     - Tuple of (validated_ingredients, warnings)
     """
-    if not claude_client:
+    if not claude_model:
         print("⚠️ Claude not available, using fallback template ingredients")
         return [], [], [], []
     
@@ -966,7 +949,7 @@ async def select_ingredients_by_benefits(
         
         print(f"🤖 Asking Claude to select ingredients for benefits: {', '.join(benefits)}")
         
-        response = claude_client.messages.create(
+        response = await create_message(
             model=claude_model,
             max_tokens=16384,
             temperature=0.3,
@@ -1150,12 +1133,8 @@ async def get_functional_category_names(category_ids: List[ObjectId]) -> List[st
     if not category_ids:
         return []
     
-    cursor = functional_categories_col.find(
-        {"_id": {"$in": category_ids}},
-        {"functionalName": 1}
-    )
-    categories = [doc.get("functionalName", "") for doc in await cursor.to_list(length=None)]
-    return categories
+    taxonomy = await get_taxonomy_cache()
+    return taxonomy.names(FUNCTIONAL_CATEGORIES, category_ids)
 
 
 def estimate_ingredient_cost(ingredient: Dict, cost_target: Dict[str, float]) -> float:
@@ -1638,7 +1617,7 @@ async def optimize_percentages_with_ai(
     - Optimized ingredient list with percentages
     - Insights, warnings, and recommendations
     """
-    if not claude_client:
+    if not claude_model:
         print("Warning: Claude not available, skipping AI optimization")
         return allocated_ingredients, {
             "insights": [],
@@ -1656,7 +1635,7 @@ async def optimize_percentages_with_ai(
         if not claude_model:
             raise ValueError("Claude model not configured")
             
-        response = claude_client.messages.create(
+        response = await create_message(
             model=claude_model,
             max_tokens=16384,
             temperature=0.3,  # Lower temperature for more consistent results
@@ -0,0 +1,133 @@
+# app/ai_ingredient_intelligence/logic/fuzzy_store.py
+"""
+Precomputed fuzzy-match candidate store for Step 2 of the INCI matcher.
+
+Built once from the branded index:
+- candidates:  deduplicated branded INCI names (first-occurrence order)
+- owners:      candidate index -> first branded doc position owning it
+- trigrams:    trigram -> candidate indexes (prefilter for large catalogs)
+
+All unmatched ingredients of a request are scored in ONE batched
+rapidfuzz.process.cdist call (optionally multi-threaded). For catalogs larger
+than FUZZY_PREFILTER_MIN_CANDIDATES, each query only considers candidates
+sharing enough trigrams with it, so lookups stay sub-linear in catalog size.
+The prefilter is a heuristic: below the threshold the result is exactly what
+process.extractOne over the full list returned.
+"""
+
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Same threshold the matcher has always used (75% similarity)
+FUZZY_SCORE_CUTOFF = 75
+# Threads used by cdist (-1 = all cores)
+FUZZY_WORKERS = int(os.getenv("FUZZY_MATCH_WORKERS", "1"))
+# Catalog size above which the trigram prefilter is used
+FUZZY_PREFILTER_MIN_CANDIDATES = int(os.getenv("FUZZY_PREFILTER_MIN_CANDIDATES", "20000"))
+# Minimum share of a query's trigrams a candidate must contain to be scored
+FUZZY_PREFILTER_MIN_SHARED = 0.3
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of the token-sorted, padded string (matches token_sort_ratio's view)"""
+    text = " ".join(sorted(text.split()))
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyCandidateStore:
+    """Deduplicated branded INCI candidates with batched fuzzy lookup"""
+
+    def __init__(self, candidates: List[str], owners: List[int]):
+        self.candidates = candidates
+        self.owners = owners
+        self.position_by_candidate: Dict[str, int] = {c: i for i, c in enumerate(candidates)}
+        self.trigram_postings: Dict[str, List[int]] = {}
+        if len(candidates) >= FUZZY_PREFILTER_MIN_CANDIDATES:
+            for i, candidate in enumerate(candidates):
+                for gram in trigrams(candidate):
+                    self.trigram_postings.setdefault(gram, []).append(i)
+
+    @classmethod
+    def build(cls, inci_lists: Sequence[Optional[Sequence[str]]]) -> "FuzzyCandidateStore":
+        """Build from per-doc INCI lists in catalog order (None = deleted doc)"""
+        candidates: List[str] = []
+        owners: List[int] = []
+        seen: Set[str] = set()
+        for pos, inci_list in enumerate(inci_lists):
+            for inci in inci_list or ():
+                inci = inci.strip().lower()
+                if inci and inci not in seen:
+                    seen.add(inci)
+                    candidates.append(inci)
+                    owners.append(pos)
+        return cls(candidates, owners)
+
+    def _prefilter(self, query: str) -> Optional[Set[int]]:
+        """Candidate indexes worth scoring for query, or None to score everything"""
+        if not self.trigram_postings:
+            return None
+        query_grams = trigrams(query)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self.trigram_postings.get(gram, ()))
+        min_shared = max(1, int(len(query_grams) * FUZZY_PREFILTER_MIN_SHARED))
+        return {i for i, count in shared.items() if count >= min_shared}
+
+    def best_matches(
+        self,
+        queries: List[str],
+        exclude: Set[str],
+        score_cutoff: float = FUZZY_SCORE_CUTOFF
+    ) -> List[Optional[Tuple[str, float, int]]]:
+        """
+        Best candidate per query as (candidate, score, owner_position), or None.
+
+        Ties resolve to the earliest candidate, like process.extractOne.
+        Candidates in `exclude` are never returned.
+        """
+        results: List[Optional[Tuple[str, float, int]]] = [None] * len(queries)
+        if not RAPIDFUZZ_AVAILABLE or not queries or not self.candidates:
+            return results
+
+        allowed_rows = [self._prefilter(q) for q in queries]
+        if any(allowed is None for allowed in allowed_rows):
+            columns = np.arange(len(self.candidates))
+        else:
+            columns = np.array(sorted(set().union(*allowed_rows)), dtype=np.int64)
+        if len(columns) == 0:
+            return results
+
+        choices = [self.candidates[i] for i in columns]
+        scores = process.cdist(
+            queries,
+            choices,
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=score_cutoff,
+            dtype=np.float64,
+            workers=FUZZY_WORKERS
+        )
+
+        excluded = [self.position_by_candidate[name] for name in exclude if name in self.position_by_candidate]
+        if excluded:
+            scores[:, np.isin(columns, excluded)] = 0
+
+        for row, allowed in enumerate(allowed_rows):
+            row_scores = scores[row]
+            if allowed is not None:
+                mask = np.fromiter((int(c) in allowed for c in columns), dtype=bool, count=len(columns))
+                row_scores = np.where(mask, row_scores, 0)
+            best_col = int(np.argmax(row_scores))
+            best_score = float(row_scores[best_col])
+            if best_score > 0 and best_score >= score_cutoff:
+                cand_idx = int(columns[best_col])
+                results[row] = (self.candidates[cand_idx], best_score, self.owners[cand_idx])
+        return results
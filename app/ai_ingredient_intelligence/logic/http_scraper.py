@@ -0,0 +1,330 @@
+# app/ai_ingredient_intelligence/logic/http_scraper.py
+"""
+HTTP-first scraping tier for product pages.
+
+Many product pages (Shopify-style D2C brands such as The Derma Co, most
+Next.js storefronts, Amazon's server-rendered detail pages) already contain
+the ingredient list in the HTML, in JSON-LD or in embedded app state, so
+driving a full browser for them is wasted seconds. fetch_product_page():
+
+1. GETs the page over a pooled httpx client (browser-like headers)
+2. Looks for the ingredient list in
+   - JSON-LD (<script type="application/ld+json">) Product data
+   - embedded state: __NEXT_DATA__, window.__PRELOADED_STATE__ / __INITIAL_STATE__
+   - per-platform DOM selectors (PLATFORM_SELECTORS), then any
+     "Ingredients" heading followed by its content
+3. Returns the same shape as URLScraper.scrape_url, or None when no
+   INCI-looking list was found - the caller then falls back to Selenium
+
+parse_product_html() is a pure function, so the extraction is tested offline
+against saved HTML fixtures (tests/fixtures/product_pages/).
+
+Environment:
+    SCRAPE_HTTP_FIRST             try this tier before Selenium (true)
+    SCRAPE_HTTP_TIMEOUT_SECONDS   per-request timeout (8)
+
+USAGE:
+    from app.ai_ingredient_intelligence.logic.http_scraper import fetch_product_page
+    result = await fetch_product_page(url, platform)
+    if result is None:
+        ...  # fall back to the browser
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+SCRAPE_HTTP_FIRST = os.getenv("SCRAPE_HTTP_FIRST", "true").lower() == "true"
+SCRAPE_HTTP_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_HTTP_TIMEOUT_SECONDS", "8"))
+# Larger documents are not product pages worth parsing
+MAX_HTML_BYTES = 5 * 1024 * 1024
+
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+
+# Containers that hold the ingredient list (or the description it is part of) per platform
+PLATFORM_SELECTORS: Dict[str, List[str]] = {
+    "amazon": ["#important-information", "#ingredients_feature_div", "#productDescription", "#feature-bullets"],
+    "nykaa": ["#content-details", "[class*='ingredient']", "[id*='ingredient']"],
+    "flipkart": ["._1mXcCf", "._2418kt", ".product-description"],
+    "thedermaco": ["[class*='ingredient']", "[id*='ingredient']", ".cms-box + *", ".product__description", ".rte"],
+}
+GENERIC_SELECTORS = [
+    "[class*='ingredient']", "[id*='ingredient']", "[data-tab-content*='ingredient']",
+    "[class*='product__description']", "[class*='product-description']", ".rte",
+]
+
+_INGREDIENT_KEY = re.compile(r"ingredient|inci|composition", re.IGNORECASE)
+_INCI_WORD = re.compile(r"aqua|water|glycerin|acid|extract|sodium", re.IGNORECASE)
+_STATE_ASSIGNMENT = re.compile(r"window\.__(?:PRELOADED|INITIAL)_STATE__\s*=\s*(\{.*?\})\s*;?\s*$", re.DOTALL)
+
+_http_client: Optional[httpx.AsyncClient] = None
+_stats = {"attempts": 0, "hits": 0, "misses": 0, "errors": 0, "seconds": 0.0}
+
+
+def looks_like_inci_list(text: str) -> bool:
+    """Same heuristic the browser scrapers use: a line with 5+ commas and a common INCI word"""
+    return any(line.count(",") >= 5 and _INCI_WORD.search(line) for line in (text or "").splitlines())
+
+
+def _html_text(value: str) -> str:
+    """Plain text of a string that may contain markup"""
+    if "<" in value and ">" in value:
+        return BeautifulSoup(value, "html.parser").get_text("\n", strip=True)
+    return value.strip()
+
+
+def _objects(node: Any, depth: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield every JSON object of a nested document, outermost first"""
+    if depth > 40:
+        return
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _objects(value, depth + 1)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _objects(item, depth + 1)
+
+
+def _as_ingredient_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        text = _html_text(value)
+    elif isinstance(value, list) and value and all(isinstance(item, str) for item in value):
+        text = ", ".join(item.strip() for item in value)
+    else:
+        return None
+    return text if looks_like_inci_list(text) else None
+
+
+def _ingredients_from_json(document: Any) -> Optional[str]:
+    """First ingredient-like field of a JSON document (string, HTML or list of names)"""
+    for obj in _objects(document):
+        for key, value in obj.items():
+            if isinstance(key, str) and _INGREDIENT_KEY.search(key):
+                text = _as_ingredient_text(value)
+                if text:
+                    return text
+        # schema.org PropertyValue / CMS blocks: {"name": "Ingredients", "value": "..."}
+        label = obj.get("name") or obj.get("title")
+        if isinstance(label, str) and _INGREDIENT_KEY.search(label):
+            for field in ("value", "content", "body", "description"):
+                text = _as_ingredient_text(obj.get(field))
+                if text:
+                    return text
+    return None
+
+
+def _json_documents(soup: BeautifulSoup) -> Dict[str, List[Any]]:
+    """JSON-LD blocks and embedded app state found in the page"""
+    documents: Dict[str, List[Any]] = {"jsonld": [], "next_data": [], "state": []}
+    for script in soup.find_all("script"):
+        content = script.string or script.get_text() or ""
+        if not content.strip():
+            continue
+        kind = None
+        if (script.get("type") or "").lower() == "application/ld+json":
+            kind = "jsonld"
+        elif script.get("id") == "__NEXT_DATA__":
+            kind = "next_data"
+        else:
+            match = _STATE_ASSIGNMENT.search(content.strip())
+            if match:
+                kind, content = "state", match.group(1)
+        if kind is None:
+            continue
+        try:
+            documents[kind].append(json.loads(content))
+        except (ValueError, TypeError):
+            continue
+    return documents
+
+
+def _jsonld_products(documents: List[Any]) -> List[Dict[str, Any]]:
+    return [
+        obj for document in documents for obj in _objects(document)
+        if obj.get("@type") in ("Product", ["Product"])
+    ]
+
+
+def _ingredients_from_dom(soup: BeautifulSoup, platform: str) -> Optional[str]:
+    """Ingredient list from platform selectors, then from an "Ingredients" heading's content"""
+    for selector in PLATFORM_SELECTORS.get(platform, []) + GENERIC_SELECTORS:
+        try:
+            elements = soup.select(selector)
+        except Exception:
+            continue
+        for element in elements:
+            text = element.get_text("\n", strip=True)
+            if looks_like_inci_list(text):
+                return text
+
+    for heading in soup.find_all(["h2", "h3", "h4", "h5", "button", "summary", "strong", "b", "dt", "span"]):
+        label = heading.get_text(" ", strip=True)
+        if not label or len(label) > 40 or not _INGREDIENT_KEY.search(label):
+            continue
+        # Content is usually the next sibling element, otherwise the heading's container
+        for candidate in (heading.find_next_sibling(), heading.parent):
+            if candidate is None:
+                continue
+            text = candidate.get_text("\n", strip=True)
+            if looks_like_inci_list(text):
+                return text
+    return None
+
+
+def _first_image(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("url") or value.get("contentUrl")
+    if isinstance(value, str) and value.startswith(("http://", "https://", "//")):
+        return "https:" + value if value.startswith("//") else value
+    return None
+
+
+def _meta(soup: BeautifulSoup, prop: str) -> Optional[str]:
+    tag = soup.find("meta", attrs={"property": prop}) or soup.find("meta", attrs={"name": prop})
+    content = tag.get("content") if tag else None
+    return content.strip() if content else None
+
+
+def parse_product_html(html: str, url: str, platform: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract product text from a server-rendered page.
+
+    Returns:
+        Dict like URLScraper.scrape_url ('extracted_text', 'platform', 'url',
+        'product_image', plus 'product_name' and 'source') or None if the
+        page has no INCI-looking ingredient list
+    """
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except Exception:
+        soup = BeautifulSoup(html, "html.parser")
+
+    documents = _json_documents(soup)
+    products = _jsonld_products(documents["jsonld"])
+
+    ingredients, source = None, None
+    for kind, docs in (("jsonld", products), ("next_data", documents["next_data"]), ("state", documents["state"])):
+        for document in docs:
+            ingredients = _ingredients_from_json(document)
+            if ingredients:
+                source = kind
+                break
+        if ingredients:
+            break
+    # JSON-LD descriptions of Shopify products often embed "Ingredients: ..."
+    if not ingredients:
+        for product in products:
+            description = _html_text(str(product.get("description") or ""))
+            if looks_like_inci_list(description):
+                ingredients, source = description, "jsonld"
+                break
+    if not ingredients:
+        ingredients = _ingredients_from_dom(soup, platform)
+        source = "dom" if ingredients else None
+    if not ingredients:
+        return None
+
+    product = products[0] if products else {}
+    h1 = soup.find("h1")
+    product_name = (product.get("name") if isinstance(product.get("name"), str) else None) \
+        or _meta(soup, "og:title") or (h1.get_text(" ", strip=True) if h1 else None)
+    description = _html_text(str(product.get("description") or "")) or _meta(soup, "og:description") or ""
+    product_image = _first_image(product.get("image")) or _first_image(_meta(soup, "og:image"))
+
+    text_parts = []
+    if product_name:
+        text_parts.append(f"Product Name: {product_name}")
+    brand = product.get("brand")
+    if isinstance(brand, dict):
+        brand = brand.get("name")
+    if isinstance(brand, str) and brand.strip():
+        text_parts.append(f"Brand: {brand.strip()}")
+    text_parts.append(f"Ingredients:\n{ingredients}")
+    if description and description not in ingredients:
+        text_parts.append(f"Description:\n{description[:3000]}")
+
+    return {
+        "extracted_text": "\n\n".join(text_parts),
+        "platform": platform,
+        "url": url,
+        "product_image": product_image,
+        "product_name": product_name,
+        "source": source,
+    }
+
+
+def get_scrape_client() -> httpx.AsyncClient:
+    """Shared pooled client for product page fetches"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        limits = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0)
+        timeout = httpx.Timeout(SCRAPE_HTTP_TIMEOUT_SECONDS, connect=5.0)
+        try:
+            _http_client = httpx.AsyncClient(http2=True, timeout=timeout, limits=limits,
+                                             headers=SCRAPE_HEADERS, follow_redirects=True)
+        except ImportError:
+            # h2 not installed - pooled HTTP/1.1 keep-alive still avoids per-call handshakes
+            _http_client = httpx.AsyncClient(timeout=timeout, limits=limits,
+                                             headers=SCRAPE_HEADERS, follow_redirects=True)
+    return _http_client
+
+
+async def close_scrape_client():
+    """Close the shared client (called on app shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+async def fetch_product_page(url: str, platform: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch and parse a product page without a browser.
+
+    Returns:
+        scrape_url-shaped dict, or None if the page could not be fetched or
+        has no ingredient list in its HTML (the caller falls back to Selenium)
+    """
+    _stats["attempts"] += 1
+    started = time.perf_counter()
+    try:
+        response = await get_scrape_client().get(url)
+        content_type = response.headers.get("content-type", "")
+        if response.status_code != 200 or "html" not in content_type or len(response.content) > MAX_HTML_BYTES:
+            print(f"   HTTP tier: {response.status_code} {content_type or 'no content-type'} - falling back to browser")
+            _stats["misses"] += 1
+            return None
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(None, parse_product_html, response.text, str(response.url), platform)
+    except Exception as e:
+        print(f"   HTTP tier failed ({type(e).__name__}: {e}) - falling back to browser")
+        _stats["errors"] += 1
+        return None
+    finally:
+        _stats["seconds"] += time.perf_counter() - started
+
+    if result is None:
+        print("   HTTP tier: no ingredient list in the page HTML - falling back to browser")
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    print(f"⚡ HTTP tier found ingredients via {result['source']} in {time.perf_counter() - started:.2f}s")
+    return result
+
+
+def get_http_tier_stats() -> Dict[str, Any]:
+    attempts = _stats["attempts"]
+    return {**_stats, "hit_rate": round(_stats["hits"] / attempts, 4) if attempts else 0.0}
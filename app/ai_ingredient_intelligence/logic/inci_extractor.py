@@ -0,0 +1,214 @@
+# app/ai_ingredient_intelligence/logic/inci_extractor.py
+"""
+Rule-based INCI extraction from scraped product page text.
+
+URLScraper.extract_ingredients_from_text used to send the whole scraped page
+to Claude for every URL, even when the page has a clean "Ingredients:"
+block. extract_inci_from_text() tries the deterministic route first:
+
+1. Candidate sections: the text after an "Ingredients:" / "INCI:" /
+   "Composition:" heading (same line or the lines below it, up to the next
+   section heading) and every line with 5+ commas
+2. Each candidate is split with utils/inci_parser.parse_inci_string and
+   cleaned (percentages, footnote marks, trailing sentences)
+3. Confidence = share of the parsed names found in the ingre_inci
+   vocabulary (normalized like inciName_normalized; "Water/Aqua/Eau" and
+   "Aqua (Water)" count as known if any alternative is)
+
+The best-scoring candidate is accepted when it has at least
+INCI_RULE_MIN_INGREDIENTS names and confidence >= INCI_RULE_CONFIDENCE;
+otherwise the caller falls back to the LLM.
+
+The vocabulary comes from the branded index (general_inci plus branded INCI
+names), which is already loaded at startup; without it (no MongoDB) the
+rule path is skipped.
+
+Environment:
+    INCI_RULE_ENABLED            (true)
+    INCI_RULE_CONFIDENCE         min share of known INCI names (0.8)
+    INCI_RULE_MIN_INGREDIENTS    min names in an accepted list (5)
+
+USAGE:
+    vocabulary = await get_inci_vocabulary()
+    result = extract_inci_from_text(raw_text, vocabulary)
+    if result and result["accepted"]:
+        ingredients = result["ingredients"]
+"""
+
+import os
+import re
+import unicodedata
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from app.ai_ingredient_intelligence.utils.inci_parser import parse_inci_string
+
+INCI_RULE_ENABLED = os.getenv("INCI_RULE_ENABLED", "true").lower() == "true"
+INCI_RULE_CONFIDENCE = float(os.getenv("INCI_RULE_CONFIDENCE", "0.8"))
+INCI_RULE_MIN_INGREDIENTS = int(os.getenv("INCI_RULE_MIN_INGREDIENTS", "5"))
+
+# "Ingredients:", "Full Ingredients List -", "INCI:", "Composition:" ...
+_HEADING = re.compile(
+    r"(?:^|\b)(?:full\s+|complete\s+|all\s+)?(?:ingredients?|inci|composition)(?:\s+list)?\s*(?:[:\-–]\s*|$)",
+    re.IGNORECASE
+)
+# Headings that end an ingredients section
+_STOP_HEADINGS = ("description", "benefits", "how to use", "directions", "warning", "caution",
+                  "price", "reviews", "key features", "about", "manufactured", "country of origin")
+_PERCENT = re.compile(r"\(?\s*\d+(?:[.,]\d+)?\s*%\s*\)?")
+_ALTERNATIVES = re.compile(r"\s*[/\\]\s*")
+_PARENTHESIZED = re.compile(r"\s*\(([^)]*)\)\s*")
+_MAX_SECTION_LINES = 60
+
+_vocabulary: Dict[str, Any] = {"loaded_at": None, "names": frozenset()}
+_stats = {"rule_accepted": 0, "llm_fallback": 0}
+
+
+def normalize_inci(name: str) -> str:
+    """Same normalization as ingre_inci.inciName_normalized (accents removed, lowercased, spaces collapsed)"""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", name).strip().lower()
+
+
+def _clean_name(name: str) -> str:
+    """Drop percentages, footnote marks and any sentence trailing the last name"""
+    name = re.split(r"\.\s+", name, maxsplit=1)[0]
+    name = _PERCENT.sub(" ", name)
+    name = name.strip().strip("*†‡•·\"'").strip()
+    name = name.rstrip(".;:").strip()
+    return re.sub(r"\s+", " ", name)
+
+
+def _is_stop_heading(line: str) -> bool:
+    lower = line.lower().strip()
+    return any(lower.startswith(stop) for stop in _STOP_HEADINGS)
+
+
+def _is_prose(line: str) -> bool:
+    """A sentence rather than ingredient names"""
+    return "," not in line and len(line.split()) > 8 and line.rstrip().endswith((".", "!"))
+
+
+def find_ingredient_sections(text: str) -> List[str]:
+    """Candidate ingredient lists in the page text, in page order"""
+    lines = [line.strip() for line in (text or "").splitlines()]
+    sections: List[str] = []
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        heading = _HEADING.search(line)
+        if heading:
+            rest = line[heading.end():].strip()
+            if rest:
+                sections.append(rest)
+                continue
+            below = []
+            for following in lines[i + 1:i + 1 + _MAX_SECTION_LINES]:
+                if not following:
+                    if below:
+                        break
+                    continue
+                if _is_stop_heading(following) or _HEADING.match(following) or _is_prose(following):
+                    break
+                below.append(following)
+            if below:
+                sections.append("\n".join(below))
+        elif line.count(",") >= 5:
+            sections.append(line)
+    return sections
+
+
+def _known_name(name: str, vocabulary: FrozenSet[str]) -> Optional[str]:
+    """
+    The form of a listed name that is known INCI, or None.
+
+    Synonym lists ("Water/Aqua/Eau", "Aqua (Water)") resolve to their first
+    known variant, since the matcher never splits on "/" or "(".
+    """
+    normalized = normalize_inci(name)
+    if normalized in vocabulary:
+        return name
+    variants = _ALTERNATIVES.split(_PARENTHESIZED.sub("/", name).strip("/ "))
+    variants += _PARENTHESIZED.findall(name)
+    for variant in variants:
+        variant = variant.strip()
+        if variant and normalize_inci(variant) in vocabulary:
+            return variant
+    return None
+
+
+def score_section(section: str, vocabulary: FrozenSet[str]) -> Dict[str, Any]:
+    """Parse one candidate section and measure how much of it is known INCI"""
+    ingredients = []
+    seen = set()
+    known = 0
+    for name in parse_inci_string(section):
+        name = _clean_name(name)
+        if len(name) <= 1:
+            continue
+        known_name = _known_name(name, vocabulary)
+        if known_name is not None:
+            name = known_name
+        key = normalize_inci(name)
+        if key not in seen:
+            seen.add(key)
+            ingredients.append(name)
+            known += known_name is not None
+    return {
+        "ingredients": ingredients,
+        "known": known,
+        "total": len(ingredients),
+        "confidence": round(known / len(ingredients), 3) if ingredients else 0.0,
+    }
+
+
+def extract_inci_from_text(
+    text: str,
+    vocabulary: Iterable[str],
+    min_confidence: float = INCI_RULE_CONFIDENCE,
+    min_ingredients: int = INCI_RULE_MIN_INGREDIENTS
+) -> Optional[Dict[str, Any]]:
+    """
+    Best rule-based ingredient list found in the text.
+
+    Returns:
+        None when no candidate section exists, else a dict with
+        'ingredients', 'known', 'total', 'confidence', 'section' and
+        'accepted' (confident enough to skip the LLM)
+    """
+    vocabulary = vocabulary if isinstance(vocabulary, frozenset) else frozenset(vocabulary)
+    best = None
+    for section in find_ingredient_sections(text):
+        scored = score_section(section, vocabulary)
+        if best is None or (scored["known"], scored["confidence"]) > (best["known"], best["confidence"]):
+            best = {**scored, "section": section}
+    if best is None:
+        return None
+    best["accepted"] = bool(
+        vocabulary and best["total"] >= min_ingredients and best["confidence"] >= min_confidence
+    )
+    return best
+
+
+async def get_inci_vocabulary() -> FrozenSet[str]:
+    """Normalized INCI names from ingre_inci and branded ingredients (empty if the index can't load)"""
+    try:
+        from app.ai_ingredient_intelligence.logic.branded_index import get_branded_index
+        index = await get_branded_index()
+    except Exception as e:
+        print(f"[WARNING] INCI vocabulary unavailable ({type(e).__name__}: {e})")
+        return frozenset()
+    if _vocabulary["loaded_at"] != index.loaded_at:
+        _vocabulary["names"] = frozenset(index.general_inci) | frozenset(index.by_inci)
+        _vocabulary["loaded_at"] = index.loaded_at
+    return _vocabulary["names"]
+
+
+def record_extraction(rule_accepted: bool):
+    _stats["rule_accepted" if rule_accepted else "llm_fallback"] += 1
+
+
+def get_extraction_stats() -> Dict[str, Any]:
+    total = _stats["rule_accepted"] + _stats["llm_fallback"]
+    return {**_stats, "rule_rate": round(_stats["rule_accepted"] / total, 4) if total else 0.0}
@@ -0,0 +1,144 @@
+# app/ai_ingredient_intelligence/logic/ingredient_index.py
+"""
+Ingredient parsing and matching rules for external products (/market-research).
+
+/market-research used to load every external product with
+.to_list(length=None), re-parse each raw ingredient string with
+parse_inci_string and compile a word-boundary regex per (active, product
+ingredient) pair - O(catalog x ingredients) work plus a full collection
+transfer on every request. Now:
+
+- product_ingredient_arrays() turns a raw ingredients field into aligned
+  display / normalized arrays; logic/product_normalizer.py stores them on
+  each product once, at write time
+- ProductIngredientIndex is the term vocabulary (plus a word -> terms
+  map), so an input active expands to every term it matches with the old
+  rules (exact, or whole-word containment for actives longer than 3
+  chars) without any regex over the catalog
+- match_product_actives() names the matched ingredients of one product
+
+Scoring and ranking over the whole catalog is done by
+logic/match_scoring.py, whose matrix carries the vocabulary.
+
+USAGE:
+    vocabulary = ProductIngredientIndex()
+    vocabulary.load_terms(terms)
+    expansions = vocabulary.expansions(actives)
+    matched = match_product_actives(actives, parsed, normalized, expansions)
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from app.ai_ingredient_intelligence.utils.inci_parser import parse_inci_string
+
+EXTERNAL_PRODUCTS_COLLECTION = "externalproducts"
+
+_WORD = re.compile(r"\w+")
+
+
+def parse_product_ingredients(raw: Any) -> List[str]:
+    """Ingredient names of an external product's raw `ingredients` field (string or list)"""
+    if isinstance(raw, list):
+        names = []
+        for ing in raw:
+            if isinstance(ing, dict) and "name" in ing:
+                ing = ing["name"]
+            if ing and str(ing).strip():
+                names.append(str(ing).strip())
+        return names
+    if not isinstance(raw, str) or not raw.strip():
+        return []
+
+    text = raw.strip()
+    # Keep only the actual list after "Full Ingredients List:" / "Ingredients:"
+    if "Full Ingredients List:" in text:
+        text = text.split("Full Ingredients List:")[-1].strip()
+    elif "Ingredients:" in text:
+        text = text.split("Ingredients:")[-1].strip()
+    # Escaped backslashes separate synonyms (Water\\Aqua\\Eau -> Water, Aqua, Eau)
+    text = text.replace("\\\\", "\\").replace("\\", ", ")
+    return parse_inci_string(text)
+
+
+def normalize_product_ingredient(name: str) -> str:
+    """Matching form of a product ingredient: trimmed, trailing punctuation dropped, lowercased"""
+    cleaned = str(name).strip().rstrip(".,;!?").strip()
+    return re.sub(r"\s+", " ", cleaned).lower()
+
+
+def product_ingredient_arrays(raw: Any) -> Tuple[List[str], List[str]]:
+    """Aligned (display names, normalized names) for a raw ingredients field"""
+    parsed, normalized = [], []
+    for name in parse_product_ingredients(raw):
+        key = normalize_product_ingredient(name)
+        if key:
+            parsed.append(name.strip())
+            normalized.append(key)
+    return parsed, normalized
+
+
+def term_matches(active: str, term: str) -> bool:
+    """The old market research rule: exact, or whole-word containment for actives longer than 3 chars"""
+    if active == term:
+        return True
+    return len(active) > 3 and re.search(r"\b" + re.escape(active) + r"\b", term) is not None
+
+
+def match_product_actives(
+    actives: List[str],
+    parsed: List[str],
+    normalized: List[str],
+    expansions: Dict[str, Set[str]]
+) -> Tuple[List[str], List[str]]:
+    """
+    Which input actives a product contains.
+
+    For each active the first product ingredient among its expanded terms is
+    taken; an ingredient already claimed by an earlier active is not counted
+    twice.
+
+    Returns:
+        (matched actives, matched product ingredient names in display form)
+    """
+    matched_actives, matched_names = [], []
+    for active in actives:
+        terms = expansions.get(active, ())
+        for position, key in enumerate(normalized):
+            if key in terms:
+                if parsed[position] not in matched_names:
+                    matched_names.append(parsed[position])
+                    matched_actives.append(active)
+                break
+    return matched_actives, matched_names
+
+
+class ProductIngredientIndex:
+    """Term vocabulary of the normalized product ingredients, for expanding input actives"""
+
+    def __init__(self):
+        self.terms: Set[str] = set()
+        self.by_word: Dict[str, List[str]] = {}
+
+    def load_terms(self, terms: Iterable[str]):
+        """Replace the vocabulary (and its word -> terms map)"""
+        by_word: Dict[str, List[str]] = {}
+        term_set = set()
+        for term in terms:
+            term_set.add(term)
+            for word in set(_WORD.findall(term)):
+                by_word.setdefault(word, []).append(term)
+        self.terms = term_set
+        self.by_word = by_word
+
+    def expand(self, active: str) -> Set[str]:
+        """Vocabulary terms an input active matches"""
+        words = _WORD.findall(active)
+        if not words:
+            return {active} & self.terms
+        # Every word of the active appears in a matching term: scan the rarest word's terms only
+        rarest = min((self.by_word.get(word, []) for word in words), key=len)
+        return {term for term in rarest if term_matches(active, term)}
+
+    def expansions(self, actives: Iterable[str]) -> Dict[str, Set[str]]:
+        return {active: self.expand(active) for active in actives}
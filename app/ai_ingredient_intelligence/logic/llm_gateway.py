@@ -0,0 +1,356 @@
+# app/ai_ingredient_intelligence/logic/llm_gateway.py
+"""
+Shared async gateway for all Claude calls.
+
+Handlers used to call the synchronous anthropic.Anthropic client directly
+inside `async def` code, so every 10-90s completion froze the whole uvicorn
+worker. Every module now awaits this gateway instead:
+
+- One AsyncAnthropic client per process over a pooled httpx connection pool
+- Per-model concurrency limits (asyncio semaphores), so a burst of slow
+  Opus calls cannot starve everything else
+- Retries with exponential backoff and full jitter on rate limits,
+  overload (429/529), 5xx and connection errors; honours Retry-After
+- Per-request timeouts (LLM_TIMEOUT_SECONDS by default)
+- Helpers to pull text / structured JSON out of responses
+- stream_text() for token streaming under the same limits
+
+Environment:
+    LLM_MAX_CONCURRENCY      default concurrent calls per model (8)
+    LLM_MODEL_CONCURRENCY    per-model overrides, "model:limit,model:limit"
+                             (a model matches the longest configured prefix)
+    LLM_MAX_RETRIES          retries after the first attempt (3)
+    LLM_TIMEOUT_SECONDS      per-request timeout (120)
+
+USAGE:
+    from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, extract_json
+    response = await create_message(model=model, max_tokens=4096,
+                                    messages=[{"role": "user", "content": prompt}])
+    ingredients = extract_json(response.content[0].text, expect=list)
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import anthropic
+import httpx
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# Backoff: full jitter over min(cap, base * 2^attempt)
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_CAP_SECONDS = 30.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def _parse_model_limits(spec: str) -> Dict[str, int]:
+    """Parse "claude-3-opus:2,claude-sonnet:8" into {prefix: limit}"""
+    limits = {}
+    for part in spec.split(","):
+        if ":" not in part:
+            continue
+        model, limit = part.rsplit(":", 1)
+        try:
+            limits[model.strip()] = max(1, int(limit))
+        except ValueError:
+            print(f"[WARNING] Ignoring invalid LLM_MODEL_CONCURRENCY entry: {part!r}")
+    return limits
+
+
+MODEL_CONCURRENCY = _parse_model_limits(os.getenv("LLM_MODEL_CONCURRENCY", "claude-3-opus:4"))
+
+_client: Optional[anthropic.AsyncAnthropic] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _api_key() -> Optional[str]:
+    # Read lazily: app.config loads .env after some modules are imported
+    return os.getenv("CLAUDE_API_KEY")
+
+
+def is_llm_available() -> bool:
+    """True when an API key is configured"""
+    return bool(_api_key())
+
+
+def default_model() -> str:
+    """Configured default Claude model"""
+    from app.config import CLAUDE_MODEL
+    return CLAUDE_MODEL or os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-sonnet-4-5-20250929"
+
+
+def max_tokens_for(model: str) -> int:
+    """claude-3-opus-20240229 allows at most 4096 output tokens; newer models 8192"""
+    return 4096 if "claude-3-opus-20240229" in model else 8192
+
+
+def get_llm_client() -> anthropic.AsyncAnthropic:
+    """Shared AsyncAnthropic client (retries are handled by the gateway, not the SDK)"""
+    global _client
+    if _client is None:
+        if not _api_key():
+            raise RuntimeError("CLAUDE_API_KEY environment variable is not set")
+        _client = anthropic.AsyncAnthropic(
+            api_key=_api_key(),
+            max_retries=0,
+            timeout=LLM_TIMEOUT_SECONDS,
+            http_client=httpx.AsyncClient(
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0)
+            )
+        )
+    return _client
+
+
+async def close_llm_client():
+    """Close the shared client (called on app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _concurrency_limit(model: str) -> int:
+    matches = [prefix for prefix in MODEL_CONCURRENCY if model.startswith(prefix)]
+    if matches:
+        return MODEL_CONCURRENCY[max(matches, key=len)]
+    return LLM_MAX_CONCURRENCY
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(model)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_concurrency_limit(model))
+        _semaphores[model] = semaphore
+    return semaphore
+
+
+def _record(model: str, field: str, amount: float = 1):
+    stats = _stats.setdefault(model, {"calls": 0, "retries": 0, "errors": 0, "seconds": 0.0})
+    stats[field] = stats.get(field, 0) + amount
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying, or None if the error is not retryable"""
+    if isinstance(error, anthropic.APIConnectionError):  # includes APITimeoutError
+        retry_after = None
+    elif isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES:
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+    else:
+        return None
+
+    backoff = random.uniform(0, min(LLM_BACKOFF_CAP_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if retry_after:
+        try:
+            return max(float(retry_after), backoff)
+        except ValueError:
+            pass
+    return backoff
+
+
+async def create_message(
+    *,
+    model: str,
+    timeout: Optional[float] = None,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    **params
+) -> Any:
+    """
+    Async drop-in for client.messages.create(...).
+
+    Waits for a slot in the model's concurrency limit, then retries
+    transient failures with jittered exponential backoff. `client`
+    overrides the shared client (e.g. one pointed at a test server).
+
+    Returns:
+        anthropic Message (response.content[0].text, response.usage, ...)
+    """
+    client = client or get_llm_client()
+    semaphore = _semaphore(model)
+    attempt = 0
+    while True:
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.messages.create(
+                    model=model,
+                    timeout=timeout or LLM_TIMEOUT_SECONDS,
+                    **params
+                )
+            _record(model, "calls")
+            _record(model, "seconds", time.perf_counter() - started)
+            return response
+        except Exception as e:
+            delay = _retry_delay(e, attempt) if attempt < LLM_MAX_RETRIES else None
+            if delay is None:
+                _record(model, "errors")
+                raise
+            attempt += 1
+            _record(model, "retries")
+            print(f"[WARNING] Claude call failed ({type(e).__name__}: {e}); "
+                  f"retry {attempt}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def stream_text(
+    *,
+    model: str,
+    timeout: Optional[float] = None,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    on_final: Optional[Callable[[Any], None]] = None,
+    **params
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of create_message: yields text deltas as they arrive.
+
+    Shares the model's concurrency limit. The model stream is drained into a
+    queue by a background task, so the semaphore slot is held only while
+    Claude is generating, never while a slow consumer reads. Failures are
+    retried only before the first delta was produced (a partial answer
+    cannot be replayed). on_final receives the complete Message (usage etc.)
+    once the stream ends.
+    """
+    client = client or get_llm_client()
+    queue: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_drain_stream(client, model, timeout, params, queue))
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "text":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                if on_final is not None:
+                    on_final(value)
+                return
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+
+async def _drain_stream(
+    client: anthropic.AsyncAnthropic,
+    model: str,
+    timeout: Optional[float],
+    params: Dict[str, Any],
+    queue: asyncio.Queue
+):
+    """Run one stream_text call under the model semaphore, pushing ("text"|"final"|"error", value)"""
+    semaphore = _semaphore(model)
+    attempt = 0
+    while True:
+        produced = False
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                async with client.messages.stream(
+                    model=model,
+                    timeout=timeout or LLM_TIMEOUT_SECONDS,
+                    **params
+                ) as stream:
+                    async for text in stream.text_stream:
+                        produced = True
+                        queue.put_nowait(("text", text))
+                    final = await stream.get_final_message()
+            _record(model, "calls")
+            _record(model, "seconds", time.perf_counter() - started)
+            queue.put_nowait(("final", final))
+            return
+        except Exception as e:
+            delay = _retry_delay(e, attempt) if attempt < LLM_MAX_RETRIES and not produced else None
+            if delay is None:
+                _record(model, "errors")
+                queue.put_nowait(("error", e))
+                return
+            attempt += 1
+            _record(model, "retries")
+            print(f"[WARNING] Claude stream failed ({type(e).__name__}: {e}); "
+                  f"retry {attempt}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def complete(
+    prompt: str,
+    *,
+    model: Optional[str] = None,
+    system: Optional[Any] = None,
+    max_tokens: Optional[int] = None,
+    temperature: float = 0.1,
+    timeout: Optional[float] = None,
+    **params
+) -> str:
+    """Single-turn completion returning the response text"""
+    model = model or default_model()
+    if system is not None:
+        params["system"] = system
+    response = await create_message(
+        model=model,
+        max_tokens=max_tokens or max_tokens_for(model),
+        temperature=temperature,
+        messages=[{"role": "user", "content": prompt}],
+        timeout=timeout,
+        **params
+    )
+    return extract_text(response)
+
+
+def extract_text(response: Any) -> str:
+    """Concatenated text blocks of a response (tool-use blocks are skipped)"""
+    parts = [getattr(block, "text", "") for block in getattr(response, "content", None) or []]
+    return "".join(part for part in parts if part).strip()
+
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """
+    Parse the JSON payload of a model response.
+
+    Accepts bare JSON, ```json fenced blocks, or JSON surrounded by prose
+    (outermost [...] or {...}). With expect=list/dict only that shape is
+    accepted.
+
+    Raises:
+        ValueError: if no JSON of the expected shape can be parsed
+    """
+    if not text:
+        raise ValueError("Empty response")
+
+    candidates: List[str] = [text.strip()]
+    candidates.extend(match.strip() for match in _CODE_FENCE.findall(text))
+    brackets: List[Tuple[str, str]] = []
+    if expect in (None, list):
+        brackets.append(("[", "]"))
+    if expect in (None, dict):
+        brackets.append(("{", "}"))
+    for open_char, close_char in brackets:
+        start, end = text.find(open_char), text.rfind(close_char)
+        if start != -1 and end > start:
+            candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except (ValueError, TypeError):
+            continue
+        if expect is None or isinstance(value, expect):
+            return value
+    raise ValueError(f"No JSON {expect.__name__ if expect else 'value'} found in response")
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """Per-model call/retry/error counters and concurrency limits"""
+    return {
+        model: {**stats, "concurrency_limit": _concurrency_limit(model)}
+        for model, stats in _stats.items()
+    }
@@ -0,0 +1,193 @@
+# app/ai_ingredient_intelligence/logic/llm_response_cache.py
+"""
+Content-addressed cache for deterministic Claude responses (opt-in).
+
+Formulation reports, Presenton prompts and Make a Wish stages run at low
+temperature on inputs that repeat heavily (popular products are decoded by
+many users). With LLM_RESPONSE_CACHE_ENABLED=true, the response text is
+cached under a SHA256 of everything that determines it - model, system
+prompt, messages and sampling parameters - so a repeat request returns in
+milliseconds without an API call.
+
+- Tiers:      in-process LRU + Mongo `llm_response_cache` (TTL index), via
+              TwoTierCache; the Mongo tier is trimmed to
+              LLM_RESPONSE_CACHE_MAX_ENTRIES (oldest entries first)
+- Scope:      only calls with temperature <= LLM_RESPONSE_CACHE_MAX_TEMPERATURE
+- Validation: callers pass `validate` so malformed responses (e.g. JSON that
+              does not parse) are never cached and retries reach the API
+- Coalescing: identical concurrent requests share one in-flight call
+- Reporting:  track_llm_cache() opens a per-request scope; its cache_hit is
+              True when every LLM call of the request was served from cache
+
+Environment:
+    LLM_RESPONSE_CACHE_ENABLED          "true" to enable (default off)
+    LLM_RESPONSE_CACHE_TTL              seconds (30 days)
+    LLM_RESPONSE_CACHE_MAX_ENTRIES      Mongo entry cap (50000)
+    LLM_RESPONSE_CACHE_MEMORY_SIZE      in-process entries (500)
+    LLM_RESPONSE_CACHE_MAX_TEMPERATURE  highest cacheable temperature (0.3)
+
+USAGE:
+    scope = track_llm_cache()
+    params = dict(model=model, max_tokens=4096, temperature=0.1,
+                  system=SYSTEM_PROMPT, messages=[{"role": "user", "content": prompt}])
+    text, hit = await cached_response_text(params, lambda: create_message(**params))
+    response["cache_hit"] = scope.cache_hit
+"""
+
+import os
+import json
+import hashlib
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache, Coalescer
+
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", str(30 * 86400)))
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "50000"))
+LLM_RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_RESPONSE_CACHE_MAX_TEMPERATURE", "0.3"))
+# Bump to invalidate every cached response (e.g. after changing response post-processing)
+LLM_RESPONSE_CACHE_VERSION = "v1"
+
+_response_cache = TwoTierCache(
+    "llm_response_cache",
+    namespace="responses",
+    ttl_seconds=LLM_RESPONSE_CACHE_TTL,
+    maxsize=int(os.getenv("LLM_RESPONSE_CACHE_MEMORY_SIZE", "500")),
+    max_entries=LLM_RESPONSE_CACHE_MAX_ENTRIES
+)
+_coalescer = Coalescer()
+
+
+class LLMCacheScope:
+    """Cache hits/misses of the LLM calls made while handling one request"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_hit(self) -> Optional[bool]:
+        """True if every call was a cache hit, False if any was not, None if no cacheable call was made"""
+        if not self.hits and not self.misses:
+            return None
+        return self.misses == 0
+
+
+_current_scope: ContextVar[Optional[LLMCacheScope]] = ContextVar("llm_cache_scope", default=None)
+
+
+def track_llm_cache() -> LLMCacheScope:
+    """
+    Start recording cache hits for the current request.
+    Tasks spawned afterwards (asyncio.gather etc.) report into the same scope.
+    """
+    scope = LLMCacheScope()
+    _current_scope.set(scope)
+    return scope
+
+
+def _system_text(system: Any) -> str:
+    """System prompt text, whether passed as a string or as (cache_control) blocks"""
+    if isinstance(system, list):
+        return "".join(block.get("text", "") for block in system if isinstance(block, dict))
+    return system or ""
+
+
+def response_cache_key(params: Dict[str, Any]) -> str:
+    """SHA256 over model, system prompt, messages and all other parameters"""
+    normalized = {key: value for key, value in params.items() if key not in ("system", "timeout")}
+    normalized["system"] = _system_text(params.get("system"))
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{LLM_RESPONSE_CACHE_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+
+def is_cacheable(params: Dict[str, Any]) -> bool:
+    return LLM_RESPONSE_CACHE_ENABLED and float(params.get("temperature", 1.0)) <= LLM_RESPONSE_CACHE_MAX_TEMPERATURE
+
+
+def _response_text(response: Any) -> str:
+    parts = [getattr(block, "text", "") for block in getattr(response, "content", None) or []]
+    return "".join(part for part in parts if part).strip()
+
+
+async def cached_response_text(
+    params: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+    validate: Optional[Callable[[str], bool]] = None
+) -> Tuple[str, bool]:
+    """
+    Response text for a messages.create call, from cache when possible.
+
+    Args:
+        params: The messages.create parameters (used only to build the key)
+        call: Makes the actual API call and returns the anthropic Message
+        validate: Optional check; text failing it is returned but not cached
+
+    Returns:
+        (response text, cache_hit)
+    """
+    if not is_cacheable(params):
+        return _response_text(await call()), False
+
+    text = await lookup_response_text(params)
+    if text is not None:
+        return text, True
+
+    async def compute() -> str:
+        text = _response_text(await call())
+        if validate is None or validate(text):
+            await store_response_text(params, text)
+        return text
+
+    return await _coalescer.run(response_cache_key(params), compute), False
+
+
+async def lookup_response_text(params: Dict[str, Any]) -> Optional[str]:
+    """
+    Cached response text for params, or None.
+    Counts as a hit or miss in the current request scope (for cacheable params).
+    """
+    if not is_cacheable(params):
+        return None
+    hit, text = await _response_cache.get(response_cache_key(params))
+    scope = _current_scope.get()
+    if hit and text:
+        if scope is not None:
+            scope.hits += 1
+        print(f"✅ LLM response cache HIT ({params.get('model')}, {len(text)} chars)")
+        return text
+    if scope is not None:
+        scope.misses += 1
+    return None
+
+
+async def store_response_text(params: Dict[str, Any], text: str):
+    """Cache a (complete, validated) response text for params"""
+    if text and is_cacheable(params):
+        await _response_cache.set(response_cache_key(params), text)
+
+
+async def clear_llm_response_cache():
+    """Drop the in-process tier and every Mongo entry"""
+    _response_cache.clear_memory()
+    try:
+        from app.ai_ingredient_intelligence.db.mongodb import db
+        await db["llm_response_cache"].delete_many({"namespace": _response_cache.namespace})
+    except Exception as e:
+        print(f"[WARNING] Could not clear LLM response cache: {e}")
+
+
+def get_llm_response_cache_stats() -> Dict[str, Any]:
+    return {
+        "enabled": LLM_RESPONSE_CACHE_ENABLED,
+        "max_temperature": LLM_RESPONSE_CACHE_MAX_TEMPERATURE,
+        **_response_cache.get_stats(),
+    }
+
+
+def llm_cache_headers(scope: LLMCacheScope) -> Dict[str, str]:
+    """X-LLM-Cache: HIT/MISS header for non-JSON responses (empty if no cacheable call was made)"""
+    if scope.cache_hit is None:
+        return {}
+    return {"X-LLM-Cache": "HIT" if scope.cache_hit else "MISS"}
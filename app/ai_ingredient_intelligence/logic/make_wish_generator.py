@@ -29,6 +29,7 @@ from app.ai_ingredient_intelligence.logic.make_wish_prompts import (
 
 # Import cache manager
 from app.ai_ingredient_intelligence.logic.prompt_cache_manager import get_cache_manager
+from app.ai_ingredient_intelligence.logic.llm_response_cache import cached_response_text, track_llm_cache
 
 # Import rules engine
 from app.ai_ingredient_intelligence.logic.make_wish_rules_engine import (
@@ -38,6 +39,7 @@ from app.ai_ingredient_intelligence.logic.make_wish_rules_engine import (
 
 # Import URL scraper for ingredient lookup
 from app.ai_ingredient_intelligence.logic.url_scraper import URLScraper
+from app.ai_ingredient_intelligence.logic.llm_gateway import get_llm_client
 
 # Claude API setup
 try:
@@ -58,7 +60,8 @@ if not claude_api_key:
 
 if ANTHROPIC_AVAILABLE and claude_api_key:
     try:
-        claude_client = anthropic.Anthropic(api_key=claude_api_key)
+        # Shared AsyncAnthropic client from the LLM gateway (pooled, non-blocking)
+        claude_client = get_llm_client()
         print(f"🤖 Make a Wish: Claude client initialized with model: {claude_model}")
     except Exception as e:
         print(f"Warning: Could not initialize Claude client: {e}")
@@ -552,6 +555,25 @@ Return the complete compliance analysis as JSON following the specified format.
 # AI CALL FUNCTION
 # ============================================================================
 
+def _parse_json_content(content: str) -> Optional[Any]:
+    """Parse the JSON in a Claude response (markdown fences or surrounding text allowed)"""
+    # Remove markdown code blocks if present
+    content = re.sub(r'```json\s*', '', content)
+    content = re.sub(r'```\s*', '', content)
+    content = content.strip()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # Try to extract JSON from text
+        json_match = re.search(r'\{.*\}', content, re.DOTALL)
+        if json_match:
+            try:
+                return json.loads(json_match.group())
+            except json.JSONDecodeError:
+                pass
+    return None
+
+
 async def call_ai_with_claude(
     system_prompt: str,
     user_prompt: str,
@@ -576,13 +598,8 @@ async def call_ai_with_claude(
         raise RuntimeError("Claude client not initialized. Check CLAUDE_API_KEY environment variable.")
     
     
-    # Get cache manager and check if we should use caching
+    # System prompt is sent as a cache_control block; usage feeds get_cache_stats()
     cache_manager = get_cache_manager(claude_client)
-    cache_block_id = await cache_manager.get_or_create_cache(
-        prompt_type=prompt_type,
-        system_prompt=system_prompt,
-        claude_client=claude_client
-    )
     
     # Prepare API call parameters
     # HARDCODED to Opus (same as Formulation Report)
@@ -590,7 +607,6 @@ async def call_ai_with_claude(
         "model": "claude-3-opus-20240229",  # Hardcoded to Opus
         "max_tokens": 4096,  # Maximum allowed for claude-3-opus-20240229
         "temperature": 0.3,
-        "system": system_prompt,
         "messages": [
             {"role": "user", "content": user_prompt}
         ]
@@ -599,29 +615,22 @@ async def call_ai_with_claude(
     # Debug: Log the model being used
     print(f"🔍 Make a Wish API call - Using model: {api_params['model']} for {prompt_type}")
     
-    # Note: cache_control is not supported in current Anthropic SDK version
-    # The cache_block_id is tracked for future use when SDK supports it
-    if cache_block_id:
-        print(f"💾 Cache tracking enabled for {prompt_type} (cache_control not yet supported in SDK)")
-    else:
-        print(f"📝 No cache tracking for {prompt_type}")
-    
     for attempt in range(max_retries):
         try:
-            # Call Claude API with caching support
-            response = claude_client.messages.create(**api_params)
+            # Call Claude API with the system prompt cached; identical requests
+            # are answered from the response cache (only parseable JSON is cached)
+            content, cache_hit = await cached_response_text(
+                {**api_params, "system": system_prompt},
+                lambda: cache_manager.create_message(
+                    prompt_type=prompt_type,
+                    system_prompt=system_prompt,
+                    **api_params
+                ),
+                validate=lambda text: _parse_json_content(text) is not None
+            )
             
             # Verify response (if available)
-            print(f"✅ API call succeeded for {prompt_type}")
-            
-            if not response.content or len(response.content) == 0:
-                if attempt < max_retries - 1:
-                    import asyncio
-                    await asyncio.sleep(1)
-                    continue
-                raise ValueError("Empty response from Claude API")
-            
-            content = response.content[0].text.strip()
+            print(f"✅ API call succeeded for {prompt_type}{' (cached response)' if cache_hit else ''}")
             
             if not content:
                 if attempt < max_retries - 1:
@@ -630,31 +639,16 @@ async def call_ai_with_claude(
                     continue
                 raise ValueError("Empty text in Claude response")
             
-            # Try to parse JSON
-            try:
-                # Remove markdown code blocks if present
-                content = re.sub(r'```json\s*', '', content)
-                content = re.sub(r'```\s*', '', content)
-                content = content.strip()
-                
-                result = json.loads(content)
+            result = _parse_json_content(content)
+            if result is not None:
                 return result
-            except json.JSONDecodeError:
-                # Try to extract JSON from text
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    try:
-                        result = json.loads(json_match.group())
-                        return result
-                    except json.JSONDecodeError:
-                        pass
-                
-                if attempt < max_retries - 1:
-                    import asyncio
-                    await asyncio.sleep(1)
-                    continue
-                else:
-                    raise ValueError(f"Failed to parse JSON from Claude response. Content: {content[:500]}")
+            
+            if attempt < max_retries - 1:
+                import asyncio
+                await asyncio.sleep(1)
+                continue
+            else:
+                raise ValueError(f"Failed to parse JSON from Claude response. Content: {content[:500]}")
         
         except Exception as e:
             if attempt < max_retries - 1:
@@ -949,6 +943,7 @@ async def generate_formula_from_wish(wish_data: dict) -> dict:
     """
     
     print("🚀 Starting Make a Wish pipeline...")
+    cache_scope = track_llm_cache()
     
     # Validate and apply rules engine (ONCE - removed duplicate)
     rules_engine = get_rules_engine()
@@ -1075,7 +1070,8 @@ async def generate_formula_from_wish(wish_data: dict) -> dict:
             "generated_at": datetime.now().isoformat(),
             "formula_version": "1.0",
             "ai_model": "claude-3-opus-20240229",  # Hardcoded to Opus
-            "cache_stats": get_cache_manager().get_cache_stats()
+            "cache_stats": get_cache_manager().get_cache_stats(),
+            "cache_hit": cache_scope.cache_hit
         }
     }
     
@@ -0,0 +1,281 @@
+# app/ai_ingredient_intelligence/logic/market_research_pages.py
+"""
+Pages of market research matches, materialized on demand.
+
+/market-research used to load, format and category-check every product
+it returned before answering - including one inci_col.find per matched
+product to name its active ingredients. Now the ranking
+(logic/match_scoring.py) is the only whole-catalog step and product
+documents are loaded one page at a time (/market-research itself is one
+page of MARKET_RESEARCH_TOP_K; /market-research/page and
+/market-research-stream walk the ranking with cursors):
+
+- materialize_page(): one find for the page's product ids and one batched
+  inci_col.find for the categories of all their matched ingredients
+- build_product_data(): the MarketResearchProduct dict of one product
+  (images, matched actives, cleaned description)
+- save_query() / load_query(): the resolved search (extracted ingredients,
+  input actives, AI analysis) is kept in TwoTierCache("market_research_queries")
+  so later pages do not scrape the URL or call the LLM again
+- encode_cursor() / decode_cursor(): opaque cursor = query id + offset +
+  build time of the matrix that ranked it. The ranking is a total order,
+  so a cursor always resumes right after the previous page; a cursor from
+  an older matrix build still works but the page is marked catalog_changed
+
+Environment:
+    MARKET_RESEARCH_PAGE_SIZE           default page size (20)
+    MARKET_RESEARCH_MAX_PAGE_SIZE       largest page a client may ask for (100)
+    MARKET_RESEARCH_QUERY_TTL_SECONDS   how long cursors stay valid (1 hour)
+    MARKET_RESEARCH_STREAM_MAX_PAGES    pages one /market-research-stream call may send (5)
+
+USAGE:
+    query_id = await save_query(state)
+    products = await materialize_page(scores, state["input_actives"], expansions)
+    next_cursor = encode_cursor(query_id, offset + len(scores), matrix.built_at)
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+from app.ai_ingredient_intelligence.logic.ingredient_index import (
+    EXTERNAL_PRODUCTS_COLLECTION,
+    match_product_actives,
+)
+
+MARKET_RESEARCH_PAGE_SIZE = int(os.getenv("MARKET_RESEARCH_PAGE_SIZE", "20"))
+MARKET_RESEARCH_MAX_PAGE_SIZE = int(os.getenv("MARKET_RESEARCH_MAX_PAGE_SIZE", "100"))
+MARKET_RESEARCH_QUERY_TTL = int(os.getenv("MARKET_RESEARCH_QUERY_TTL_SECONDS", "3600"))
+MARKET_RESEARCH_STREAM_MAX_PAGES = int(os.getenv("MARKET_RESEARCH_STREAM_MAX_PAGES", "5"))
+
+_query_cache = TwoTierCache(
+    "market_research_queries",
+    namespace="query",
+    ttl_seconds=MARKET_RESEARCH_QUERY_TTL,
+    maxsize=1000
+)
+
+# Product fields never shown in results (also stripped from descriptions)
+EXCLUDED_FIELDS = {
+    "countryOfOrigin", "manufacturer", "expiryDate", "expiry",
+    "address", "Address", "Expiry Date", "Country of Origin",
+    "Manufacturer", "Address:", "Expiry Date:", "Country of Origin:"
+}
+DESCRIPTION_NOISE = [
+    r"Expiry Date:\s*[^\n]*",
+    r"Country of Origin:\s*[^\n]*",
+    r"Manufacturer:\s*[^\n]*",
+    r"Address:\s*[^\n]*",
+    r"&nbsp;",
+]
+
+
+def clamp_page_size(page_size: Any) -> int:
+    """Requested page size limited to 1..MARKET_RESEARCH_MAX_PAGE_SIZE"""
+    try:
+        size = int(page_size)
+    except (TypeError, ValueError):
+        return MARKET_RESEARCH_PAGE_SIZE
+    return max(1, min(size, MARKET_RESEARCH_MAX_PAGE_SIZE))
+
+
+def encode_cursor(query_id: str, offset: int, built_at: float) -> str:
+    payload = json.dumps({"q": query_id, "o": offset, "b": built_at}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, float]:
+    """(query id, offset, matrix build time); ValueError for anything that is not our cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        query_id, offset, built_at = str(payload["q"]), int(payload["o"]), float(payload["b"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0 or not query_id:
+        raise ValueError("Invalid cursor")
+    return query_id, offset, built_at
+
+
+def query_key(input_actives: List[str], normalized_input: List[str]) -> str:
+    """Same actives and input list -> same query id (and the same cursors)"""
+    payload = json.dumps([input_actives, normalized_input], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+async def save_query(state: Dict[str, Any]) -> str:
+    """Remember a resolved search; returns its query id"""
+    query_id = query_key(state["input_actives"], state["normalized_input_ingredients"])
+    await _query_cache.set(query_id, state)
+    return query_id
+
+
+async def load_query(query_id: str) -> Optional[Dict[str, Any]]:
+    hit, state = await _query_cache.get(query_id)
+    return state if hit else None
+
+
+def product_images(product: Dict[str, Any]) -> Tuple[Optional[str], List[str]]:
+    """(main image, all images) - S3 copies first, then the scraped image/images"""
+    image = None
+    images = []
+    if product.get("s3Image"):
+        image = product["s3Image"]
+        if isinstance(image, str):
+            images = [image]
+    if isinstance(product.get("s3Images"), list) and product["s3Images"]:
+        images = product["s3Images"]
+        if not image:
+            image = images[0]
+    if not image and product.get("image"):
+        image = product["image"]
+        if isinstance(image, str) and image not in images:
+            images.insert(0, image)
+    if isinstance(product.get("images"), list):
+        for img in product["images"]:
+            if img and img not in images:
+                images.append(img)
+        if not image and images:
+            image = images[0]
+    return image, images
+
+
+def clean_description(description: Optional[str]) -> Optional[str]:
+    if not description:
+        return description
+    for pattern in DESCRIPTION_NOISE:
+        description = re.sub(pattern, "", description, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", description).strip() or None
+
+
+def build_product_data(
+    product: Dict[str, Any],
+    input_actives: List[str],
+    expansions: Dict[str, Set[str]],
+    score: Dict[str, Any],
+    inci_actives: Optional[Dict[str, str]]
+) -> Optional[Dict[str, Any]]:
+    """
+    MarketResearchProduct dict for one external product, None if it matches no active.
+
+    Args:
+        score: the product's IngredientMatrix.rank entry
+        inci_actives: normalized INCI name -> display name of every Active among
+            the page's matched ingredients (None when the lookup failed: all
+            matched ingredients are then reported as active)
+    """
+    # Arrays written once by logic/product_normalizer.py - raw text is never parsed here
+    product_ingredients = product.get("ingredients_parsed") or []
+    normalized_product_ingredients = product.get("ingredients_normalized") or []
+    matched_actives, matched_ingredients = match_product_actives(
+        input_actives, product_ingredients, normalized_product_ingredients, expansions
+    )
+    if not matched_actives:
+        return None
+
+    if inci_actives is None:
+        active_ingredients = list(matched_ingredients)
+    else:
+        active_ingredients = []
+        for name in matched_ingredients:
+            active_name = inci_actives.get(name.strip().lower())
+            if active_name and active_name not in active_ingredients:
+                active_ingredients.append(active_name)
+
+    image, images = product_images(product)
+    active_match_count = len(matched_actives)
+    active_match_percentage = round(active_match_count / len(input_actives) * 100, 2)
+    product_data = {
+        "id": str(product.get("_id", "")),
+        "productName": product.get("name") or product.get("productName") or product.get("product_name"),
+        "brand": product.get("brand") or product.get("brandName") or product.get("brand_name"),
+        "ingredients": product_ingredients,
+        "image": image,
+        "images": images,
+        "price": product.get("price"),
+        "salePrice": product.get("salePrice") or product.get("sale_price"),
+        "description": clean_description(product.get("description")),
+        "matched_ingredients": matched_ingredients,
+        "match_count": active_match_count,
+        "total_ingredients": len(product_ingredients),
+        "match_percentage": active_match_percentage,
+        "match_score": active_match_percentage,
+        "active_match_count": active_match_count,
+        "active_ingredients": active_ingredients,
+        "ingredient_overlap": score["ingredient_overlap"],
+        "weighted_jaccard": score["weighted_jaccard"],
+    }
+    if product_data["description"] is None:
+        product_data.pop("description")
+    for key in ["category", "subcategory", "url"]:
+        if key in product and key not in EXCLUDED_FIELDS:
+            product_data[key] = product[key]
+    return product_data
+
+
+async def load_active_names_for(names: List[str], inci_collection=None) -> Optional[Dict[str, str]]:
+    """normalized name -> INCI name of the Active ones among names (one query); None on failure"""
+    if inci_collection is None:
+        from app.ai_ingredient_intelligence.db.collections import inci_col
+        inci_collection = inci_col
+    if not names:
+        return {}
+    try:
+        actives = {}
+        cursor = inci_collection.find(
+            {"inciName_normalized": {"$in": names}, "category": "Active"},
+            {"inciName": 1, "inciName_normalized": 1}
+        )
+        async for doc in cursor:
+            normalized = (doc.get("inciName_normalized") or "").strip().lower()
+            if normalized:
+                actives[normalized] = doc.get("inciName") or normalized
+        return actives
+    except Exception as e:
+        print(f"  [WARNING] Error checking active ingredients: {e}")
+        return None
+
+
+async def materialize_page(
+    scores: List[Dict[str, Any]],
+    input_actives: List[str],
+    expansions: Dict[str, Set[str]],
+    products_col=None,
+    inci_collection=None
+) -> List[Dict[str, Any]]:
+    """Product dicts for one page of rank() scores, in score order (two queries per page)"""
+    if not scores:
+        return []
+    if products_col is None:
+        from app.ai_ingredient_intelligence.db.mongodb import db
+        products_col = db[EXTERNAL_PRODUCTS_COLLECTION]
+
+    by_id = {score["product_id"]: score for score in scores}
+    products = {}
+    async for product in products_col.find({"_id": {"$in": list(by_id)}}, {"ingredients": 0}):
+        products[product["_id"]] = product
+
+    matched_names = []
+    for product in products.values():
+        _, names = match_product_actives(
+            input_actives,
+            product.get("ingredients_parsed") or [],
+            product.get("ingredients_normalized") or [],
+            expansions
+        )
+        matched_names.extend(name.strip().lower() for name in names)
+    inci_actives = await load_active_names_for(list(dict.fromkeys(matched_names)), inci_collection)
+
+    page = []
+    for score in scores:
+        product = products.get(score["product_id"])
+        if product is None:
+            continue  # deleted since the matrix was built
+        product_data = build_product_data(product, input_actives, expansions, score, inci_actives)
+        if product_data:
+            page.append(product_data)
+    return page
@@ -0,0 +1,237 @@
+# app/ai_ingredient_intelligence/logic/match_scoring.py
+"""
+Vectorized match scoring for /market-research.
+
+Market research used to score candidates one product at a time in Python
+(active_match_percentage and friends) and hand every match to
+enhance_product_ranking_with_ai. IngredientMatrix encodes the catalog once
+as a sparse product x INCI matrix (rows from the stored
+ingredients_normalized arrays, see logic/product_normalizer.py) and scores
+every product in a few sparse matrix products:
+
+- active coverage:   X @ A.T, where A is the active x term indicator of the
+                     expanded input actives (ProductIngredientIndex rules)
+- ingredient overlap: X @ q, q = indicator of the input INCI list
+- weighted Jaccard:  idf-weighted |P n Q| / |P u Q|, using precomputed
+                     per-product idf sums
+
+Products covering at least one active are the matches. They are ordered by
+(actives covered, weighted Jaccard) and only the top k are returned, so
+only those documents are loaded and sent to the LLM re-rank.
+
+The matrix is rebuilt when the catalog changes: a version stamp (document
+count + newest ingredients_normalized_at) is checked at most every
+MATCH_MATRIX_REFRESH_SECONDS.
+
+Environment:
+    MATCH_MATRIX_REFRESH_SECONDS   (300)
+    MARKET_RESEARCH_TOP_K          matches scored in full / sent to the LLM re-rank (20)
+
+USAGE:
+    matrix = await get_ingredient_matrix()
+    expansions = matrix.vocabulary.expansions(actives)
+    top, total = matrix.rank(expansions, input_ingredients, top_k=MARKET_RESEARCH_TOP_K)
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.ai_ingredient_intelligence.logic.ingredient_index import (
+    EXTERNAL_PRODUCTS_COLLECTION,
+    ProductIngredientIndex,
+)
+
+MATCH_MATRIX_REFRESH_SECONDS = int(os.getenv("MATCH_MATRIX_REFRESH_SECONDS", "300"))
+MARKET_RESEARCH_TOP_K = int(os.getenv("MARKET_RESEARCH_TOP_K", "20"))
+
+
+class IngredientMatrix:
+    """Binary product x term matrix with idf weights and a term vocabulary for active expansion"""
+
+    def __init__(self, product_ids: Sequence[Any], ingredient_lists: Iterable[Sequence[str]]):
+        term_index: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        for ingredients in ingredient_lists:
+            columns = {term_index.setdefault(term, len(term_index)) for term in ingredients if term}
+            indices.extend(columns)
+            indptr.append(len(indices))
+
+        self.product_ids = list(product_ids)
+        # Identifies this build (pagination cursors remember which ranking they came from)
+        self.built_at = time.time()
+        self.term_index = term_index
+        self.terms = list(term_index)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(self.product_ids), len(self.terms))
+        )
+        document_frequency = np.asarray(self.matrix.sum(axis=0)).ravel()
+        self.idf = np.log1p(len(self.product_ids) / np.maximum(document_frequency, 1)).astype(np.float32)
+        # Sum of idf over each product's ingredients (the |P| of the weighted Jaccard)
+        self.row_weight = self.matrix @ self.idf
+
+        self.vocabulary = ProductIngredientIndex()
+        self.vocabulary.load_terms(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def _indicator(self, term_sets: List[Set[str]]):
+        rows, columns = [], []
+        for row, terms in enumerate(term_sets):
+            for term in terms:
+                column = self.term_index.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+            shape=(len(term_sets), len(self.terms))
+        )
+
+    def rank(
+        self,
+        expansions: Dict[str, Set[str]],
+        input_ingredients: Iterable[str],
+        top_k: int = MARKET_RESEARCH_TOP_K,
+        offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Score every product against the input and keep the best top_k.
+
+        The order is total (ties fall back to catalog position), so
+        rank(..., top_k=n, offset=k) is always the slice [k:k + n] of the same
+        ranking - pages fetched one by one never overlap or skip.
+
+        Args:
+            expansions: input active -> matching vocabulary terms
+            input_ingredients: normalized input INCI list (for overlap / Jaccard)
+            top_k: page size (0 = every match)
+            offset: matches to skip
+
+        Returns:
+            (score dicts best first, number of products matching at least one active)
+        """
+        actives = list(expansions)
+        if not actives or not len(self):
+            return [], 0
+        active_terms = self._indicator([expansions[active] for active in actives])
+        if not active_terms.nnz:
+            return [], 0
+
+        # products x actives: > 0 where the product has a term the active expands to
+        coverage = np.asarray(((self.matrix @ active_terms.T) > 0).sum(axis=1)).ravel()
+        matched = np.flatnonzero(coverage)
+        if not matched.size or offset >= matched.size:
+            return [], int(matched.size)
+
+        query = np.asarray(self._indicator([set(input_ingredients)]).todense()).ravel()
+        weighted_query = query * self.idf
+        candidates = self.matrix[matched]
+        overlap = candidates @ query
+        intersection = candidates @ weighted_query
+        union = self.row_weight[matched] + weighted_query.sum() - intersection
+        jaccard = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        covered = coverage[matched]
+
+        needed = offset + top_k if top_k else 0
+        pool = np.arange(matched.size)
+        if needed and matched.size > needed:
+            # Only the best `needed` need sorting: keep everything scoring at least the
+            # needed-th key (ties included, so the cut does not depend on partition order)
+            key = covered + jaccard * 0.999
+            threshold = np.partition(-key, needed - 1)[needed - 1]
+            pool = np.flatnonzero(-key <= threshold)
+        order = pool[np.lexsort((pool, -jaccard[pool], -covered[pool]))]
+        order = order[offset:needed] if needed else order[offset:]
+
+        top = []
+        for position in order:
+            top.append({
+                "product_id": self.product_ids[matched[position]],
+                "active_match_count": int(covered[position]),
+                "active_coverage": round(float(covered[position]) / len(actives) * 100, 2),
+                "ingredient_overlap": int(overlap[position]),
+                "weighted_jaccard": round(float(jaccard[position]), 4),
+            })
+        return top, int(matched.size)
+
+
+class IngredientMatrixStore:
+    """Loads the catalog matrix on first use and rebuilds it when externalproducts changes"""
+
+    def __init__(self, collection=None):
+        self._collection = collection
+        self.matrix: Optional[IngredientMatrix] = None
+        self.version: Optional[Tuple] = None
+        self.last_checked: float = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from app.ai_ingredient_intelligence.db.mongodb import db
+            self._collection = db[EXTERNAL_PRODUCTS_COLLECTION]
+        return self._collection
+
+    async def _compute_version(self) -> Tuple:
+        """Cheap version stamp: estimated count + newest normalization time"""
+        count = await self.collection.estimated_document_count()
+        newest = await self.collection.find_one(
+            {"ingredients_normalized_at": {"$exists": True}},
+            {"ingredients_normalized_at": 1},
+            sort=[("ingredients_normalized_at", -1)]
+        )
+        return count, newest.get("ingredients_normalized_at") if newest else None
+
+    async def rebuild(self, version: Optional[Tuple] = None):
+        start = time.time()
+        version = version or await self._compute_version()
+        product_ids, ingredient_lists = [], []
+        cursor = self.collection.find(
+            {"ingredients_normalized.0": {"$exists": True}},
+            {"ingredients_normalized": 1}
+        )
+        async for product in cursor:
+            product_ids.append(product["_id"])
+            ingredient_lists.append(product["ingredients_normalized"])
+        self.matrix = IngredientMatrix(product_ids, ingredient_lists)
+        self.version = version
+        self.last_checked = time.time()
+        print(f"[OK] Ingredient matrix built: {len(product_ids)} products x {len(self.matrix.terms)} INCI, "
+              f"{self.matrix.matrix.nnz} entries in {time.time() - start:.2f}s")
+
+    async def ensure_fresh(self) -> IngredientMatrix:
+        if self.matrix is not None and time.time() - self.last_checked < MATCH_MATRIX_REFRESH_SECONDS:
+            return self.matrix
+        async with self._lock:
+            if self.matrix is None:
+                await self.rebuild()
+            elif time.time() - self.last_checked >= MATCH_MATRIX_REFRESH_SECONDS:
+                version = await self._compute_version()
+                self.last_checked = time.time()
+                if version != self.version:
+                    print("[INFO] External products changed, rebuilding ingredient matrix...")
+                    await self.rebuild(version)
+        return self.matrix
+
+    def invalidate(self):
+        """Force a version check on next use (call after bulk writes to externalproducts)"""
+        self.last_checked = 0.0
+
+
+_matrix_store: Optional[IngredientMatrixStore] = None
+
+
+async def get_ingredient_matrix() -> IngredientMatrix:
+    """Shared catalog matrix, built or refreshed if needed"""
+    global _matrix_store
+    if _matrix_store is None:
+        _matrix_store = IngredientMatrixStore()
+    return await _matrix_store.ensure_fresh()
@@ -1,16 +1,22 @@
 # app/logic/matcher.py
 import re
-from typing import List, Tuple, Dict, Set, Optional
+import inspect
+from typing import Awaitable, List, Tuple, Dict, Set, Optional, Union
 from bson import ObjectId  # type: ignore
 
 from app.ai_ingredient_intelligence.db.mongodb import db
+from app.ai_ingredient_intelligence.logic.branded_index import (
+    get_branded_index,
+    brand_inci_set as brand_inci_set_of,
+)
+from app.ai_ingredient_intelligence.logic.taxonomy_cache import (
+    get_taxonomy_cache,
+    TAXONOMY_NAME_FIELDS,
+)
 
-# Try to import rapidfuzz for fuzzy matching
-try:
-    from rapidfuzz import fuzz, process
-    RAPIDFUZZ_AVAILABLE = True
-except ImportError:
-    RAPIDFUZZ_AVAILABLE = False
+# rapidfuzz (+ numpy) powers the Step 2 fuzzy candidate store
+from app.ai_ingredient_intelligence.logic.fuzzy_store import RAPIDFUZZ_AVAILABLE
+if not RAPIDFUZZ_AVAILABLE:
     print("Warning: rapidfuzz not available for fuzzy matching. Install with: pip install rapidfuzz")
 
 
@@ -32,7 +38,14 @@ async def build_category_tree(collection, category_ids, name_field):
     """
     Given a collection and list of category ObjectIds, build a list of name paths.
     Example: [["Colorants", "Organic Colorants", "Natural Organic Colorants"]]
+
+    Served from the in-memory taxonomy cache for the functional category and
+    chemical class collections; other collections fall back to walking parent_id.
     """
+    if collection.name in TAXONOMY_NAME_FIELDS:
+        taxonomy = await get_taxonomy_cache()
+        return taxonomy.name_paths(collection.name, category_ids)
+
     results = []
     for cid in category_ids:
         if not isinstance(cid, ObjectId):
@@ -54,26 +67,70 @@ async def build_category_tree(collection, category_ids, name_field):
     return results
 
 
+async def _build_branded_match(
+    doc: dict,
+    func_cat_col,
+    chem_class_col,
+    match_score: float,
+    matched_inci: List[str],
+    total_brand_inci: int,
+    match_method: str
+) -> dict:
+    """Build a branded ('B') match result for a branded ingredient doc"""
+    func_tree = await build_category_tree(
+        func_cat_col,
+        doc.get("functional_category_ids", []),
+        "functionalName"
+    )
+    chem_tree = await build_category_tree(
+        chem_class_col,
+        doc.get("chemical_class_ids", []),
+        "chemicalClassName"
+    )
+
+    # Use enhanced_description if available, otherwise fallback to description
+    description = doc.get("enhanced_description") or doc.get("description")
+
+    return {
+        "ingredient_name": doc["ingredient_name"],
+        "ingredient_id": str(doc["_id"]),  # Add ingredient ID for distributor mapping
+        "supplier_name": doc.get("supplier_name"),
+        "description": description,  # Use enhanced_description if available
+        "rephrased_description": doc.get("enhanced_description"),  # Keep for backward compatibility
+        "category_decided": doc.get("category_decided"),  # Include category_decided from MongoDB
+        "functionality_category_tree": func_tree,
+        "chemical_class_category_tree": chem_tree,
+        "match_score": match_score,
+        "matched_inci": matched_inci,
+        "matched_count": len(matched_inci),
+        "total_brand_inci": total_brand_inci,
+        "tag": "B",  # Branded
+        "match_method": match_method
+    }
+
+
 async def match_inci_names(
     inci_names: List[str], 
-    synonyms_map: Optional[Dict[str, List[str]]] = None
+    synonyms_map: Optional[Union[Dict[str, List[str]], Awaitable[Dict[str, List[str]]]]] = None
 ) -> Tuple[List[dict], List[str], Dict[str, str], List[str]]:
     """
     Matches given INCI names following the new flow:
-    1. Direct MongoDB query for exact branded matches (original logic)
+    1. Exact branded matches (brand INCI set contained in the product)
     2. Fuzzy/NLP matching for branded ingredients (spelling mistakes)
     3. CAS API synonyms lookup for unmatched → check if synonyms match branded
     4. Check general INCI collection
     5. Remaining unmatched → "Unable to Decode"
     
+    synonyms_map may also be an awaitable (e.g. a running CAS lookup task): it is
+    only awaited when Step 3 actually has unmatched ingredients to check, so
+    Steps 0-2 run concurrently with the CAS API calls.
+    
     Returns:
     - matched_results: List of matched ingredients (branded or general)
     - general_ingredients: List of general INCI ingredients (tagged as 'G')
     - ingredient_tags: Dict mapping ingredient name to tag ('B' for branded, 'G' for general)
     - unable_to_decode: List of ingredients that couldn't be found even after all steps
     """
-    branded_ingredients_col = db["ingre_branded_ingredients"]
-    inci_col = db["ingre_inci"]
     func_cat_col = db["ingre_functional_categories"]
     chem_class_col = db["ingre_chemical_classes"]
 
@@ -136,42 +193,17 @@ async def match_inci_names(
     matched_original_names: Set[str] = set()  # Original ingredient names that have been matched
     matched_combinations: Set[str] = set()  # Track which combinations have been matched
 
+    # Reverse map normalized -> original names (replaces per-INCI scans of product_inci_original)
+    original_by_normalized: Dict[str, List[str]] = {}
+    for orig_name, norm_name in product_inci_original.items():
+        original_by_normalized.setdefault(norm_name, []).append(orig_name)
+
+    # All steps run against the process-wide in-memory index (no per-request aggregates)
+    branded_index = await get_branded_index()
+
     # ============================================
     # STEP 0: Search for INCI combinations in branded ingredients
     # ============================================
-    # Build pipeline for combination matching (same as Step 1)
-    pipeline_combos = [
-        {
-            "$lookup": {
-                "from": "ingre_inci",
-                "localField": "inci_ids",
-                "foreignField": "_id",
-                "as": "inci_docs"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "ingre_suppliers",
-                "localField": "supplier_id",
-                "foreignField": "_id",
-                "as": "supplier_docs"
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "ingredient_name": 1,
-                "supplier_name": {"$arrayElemAt": ["$supplier_docs.supplierName", 0]},
-                "description": 1,
-                "enhanced_description": 1,  # Prefer enhanced_description for branded ingredients
-                "category_decided": 1,  # Include category_decided field
-                "functional_category_ids": 1,
-                "chemical_class_ids": 1,
-                "inci_list": "$inci_docs.inciName_normalized"
-            }
-        }
-    ]
-    
     if combinations:
         print(f"[INFO] Step 0: Searching for {len(combinations)} INCI combination(s) in branded ingredients...")
         
@@ -182,141 +214,56 @@ async def match_inci_names(
             # Normalize combo INCI list
             combo_inci_set = {inci.strip().lower() for inci in combo_inci_list}
             
-            # Search for branded ingredients where ALL INCI in the combination are present
-            async for doc in branded_ingredients_col.aggregate(pipeline_combos):
-                brand_inci_list = [i.strip().lower() for i in doc.get("inci_list", [])]
-                brand_inci_set = set(brand_inci_list)
-                
-                # Check if this branded ingredient's INCI list contains ALL INCI from the combination
-                if combo_inci_set.issubset(brand_inci_set) and len(combo_inci_set) > 0:
-                    # Also check that the combination matches a significant portion (at least 2 INCI or 50% match)
-                    match_ratio = len(combo_inci_set) / len(brand_inci_set) if brand_inci_set else 0
-                    if len(combo_inci_set) >= 2 or match_ratio >= 0.5:
-                        func_tree = await build_category_tree(
-                            func_cat_col,
-                            doc.get("functional_category_ids", []),
-                            "functionalName"
-                        )
-                        chem_tree = await build_category_tree(
-                            chem_class_col,
-                            doc.get("chemical_class_ids", []),
-                            "chemicalClassName"
-                        )
-                        
-                        # Use enhanced_description if available, otherwise fallback to description
-                        description = doc.get("enhanced_description") or doc.get("description")
-                        
-                        matched_results.append({
-                            "ingredient_name": doc["ingredient_name"],
-                            "ingredient_id": str(doc["_id"]),
-                            "supplier_name": doc.get("supplier_name"),
-                            "description": description,  # Use enhanced_description if available
-                            "rephrased_description": doc.get("enhanced_description"),  # Keep for backward compatibility
-                            "category_decided": doc.get("category_decided"),  # Include category_decided from MongoDB
-                            "functionality_category_tree": func_tree,
-                            "chemical_class_category_tree": chem_tree,
-                            "match_score": 1.0,
-                            "matched_inci": list(combo_inci_set),  # The INCI that matched from the combination
-                            "matched_count": len(combo_inci_set),
-                            "total_brand_inci": len(brand_inci_set),
-                            "tag": "B",  # Branded
-                            "match_method": "combination"
-                        })
-                        
-                        # Mark combination as matched
-                        matched_combinations.add(combo_string.lower())
-                        matched_original_names.add(combo_string)
-                        
-                        # Mark all matched INCI as branded
-                        for inci in combo_inci_set:
-                            matched_inci_all.add(inci)
-                            ingredient_tags[inci] = "B"
-                        
-                        print(f"[OK] Matched combination '{combo_string}' to branded ingredient '{doc['ingredient_name']}'")
-                        break  # Found a match for this combination, move to next
+            # Branded ingredients where ALL INCI in the combination are present
+            for doc, brand_inci_set in branded_index.docs_containing_all(combo_inci_set):
+                # Also check that the combination matches a significant portion (at least 2 INCI or 50% match)
+                match_ratio = len(combo_inci_set) / len(brand_inci_set) if brand_inci_set else 0
+                if len(combo_inci_set) >= 2 or match_ratio >= 0.5:
+                    matched_results.append(await _build_branded_match(
+                        doc,
+                        func_cat_col,
+                        chem_class_col,
+                        match_score=1.0,
+                        matched_inci=list(combo_inci_set),  # The INCI that matched from the combination
+                        total_brand_inci=len(brand_inci_set),
+                        match_method="combination"
+                    ))
+                    
+                    # Mark combination as matched
+                    matched_combinations.add(combo_string.lower())
+                    matched_original_names.add(combo_string)
+                    
+                    # Mark all matched INCI as branded
+                    for inci in combo_inci_set:
+                        matched_inci_all.add(inci)
+                        ingredient_tags[inci] = "B"
+                    
+                    print(f"[OK] Matched combination '{combo_string}' to branded ingredient '{doc['ingredient_name']}'")
+                    break  # Found a match for this combination, move to next
     
     # ============================================
-    # STEP 1: Direct MongoDB query for exact branded matches (original logic)
+    # STEP 1: Exact branded matches (brand INCI set fully contained in the product)
     # ============================================
-    print("[INFO] Step 1: Direct MongoDB query for exact branded matches...")
-    
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "ingre_inci",
-                "localField": "inci_ids",
-                "foreignField": "_id",
-                "as": "inci_docs"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "ingre_suppliers",
-                "localField": "supplier_id",
-                "foreignField": "_id",
-                "as": "supplier_docs"
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "ingredient_name": 1,
-                "supplier_name": {"$arrayElemAt": ["$supplier_docs.supplierName", 0]},
-                "description": 1,
-                "enhanced_description": 1,  # Prefer enhanced_description for branded ingredients
-                "category_decided": 1,  # Include category_decided field
-                "functional_category_ids": 1,
-                "chemical_class_ids": 1,
-                "inci_list": "$inci_docs.inciName_normalized"
-            }
-        }
-    ]
+    print("[INFO] Step 1: Exact branded matches from index...")
 
-    async for doc in branded_ingredients_col.aggregate(pipeline):
-        brand_inci_list = [i.strip().lower() for i in doc.get("inci_list", [])]
-        brand_inci_set = set(brand_inci_list)
+    for doc, brand_inci_set in branded_index.docs_contained_in(product_inci_set):
         total_brand_inci = len(brand_inci_set)
-
-        if brand_inci_set.issubset(product_inci_set) and total_brand_inci > 0:
-            func_tree = await build_category_tree(
-                func_cat_col,
-                doc.get("functional_category_ids", []),
-                "functionalName"
-            )
-            chem_tree = await build_category_tree(
-                chem_class_col,
-                doc.get("chemical_class_ids", []),
-                "chemicalClassName"
-            )
-
-            # Use enhanced_description if available, otherwise fallback to description
-            description = doc.get("enhanced_description") or doc.get("description")
-            
-            matched_results.append({
-                "ingredient_name": doc["ingredient_name"],
-                "ingredient_id": str(doc["_id"]),  # Add ingredient ID for distributor mapping
-                "supplier_name": doc.get("supplier_name"),
-                "description": description,  # Use enhanced_description if available
-                "rephrased_description": doc.get("enhanced_description"),  # Keep for backward compatibility
-                "category_decided": doc.get("category_decided"),  # Include category_decided from MongoDB
-                "functionality_category_tree": func_tree,
-                "chemical_class_category_tree": chem_tree,
-                "match_score": 1.0,
-                "matched_inci": list(brand_inci_set),
-                "matched_count": total_brand_inci,
-                "total_brand_inci": total_brand_inci,
-                "tag": "B",  # Branded
-                "match_method": "exact"
-            })
-            
-            # Mark all matched INCI as branded
-            for inci in brand_inci_set:
-                matched_inci_all.add(inci)
-                ingredient_tags[inci] = "B"
-                # Find original name that matched
-                for orig_name, norm_name in product_inci_original.items():
-                    if norm_name == inci:
-                        matched_original_names.add(orig_name)
+        matched_results.append(await _build_branded_match(
+            doc,
+            func_cat_col,
+            chem_class_col,
+            match_score=1.0,
+            matched_inci=list(brand_inci_set),
+            total_brand_inci=total_brand_inci,
+            match_method="exact"
+        ))
+        
+        # Mark all matched INCI as branded
+        for inci in brand_inci_set:
+            matched_inci_all.add(inci)
+            ingredient_tags[inci] = "B"
+            # Find original name that matched
+            matched_original_names.update(original_by_normalized.get(inci, ()))
 
     # ============================================
     # STEP 2: Fuzzy/NLP matching for branded ingredients (spelling mistakes)
@@ -335,77 +282,36 @@ async def match_inci_names(
     remaining_normalized = remaining_normalized - matched_inci_all
     
     if remaining_normalized and RAPIDFUZZ_AVAILABLE:
-        # Get all branded ingredient INCI names for fuzzy matching
-        all_branded_inci = []
-        async for doc in branded_ingredients_col.aggregate(pipeline):
-            brand_inci_list = [i.strip().lower() for i in doc.get("inci_list", [])]
-            for inci in brand_inci_list:
-                if inci not in matched_inci_all:
-                    all_branded_inci.append((inci, doc))
+        # Score every remaining ingredient against the precomputed candidate store in one batch
+        queries = list(remaining_normalized)
+        best_matches = branded_index.fuzzy_matches(queries, exclude=matched_inci_all)
         
-        # Fuzzy match remaining ingredients against branded INCI
-        for ingredient_norm in remaining_normalized:
+        for ingredient_norm, best_match in zip(queries, best_matches):
+            # An earlier fuzzy match in this loop may already cover this ingredient
             if ingredient_norm in matched_inci_all:
                 continue
+            
+            if best_match:
+                matched_inci, score, doc = best_match
+                confidence = score / 100.0
+                doc_inci_set = brand_inci_set_of(doc)
                 
-            # Find best fuzzy match
-            candidates = [inci for inci, _ in all_branded_inci]
-            if candidates:
-                best_match = process.extractOne(
-                    ingredient_norm,
-                    candidates,
-                    scorer=fuzz.token_sort_ratio,
-                    score_cutoff=75  # 75% similarity threshold
-                )
+                matched_results.append(await _build_branded_match(
+                    doc,
+                    func_cat_col,
+                    chem_class_col,
+                    match_score=confidence,
+                    matched_inci=[matched_inci],
+                    total_brand_inci=len(doc_inci_set),
+                    match_method="fuzzy"
+                ))
                 
-                if best_match:
-                    matched_inci, score, _ = best_match
-                    confidence = score / 100.0
-                    
-                    # Find the branded ingredient document for this matched INCI
-                    for matched_inci_candidate, doc in all_branded_inci:
-                        if matched_inci_candidate == matched_inci:
-                            # Check if this doc is already in results
-                            doc_inci_set = {i.strip().lower() for i in doc.get("inci_list", [])}
-                            if matched_inci in doc_inci_set:
-                                func_tree = await build_category_tree(
-                                    func_cat_col,
-                                    doc.get("functional_category_ids", []),
-                                    "functionalName"
-                                )
-                                chem_tree = await build_category_tree(
-                                    chem_class_col,
-                                    doc.get("chemical_class_ids", []),
-                                    "chemicalClassName"
-                                )
-                                
-                                # Use enhanced_description if available, otherwise fallback to description
-                                description = doc.get("enhanced_description") or doc.get("description")
-                                
-                                matched_results.append({
-                                    "ingredient_name": doc["ingredient_name"],
-                                    "ingredient_id": str(doc["_id"]),  # Add ingredient ID for distributor mapping
-                                    "supplier_name": doc.get("supplier_name"),
-                                    "description": description,  # Use enhanced_description if available
-                                    "rephrased_description": doc.get("enhanced_description"),  # Keep for backward compatibility
-                                    "category_decided": doc.get("category_decided"),  # Include category_decided from MongoDB
-                                    "functionality_category_tree": func_tree,
-                                    "chemical_class_category_tree": chem_tree,
-                                    "match_score": confidence,
-                                    "matched_inci": [matched_inci],
-                                    "matched_count": 1,
-                                    "total_brand_inci": len(doc_inci_set),
-                                    "tag": "B",
-                                    "match_method": "fuzzy"
-                                })
-                                
-                                matched_inci_all.add(matched_inci)
-                                ingredient_tags[matched_inci] = "B"
-                                # Find original name
-                                for orig_name, norm_name in product_inci_original.items():
-                                    if normalize_ingredient_name(orig_name) == ingredient_norm:
-                                        matched_original_names.add(orig_name)
-                                break
+                matched_inci_all.add(matched_inci)
+                ingredient_tags[matched_inci] = "B"
+                # Find original name
+                for orig_name in product_inci_original:
+                    if normalize_ingredient_name(orig_name) == ingredient_norm:
+                        matched_original_names.add(orig_name)
 
     # ============================================
     # STEP 3: CAS API synonyms lookup for unmatched → check if synonyms match branded
@@ -414,6 +320,10 @@ async def match_inci_names(
     
     remaining_after_fuzzy = [name for name in inci_names if name not in matched_original_names]
     
+    if remaining_after_fuzzy and inspect.isawaitable(synonyms_map):
+        # Only the synonym step waits on CAS
+        synonyms_map = await synonyms_map
+    
     if remaining_after_fuzzy and synonyms_map:
         # Check if any synonyms match branded ingredients
         for ingredient in remaining_after_fuzzy:
@@ -427,52 +337,27 @@ async def match_inci_names(
             # Normalize synonyms
             normalized_synonyms = {normalize_ingredient_name(s) for s in synonyms}
             
-            # Check if any synonym matches a branded ingredient
-            async for doc in branded_ingredients_col.aggregate(pipeline):
-                brand_inci_list = [i.strip().lower() for i in doc.get("inci_list", [])]
-                brand_inci_set = set(brand_inci_list)
+            # First branded ingredient sharing any synonym
+            hit = branded_index.first_doc_intersecting(normalized_synonyms)
+            if hit:
+                doc, brand_inci_set = hit
+                matched_synonyms = normalized_synonyms.intersection(brand_inci_set)
                 
-                # Check if any synonym matches this branded ingredient
-                if normalized_synonyms.intersection(brand_inci_set):
-                    matched_synonyms = normalized_synonyms.intersection(brand_inci_set)
-                    
-                    func_tree = await build_category_tree(
-                        func_cat_col,
-                        doc.get("functional_category_ids", []),
-                        "functionalName"
-                    )
-                    chem_tree = await build_category_tree(
-                        chem_class_col,
-                        doc.get("chemical_class_ids", []),
-                        "chemicalClassName"
-                    )
-                    
-                    # Use enhanced_description if available, otherwise fallback to description
-                    description = doc.get("enhanced_description") or doc.get("description")
-                    
-                    matched_results.append({
-                        "ingredient_name": doc["ingredient_name"],
-                        "ingredient_id": str(doc["_id"]),  # Add ingredient ID for distributor mapping
-                        "supplier_name": doc.get("supplier_name"),
-                        "description": description,  # Use enhanced_description if available
-                        "rephrased_description": doc.get("enhanced_description"),  # Keep for backward compatibility
-                        "category_decided": doc.get("category_decided"),  # Include category_decided from MongoDB
-                        "functionality_category_tree": func_tree,
-                        "chemical_class_category_tree": chem_tree,
-                        "match_score": 0.9,  # Slightly lower score for synonym match
-                        "matched_inci": list(matched_synonyms),
-                        "matched_count": len(matched_synonyms),
-                        "total_brand_inci": len(brand_inci_set),
-                        "tag": "B",
-                        "match_method": "synonym"
-                    })
-                    
-                    for syn in matched_synonyms:
-                        matched_inci_all.add(syn)
-                        ingredient_tags[syn] = "B"
-                    
-                    matched_original_names.add(ingredient)
-                    break
+                matched_results.append(await _build_branded_match(
+                    doc,
+                    func_cat_col,
+                    chem_class_col,
+                    match_score=0.9,  # Slightly lower score for synonym match
+                    matched_inci=list(matched_synonyms),
+                    total_brand_inci=len(brand_inci_set),
+                    match_method="synonym"
+                ))
+                
+                for syn in matched_synonyms:
+                    matched_inci_all.add(syn)
+                    ingredient_tags[syn] = "B"
+                
+                matched_original_names.add(ingredient)
 
     # ============================================
     # STEP 4: Check general INCI collection for remaining
@@ -483,40 +368,29 @@ async def match_inci_names(
     
     general_ingredients = []
     if remaining_for_general:
-        # Query INCI collection for these names
-        inci_docs = await inci_col.find({
-            "inciName_normalized": {"$in": list(remaining_for_general)}
-        }).to_list(length=None)
-        
-        for inci_doc in inci_docs:
-            inci_name_normalized = inci_doc.get("inciName_normalized", "").lower()
-            inci_name_original = inci_doc.get("inciName", "")
+        for inci_name_normalized, inci_name_original in branded_index.lookup_general(remaining_for_general):
+            # This is a general INCI (not branded)
+            matched_results.append({
+                "ingredient_name": inci_name_original,
+                "ingredient_id": None,  # General INCI ingredients don't have ingredient_id
+                "supplier_name": None,
+                "description": None,
+                "functionality_category_tree": [],
+                "chemical_class_category_tree": [],
+                "match_score": 1.0,
+                "matched_inci": [inci_name_normalized],
+                "matched_count": 1,
+                "total_brand_inci": 1,
+                "tag": "G",  # General
+                "match_method": "exact"
+            })
             
-            if inci_name_normalized in remaining_for_general:
-                # This is a general INCI (not branded)
-                matched_results.append({
-                    "ingredient_name": inci_name_original,
-                    "ingredient_id": None,  # General INCI ingredients don't have ingredient_id
-                    "supplier_name": None,
-                    "description": None,
-                    "functionality_category_tree": [],
-                    "chemical_class_category_tree": [],
-                    "match_score": 1.0,
-                    "matched_inci": [inci_name_normalized],
-                    "matched_count": 1,
-                    "total_brand_inci": 1,
-                    "tag": "G",  # General
-                    "match_method": "exact"
-                })
-                
-                general_ingredients.append(inci_name_original)
-                matched_inci_all.add(inci_name_normalized)
-                ingredient_tags[inci_name_normalized] = "G"
-                
-                # Find original name
-                for orig_name, norm_name in product_inci_original.items():
-                    if norm_name == inci_name_normalized:
-                        matched_original_names.add(orig_name)
+            general_ingredients.append(inci_name_original)
+            matched_inci_all.add(inci_name_normalized)
+            ingredient_tags[inci_name_normalized] = "G"
+            
+            # Find original name
+            matched_original_names.update(original_by_normalized.get(inci_name_normalized, ()))
 
     # ============================================
     # STEP 5: Remaining unmatched → "Unable to Decode"
@@ -8,20 +8,17 @@ from PIL import Image
 import google.cloud.vision as vision
 from google.cloud import storage
 import tempfile
-import anthropic
 from anthropic import APIError, APIStatusError, BadRequestError, RateLimitError
 import json
 from app.config import CLAUDE_MODEL
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message
 
 class OCRProcessor:
     def __init__(self):
         # Initialize Google Vision client
         self.vision_client = vision.ImageAnnotatorClient()
         
-        # Initialize Claude client
-        self.claude_client = anthropic.Anthropic(
-            api_key=os.getenv("CLAUDE_API_KEY")
-        )
+        # Claude calls go through the shared async gateway (see llm_gateway.py)
         
     async def extract_text_from_image(self, image_data: bytes) -> str:
         """Extract text from image using Google Vision API"""
@@ -114,7 +111,7 @@ Raw text to analyze:
 Return only the JSON array:"""
 
             # Call Claude API
-            response = self.claude_client.messages.create(
+            response = await create_message(
                 model=CLAUDE_MODEL if CLAUDE_MODEL else (os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-sonnet-4-5-20250929"),
                 max_tokens=4096,
                 temperature=0.1,
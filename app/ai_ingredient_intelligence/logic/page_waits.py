@@ -0,0 +1,200 @@
+# app/ai_ingredient_intelligence/logic/page_waits.py
+"""
+Condition-based waits for the Selenium scrapers.
+
+The platform scrapers used to sleep fixed amounts (time.sleep(0.5..5) after
+every scroll and click, plus 3s after page load and 2s before each
+scraper), so a generic page could spend 20+ seconds sleeping. PageWaiter
+replaces those sleeps with WebDriverWait conditions that return as soon as
+the page is ready:
+
+- present(): the first of several locators appears
+- populated() / text_filled(): an element (or the first of several
+  locators) has text, optionally different from its text before a click
+- ingredient_list_visible(): a visible line looks like an INCI list
+- network_idle(): document complete and no new resource requests or DOM
+  text changes for a short quiet period
+
+Every wait is bounded by its own timeout and by a per-scrape budget
+(SCRAPE_WAIT_BUDGET_SECONDS), and the time spent waiting is recorded, so
+each scrape reports how long it waited (PageWaiter.stats()).
+
+PLATFORM_READY / INGREDIENT_PANELS hold the per-platform selectors that
+mean "product page rendered" and "ingredients panel populated".
+
+USAGE:
+    waiter = PageWaiter(driver)
+    waiter.ready("nykaa")
+    driver.execute_script("arguments[0].click();", tab)
+    text = waiter.text_filled(INGREDIENT_PANELS["nykaa"], min_chars=10, previous=text_before_click)
+    print(waiter.stats())
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+SCRAPE_WAIT_BUDGET_SECONDS = float(os.getenv("SCRAPE_WAIT_BUDGET_SECONDS", "20"))
+SCRAPE_READY_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_READY_TIMEOUT_SECONDS", "8"))
+SCRAPE_PANEL_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_PANEL_TIMEOUT_SECONDS", "4"))
+SCRAPE_IDLE_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_IDLE_TIMEOUT_SECONDS", "3"))
+# How long nothing may change before the page counts as idle
+SCRAPE_IDLE_QUIET_SECONDS = float(os.getenv("SCRAPE_IDLE_QUIET_SECONDS", "0.5"))
+SCRAPE_POLL_SECONDS = 0.1
+
+Locator = Tuple[str, str]
+
+# Elements that mean the product page has rendered
+PLATFORM_READY: Dict[str, List[Locator]] = {
+    "amazon": [(By.ID, "productTitle"), (By.ID, "ingredients_feature_div"), (By.ID, "dp")],
+    "nykaa": [(By.CSS_SELECTOR, "h1"), (By.CSS_SELECTOR, "[data-testid='product-name']")],
+    "flipkart": [(By.CSS_SELECTOR, "h1"), (By.CSS_SELECTOR, "._2418kt"), (By.CSS_SELECTOR, "._1mXcCf")],
+    "thedermaco": [(By.CSS_SELECTOR, "h2.cms-box"), (By.CSS_SELECTOR, "h1")],
+}
+DEFAULT_READY: List[Locator] = [(By.CSS_SELECTOR, "h1"), (By.CSS_SELECTOR, "main"), (By.TAG_NAME, "body")]
+
+# Containers whose text is the ingredient list once its tab/accordion is open
+INGREDIENT_PANELS: Dict[str, List[Locator]] = {
+    "nykaa": [(By.ID, "content-details"), (By.CSS_SELECTOR, "[class*='ingredient']"), (By.CSS_SELECTOR, "[id*='ingredient']")],
+    "thedermaco": [(By.CSS_SELECTOR, "[class*='ingredient']"), (By.CSS_SELECTOR, "[role='tabpanel']")],
+    "generic": [(By.CSS_SELECTOR, "[role='tabpanel'][aria-hidden='false']"), (By.CSS_SELECTOR, "[class*='ingredient']"),
+                (By.CSS_SELECTOR, "[id*='ingredient']"), (By.CSS_SELECTOR, "[class*='collapse'][class*='show']")],
+}
+
+# readyState, resource requests so far, DOM text size - idle when none changes
+_PAGE_PROBE = """
+return [document.readyState,
+        performance.getEntriesByType('resource').length,
+        document.body ? document.body.textContent.length : 0];
+"""
+
+# Same heuristic the scrapers use to pick the ingredient line out of the body text
+_INGREDIENT_LIST_PROBE = """
+return (document.body ? document.body.innerText : '').split('\\n').some(function (line) {
+    return (line.match(/,/g) || []).length >= 5 && /aqua|water|glycerin|acid|extract|sodium/i.test(line);
+});
+"""
+
+_totals = {"scrapes": 0, "wait_seconds": 0.0, "waits": 0, "timeouts": 0}
+
+
+class PageWaiter:
+    """Bounded WebDriverWait helpers that record the time spent waiting"""
+
+    def __init__(self, driver, budget: float = SCRAPE_WAIT_BUDGET_SECONDS):
+        self.driver = driver
+        self.budget = budget
+        self.wait_seconds = 0.0
+        self.waits = 0
+        self.timeouts = 0
+
+    def remaining(self) -> float:
+        return max(0.0, self.budget - self.wait_seconds)
+
+    def until(self, condition: Callable[[Any], Any], timeout: float) -> Any:
+        """Wait for condition(driver) to return something truthy; None on timeout or exhausted budget"""
+        timeout = min(timeout, self.remaining())
+        self.waits += 1
+        if timeout <= 0:
+            self.timeouts += 1
+            return None
+        started = time.monotonic()
+        try:
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=SCRAPE_POLL_SECONDS,
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+            ).until(condition)
+        except TimeoutException:
+            self.timeouts += 1
+            return None
+        finally:
+            self.wait_seconds += time.monotonic() - started
+
+    def present(self, locators: List[Locator], timeout: float = SCRAPE_PANEL_TIMEOUT_SECONDS):
+        """First element matching any of the locators (in order), or None"""
+        def find(driver):
+            for by, value in locators:
+                elements = driver.find_elements(by, value)
+                if elements:
+                    return elements[0]
+            return False
+        return self.until(find, timeout)
+
+    def populated(
+        self,
+        target: Union[Any, List[Locator]],
+        timeout: float = SCRAPE_PANEL_TIMEOUT_SECONDS,
+        min_chars: int = 1,
+        previous: Optional[str] = None
+    ) -> Optional[Tuple[Any, str]]:
+        """
+        (element, text) once the element - or the first displayed match of the
+        locators - has at least min_chars of text that differs from `previous`
+        (the panel's text before a tab click), else None
+        """
+        def filled(driver):
+            elements = [target] if not isinstance(target, list) else [
+                element for by, value in target for element in driver.find_elements(by, value)
+            ]
+            for element in elements:
+                if isinstance(target, list) and not element.is_displayed():
+                    continue
+                text = (element.text or "").strip()
+                if len(text) >= min_chars and text != previous:
+                    return element, text
+            return False
+        return self.until(filled, timeout)
+
+    def text_filled(self, target: Union[Any, List[Locator]], timeout: float = SCRAPE_PANEL_TIMEOUT_SECONDS,
+                    min_chars: int = 1, previous: Optional[str] = None) -> Optional[str]:
+        """Text of populated(), or None"""
+        found = self.populated(target, timeout, min_chars, previous)
+        return found[1] if found else None
+
+    def ingredient_list_visible(self, timeout: float = SCRAPE_PANEL_TIMEOUT_SECONDS) -> bool:
+        """True once a visible line looks like an INCI list (many commas and a common ingredient word)"""
+        return bool(self.until(lambda driver: driver.execute_script(_INGREDIENT_LIST_PROBE), timeout))
+
+    def network_idle(self, timeout: float = SCRAPE_IDLE_TIMEOUT_SECONDS, quiet: float = SCRAPE_IDLE_QUIET_SECONDS) -> bool:
+        """True once the document is complete and requests/DOM text stopped changing for `quiet` seconds"""
+        state = {"probe": None, "since": time.monotonic()}
+
+        def idle(driver):
+            probe = driver.execute_script(_PAGE_PROBE)
+            now = time.monotonic()
+            if probe != state["probe"] or probe[0] != "complete":
+                state["probe"], state["since"] = probe, now
+                return False
+            return now - state["since"] >= quiet
+        return bool(self.until(idle, timeout))
+
+    def ready(self, platform: str, timeout: float = SCRAPE_READY_TIMEOUT_SECONDS) -> bool:
+        """Wait for the platform's product markup, then for the page to go idle"""
+        found = self.present(PLATFORM_READY.get(platform, DEFAULT_READY), timeout)
+        self.network_idle()
+        return found is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"wait_seconds": round(self.wait_seconds, 2), "waits": self.waits, "timeouts": self.timeouts}
+
+
+def record_scrape_waits(waiter: PageWaiter) -> Dict[str, Any]:
+    """Add a finished scrape's waits to the process totals and return its stats"""
+    _totals["scrapes"] += 1
+    _totals["wait_seconds"] += waiter.wait_seconds
+    _totals["waits"] += waiter.waits
+    _totals["timeouts"] += waiter.timeouts
+    return waiter.stats()
+
+
+def get_wait_stats() -> Dict[str, Any]:
+    scrapes = _totals["scrapes"]
+    return {
+        **_totals,
+        "wait_seconds": round(_totals["wait_seconds"], 2),
+        "avg_wait_seconds": round(_totals["wait_seconds"] / scrapes, 2) if scrapes else 0.0
+    }
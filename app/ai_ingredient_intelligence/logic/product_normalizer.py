@@ -0,0 +1,144 @@
+# app/ai_ingredient_intelligence/logic/product_normalizer.py
+"""
+Write-time ingredient normalization for the externalproducts collection.
+
+Market research used to re-derive normalized ingredient lists from raw
+strings such as "Full Ingredients List: Water\\Aqua\\Eau, ..." on every
+request. Products are now normalized once, when they are written, and
+carry:
+
+- ingredients_parsed:      display names in label order
+- ingredients_normalized:  matching form of the same names (multikey index)
+- ingredients_hash:        sha256 of the normalizer version + normalized list
+- actives:                 normalized names whose ingre_inci category is Active
+
+normalized_product_fields() is the single place these fields are computed.
+It is used by:
+- scripts/normalize_external_products.py - backfill; products whose hash
+  and actives are unchanged are not rewritten
+- scripts/clean_external_products.py - every cleaned product is written
+  together with its normalized fields
+
+Requests only read the stored arrays; a product without them does not
+match until it has been normalized.
+
+USAGE:
+    active_names = await load_active_names(inci_col)
+    fields = normalized_product_fields(product["ingredients"], active_names)
+    await collection.update_one({"_id": product["_id"]}, {"$set": fields})
+"""
+
+import time
+import hashlib
+from typing import Any, Dict, List, Set
+
+from app.ai_ingredient_intelligence.logic.ingredient_index import (
+    EXTERNAL_PRODUCTS_COLLECTION,
+    product_ingredient_arrays,
+)
+
+# Bump when parsing/normalization changes so the backfill rewrites every product
+NORMALIZER_VERSION = "1"
+
+
+def ingredients_hash(normalized: List[str]) -> str:
+    payload = NORMALIZER_VERSION + "\n" + "\n".join(normalized)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalized_product_fields(raw_ingredients: Any, active_names: Set[str]) -> Dict[str, Any]:
+    """Fields to $set on an external product for its raw `ingredients` value"""
+    parsed, normalized = product_ingredient_arrays(raw_ingredients)
+    return {
+        "ingredients_parsed": parsed,
+        "ingredients_normalized": normalized,
+        "ingredients_hash": ingredients_hash(normalized),
+        "actives": [name for name in dict.fromkeys(normalized) if name in active_names],
+        "ingredients_normalized_at": time.time(),
+    }
+
+
+def is_current(product: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+    """True when the stored normalized fields already match"""
+    return (
+        product.get("ingredients_hash") == fields["ingredients_hash"]
+        and product.get("actives") == fields["actives"]
+        and "ingredients_parsed" in product
+    )
+
+
+async def load_active_names(inci_collection=None) -> Set[str]:
+    """Normalized INCI names categorized as Active in ingre_inci"""
+    if inci_collection is None:
+        from app.ai_ingredient_intelligence.db.collections import inci_col
+        inci_collection = inci_col
+    names = set()
+    async for doc in inci_collection.find({"category": "Active"}, {"inciName_normalized": 1}):
+        name = (doc.get("inciName_normalized") or "").strip().lower()
+        if name:
+            names.add(name)
+    return names
+
+
+async def ensure_product_indexes(products_col=None):
+    """Multikey indexes on the normalized arrays (+ normalization time for change detection)"""
+    if products_col is None:
+        from app.ai_ingredient_intelligence.db.mongodb import db
+        products_col = db[EXTERNAL_PRODUCTS_COLLECTION]
+    await products_col.create_index("ingredients_normalized", name="idx_ingredients_normalized")
+    await products_col.create_index("actives", name="idx_actives")
+    await products_col.create_index("ingredients_normalized_at", name="idx_ingredients_normalized_at")
+
+
+async def normalize_products(
+    products_col=None,
+    inci_collection=None,
+    batch_size: int = 1000,
+    force: bool = False,
+    limit: int = 0
+) -> Dict[str, Any]:
+    """
+    Backfill: (re)compute the normalized fields of every external product.
+
+    Args:
+        force: Rewrite products whose stored fields are already current
+        limit: Only look at the first N products (0 = all)
+    """
+    from pymongo import UpdateOne
+
+    if products_col is None:
+        from app.ai_ingredient_intelligence.db.mongodb import db
+        products_col = db[EXTERNAL_PRODUCTS_COLLECTION]
+
+    start = time.time()
+    active_names = await load_active_names(inci_collection)
+    print(f"Loaded {len(active_names)} active INCI names")
+    await ensure_product_indexes(products_col)
+
+    stats = {"seen": 0, "updated": 0, "unchanged": 0, "empty": 0}
+    updates = []
+    projection = {"ingredients": 1, "ingredients_hash": 1, "actives": 1, "ingredients_parsed": 1}
+    cursor = products_col.find({"ingredients": {"$exists": True, "$nin": [None, ""]}}, projection)
+    if limit:
+        cursor = cursor.limit(limit)
+    async for product in cursor:
+        stats["seen"] += 1
+        fields = normalized_product_fields(product.get("ingredients"), active_names)
+        if not fields["ingredients_normalized"]:
+            stats["empty"] += 1
+        if not force and is_current(product, fields):
+            stats["unchanged"] += 1
+            continue
+        updates.append(UpdateOne({"_id": product["_id"]}, {"$set": fields}))
+        if len(updates) >= batch_size:
+            await products_col.bulk_write(updates, ordered=False)
+            stats["updated"] += len(updates)
+            updates = []
+            print(f"  {stats['seen']} products checked, {stats['updated']} updated")
+    if updates:
+        await products_col.bulk_write(updates, ordered=False)
+        stats["updated"] += len(updates)
+
+    stats["seconds"] = round(time.time() - start, 2)
+    print(f"[OK] Normalized external products: {stats}")
+    return stats
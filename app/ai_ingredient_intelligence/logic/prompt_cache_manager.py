@@ -3,185 +3,256 @@ Prompt Cache Manager for Claude API
 =====================================
 
 This module implements system prompt caching using Claude's cache_control API
-to reduce costs and latency. System prompts are cached and reused across requests.
+to reduce costs and latency. System prompts are sent as a text block marked
+`cache_control: {"type": "ephemeral"}`; Anthropic caches the prefix up to that
+block and later requests with the identical prefix read it from cache.
 
 COST SAVINGS:
 - Writing to cache: 25% more expensive than base input tokens
 - Reading from cache: Only 10% of base input token price
 - For long system prompts (1000+ tokens), this saves ~90% on system prompt costs
 
+HOW THE CACHE BEHAVES:
+- The cache is keyed by the exact prefix (model + system blocks), so the
+  system prompt must be byte-identical between calls - keep dynamic content
+  in the user message
+- Entries live ~5 minutes and the lifetime is refreshed on every hit
+- Prompts shorter than the model's minimum (1024 tokens for Sonnet/Opus,
+  2048 for Haiku) are processed normally and simply not cached
+
+Cache effectiveness is measured, not assumed: every response's `usage`
+(cache_creation_input_tokens / cache_read_input_tokens / input_tokens) is
+recorded per prompt type and reported by get_cache_stats().
+
 USAGE:
-    cache_manager = PromptCacheManager()
-    cache_block_id = await cache_manager.get_or_create_cache(
+    cache_manager = get_cache_manager()
+    response = await cache_manager.create_message(
         prompt_type="ingredient_selection",
-        system_prompt=INGREDIENT_SELECTION_SYSTEM_PROMPT
+        system_prompt=INGREDIENT_SELECTION_SYSTEM_PROMPT,
+        model="claude-3-opus-20240229",
+        max_tokens=4096,
+        messages=[{"role": "user", "content": user_prompt}]
     )
-    
-    # Use cache_block_id in API calls
+    print(cache_manager.get_cache_stats()["usage"]["ingredient_selection"])
 """
 
-import os
 import hashlib
-import json
-from typing import Dict, Optional, Any
-from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Any
+from datetime import datetime
 
-# In-memory cache store (can be replaced with Redis/database for production)
-# Format: {prompt_hash: {"cache_block_id": "...", "created_at": "...", "ttl": 3600}}
+# In-memory record of prompts sent with cache_control
+# Format: {cache_key: {"cache_block_id": "...", "created_at": "...", "last_used_at": "...", ...}}
 _cache_store: Dict[str, Dict[str, Any]] = {}
 
-# Cache TTL in seconds (24 hours default)
-CACHE_TTL = 86400
+# Anthropic's ephemeral cache lifetime in seconds (refreshed on each hit)
+CACHE_TTL = 300
+
+USAGE_FIELDS = ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens", "output_tokens")
 
 
 class PromptCacheManager:
     """
     Manages Claude API prompt caching for system prompts.
-    
-    Each system prompt is cached once and reused across all requests,
-    dramatically reducing token costs for the system prompt portion.
+
+    Each system prompt is sent as a cacheable block, so after the first call
+    only ~10% of the system prompt's input tokens are billed.
     """
-    
+
     def __init__(self, claude_client=None):
         """
         Initialize the cache manager.
-        
+
         Args:
-            claude_client: Anthropic client instance (optional, will use global if not provided)
+            claude_client: AsyncAnthropic client (optional, the shared gateway client is used if not provided)
         """
         self.claude_client = claude_client
         self._cache_store = _cache_store
-    
+        # Token usage per prompt type, from response.usage
+        self._usage: Dict[str, Dict[str, int]] = {}
+
     def _get_prompt_hash(self, prompt: str) -> str:
         """
         Generate a hash for the prompt to use as cache key.
-        
+
         Args:
             prompt: The system prompt text
-            
+
         Returns:
             SHA256 hash of the prompt
         """
         return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
-    
+
     def _get_cache_key(self, prompt_type: str, prompt: str) -> str:
         """
         Generate a cache key combining prompt type and hash.
-        
+
         Args:
             prompt_type: Type of prompt (e.g., "ingredient_selection")
             prompt: The system prompt text
-            
+
         Returns:
             Combined cache key
         """
         prompt_hash = self._get_prompt_hash(prompt)
         return f"{prompt_type}:{prompt_hash}"
-    
-    async def get_or_create_cache(
-        self,
-        prompt_type: str,
-        system_prompt: str,
-        claude_client=None
-    ) -> Optional[str]:
+
+    def system_blocks(self, prompt_type: str, system_prompt: str) -> List[Dict[str, Any]]:
         """
-        Get existing cache block ID or create a new one.
-        
-        This function:
-        1. Checks if we have a cached block ID for this prompt
-        2. If yes and not expired, returns it
-        3. If no or expired, creates a new cache block via Claude API
-        4. Stores the cache block ID for future use
-        
+        Build the `system` parameter with the prompt marked for caching.
+
         Args:
-            prompt_type: Type of prompt (e.g., "ingredient_selection", "optimization")
-            system_prompt: The system prompt to cache
-            claude_client: Anthropic client (optional, uses instance client or global)
-            
+            prompt_type: Type of prompt (e.g., "ingredient_selection")
+            system_prompt: The static system prompt
+
         Returns:
-            Cache block ID string, or None if caching is not available
-        """
-        if not claude_client:
-            claude_client = self.claude_client
-        
-        if not claude_client:
-            # No client available, return None (will use regular API call)
-            return None
-        
+            List with one text block carrying cache_control
+        """
         cache_key = self._get_cache_key(prompt_type, system_prompt)
-        
-        # Check if we have a valid cached block ID
-        cached_entry = self._cache_store.get(cache_key)
-        if cached_entry:
-            created_at = datetime.fromisoformat(cached_entry['created_at'])
-            age = (datetime.now() - created_at).total_seconds()
-            
-            if age < cached_entry.get('ttl', CACHE_TTL):
-                # Cache is still valid
-                print(f"✅ Cache HIT for {prompt_type} (age: {age:.0f}s)")
-                return cached_entry['cache_block_id']
-            else:
-                # Cache expired, remove it
-                print(f"⏰ Cache EXPIRED for {prompt_type} (age: {age:.0f}s)")
-                del self._cache_store[cache_key]
-        
-        # No valid cache, mark that we should use caching for this prompt
-        # Claude's ephemeral caching works automatically when we use cache_control
-        # We just need to track that this prompt should use caching
-        try:
-            print(f"📝 Setting up cache for {prompt_type}...")
-            
-            # Store cache metadata - we'll use the prompt hash to track cached prompts
-            # Claude's ephemeral cache is automatic when cache_control is used
-            cache_block_id = self._get_prompt_hash(system_prompt)
-            
+        now = datetime.now().isoformat()
+        entry = self._cache_store.get(cache_key)
+        if entry is None:
             self._cache_store[cache_key] = {
-                "cache_block_id": cache_block_id,
-                "created_at": datetime.now().isoformat(),
+                "cache_block_id": self._get_prompt_hash(system_prompt),
+                "created_at": now,
+                "last_used_at": now,
                 "ttl": CACHE_TTL,
                 "prompt_type": prompt_type,
-                "system_prompt": system_prompt  # Store for reference
+                "prompt_chars": len(system_prompt)
             }
-            
-            print(f"✅ Cache configured for {prompt_type}")
-            return cache_block_id
-            
-        except Exception as e:
-            print(f"⚠️ Failed to create cache block for {prompt_type}: {e}")
-            # Return None to fall back to regular API call
-            return None
-    
+        else:
+            entry["last_used_at"] = now
+
+        return [{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"}
+        }]
+
+    def record_usage(self, prompt_type: str, response: Any) -> Dict[str, int]:
+        """
+        Add a response's token usage to the per-prompt-type counters.
+
+        Args:
+            prompt_type: Type of prompt the call was made for
+            response: anthropic Message (or anything with a `usage` attribute)
+
+        Returns:
+            Token counts of this response
+        """
+        usage = getattr(response, "usage", None)
+        counts = {field: int(getattr(usage, field, 0) or 0) for field in USAGE_FIELDS}
+
+        totals = self._usage.setdefault(prompt_type, {"calls": 0, "cache_hits": 0, "cache_writes": 0, **{f: 0 for f in USAGE_FIELDS}})
+        totals["calls"] += 1
+        if counts["cache_read_input_tokens"]:
+            totals["cache_hits"] += 1
+        if counts["cache_creation_input_tokens"]:
+            totals["cache_writes"] += 1
+        for field in USAGE_FIELDS:
+            totals[field] += counts[field]
+
+        if counts["cache_read_input_tokens"]:
+            print(f"✅ Prompt cache HIT for {prompt_type} ({counts['cache_read_input_tokens']} tokens read from cache)")
+        elif counts["cache_creation_input_tokens"]:
+            print(f"📝 Prompt cache WRITE for {prompt_type} ({counts['cache_creation_input_tokens']} tokens cached)")
+        return counts
+
+    async def create_message(self, *, prompt_type: str, system_prompt: str, **params) -> Any:
+        """
+        Call Claude with the system prompt as a cached block and record usage.
+
+        Args:
+            prompt_type: Type of prompt, used for stats
+            system_prompt: The static system prompt to cache
+            **params: Remaining messages.create parameters (model, max_tokens, messages, ...)
+
+        Returns:
+            anthropic Message
+        """
+        from app.ai_ingredient_intelligence.logic.llm_gateway import create_message
+
+        response = await create_message(
+            system=self.system_blocks(prompt_type, system_prompt),
+            client=self.claude_client,
+            **params
+        )
+        self.record_usage(prompt_type, response)
+        return response
+
+    async def stream_message(self, *, prompt_type: str, system_prompt: str, **params) -> AsyncIterator[str]:
+        """
+        Streaming variant of create_message: yields text deltas, records usage at the end.
+        """
+        from app.ai_ingredient_intelligence.logic.llm_gateway import stream_text
+
+        async for text in stream_text(
+            system=self.system_blocks(prompt_type, system_prompt),
+            client=self.claude_client,
+            on_final=lambda message: self.record_usage(prompt_type, message),
+            **params
+        ):
+            yield text
+
+    async def get_or_create_cache(
+        self,
+        prompt_type: str,
+        system_prompt: str,
+        claude_client=None
+    ) -> Optional[str]:
+        """
+        Register a system prompt for caching and return its cache block ID.
+
+        Kept for callers that only need an identifier; the actual caching
+        happens when the prompt is sent via system_blocks()/create_message().
+
+        Returns:
+            Cache block ID string (SHA256 of the prompt)
+        """
+        self.system_blocks(prompt_type, system_prompt)
+        return self._get_prompt_hash(system_prompt)
+
     def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get statistics about cache usage.
-        
+
         Returns:
-            Dictionary with cache statistics
+            Dictionary with cache statistics; "usage" holds token counts and
+            hit rates per prompt type as reported by the API
         """
         total_entries = len(self._cache_store)
         valid_entries = 0
         expired_entries = 0
-        
+
         now = datetime.now()
         for entry in self._cache_store.values():
-            created_at = datetime.fromisoformat(entry['created_at'])
-            age = (now - created_at).total_seconds()
+            last_used = datetime.fromisoformat(entry.get('last_used_at', entry['created_at']))
+            age = (now - last_used).total_seconds()
             if age < entry.get('ttl', CACHE_TTL):
                 valid_entries += 1
             else:
                 expired_entries += 1
-        
+
+        usage = {}
+        for prompt_type, totals in self._usage.items():
+            prompt_tokens = totals["input_tokens"] + totals["cache_creation_input_tokens"] + totals["cache_read_input_tokens"]
+            usage[prompt_type] = {
+                **totals,
+                "hit_rate": round(totals["cache_hits"] / totals["calls"], 4) if totals["calls"] else 0.0,
+                "cached_token_ratio": round(totals["cache_read_input_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+            }
+
         return {
             "total_entries": total_entries,
             "valid_entries": valid_entries,
             "expired_entries": expired_entries,
-            "cache_types": list(set(e.get('prompt_type', 'unknown') for e in self._cache_store.values()))
+            "cache_types": list(set(e.get('prompt_type', 'unknown') for e in self._cache_store.values())),
+            "usage": usage
         }
-    
+
     def clear_cache(self, prompt_type: Optional[str] = None):
         """
-        Clear cache entries.
-        
+        Clear cache entries and usage counters.
+
         Args:
             prompt_type: If provided, only clear entries for this type. Otherwise clear all.
         """
@@ -192,10 +263,12 @@ class PromptCacheManager:
             ]
             for key in keys_to_remove:
                 del self._cache_store[key]
+            self._usage.pop(prompt_type, None)
             print(f"🗑️ Cleared {len(keys_to_remove)} cache entries for {prompt_type}")
         else:
             count = len(self._cache_store)
             self._cache_store.clear()
+            self._usage.clear()
             print(f"🗑️ Cleared all {count} cache entries")
 
 
@@ -206,10 +279,10 @@ _cache_manager: Optional[PromptCacheManager] = None
 def get_cache_manager(claude_client=None) -> PromptCacheManager:
     """
     Get or create the global cache manager instance.
-    
+
     Args:
         claude_client: Anthropic client (optional)
-        
+
     Returns:
         PromptCacheManager instance
     """
@@ -217,4 +290,3 @@ def get_cache_manager(claude_client=None) -> PromptCacheManager:
     if _cache_manager is None:
         _cache_manager = PromptCacheManager(claude_client=claude_client)
     return _cache_manager
-
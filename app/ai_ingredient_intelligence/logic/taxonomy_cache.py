@@ -0,0 +1,227 @@
+# app/ai_ingredient_intelligence/logic/taxonomy_cache.py
+"""
+Cached taxonomy service for functional categories and chemical classes.
+
+Both taxonomies are small trees stored as parent pointers (parent_id). The
+matcher used to walk them with one find_one per ancestor, per category id,
+per matched branded ingredient. This module loads each collection ONCE into
+a parent-pointer table and serves name paths (root -> leaf) from memory,
+memoized per id.
+
+Invalidation mirrors the branded index: a change stream on the two
+collections drops the cache, and when change streams are unavailable a
+version stamp (estimated count + newest _id) is re-checked every
+TAXONOMY_REFRESH_SECONDS.
+
+USAGE:
+    taxonomy = await get_taxonomy_cache()
+    paths = taxonomy.name_paths(FUNCTIONAL_CATEGORIES, doc["functional_category_ids"])
+"""
+
+import os
+import re
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId  # type: ignore
+
+from app.ai_ingredient_intelligence.db.mongodb import db
+
+FUNCTIONAL_CATEGORIES = "ingre_functional_categories"
+CHEMICAL_CLASSES = "ingre_chemical_classes"
+
+# Collection -> display name field
+TAXONOMY_NAME_FIELDS = {
+    FUNCTIONAL_CATEGORIES: "functionalName",
+    CHEMICAL_CLASSES: "chemicalClassName",
+}
+
+TAXONOMY_REFRESH_INTERVAL = int(os.getenv("TAXONOMY_REFRESH_SECONDS", "600"))
+
+
+class TaxonomyNode:
+    __slots__ = ("name", "normalized", "parent_id", "order")
+
+    def __init__(self, name: Optional[str], normalized: str, parent_id: Any, order: int):
+        self.name = name
+        self.normalized = normalized
+        self.parent_id = parent_id
+        self.order = order
+
+
+class TaxonomyCache:
+    """In-memory parent-pointer tables for the category taxonomies"""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict[Any, TaxonomyNode]] = {}
+        self._paths: Dict[str, Dict[Any, List[Optional[str]]]] = {}
+        self.version: Optional[Tuple] = None
+        self.last_checked: float = 0.0
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    async def _compute_version(self) -> Tuple:
+        stamp = []
+        for collection_name in TAXONOMY_NAME_FIELDS:
+            col = db[collection_name]
+            count = await col.estimated_document_count()
+            newest = await col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            stamp.append((count, newest["_id"] if newest else None))
+        return tuple(stamp)
+
+    async def rebuild(self):
+        """Load both taxonomy collections into parent-pointer tables"""
+        version = await self._compute_version()
+        nodes: Dict[str, Dict[Any, TaxonomyNode]] = {}
+        for collection_name, name_field in TAXONOMY_NAME_FIELDS.items():
+            table: Dict[Any, TaxonomyNode] = {}
+            projection = {name_field: 1, f"{name_field}_normalized": 1, "parent_id": 1}
+            async for doc in db[collection_name].find({}, projection):
+                name = doc.get(name_field)
+                normalized = doc.get(f"{name_field}_normalized") or (name or "").strip().lower()
+                table[doc["_id"]] = TaxonomyNode(name, normalized, doc.get("parent_id"), len(table))
+            nodes[collection_name] = table
+
+        self.nodes = nodes
+        self._paths = {collection_name: {} for collection_name in TAXONOMY_NAME_FIELDS}
+        self.version = version
+        self.last_checked = time.time()
+        print("[OK] Taxonomy cache loaded: "
+              + ", ".join(f"{name}={len(table)}" for name, table in nodes.items()))
+
+    async def ensure_fresh(self):
+        """Load on first use; afterwards rely on the change stream or periodic version stamps"""
+        if self.loaded:
+            watching = self._watch_task is not None and not self._watch_task.done()
+            if watching or time.time() - self.last_checked < TAXONOMY_REFRESH_INTERVAL:
+                return
+
+        async with self._lock:
+            if not self.loaded:
+                await self.rebuild()
+                return
+            if time.time() - self.last_checked < TAXONOMY_REFRESH_INTERVAL:
+                return
+            version = await self._compute_version()
+            self.last_checked = time.time()
+            if version != self.version:
+                await self.rebuild()
+
+    def invalidate(self):
+        """Drop the cache; it is reloaded on next use"""
+        self.version = None
+
+    async def _watch(self):
+        try:
+            pipeline = [{"$match": {"ns.coll": {"$in": list(TAXONOMY_NAME_FIELDS)}}}]
+            async with db.watch(pipeline) as stream:
+                async for _change in stream:
+                    self.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WARNING] Taxonomy change stream unavailable ({type(e).__name__}: {e}); "
+                  f"falling back to version stamp checks every {TAXONOMY_REFRESH_INTERVAL}s")
+
+    def start_watching(self):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task is not None and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _path(self, collection_name: str, cid: Any) -> List[Optional[str]]:
+        paths = self._paths.setdefault(collection_name, {})
+        cached = paths.get(cid)
+        if cached is not None:
+            return cached
+
+        table = self.nodes.get(collection_name, {})
+        path: List[Optional[str]] = []
+        seen = set()
+        current = table.get(cid)
+        while current is not None and current.order not in seen:  # guard against parent cycles
+            seen.add(current.order)
+            path.insert(0, current.name)
+            current = table.get(current.parent_id) if current.parent_id else None
+
+        paths[cid] = path
+        return path
+
+    def name_paths(self, collection_name: str, category_ids: List[Any]) -> List[List[Optional[str]]]:
+        """
+        Name paths (root -> leaf) for each category id.
+        Example: [["Colorants", "Organic Colorants", "Natural Organic Colorants"]]
+        Invalid ids are skipped; unknown ids yield an empty path.
+        """
+        results = []
+        for cid in category_ids or []:
+            if not isinstance(cid, ObjectId):
+                try:
+                    cid = ObjectId(cid)
+                except Exception:
+                    continue
+            results.append(list(self._path(collection_name, cid)))
+        return results
+
+    def names(self, collection_name: str, category_ids: List[Any]) -> List[str]:
+        """Display names for the given ids (deduplicated, in collection order)"""
+        table = self.nodes.get(collection_name, {})
+        found = {cid: table[cid] for cid in category_ids or [] if cid in table}
+        return [node.name or "" for node in sorted(found.values(), key=lambda node: node.order)]
+
+    def ids_matching_names(self, collection_name: str, category_names: List[str]) -> List[Any]:
+        """
+        Ids whose normalized name equals one of category_names, or whose display
+        name matches any of them case-insensitively (same semantics as the old
+        $or of $in / $regex query), in collection order.
+        """
+        normalized_names = [name.strip().lower() for name in category_names if name]
+        if not normalized_names:
+            return []
+        wanted = set(normalized_names)
+        pattern = re.compile("|".join(normalized_names), re.IGNORECASE)
+        table = self.nodes.get(collection_name, {})
+        return [
+            cid for cid, node in table.items()
+            if node.normalized in wanted or (node.name and pattern.search(node.name))
+        ]
+
+
+# Global taxonomy cache instance
+_taxonomy_cache: Optional[TaxonomyCache] = None
+
+
+def get_taxonomy_cache_instance() -> TaxonomyCache:
+    """Get the global taxonomy cache without loading it"""
+    global _taxonomy_cache
+    if _taxonomy_cache is None:
+        _taxonomy_cache = TaxonomyCache()
+    return _taxonomy_cache
+
+
+async def get_taxonomy_cache() -> TaxonomyCache:
+    """
+    Get the global taxonomy cache, loading or refreshing it if needed.
+
+    Returns:
+        TaxonomyCache instance ready for queries
+    """
+    cache = get_taxonomy_cache_instance()
+    await cache.ensure_fresh()
+    return cache
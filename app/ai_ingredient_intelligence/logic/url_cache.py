@@ -0,0 +1,176 @@
+# app/ai_ingredient_intelligence/logic/url_cache.py
+"""
+Persistent cache of URL ingredient extractions, keyed by canonical product URL.
+
+The same Amazon / Nykaa / Flipkart products arrive again and again through
+/analyze-url, /compare-products, inspiration boards and make-a-wish
+reference URLs - each time costing a scrape plus one or two LLM calls, and
+each time under a slightly different URL (tracking params, affiliate tags,
+mobile hosts, SEO slugs). This module:
+
+- canonicalize_url(): one URL per product - Amazon /dp/<ASIN>, Nykaa
+  /p/<id>, Flipkart /p/<itm>?pid=<pid>, otherwise the URL without tracking
+  params, fragment, "www."/"m." prefixes and with sorted query params
+- cached_extraction(): serves URLScraper.extract_ingredients_from_url
+  results (ingredients, product name, image, platform, ...) from
+  TwoTierCache("url_extraction_cache") and coalesces concurrent requests
+  for the same product into one scrape. refresh=True skips the lookup and
+  overwrites the entry.
+
+Only results with ingredients are cached; AI-estimated lists get a shorter TTL.
+
+Environment:
+    URL_CACHE_ENABLED               (true)
+    URL_CACHE_TTL_SECONDS           direct extractions (7 days)
+    URL_CACHE_ESTIMATED_TTL_SECONDS AI-search estimates (1 day)
+
+USAGE:
+    result = await cached_extraction(url, lambda: scraper._extract_ingredients_from_url(url), refresh=False)
+"""
+
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from app.ai_ingredient_intelligence.logic.cache_store import Coalescer, TwoTierCache
+
+URL_CACHE_ENABLED = os.getenv("URL_CACHE_ENABLED", "true").lower() == "true"
+URL_CACHE_TTL = int(os.getenv("URL_CACHE_TTL_SECONDS", str(7 * 86400)))
+URL_CACHE_ESTIMATED_TTL = int(os.getenv("URL_CACHE_ESTIMATED_TTL_SECONDS", str(86400)))
+# Bump when the extraction pipeline changes in a way that invalidates old results
+URL_CACHE_VERSION = "v1"
+
+_extraction_cache = TwoTierCache(
+    "url_extraction_cache",
+    namespace="extraction",
+    ttl_seconds=URL_CACHE_TTL,
+    maxsize=int(os.getenv("URL_CACHE_MEMORY_SIZE", "2000"))
+)
+_coalescer = Coalescer()
+_stats = {"hits": 0, "misses": 0, "refreshes": 0, "coalesced": 0}
+
+# Query parameters that never identify a product
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "dclid", "yclid", "igshid", "mc_cid", "mc_eid", "srsltid",
+    "ref", "ref_", "tag", "psc", "th", "smid", "qid", "sr", "keywords", "crid", "sprefix",
+    "content-id", "linkcode", "linkid", "creative", "creativeasin", "ascsubtag",
+    "pps", "ptype", "intcmp", "affiliate", "aff_id", "spm", "_pos", "_sid", "_ss", "_psq", "_v",
+    "lid", "marketplace", "store", "srno", "otracker", "otracker1", "fm", "iid", "ppt", "ppn", "ssid", "qh",
+}
+TRACKING_PREFIXES = ("utm_", "pf_rd_", "pd_rd_", "_encoding", "trk")
+
+_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d|product|d)/([A-Z0-9]{10})(?:[/?]|$)", re.IGNORECASE)
+_NYKAA_ID = re.compile(r"/p/(\d+)")
+_FLIPKART_ITEM = re.compile(r"/p/(itm[0-9a-z]+)", re.IGNORECASE)
+
+
+def _host(netloc: str) -> str:
+    host = netloc.lower().split("@")[-1].split(":")[0]
+    for prefix in ("www.", "m.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+def canonicalize_url(url: str) -> str:
+    """Stable identity of a product URL (used as the cache key)"""
+    parsed = urlparse(url.strip())
+    host = _host(parsed.netloc)
+    query = dict(parse_qsl(parsed.query, keep_blank_values=False))
+
+    if "amazon." in host:
+        match = _ASIN.search(parsed.path)
+        if match:
+            return f"https://{host}/dp/{match.group(1).upper()}"
+    elif "nykaa" in host:
+        match = _NYKAA_ID.search(parsed.path)
+        product_id = match.group(1) if match else query.get("productId")
+        if product_id:
+            sku = query.get("skuId")
+            suffix = f"?skuId={sku}" if sku and sku != product_id else ""
+            return f"https://{host}/p/{product_id}{suffix}"
+    elif "flipkart" in host:
+        match = _FLIPKART_ITEM.search(parsed.path)
+        if match:
+            pid = query.get("pid")
+            return f"https://{host}/p/{match.group(1).lower()}" + (f"?pid={pid}" if pid else "")
+
+    kept = sorted(
+        (key, value) for key, value in query.items()
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = re.sub(r"/{2,}", "/", parsed.path).rstrip("/") or "/"
+    return urlunparse(("https", host, path, "", urlencode(kept), ""))
+
+
+def _cache_key(url: str) -> str:
+    return f"{URL_CACHE_VERSION}:{canonicalize_url(url)}"
+
+
+def _cacheable(result: Dict[str, Any]) -> bool:
+    return bool(isinstance(result, dict) and result.get("ingredients"))
+
+
+async def cached_extraction(
+    url: str,
+    extract: Callable[[], Awaitable[Dict[str, Any]]],
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Cached / coalesced extract_ingredients_from_url.
+
+    Args:
+        url: Product URL as given by the caller
+        extract: Coroutine factory doing the real scrape + extraction
+        refresh: Ignore any cached entry and re-scrape (the new result replaces it)
+
+    Returns:
+        The extraction dict, with "url" set to the caller's URL and
+        "cache_hit" telling whether it came from the cache
+    """
+    if not URL_CACHE_ENABLED:
+        return await extract()
+
+    key = _cache_key(url)
+    if refresh:
+        _stats["refreshes"] += 1
+    else:
+        hit, cached = await _extraction_cache.get(key)
+        if hit and cached:
+            _stats["hits"] += 1
+            print(f"💾 URL extraction cache HIT for {canonicalize_url(url)}")
+            return {**cached, "url": url, "cache_hit": True}
+
+    ran = False
+
+    async def scrape_and_store():
+        nonlocal ran
+        ran = True
+        _stats["misses"] += 1
+        result = await extract()
+        if _cacheable(result):
+            ttl = URL_CACHE_ESTIMATED_TTL if result.get("is_estimated") else URL_CACHE_TTL
+            await _extraction_cache.set(key, {k: v for k, v in result.items() if k != "cache_hit"}, ttl_seconds=ttl)
+        return result
+
+    # Refreshes get their own flight so they never reuse a stale in-flight scrape
+    flight_key = f"refresh:{key}" if refresh else key
+    result = await _coalescer.run(flight_key, scrape_and_store)
+    if not ran:
+        _stats["coalesced"] += 1
+    return {**result, "url": url, "cache_hit": False}
+
+
+async def invalidate_url(url: str):
+    """Drop the cached extraction for a product URL"""
+    await _extraction_cache.delete(_cache_key(url))
+
+
+def get_url_cache_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+        "cache": _extraction_cache.get_stats(),
+    }
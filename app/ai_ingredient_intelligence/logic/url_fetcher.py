@@ -3,6 +3,7 @@ URL Fetcher for Inspiration Boards - Wraps URLScraper to fetch product data
 """
 from typing import Dict, Any, Optional, List
 from app.ai_ingredient_intelligence.logic.url_scraper import URLScraper
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, get_llm_client
 import os
 import json
 import re
@@ -20,7 +21,8 @@ claude_model = os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-s
 
 if ANTHROPIC_AVAILABLE and claude_api_key:
     try:
-        claude_client = anthropic.Anthropic(api_key=claude_api_key)
+        # Shared AsyncAnthropic client from the LLM gateway (pooled, non-blocking)
+        claude_client = get_llm_client()
     except Exception as e:
         print(f"Warning: Could not initialize Claude client: {e}")
         claude_client = None
@@ -28,10 +30,14 @@ else:
     claude_client = None
 
 
-async def fetch_product_from_url(url: str) -> Dict[str, Any]:
+async def fetch_product_from_url(url: str, refresh: bool = False) -> Dict[str, Any]:
     """
     Fetch product data from e-commerce URL
     
+    Args:
+        url: Product page URL
+        refresh: Re-scrape even if the URL's extraction is cached
+    
     Returns:
         Dict with product information including name, brand, price, etc.
     """
@@ -42,7 +48,7 @@ async def fetch_product_from_url(url: str) -> Dict[str, Any]:
         platform = _detect_platform(url)
         
         # Extract ingredients and basic info
-        result = await scraper.extract_ingredients_from_url(url)
+        result = await scraper.extract_ingredients_from_url(url, refresh=refresh)
         
         # Parse the result
         # Extract product image from result, fallback to emoji if not found
@@ -540,7 +546,7 @@ Valid Tags (choose from these):
 Return JSON with "category" (string, required), "benefits" (array, at least 3 items), "tags" (array), and "target_audience" (array)."""
 
         # Call Claude API
-        response = claude_client.messages.create(
+        response = await create_message(
             model=claude_model,
             max_tokens=2048,
             temperature=0.3,
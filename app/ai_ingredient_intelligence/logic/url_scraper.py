@@ -11,207 +11,192 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
-from anthropic import Anthropic, APIError, APIStatusError, BadRequestError, RateLimitError
+from anthropic import AsyncAnthropic, APIError, APIStatusError, BadRequestError, RateLimitError
 import os
 
+from app.ai_ingredient_intelligence.logic.llm_gateway import create_message, get_llm_client
+from app.ai_ingredient_intelligence.logic.browser_pool import get_browser_pool
+from app.ai_ingredient_intelligence.logic.http_scraper import SCRAPE_HTTP_FIRST, fetch_product_page
+from app.ai_ingredient_intelligence.logic.page_waits import INGREDIENT_PANELS, SCRAPE_POLL_SECONDS, PageWaiter, record_scrape_waits
+
+
+_chromedriver_path: Optional[str] = None
+
+
+def create_chrome_driver() -> webdriver.Chrome:
+    """
+    Launch a configured headless Chrome (blocking - run it in an executor).
+
+    Used by the browser pool (browser_pool.py); the ChromeDriverManager
+    download check runs once per process, not per browser.
+    """
+    global _chromedriver_path
+    import subprocess
+    import platform
+
+    chrome_options = Options()
+
+    # Check if running on server (headless mode) or local (visible browser)
+    # Use environment variable HEADLESS_MODE or default to True for servers
+    headless_mode = os.getenv("HEADLESS_MODE", "true").lower() == "true"
+
+    if headless_mode:
+        # Server deployment - use headless mode
+        chrome_options.add_argument("--headless=new")  # New headless mode
+        chrome_options.add_argument("--disable-gpu")
+        print("Running in headless mode (server deployment)")
+    else:
+        # Local development - visible browser
+        chrome_options.add_argument("--start-maximized")
+        print("Running in visible mode (local development)")
+
+    # Essential options for both local and server
+    chrome_options.add_argument("--no-sandbox")  # Required for server/Linux
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--window-size=1920,1080")  # Set window size for consistency
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-software-rasterizer")
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+
+    # Additional Linux server options
+    chrome_options.add_argument("--disable-setuid-sandbox")
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--disable-features=IsolateOrigins,site-per-process")
+    chrome_options.add_argument("--single-process")  # Run in single process mode (helps on some servers)
+
+    # User agent
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+    # Experimental options
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    # Try to find Chrome binary on Linux servers
+    chrome_binary = None
+    if platform.system() == "Linux":
+        # Try common Chrome/Chromium paths
+        possible_paths = [
+            "/usr/bin/google-chrome",
+            "/usr/bin/google-chrome-stable",
+            "/usr/bin/chromium",
+            "/usr/bin/chromium-browser",
+            "/snap/bin/chromium"
+        ]
+        for path in possible_paths:
+            if os.path.exists(path):
+                chrome_binary = path
+                print(f"Found Chrome binary at: {chrome_binary}")
+                break
+
+        if chrome_binary:
+            chrome_options.binary_location = chrome_binary
+        else:
+            # Try to find via which command
+            try:
+                result = subprocess.run(
+                    ["which", "google-chrome"],
+                    capture_output=True,
+                    text=True,
+                    timeout=2
+                )
+                if result.returncode == 0 and result.stdout.strip():
+                    chrome_binary = result.stdout.strip()
+                    chrome_options.binary_location = chrome_binary
+                    print(f"Found Chrome via which: {chrome_binary}")
+            except:
+                pass
+
+            if not chrome_binary:
+                try:
+                    result = subprocess.run(
+                        ["which", "chromium-browser"],
+                        capture_output=True,
+                        text=True,
+                        timeout=2
+                    )
+                    if result.returncode == 0 and result.stdout.strip():
+                        chrome_binary = result.stdout.strip()
+                        chrome_options.binary_location = chrome_binary
+                        print(f"Found Chromium via which: {chrome_binary}")
+                except:
+                    pass
+
+    # Use webdriver-manager to automatically download and manage ChromeDriver
+    try:
+        if _chromedriver_path is None:
+            _chromedriver_path = ChromeDriverManager().install()
+        service = Service(_chromedriver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception as e:
+        # Fallback: try without service (if ChromeDriver is in PATH)
+        print(f"Warning: ChromeDriverManager failed, trying direct: {e}")
+        try:
+            driver = webdriver.Chrome(options=chrome_options)
+        except Exception as e2:
+            error_msg = str(e2)
+            install_instructions = ""
+            if platform.system() == "Linux":
+                install_instructions = (
+                    "\n\nTo fix on Linux server, run:\n"
+                    "sudo apt-get update\n"
+                    "sudo apt-get install -y google-chrome-stable\n"
+                    "OR\n"
+                    "sudo apt-get install -y chromium-browser chromium-chromedriver\n"
+                    "\nIf Chrome is installed but not found, check:\n"
+                    "1. Chrome binary location: which google-chrome\n"
+                    "2. Set CHROME_BIN environment variable if Chrome is in non-standard location\n"
+                    "3. Ensure all Chrome dependencies are installed:\n"
+                    "   sudo apt-get install -y libnss3 libatk-bridge2.0-0 libdrm2 libxkbcommon0 libxcomposite1 libxdamage1 libxfixes3 libxrandr2 libgbm1 libasound2"
+                )
+            raise Exception(
+                f"Failed to initialize Chrome driver: {error_msg}\n"
+                f"Server deployment requires:\n"
+                f"1. Chrome browser installed\n"
+                f"2. ChromeDriver available (webdriver-manager will download it)\n"
+                f"3. Set HEADLESS_MODE=true in environment variables{install_instructions}"
+            )
+
+    # Execute script to hide webdriver property
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            'source': '''
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                })
+            '''
+        })
+    except:
+        pass  # Non-critical, continue anyway
+
+    return driver
+
 
 class URLScraper:
     def __init__(self):
-        """Initialize the URL scraper - Anthropic client is lazy-loaded only when needed"""
-        self.claude_client: Optional[Anthropic] = None
-        self.driver: Optional[webdriver.Chrome] = None
+        """
+        Initialize the URL scraper - Anthropic client is lazy-loaded only when needed.
+        Browsers are leased per scrape from the shared pool (browser_pool.py).
+        """
+        self.claude_client: Optional[AsyncAnthropic] = None
     
     def _get_claude_client(self):
-        """Lazy-load Claude client only when needed for ingredient extraction"""
+        """Lazy-load the shared async Claude client (see llm_gateway.py) only when needed"""
         if self.claude_client is None:
             claude_key = os.getenv("CLAUDE_API_KEY")
             if not claude_key:
                 raise Exception("CLAUDE_API_KEY environment variable is not set")
             try:
-                self.claude_client = Anthropic(api_key=claude_key)
+                self.claude_client = get_llm_client()
             except Exception as e:
                 raise Exception(f"Failed to initialize Claude client: {str(e)}")
         return self.claude_client
         
-    async def _get_driver(self):
-        """Initialize Selenium Chrome driver (runs in executor for async compatibility)"""
-        if self.driver is None:
-            loop = asyncio.get_event_loop()
-            
-            def init_driver():
-                import subprocess
-                import platform
-                
-                chrome_options = Options()
-                
-                # Check if running on server (headless mode) or local (visible browser)
-                # Use environment variable HEADLESS_MODE or default to True for servers
-                headless_mode = os.getenv("HEADLESS_MODE", "true").lower() == "true"
-                
-                if headless_mode:
-                    # Server deployment - use headless mode
-                    chrome_options.add_argument("--headless=new")  # New headless mode
-                    chrome_options.add_argument("--disable-gpu")
-                    print("Running in headless mode (server deployment)")
-                else:
-                    # Local development - visible browser
-                    chrome_options.add_argument("--start-maximized")
-                    print("Running in visible mode (local development)")
-                
-                # Essential options for both local and server
-                chrome_options.add_argument("--no-sandbox")  # Required for server/Linux
-                chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-                chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-                chrome_options.add_argument("--window-size=1920,1080")  # Set window size for consistency
-                chrome_options.add_argument("--disable-extensions")
-                chrome_options.add_argument("--disable-software-rasterizer")
-                chrome_options.add_argument("--disable-background-timer-throttling")
-                chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-                chrome_options.add_argument("--disable-renderer-backgrounding")
-                
-                # Additional Linux server options
-                chrome_options.add_argument("--disable-setuid-sandbox")
-                chrome_options.add_argument("--disable-web-security")
-                chrome_options.add_argument("--disable-features=IsolateOrigins,site-per-process")
-                chrome_options.add_argument("--single-process")  # Run in single process mode (helps on some servers)
-                
-                # User agent
-                chrome_options.add_argument("user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-                
-                # Experimental options
-                chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-                chrome_options.add_experimental_option('useAutomationExtension', False)
-                
-                # Try to find Chrome binary on Linux servers
-                chrome_binary = None
-                if platform.system() == "Linux":
-                    # Try common Chrome/Chromium paths
-                    possible_paths = [
-                        "/usr/bin/google-chrome",
-                        "/usr/bin/google-chrome-stable",
-                        "/usr/bin/chromium",
-                        "/usr/bin/chromium-browser",
-                        "/snap/bin/chromium"
-                    ]
-                    for path in possible_paths:
-                        if os.path.exists(path):
-                            chrome_binary = path
-                            print(f"Found Chrome binary at: {chrome_binary}")
-                            break
-                    
-                    if chrome_binary:
-                        chrome_options.binary_location = chrome_binary
-                    else:
-                        # Try to find via which command
-                        try:
-                            result = subprocess.run(
-                                ["which", "google-chrome"],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            if result.returncode == 0 and result.stdout.strip():
-                                chrome_binary = result.stdout.strip()
-                                chrome_options.binary_location = chrome_binary
-                                print(f"Found Chrome via which: {chrome_binary}")
-                        except:
-                            pass
-                        
-                        if not chrome_binary:
-                            try:
-                                result = subprocess.run(
-                                    ["which", "chromium-browser"],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                if result.returncode == 0 and result.stdout.strip():
-                                    chrome_binary = result.stdout.strip()
-                                    chrome_options.binary_location = chrome_binary
-                                    print(f"Found Chromium via which: {chrome_binary}")
-                            except:
-                                pass
-                
-                # Use webdriver-manager to automatically download and manage ChromeDriver
-                try:
-                    service = Service(ChromeDriverManager().install())
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                except Exception as e:
-                    # Fallback: try without service (if ChromeDriver is in PATH)
-                    print(f"Warning: ChromeDriverManager failed, trying direct: {e}")
-                    try:
-                        driver = webdriver.Chrome(options=chrome_options)
-                    except Exception as e2:
-                        error_msg = str(e2)
-                        install_instructions = ""
-                        if platform.system() == "Linux":
-                            install_instructions = (
-                                "\n\nTo fix on Linux server, run:\n"
-                                "sudo apt-get update\n"
-                                "sudo apt-get install -y google-chrome-stable\n"
-                                "OR\n"
-                                "sudo apt-get install -y chromium-browser chromium-chromedriver\n"
-                                "\nIf Chrome is installed but not found, check:\n"
-                                "1. Chrome binary location: which google-chrome\n"
-                                "2. Set CHROME_BIN environment variable if Chrome is in non-standard location\n"
-                                "3. Ensure all Chrome dependencies are installed:\n"
-                                "   sudo apt-get install -y libnss3 libatk-bridge2.0-0 libdrm2 libxkbcommon0 libxcomposite1 libxdamage1 libxfixes3 libxrandr2 libgbm1 libasound2"
-                            )
-                        raise Exception(
-                            f"Failed to initialize Chrome driver: {error_msg}\n"
-                            f"Server deployment requires:\n"
-                            f"1. Chrome browser installed\n"
-                            f"2. ChromeDriver available (webdriver-manager will download it)\n"
-                            f"3. Set HEADLESS_MODE=true in environment variables{install_instructions}"
-                        )
-                
-                # Execute script to hide webdriver property
-                try:
-                    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                        'source': '''
-                            Object.defineProperty(navigator, 'webdriver', {
-                                get: () => undefined
-                            })
-                        '''
-                    })
-                except:
-                    pass  # Non-critical, continue anyway
-                
-                return driver
-            
-            try:
-                self.driver = await loop.run_in_executor(None, init_driver)
-            except Exception as e:
-                error_msg = str(e)
-                if "chromedriver" in error_msg.lower() or "executable" in error_msg.lower() or "session not created" in error_msg.lower():
-                    raise Exception(
-                        f"ChromeDriver error: {error_msg}\n"
-                        f"For server deployment, ensure:\n"
-                        f"1. Chrome/Chromium is installed and accessible\n"
-                        f"2. Set HEADLESS_MODE=true in environment variables\n"
-                        f"3. ChromeDriver is available (webdriver-manager will download it)\n"
-                        f"4. On Linux: Install Chrome dependencies (see error message above)"
-                    )
-                else:
-                    raise Exception(f"Failed to initialize Chrome driver: {error_msg}")
-            
-        return self.driver
-    
-    async def _close_driver(self):
-        """Close the Selenium driver"""
-        if self.driver:
-            loop = asyncio.get_event_loop()
-            try:
-                await loop.run_in_executor(None, self.driver.quit)
-            except:
-                pass
-            self.driver = None
-    
     def _detect_platform(self, url: str) -> str:
         """Detect the e-commerce platform from URL - extracts actual platform name from domain"""
         from urllib.parse import urlparse
@@ -260,14 +245,14 @@ class URLScraper:
             # Fallback to generic only if we can't parse the URL
             return "generic"
     
-    async def _scrape_amazon(self, driver: webdriver.Chrome) -> str:
+    async def _scrape_amazon(self, driver: webdriver.Chrome, waiter: Optional[PageWaiter] = None) -> str:
         """Scrape ingredients from Amazon product page"""
         try:
             loop = asyncio.get_event_loop()
             
             def scrape():
-                wait = WebDriverWait(driver, 10)
-                
+                # The product page is already rendered (PageWaiter.ready in scrape_url),
+                # so missing sections are simply absent - no per-selector waits
                 # Try multiple selectors for ingredients/description
                 selectors = [
                     "#feature-bullets ul",
@@ -281,13 +266,11 @@ class URLScraper:
                 text_parts = []
                 for selector in selectors:
                     try:
-                        elements = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector)))
+                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
                         for element in elements:
                             text = element.text.strip()
                             if text and len(text) > 20:
                                 text_parts.append(text)
-                    except TimeoutException:
-                        continue
                     except:
                         continue
                 
@@ -300,24 +283,22 @@ class URLScraper:
             return await loop.run_in_executor(None, scrape)
         except Exception as e:
             print(f"Error scraping Amazon: {e}")
-            if self.driver:
+            if driver:
                 loop = asyncio.get_event_loop()
                 return await loop.run_in_executor(None, lambda: driver.find_element(By.TAG_NAME, "body").text)
             return ""
     
-    async def _scrape_nykaa(self, driver: webdriver.Chrome) -> str:
+    async def _scrape_nykaa(self, driver: webdriver.Chrome, waiter: Optional[PageWaiter] = None) -> str:
         """Scrape ingredients and product details from Nykaa product page"""
+        waiter = waiter or PageWaiter(driver)
         try:
             loop = asyncio.get_event_loop()
             
             def scrape():
-                import time
                 from bs4 import BeautifulSoup
                 
                 # Wait for page to load
-                wait = WebDriverWait(driver, 10)
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#app")))
-                time.sleep(2)
+                waiter.present([(By.CSS_SELECTOR, "#app")])
                 
                 text_parts = []
                 
@@ -499,7 +480,7 @@ class URLScraper:
                 
                 # Scroll down to load content
                 driver.execute_script("window.scrollBy(0, 500);")
-                time.sleep(1)
+                waiter.network_idle()
                 
                 # SECOND: Extract from Ingredients tab - try multiple ways to find it
                 ingredients_found = False
@@ -516,28 +497,21 @@ class URLScraper:
                 for pattern in ingredient_tab_patterns:
                     try:
                         ingredients_tab = driver.find_element(By.XPATH, pattern)
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", ingredients_tab)
-                        time.sleep(0.5)
+                        # The tab swaps the text of the shared content panel (Description is open by default)
+                        before = "".join(e.text for e in driver.find_elements(By.ID, "content-details")[:1]).strip()
+                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", ingredients_tab)
                         driver.execute_script("arguments[0].click();", ingredients_tab)
-                        time.sleep(2)  # Wait longer for content to load
                         
-                        # Wait for content to appear - try multiple selectors
+                        # Wait until a content panel shows the new text - try multiple selectors
                         content_selectors = [
                             (By.ID, "content-details"),
+                            *INGREDIENT_PANELS["nykaa"][1:],
                             (By.CSS_SELECTOR, "[id*='content']"),
-                            (By.CSS_SELECTOR, "[class*='content']"),
-                            (By.CSS_SELECTOR, "[class*='ingredient']"),
-                            (By.CSS_SELECTOR, "[id*='ingredient']")
+                            (By.CSS_SELECTOR, "[class*='content']")
                         ]
                         
-                        content_element = None
-                        for selector_type, selector_value in content_selectors:
-                            try:
-                                wait.until(EC.presence_of_element_located((selector_type, selector_value)))
-                                content_element = driver.find_element(selector_type, selector_value)
-                                break
-                            except:
-                                continue
+                        populated = waiter.populated(content_selectors, min_chars=10, previous=before or None)
+                        content_element = populated[0] if populated else None
                         
                         if content_element:
                             html = content_element.get_attribute("innerHTML")
@@ -567,13 +541,12 @@ class URLScraper:
                 # THIRD: Extract from Description tab
                 try:
                     desc_tab = driver.find_element(By.XPATH, "//h3[normalize-space()='Description']")
+                    before = "".join(e.text for e in driver.find_elements(By.ID, "content-details")[:1]).strip()
                     driver.execute_script("arguments[0].scrollIntoView(true);", desc_tab)
-                    time.sleep(0.5)
                     driver.execute_script("arguments[0].click();", desc_tab)
-                    time.sleep(1.5)
                     
-                    wait.until(EC.presence_of_element_located((By.ID, "content-details")))
-                    block = driver.find_element(By.ID, "content-details")
+                    populated = waiter.populated([(By.ID, "content-details")], previous=before or None)
+                    block = populated[0] if populated else driver.find_element(By.ID, "content-details")
                     html = block.get_attribute("innerHTML")
                     soup = BeautifulSoup(html, "html.parser")
                     
@@ -612,16 +585,15 @@ class URLScraper:
             return await loop.run_in_executor(None, scrape)
         except Exception as e:
             print(f"Error scraping Nykaa: {e}")
-            if self.driver:
+            if driver:
                 loop = asyncio.get_event_loop()
                 return await loop.run_in_executor(None, lambda: driver.find_element(By.TAG_NAME, "body").text)
             return ""
     
-    async def _scrape_flipkart(self, driver: webdriver.Chrome) -> str:
+    async def _scrape_flipkart(self, driver: webdriver.Chrome, waiter: Optional[PageWaiter] = None) -> str:
         """Scrape ingredients from Flipkart product page"""
         try:
-            await asyncio.sleep(2)  # Give JS time to render
-            
+            waiter = waiter or PageWaiter(driver)
             loop = asyncio.get_event_loop()
             
             def scrape():
@@ -633,6 +605,9 @@ class URLScraper:
                     ".product-details"
                 ]
                 
+                # Descriptions render after the header; done as soon as one has text
+                waiter.text_filled([(By.CSS_SELECTOR, selector) for selector in selectors], min_chars=21)
+                
                 text_parts = []
                 for selector in selectors:
                     try:
@@ -652,23 +627,19 @@ class URLScraper:
             return await loop.run_in_executor(None, scrape)
         except Exception as e:
             print(f"Error scraping Flipkart: {e}")
-            if self.driver:
+            if driver:
                 loop = asyncio.get_event_loop()
                 return await loop.run_in_executor(None, lambda: driver.find_element(By.TAG_NAME, "body").text)
             return ""
     
-    async def _scrape_thedermaco(self, driver: webdriver.Chrome) -> str:
+    async def _scrape_thedermaco(self, driver: webdriver.Chrome, waiter: Optional[PageWaiter] = None) -> str:
         """Scrape ingredients from The Derma Co product page - specific handler for their tab structure"""
         print("🚀 THE DERMA CO SCRAPER CALLED - Starting extraction...")
+        waiter = waiter or PageWaiter(driver)
         try:
-            await asyncio.sleep(2)  # Give JS time to render
-            
             loop = asyncio.get_event_loop()
             
             def scrape():
-                import time
-                
-                wait = WebDriverWait(driver, 15)
                 text_parts = []
                 
                 print("🔍 The Derma Co: Looking for Ingredients List tab...")
@@ -733,10 +704,11 @@ class URLScraper:
                                 text = elem.text.strip().lower()
                                 if 'ingredient' in text or 'list' in text or 'composition' in text:
                                     print(f"   Trying to click: {elem.text.strip()[:50]}")
-                                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", elem)
-                                    time.sleep(0.3)
+                                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
                                     driver.execute_script("arguments[0].click();", elem)
-                                    time.sleep(2)  # Wait for content to load
+                                    # Stop clicking as soon as an ingredient list shows up
+                                    if waiter.ingredient_list_visible():
+                                        break
                             except:
                                 continue
                     except Exception as e:
@@ -744,31 +716,29 @@ class URLScraper:
                 else:
                     # Click the tab
                     try:
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", ingredient_tab)
-                        time.sleep(0.5)
+                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", ingredient_tab)
                         
                         # Click using JavaScript (more reliable)
                         driver.execute_script("arguments[0].click();", ingredient_tab)
                         print("✅ Clicked Ingredients List tab")
-                        time.sleep(4)  # Wait longer for content to load
                         
-                        # Also try regular click as backup
-                        try:
-                            ingredient_tab.click()
-                            time.sleep(2)
-                        except:
-                            pass
+                        # Also try regular click as backup, only if the list did not appear
+                        if not waiter.ingredient_list_visible():
+                            try:
+                                ingredient_tab.click()
+                                waiter.ingredient_list_visible()
+                            except:
+                                pass
                     except Exception as e:
                         print(f"⚠️ Error clicking tab: {e}")
                 
                 # Now extract the ingredient content
                 print("🔍 Extracting ingredient content...")
                 
-                # Scroll to ensure all content is visible
+                # Scroll to ensure all content is visible (lazy sections load on scroll)
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
+                waiter.network_idle()
                 driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(1)
                 
                 # Method 1: Get all visible text and find the longest comma-separated line
                 body_text = driver.find_element(By.TAG_NAME, "body").text
@@ -970,20 +940,17 @@ class URLScraper:
             import traceback
             traceback.print_exc()
             # Fallback to generic
-            return await self._scrape_generic(driver)
+            return await self._scrape_generic(driver, waiter)
     
-    async def _scrape_generic(self, driver: webdriver.Chrome) -> str:
+    async def _scrape_generic(self, driver: webdriver.Chrome, waiter: Optional[PageWaiter] = None) -> str:
         """Scrape ingredients from generic e-commerce page - clicks accordions to find ingredient lists"""
+        waiter = waiter or PageWaiter(driver)
         try:
-            await asyncio.sleep(2)  # Give JS time to render
-            
             loop = asyncio.get_event_loop()
             
             def scrape():
-                import time
                 from bs4 import BeautifulSoup
                 
-                wait = WebDriverWait(driver, 10)
                 text_parts = []
                 
                 # FIRST: Try to find and click tabs that contain ingredient-related keywords
@@ -1012,8 +979,7 @@ class URLScraper:
                                     tab_text = tab.text.strip().lower()
                                     if any(keyword in tab_text for keyword in ingredient_keywords):
                                         # Scroll and click the tab
-                                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", tab)
-                                        time.sleep(0.5)
+                                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tab)
                                         
                                         # Get tab's aria-controls or data-target to find the content panel
                                         aria_controls = tab.get_attribute("aria-controls")
@@ -1023,17 +989,14 @@ class URLScraper:
                                             driver.execute_script("arguments[0].click();", tab)
                                             print(f"✅ Clicked ingredient tab: {tab.text.strip()[:50]}")
                                             
-                                            # Wait for content to load - check if we have a target panel
+                                            # Wait for content to load - the target panel if we have one,
+                                            # otherwise any ingredient-looking panel - until it has text
                                             if aria_controls or data_target:
-                                                # Wait for the panel to become visible
                                                 panel_id = aria_controls or data_target.lstrip('#')
-                                                try:
-                                                    wait.until(EC.visibility_of_element_located((By.ID, panel_id)))
-                                                    print(f"   Panel {panel_id} is now visible")
-                                                except:
-                                                    pass
-                                            
-                                            time.sleep(4)  # Wait longer for dynamic content to load
+                                                if waiter.text_filled([(By.ID, panel_id)], min_chars=21):
+                                                    print(f"   Panel {panel_id} is now populated")
+                                            else:
+                                                waiter.text_filled(INGREDIENT_PANELS["generic"], min_chars=21)
                                             
                                             # Try multiple methods to find and extract the tab panel content
                                             panel_found = False
@@ -1126,7 +1089,7 @@ class URLScraper:
                                         except Exception as e:
                                             try:
                                                 tab.click()
-                                                time.sleep(3)
+                                                waiter.network_idle()
                                             except:
                                                 print(f"   ⚠️ Could not click tab: {e}")
                                                 pass
@@ -1141,10 +1104,17 @@ class URLScraper:
                 
                 clicked_elements = set()  # Track clicked elements to avoid duplicates
                 
+                def expanded():
+                    """Let a click settle; True once an ingredient list is on screen (stop clicking)"""
+                    waiter.network_idle()
+                    return waiter.ingredient_list_visible(timeout=SCRAPE_POLL_SECONDS)
+                
+                # Nothing left to expand if the tabs already revealed the list
+                list_found = waiter.ingredient_list_visible(timeout=SCRAPE_POLL_SECONDS)
+                
                 try:
                     # Scroll through the page to find accordion elements
                     driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(1)
                     
                     # Find all clickable elements that might be accordions/buttons
                     # Look for buttons, divs, spans, h3, h4, etc. that contain ingredient keywords
@@ -1159,9 +1129,13 @@ class URLScraper:
                     ]
                     
                     for selector in selectors_to_try:
+                        if list_found:
+                            break
                         try:
                             elements = driver.find_elements(By.CSS_SELECTOR, selector)
                             for element in elements:
+                                if list_found:
+                                    break
                                 try:
                                     # Get element text and check if it contains ingredient keywords
                                     element_text = element.text.strip().lower()
@@ -1180,8 +1154,7 @@ class URLScraper:
                                     text_to_check = f"{element_text} {aria_label} {title} {data_label}"
                                     if any(keyword in text_to_check for keyword in ingredient_keywords):
                                         # Scroll element into view
-                                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                                        time.sleep(0.5)
+                                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
                                         
                                         # Try to click the element
                                         try:
@@ -1189,14 +1162,14 @@ class URLScraper:
                                             driver.execute_script("arguments[0].click();", element)
                                             clicked_elements.add(element_id)
                                             print(f"Clicked accordion/button: {element_text[:50] or aria_label[:50] or title[:50]}")
-                                            time.sleep(2)  # Wait longer for content to expand
+                                            list_found = expanded()
                                         except:
                                             # Try regular click as fallback
                                             try:
                                                 element.click()
                                                 clicked_elements.add(element_id)
                                                 print(f"Clicked accordion/button (regular): {element_text[:50] or aria_label[:50] or title[:50]}")
-                                                time.sleep(2)
+                                                list_found = expanded()
                                             except:
                                                 pass
                                 except:
@@ -1206,6 +1179,8 @@ class URLScraper:
                     
                     # Also try XPath to find elements containing ingredient keywords (case-insensitive)
                     for keyword in ingredient_keywords:
+                        if list_found:
+                            break
                         try:
                             # Try multiple XPath patterns to find elements with ingredient keywords
                             xpath_patterns = [
@@ -1216,9 +1191,13 @@ class URLScraper:
                             ]
                             
                             for xpath in xpath_patterns:
+                                if list_found:
+                                    break
                                 try:
                                     elements = driver.find_elements(By.XPATH, xpath)
                                     for element in elements:
+                                        if list_found:
+                                            break
                                         try:
                                             element_id = element.id or element.get_attribute("id") or ""
                                             if element_id in clicked_elements:
@@ -1227,19 +1206,18 @@ class URLScraper:
                                             # Check if it's a clickable element
                                             tag_name = element.tag_name.lower()
                                             if tag_name in ['button', 'a', 'div', 'span', 'h3', 'h4', 'h5', 'h6', 'summary']:
-                                                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                                                time.sleep(0.5)
+                                                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
                                                 try:
                                                     driver.execute_script("arguments[0].click();", element)
                                                     clicked_elements.add(element_id)
                                                     print(f"Clicked element via XPath: {keyword}")
-                                                    time.sleep(2)  # Wait longer for content
+                                                    list_found = expanded()
                                                 except:
                                                     try:
                                                         element.click()
                                                         clicked_elements.add(element_id)
                                                         print(f"Clicked element via XPath (regular): {keyword}")
-                                                        time.sleep(2)
+                                                        list_found = expanded()
                                                     except:
                                                         pass
                                         except:
@@ -1254,14 +1232,13 @@ class URLScraper:
                 
                 # THIRD: Extract text from the page (after clicking accordions)
                 try:
-                    # Wait longer for all accordions to expand and content to load
-                    time.sleep(5)  # Increased wait time for dynamic content
+                    # Wait for expanded accordions to show the list (returns at once if it is there)
+                    waiter.ingredient_list_visible()
                     
                     # Scroll to ensure all content is loaded
                     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
+                    waiter.network_idle()
                     driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(1)
                     
                     # FIRST: Try to find ingredient content directly using more specific selectors
                     # Look for common patterns where ingredients are actually displayed
@@ -1569,71 +1546,83 @@ class URLScraper:
             return await loop.run_in_executor(None, scrape)
         except Exception as e:
             print(f"Error scraping generic page: {e}")
-            if self.driver:
+            if driver:
                 loop = asyncio.get_event_loop()
                 return await loop.run_in_executor(None, lambda: driver.find_element(By.TAG_NAME, "body").text[:5000])
             return ""
     
     async def scrape_url(self, url: str) -> Dict[str, any]:
         """
-        Scrape a product URL and extract text content using Selenium
+        Scrape a product URL and extract text content.
+        
+        Tries a plain HTTP fetch first (http_scraper.py: JSON-LD, embedded
+        state, platform selectors); Selenium is used only when that finds no
+        ingredient list.
         
         Returns:
             Dict with 'extracted_text' and 'platform' keys
         """
-        driver = None
+        if SCRAPE_HTTP_FIRST:
+            result = await fetch_product_page(url, self._detect_platform(url))
+            if result is not None:
+                return result
+        
         try:
-            # Initialize driver
-            driver = await self._get_driver()
-            
-            loop = asyncio.get_event_loop()
-            
-            # Load URL in executor (Selenium is synchronous)
-            print(f"Loading URL with Selenium: {url}")
-            await loop.run_in_executor(None, driver.get, url)
-            
-            # Wait for page to load
-            await asyncio.sleep(3)  # Give JavaScript time to render
-            
-            # Detect platform and scrape accordingly
-            platform = self._detect_platform(url)
-            print(f"Detected platform: {platform}")
-            
-            if platform == "amazon":
-                extracted_text = await self._scrape_amazon(driver)
-            elif platform == "nykaa":
-                extracted_text = await self._scrape_nykaa(driver)
-            elif platform == "flipkart":
-                extracted_text = await self._scrape_flipkart(driver)
-            elif platform == "thedermaco":
-                print(f"🎯 Using The Derma Co specific scraper")
-                extracted_text = await self._scrape_thedermaco(driver)
-                print(f"📊 The Derma Co scraper returned {len(extracted_text)} chars")
-            else:
-                extracted_text = await self._scrape_generic(driver)
-            
-            if not extracted_text or len(extracted_text.strip()) < 10:
-                raise Exception("No meaningful text extracted from the page")
-            
-            print(f"Extracted {len(extracted_text)} characters of text")
-            
-            # Extract product image
-            product_image = await self.extract_product_image(driver, url)
-            
-            return {
-                "extracted_text": extracted_text,
-                "platform": platform,
-                "url": url,
-                "product_image": product_image
-            }
-            
+            # Lease a warm browser; it goes back to the pool when the scrape ends
+            async with get_browser_pool().lease() as driver:
+                return await self._scrape_with_driver(driver, url)
         except WebDriverException as e:
             raise Exception(f"Selenium WebDriver error: {str(e)}. Make sure ChromeDriver is installed.")
         except Exception as e:
             raise Exception(f"Failed to scrape URL: {str(e)}")
-        finally:
-            # Don't close driver here - keep it for reuse
-            pass
+    
+    async def _scrape_with_driver(self, driver: webdriver.Chrome, url: str) -> Dict[str, any]:
+        """Load the URL in a leased browser and extract its text and product image"""
+        loop = asyncio.get_event_loop()
+        
+        # Load URL in executor (Selenium is synchronous)
+        print(f"Loading URL with Selenium: {url}")
+        await loop.run_in_executor(None, driver.get, url)
+        
+        # Detect platform and scrape accordingly
+        platform = self._detect_platform(url)
+        print(f"Detected platform: {platform}")
+        
+        # Wait for the platform's product markup and for the page to go idle
+        waiter = PageWaiter(driver)
+        await loop.run_in_executor(None, waiter.ready, platform)
+        
+        if platform == "amazon":
+            extracted_text = await self._scrape_amazon(driver, waiter)
+        elif platform == "nykaa":
+            extracted_text = await self._scrape_nykaa(driver, waiter)
+        elif platform == "flipkart":
+            extracted_text = await self._scrape_flipkart(driver, waiter)
+        elif platform == "thedermaco":
+            print(f"🎯 Using The Derma Co specific scraper")
+            extracted_text = await self._scrape_thedermaco(driver, waiter)
+            print(f"📊 The Derma Co scraper returned {len(extracted_text)} chars")
+        else:
+            extracted_text = await self._scrape_generic(driver, waiter)
+        
+        waits = record_scrape_waits(waiter)
+        print(f"⏱️ Waited {waits['wait_seconds']}s on page conditions ({waits['waits']} waits, {waits['timeouts']} timed out)")
+        
+        if not extracted_text or len(extracted_text.strip()) < 10:
+            raise Exception("No meaningful text extracted from the page")
+        
+        print(f"Extracted {len(extracted_text)} characters of text")
+        
+        # Extract product image
+        product_image = await self.extract_product_image(driver, url)
+        
+        return {
+            "extracted_text": extracted_text,
+            "platform": platform,
+            "url": url,
+            "product_image": product_image,
+            "wait_seconds": waits["wait_seconds"]
+        }
     
     async def extract_product_image(self, driver: webdriver.Chrome, url: str) -> Optional[str]:
         """
@@ -2110,8 +2099,11 @@ class URLScraper:
             return None
     
     async def close(self):
-        """Close the Selenium driver"""
-        await self._close_driver()
+        """
+        Kept for callers' cleanup blocks - browsers are already returned to the
+        pool after every scrape, and the pool itself is closed on app shutdown.
+        """
+        return None
     
     async def detect_product_name(self, raw_text: str, url: str) -> Optional[str]:
         """
@@ -2143,14 +2135,14 @@ Return ONLY the product name as a plain text string. If you cannot identify a cl
 
 Product name:"""
 
-            claude_client = self._get_claude_client()
+            self._get_claude_client()  # raises if CLAUDE_API_KEY is missing
             from app.config import CLAUDE_MODEL
             model_name = CLAUDE_MODEL if CLAUDE_MODEL else (os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-sonnet-4-5-20250929")
             
             # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
             max_tokens = 4096 if "claude-3-opus-20240229" in model_name else 8192
             
-            response = claude_client.messages.create(
+            response = await create_message(
                 model=model_name,
                 max_tokens=max_tokens,
                 temperature=0.1,
@@ -2220,14 +2212,14 @@ Example output format:
 
 Return only the JSON array of INCI names:"""
 
-            claude_client = self._get_claude_client()
+            self._get_claude_client()  # raises if CLAUDE_API_KEY is missing
             from app.config import CLAUDE_MODEL
             model_name = CLAUDE_MODEL if CLAUDE_MODEL else (os.getenv("CLAUDE_MODEL") or os.getenv("MODEL_NAME") or "claude-sonnet-4-5-20250929")
             
             # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
             max_tokens = 4096 if "claude-3-opus-20240229" in model_name else 8192
             
-            response = claude_client.messages.create(
+            response = await create_message(
                 model=model_name,
                 max_tokens=max_tokens,
                 temperature=0.2,
@@ -2260,15 +2252,34 @@ Return only the JSON array of INCI names:"""
     
     async def extract_ingredients_from_text(self, raw_text: str, url: str = None) -> List[str]:
         """
-        Use Claude API to extract INCI ingredient names from scraped text
-        
+        Extract INCI ingredient names from scraped text
+
+        A clean ingredients block is parsed deterministically and scored
+        against the ingre_inci vocabulary (inci_extractor.py); Claude is only
+        called when that result is not confident enough.
+
         Args:
             raw_text: Raw text scraped from the product page
             url: The product URL (optional, but recommended for better context)
-            
+
         Returns:
             List of extracted INCI ingredient names
         """
+        from app.ai_ingredient_intelligence.logic.inci_extractor import (
+            INCI_RULE_ENABLED, extract_inci_from_text, get_inci_vocabulary, record_extraction
+        )
+        if INCI_RULE_ENABLED and raw_text:
+            rule_result = extract_inci_from_text(raw_text, await get_inci_vocabulary())
+            if rule_result and rule_result["accepted"]:
+                record_extraction(True)
+                print(f"✅ Rule-based extraction: {rule_result['total']} ingredients "
+                      f"({rule_result['confidence']:.0%} known INCI), skipping Claude")
+                return rule_result["ingredients"]
+            record_extraction(False)
+            if rule_result:
+                print(f"[INFO] Rule-based extraction not confident ({rule_result['known']}/{rule_result['total']} "
+                      f"known INCI), using Claude")
+
         try:
             url_context = f"\n\nProduct URL: {url}" if url else ""
             
@@ -2451,7 +2462,7 @@ Return ONLY the JSON array of ALL INCI ingredient names from the complete list,
                 print(f"   🔗 Product URL: {url}")
 
             # Get Claude client (lazy-loaded)
-            claude_client = self._get_claude_client()
+            self._get_claude_client()  # raises if CLAUDE_API_KEY is missing
             
             # Call Claude API - use config model (defaults to claude-sonnet-4-5-20250929)
             from app.config import CLAUDE_MODEL
@@ -2460,7 +2471,7 @@ Return ONLY the JSON array of ALL INCI ingredient names from the complete list,
             # Set max_tokens based on model (claude-3-opus-20240229 has max 4096)
             max_tokens = 4096 if "claude-3-opus-20240229" in model_name else 8192
             
-            response = claude_client.messages.create(
+            response = await create_message(
                 model=model_name,
                 max_tokens=max_tokens,
                 temperature=0.1,
@@ -2662,18 +2673,27 @@ Return ONLY the JSON array of ALL INCI ingredient names from the complete list,
                 raise Exception(f"Claude API usage limit reached. You will regain access{date_str}. Please try again later or upgrade your API plan.")
             raise Exception(f"Failed to extract ingredients with Claude: {error_msg}")
     
-    async def extract_ingredients_from_url(self, url: str) -> Dict[str, any]:
+    async def extract_ingredients_from_url(self, url: str, refresh: bool = False) -> Dict[str, any]:
         """
         Complete workflow: Scrape URL and extract ingredients
         Falls back to AI search if direct extraction fails
         
+        Results are cached per canonical product URL (url_cache.py) and
+        concurrent requests for the same product share one scrape.
+        
         Args:
             url: Product page URL
+            refresh: Ignore a cached result and scrape again
             
         Returns:
             Dict with 'ingredients' (List[str]), 'extracted_text' (str), 'platform' (str),
-            'is_estimated' (bool), 'source' (str), 'product_name' (str)
+            'is_estimated' (bool), 'source' (str), 'product_name' (str), 'cache_hit' (bool)
         """
+        from app.ai_ingredient_intelligence.logic.url_cache import cached_extraction
+        return await cached_extraction(url, lambda: self._extract_ingredients_from_url(url), refresh=refresh)
+    
+    async def _extract_ingredients_from_url(self, url: str) -> Dict[str, any]:
+        """Scrape and extract without the cache (see extract_ingredients_from_url)"""
         try:
             # Scrape the URL
             scrape_result = await self.scrape_url(url)
@@ -2691,7 +2711,7 @@ Return ONLY the JSON array of ALL INCI ingredient names from the complete list,
                     "url": url,
                     "is_estimated": False,
                     "source": "url_extraction",
-                    "product_name": None,
+                    "product_name": scrape_result.get("product_name"),
                     "product_image": scrape_result.get("product_image")
                 }
             
@@ -43,6 +43,7 @@ class AnalyzeInciResponse(BaseModel):
     bis_cautions: Optional[Dict[str, List[str]]] = Field(None, description="BIS cautions for ingredients")
     categories: Optional[Dict[str, str]] = Field(None, description="Individual INCI categories mapping for bifurcation: { 'inci_name': 'Active' | 'Excipient' }")
     distributor_info: Optional[Dict[str, List[Dict]]] = Field(None, description="Distributor information for branded ingredients: { 'ingredient_name': [distributor1, distributor2, ...] }")
+    processing_breakdown: Optional[Dict[str, float]] = Field(None, description="Per-stage timings in seconds: { 'matching': 0.12, 'bis_cautions': 1.4, ... } (stages overlap, so they don't sum to processing_time)")
     
     class Config:
         # Exclude None values from JSON serialization to remove deprecated fields
@@ -111,6 +112,7 @@ class CompareProductsResponse(BaseModel):
     """Response schema for product comparison - supports multiple products"""
     products: List[ProductComparisonItem] = Field(..., description="List of compared products")
     processing_time: float = Field(..., description="Time taken for comparison (in seconds)")
+    processing_breakdown: Optional[Dict[str, float]] = Field(None, description="Per-stage timings in seconds: { 'extraction': 4.1, 'product_1': 3.9, 'comparison_llm': 12.3, 'fill_llm': 6.0, 'total': 22.5 } (stages overlap)")
 
 
 # ============================================================================
@@ -278,6 +280,7 @@ class FormulationReportResponse(BaseModel):
     recommended_ph_range: Optional[str] = Field(None, description="Recommended pH range text")
     expected_benefits_analysis: List[ReportTableRow] = Field(default_factory=list, description="Expected benefits analysis table (if provided)")
     raw_text: Optional[str] = Field(None, description="Raw report text for reference")
+    cache_hit: Optional[bool] = Field(None, description="True if the report was served from the LLM response cache (None when caching is disabled)")
 
 class AnalyzeInciWithReportResponse(BaseModel):
     """Combined response schema for merged analyze_inci and formulation_report endpoints"""
@@ -408,6 +411,8 @@ class MarketResearchProduct(BaseModel):
     match_score: float = Field(0.0, description="Weighted match score (0-100) considering actives, excipients, and overall match")
     active_match_count: int = Field(0, description="Number of active ingredients that matched")
     active_ingredients: List[str] = Field(default_factory=list, description="List of matched active ingredients")
+    ingredient_overlap: int = Field(0, description="Number of input ingredients present in the product")
+    weighted_jaccard: float = Field(0.0, description="idf-weighted Jaccard similarity of the ingredient lists (0-1)")
 
 
 class MarketResearchRequest(BaseModel):
@@ -429,6 +434,22 @@ class MarketResearchResponse(BaseModel):
     ai_reasoning: Optional[str] = Field(None, description="AI reasoning for ingredient selection and matching strategy")
 
 
+class MarketResearchPageResponse(BaseModel):
+    """Response schema for one page of market research matches (/market-research/page)"""
+    products: List[MarketResearchProduct] = Field(default_factory=list, description="Matched products of this page, best first")
+    extracted_ingredients: List[str] = Field(default_factory=list, description="List of extracted ingredients from input")
+    total_matched: int = Field(0, description="Total number of matched products (all pages)")
+    offset: int = Field(0, description="Position of the first product of this page in the ranking")
+    page_size: int = Field(0, description="Requested page size")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
+    catalog_changed: bool = Field(False, description="True if the product catalog was re-indexed since the cursor was issued")
+    processing_time: float = Field(0.0, description="Time taken for processing (in seconds)")
+    input_type: str = Field(..., description="Type of input processed")
+    ai_analysis: Optional[str] = Field(None, description="AI analysis message when no actives found")
+    ai_product_type: Optional[str] = Field(None, description="Product type identified by AI")
+    ai_reasoning: Optional[str] = Field(None, description="AI reasoning for ingredient selection and matching strategy")
+
+
 class MarketResearchHistoryItemSummary(BaseModel):
     """Summary schema for market research history item (used in list endpoints - excludes large fields)"""
     id: Optional[str] = Field(None, description="History item ID")
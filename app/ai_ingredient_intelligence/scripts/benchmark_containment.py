@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: Step 1 branded containment (rarest-member index vs linear scan)
+
+Generates a synthetic branded catalog (one active plus a few Zipf-distributed
+carriers like Water/Glycerin per branded ingredient) and times both
+implementations on random 30-ingredient products. Also asserts both return
+identical positions.
+
+Run with:
+    python -m app.ai_ingredient_intelligence.scripts.benchmark_containment
+    python -m app.ai_ingredient_intelligence.scripts.benchmark_containment --sizes 10000 100000
+"""
+
+import argparse
+import random
+import time
+from itertools import accumulate
+
+from app.ai_ingredient_intelligence.logic.containment_index import (
+    ContainmentIndex,
+    linear_contained_in,
+)
+
+VOCAB_SIZE = 20000
+PRODUCT_SIZE = 30
+
+
+def make_vocab():
+    vocab = [f"inci {i}" for i in range(VOCAB_SIZE)]
+    # Zipf-like cumulative weights: rank 1 (Water) is very common, the tail is rare
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(VOCAB_SIZE)))
+    return vocab, cum_weights
+
+
+def make_catalog(rows: int, vocab, cum_weights, rng: random.Random):
+    # Each branded ingredient = one (uniform) active + 0-3 common carriers/solvents
+    catalog = []
+    for _ in range(rows):
+        carriers = rng.choices(vocab, cum_weights=cum_weights, k=rng.choice((0, 0, 1, 1, 2, 3)))
+        catalog.append(frozenset([rng.choice(vocab)] + carriers))
+    return catalog
+
+
+def make_products(count: int, vocab, cum_weights, rng: random.Random):
+    # Products = mostly common excipients plus a handful of actives
+    return [
+        set(rng.choices(vocab, cum_weights=cum_weights, k=PRODUCT_SIZE - 8)) | set(rng.sample(vocab, 8))
+        for _ in range(count)
+    ]
+
+
+def bench(rows: int, queries: int, seed: int):
+    rng = random.Random(seed)
+    vocab, cum_weights = make_vocab()
+    catalog = make_catalog(rows, vocab, cum_weights, rng)
+    products = make_products(queries, vocab, cum_weights, rng)
+
+    start = time.perf_counter()
+    index = ContainmentIndex.build(catalog)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    linear_results = [linear_contained_in(catalog, p) for p in products]
+    linear_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    index_results = [index.contained_in(p) for p in products]
+    index_ms = (time.perf_counter() - start) * 1000 / queries
+
+    assert index_results == linear_results, "Index results differ from linear scan"
+    matches = sum(len(r) for r in index_results) / queries
+
+    print(f"{rows:>9,} rows | build {build_s:6.2f}s | linear {linear_ms:9.3f} ms/query | "
+          f"index {index_ms:8.3f} ms/query | speedup {linear_ms / max(index_ms, 1e-9):7.1f}x | "
+          f"avg matches {matches:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Step 1 containment benchmark (rarest-member index vs linear scan)")
+    print("=" * 80)
+    for rows in args.sizes:
+        bench(rows, args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
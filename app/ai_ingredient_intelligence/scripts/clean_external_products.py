@@ -8,6 +8,8 @@ This script:
 2. Skips products that have already been cleaned (ingredientsCleaned: true)
 3. Uses Claude AI to extract only the INCI list from ingredients field
 4. Updates the document with cleaned ingredients and marks it as cleaned
+5. Stores the normalized ingredient fields (ingredients_normalized,
+   ingredients_hash, actives) in the same update - see logic/product_normalizer.py
 
 Usage:
     python -m app.ai_ingredient_intelligence.scripts.clean_external_products
@@ -26,6 +28,12 @@ from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional, Dict, Any, List
 
+from app.ai_ingredient_intelligence.logic.product_normalizer import (
+    ensure_product_indexes,
+    load_active_names,
+    normalized_product_fields,
+)
+
 # Try to import anthropic
 try:
     import anthropic
@@ -232,7 +240,8 @@ Example output: Water, Glycerin, Sodium Hyaluronate, Niacinamide, Xylitylglucosi
 async def process_product(
     product: Dict[str, Any],
     stats: Dict[str, int],
-    collection
+    collection,
+    active_names: set
 ) -> bool:
     """
     Process a single product: clean ingredients and update database.
@@ -259,7 +268,8 @@ async def process_product(
                         "$set": {
                             "ingredients": ingredients_raw,  # Keep as array
                             "ingredientsCleaned": True,
-                            "ingredientsCleanedAt": time.time()
+                            "ingredientsCleanedAt": time.time(),
+                            **normalized_product_fields(ingredients_raw, active_names)
                         }
                     }
                 )
@@ -293,7 +303,8 @@ async def process_product(
                 "$set": {
                     "ingredients": cleaned_ingredients,  # Store as array for better structure
                     "ingredientsCleaned": True,
-                    "ingredientsCleanedAt": time.time()
+                    "ingredientsCleanedAt": time.time(),
+                    **normalized_product_fields(cleaned_ingredients, active_names)
                 }
             }
         )
@@ -310,12 +321,13 @@ async def process_batch(
     products: List[Dict[str, Any]],
     stats: Dict[str, int],
     batch_num: int,
-    collection
+    collection,
+    active_names: set
 ):
     """Process a batch of products concurrently"""
     print(f"\n📦 Processing batch {batch_num} ({len(products)} products)...")
     
-    tasks = [process_product(product, stats, collection) for product in products]
+    tasks = [process_product(product, stats, collection, active_names) for product in products]
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
     # Count exceptions
@@ -347,6 +359,11 @@ async def main():
         return
     
     collection = target_collection
+    
+    # Cleaned products are written together with their normalized ingredient fields
+    active_names = await load_active_names(db["ingre_inci"])
+    await ensure_product_indexes(collection)
+    print(f"🧪 Loaded {len(active_names)} active INCI names for normalization")
     print()
     
     # First, get diagnostic information
@@ -420,7 +437,7 @@ async def main():
     batch_size = 5  # Process 5 products concurrently
     for i in range(0, len(all_products), batch_size):
         batch = all_products[i:i + batch_size]
-        await process_batch(batch, stats, (i // batch_size) + 1, collection)
+        await process_batch(batch, stats, (i // batch_size) + 1, collection, active_names)
         
         # Small delay between batches
         if i + batch_size < len(all_products):
@@ -0,0 +1,39 @@
+# app/ai_ingredient_intelligence/scripts/normalize_external_products.py
+"""
+Backfill the normalized ingredient fields on externalproducts.
+
+Stores ingredients_parsed, ingredients_normalized, ingredients_hash and
+actives on every product (see logic/product_normalizer.py) and creates the
+multikey indexes on them. Running servers rebuild their market research
+matrix within MATCH_MATRIX_REFRESH_SECONDS. Products whose stored hash and
+actives are already current are skipped unless --force is given.
+
+Re-run after imports that bypass scripts/clean_external_products.py, after
+recategorizing ingre_inci actives, or after bumping NORMALIZER_VERSION.
+
+Usage:
+    python -m app.ai_ingredient_intelligence.scripts.normalize_external_products
+    python -m app.ai_ingredient_intelligence.scripts.normalize_external_products --batch-size 500 --force
+"""
+
+import argparse
+import asyncio
+
+from app.ai_ingredient_intelligence.logic.product_normalizer import normalize_products
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Products written per bulk update")
+    parser.add_argument("--limit", type=int, default=0, help="Only process the first N products (0 = all)")
+    parser.add_argument("--force", action="store_true", help="Rewrite products that are already current")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Normalizing externalproducts ingredients")
+    print("=" * 80)
+    await normalize_products(batch_size=args.batch_size, force=args.force, limit=args.limit)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+# app/ai_ingredient_intelligence/scripts/precompute_bis_cautions.py
+"""
+Precompute BIS cautions for every INCI name in ingre_inci.
+
+Fills the per-ingredient BIS caution cache (collection bis_caution_cache)
+for the currently embedded BIS PDFs, so production lookups are dictionary
+hits. Entries are keyed by the embed_manifest.json hash: re-run this script
+after adding or updating BIS PDFs.
+
+Ingredients already cached for the current manifest are skipped unless
+--force is given.
+
+Usage:
+    python -m app.ai_ingredient_intelligence.scripts.precompute_bis_cautions
+    python -m app.ai_ingredient_intelligence.scripts.precompute_bis_cautions --batch-size 50 --limit 1000
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.ai_ingredient_intelligence.db.collections import inci_col
+from app.ai_ingredient_intelligence.logic import bis_rag
+
+
+async def load_inci_names(limit: int = 0) -> list:
+    """Distinct, non-empty INCI names in collection order"""
+    names = []
+    seen = set()
+    cursor = inci_col.find({"inciName": {"$nin": [None, ""]}}, {"inciName": 1})
+    async for doc in cursor:
+        name = (doc.get("inciName") or "").strip()
+        key = bis_rag.normalize_caution_key(name)
+        if key and key not in seen:
+            seen.add(key)
+            names.append(name)
+            if limit and len(names) >= limit:
+                break
+    return names
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50, help="Ingredients retrieved per batch")
+    parser.add_argument("--limit", type=int, default=0, help="Only process the first N INCI names (0 = all)")
+    parser.add_argument("--force", action="store_true", help="Recompute entries that are already cached")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("Precomputing BIS cautions for ingre_inci")
+    print("=" * 80)
+
+    # Load (and if needed update) the vectorstore first: this settles the manifest hash
+    engine = await bis_rag.get_bis_retrieval_engine()
+    if engine is None:
+        print("❌ BIS vectorstore is not available - nothing to precompute")
+        return
+    print(f"Manifest hash: {bis_rag.get_bis_manifest_hash()}")
+
+    names = await load_inci_names(args.limit)
+    print(f"Found {len(names)} distinct INCI names")
+
+    if args.force:
+        todo = names
+    else:
+        todo = []
+        for name in names:
+            hit, _ = await bis_rag._bis_caution_cache.get(bis_rag._caution_cache_key(name))
+            if not hit:
+                todo.append(name)
+        print(f"{len(names) - len(todo)} already cached, {len(todo)} to compute")
+
+    started = time.time()
+    with_cautions = 0
+    for start in range(0, len(todo), args.batch_size):
+        batch = todo[start:start + args.batch_size]
+        if args.force:
+            # Drop existing entries so get_bis_cautions_for_ingredients recomputes them
+            for name in batch:
+                await bis_rag._bis_caution_cache.delete(bis_rag._caution_cache_key(name))
+        cautions_map = await bis_rag.get_bis_cautions_for_ingredients(batch)
+        with_cautions += len(cautions_map)
+        done = start + len(batch)
+        elapsed = time.time() - started
+        print(f"[{done}/{len(todo)}] {with_cautions} with cautions - {elapsed:.1f}s elapsed")
+
+    print(f"\n[OK] Precomputed {len(todo)} ingredient(s) in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
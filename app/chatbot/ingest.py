@@ -20,7 +20,7 @@ try:
 except ImportError:
     from langchain_core.documents import Document
     from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+from app.core.embeddings import get_embedding_model
 
 
 def ingest_documents():
@@ -119,8 +119,7 @@ def ingest_documents():
 
     # Load embedding model
     rprint("\n[bold]🔗 Loading embedding model...[/]")
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2"
-    )
+    embedding_model = get_embedding_model()
 
 
     rprint("[yellow]💡 Creating embeddings...[/]")
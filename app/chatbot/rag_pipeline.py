@@ -2,7 +2,7 @@
 
 from app.config import CHROMA_DB_PATH
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from app.core.embeddings import get_embedding_model
 try:
     from langchain.chains import RetrievalQA
 except ImportError:
@@ -21,7 +21,7 @@ from app.chatbot.llm_claude import get_claude_llm
 def get_rag_chain():
     vector_db = Chroma(
         persist_directory=CHROMA_DB_PATH,
-        embedding_function=HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+        embedding_function=get_embedding_model()  # shared with BIS RAG
     )
 
     retriever = vector_db.as_retriever(
@@ -0,0 +1,214 @@
+# app/core/embeddings.py
+"""
+Process-wide sentence embedding provider shared by every vectorstore.
+
+The chatbot RAG chain, the BIS RAG vectorstore and the chatbot ingest job
+each created their own HuggingFaceEmbeddings("all-mpnet-base-v2"), so a
+worker held two copies of the ~420MB model and paid the load time twice.
+get_embedding_model() returns ONE lazily loaded instance per model name.
+
+- Lazy:        the model loads on the first embedding call, not at import
+- Thread-safe: all encoding runs on a single worker thread; callers block
+               on a Future for their own slice of the result
+- Batching:    requests arriving within EMBEDDING_BATCH_WAIT_MS of each
+               other (e.g. concurrent chatbot and BIS lookups) are encoded
+               in one model call, up to EMBEDDING_MAX_BATCH texts
+- Backends:    EMBEDDING_BACKEND=torch (default) | onnx | openvino.
+               EMBEDDING_ONNX_FILE picks a specific export, e.g.
+               "onnx/model_qint8_avx512_vnni.onnx" for int8 CPU inference
+               (needs `pip install optimum[onnxruntime]`). Quantized vectors
+               differ slightly from the ones already persisted in Chroma,
+               so re-embed when switching a production store to int8.
+
+Vectors are identical to HuggingFaceEmbeddings' defaults (newlines replaced
+by spaces, no normalization), so existing Chroma stores stay compatible.
+The object implements the LangChain Embeddings interface (embed_documents /
+embed_query) and can be passed as Chroma's embedding_function.
+
+USAGE:
+    from app.core.embeddings import get_embedding_model
+    vectorstore = Chroma(persist_directory=..., embedding_function=get_embedding_model())
+"""
+
+import os
+import time
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "")
+# Texts per model forward pass (sentence-transformers batch_size)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# How long the worker waits to merge concurrent requests into one encode call
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+# Stop merging once this many texts are queued
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "256"))
+
+
+class EmbeddingBatcher:
+    """Single worker thread that merges concurrent encode requests"""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], List[List[float]]],
+        max_batch: int = EMBEDDING_MAX_BATCH,
+        wait_seconds: float = EMBEDDING_BATCH_WAIT_MS / 1000.0,
+        name: str = "embeddings"
+    ):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.wait_seconds = wait_seconds
+        self.name = name
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.calls = 0
+        self.requests = 0
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._worker.start()
+
+    def submit(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts (blocking); may be merged with other callers' texts"""
+        if not texts:
+            return []
+        future: Future = Future()
+        self._queue.put((list(texts), future))
+        self._ensure_worker()
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        """Block for one request, then gather others arriving within the wait window"""
+        pending = [self._queue.get()]
+        total = len(pending[0][0])
+        deadline = time.monotonic() + self.wait_seconds
+        while total < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            total += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = self._encode(texts)
+            except BaseException as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.calls += 1
+            self.requests += len(pending)
+            offset = 0
+            for item_texts, future in pending:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+class SharedEmbeddings:
+    """Lazily loaded SentenceTransformer behind a request batcher (LangChain Embeddings interface)"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._batcher = EmbeddingBatcher(self._encode, name=model_name.rsplit("/", 1)[-1])
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is not None:
+                return self._model
+            from sentence_transformers import SentenceTransformer
+
+            started = time.time()
+            model = None
+            if self.backend != "torch":
+                try:
+                    model_kwargs = {"file_name": EMBEDDING_ONNX_FILE} if EMBEDDING_ONNX_FILE else None
+                    model = SentenceTransformer(self.model_name, backend=self.backend, model_kwargs=model_kwargs)
+                except Exception as e:
+                    print(f"[WARNING] Could not load {self.model_name} with backend '{self.backend}' "
+                          f"({type(e).__name__}: {e}); falling back to torch")
+            if model is None:
+                model = SentenceTransformer(self.model_name)
+            self._model = model
+            print(f"[OK] Embedding model loaded: {self.model_name} "
+                  f"(backend={getattr(model, 'backend', 'torch')}, {time.time() - started:.1f}s)")
+            return model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        model = self._load()
+        # Same preprocessing and defaults as HuggingFaceEmbeddings
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors = model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, show_progress_bar=False)
+        return vectors.tolist()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def preload(self):
+        """Load the model now (e.g. at startup) instead of on first use"""
+        self._load()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._batcher.submit(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._batcher.submit([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "loaded": self.loaded,
+            "encode_calls": self._batcher.calls,
+            "requests": self._batcher.requests,
+        }
+
+
+# Global embedding providers, one per model name
+_embedding_models: Dict[str, SharedEmbeddings] = {}
+_embedding_models_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> SharedEmbeddings:
+    """
+    Get the process-wide embedding provider for model_name.
+
+    Returns:
+        SharedEmbeddings instance (the model itself loads on first use)
+    """
+    model = _embedding_models.get(model_name)
+    if model is None:
+        with _embedding_models_lock:
+            model = _embedding_models.get(model_name)
+            if model is None:
+                model = SharedEmbeddings(model_name)
+                _embedding_models[model_name] = model
+    return model
@@ -469,10 +469,78 @@ async def create_indexes():
         await inspiration_products_col.create_index([("board_id", 1), ("decoded", 1)])
         await inspiration_products_col.create_index([("user_id", 1), ("created_at", -1)])
         logger.info("✅ Inspiration boards collection indexes created successfully")
+        
+        # Multikey indexes on the normalized ingredient arrays used by market research
+        from app.ai_ingredient_intelligence.logic.product_normalizer import ensure_product_indexes
+        await ensure_product_indexes()
+        logger.info("✅ External products ingredient indexes created successfully")
     except Exception as e:
         logger.warning(f"⚠️  Could not create indexes: {e}")
         # Don't fail startup if indexes already exist
 
+@app.on_event("startup")
+async def warm_matcher_index():
+    """Build the in-memory branded ingredient index and taxonomy cache used by the INCI matcher"""
+    try:
+        from app.ai_ingredient_intelligence.logic.branded_index import warm_branded_index
+        from app.ai_ingredient_intelligence.logic.taxonomy_cache import get_taxonomy_cache
+        await warm_branded_index()
+        taxonomy = await get_taxonomy_cache()
+        taxonomy.start_watching()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not warm matcher caches (will build on first request): {e}")
+
+@app.on_event("startup")
+async def warm_bis_cautions():
+    """Load precomputed per-ingredient BIS cautions into memory"""
+    try:
+        from app.ai_ingredient_intelligence.logic.bis_rag import warm_bis_caution_cache
+        await warm_bis_caution_cache()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not warm BIS caution cache (will fill on demand): {e}")
+
+@app.on_event("startup")
+async def warm_ingredient_matrix():
+    """Build the market research product x INCI scoring matrix"""
+    try:
+        from app.ai_ingredient_intelligence.logic.match_scoring import get_ingredient_matrix
+        await get_ingredient_matrix()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not build ingredient matrix (will build on first request): {e}")
+
+@app.on_event("startup")
+async def warm_browser_pool():
+    """Optionally pre-launch pooled browsers for URL scraping (BROWSER_POOL_WARM)"""
+    try:
+        from app.ai_ingredient_intelligence.logic.browser_pool import warm_browser_pool as warm_pool
+        await warm_pool()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not warm browser pool (browsers will launch on demand): {e}")
+
+@app.on_event("shutdown")
+async def stop_matcher_index():
+    """Stop the branded index and taxonomy change stream watchers"""
+    from app.ai_ingredient_intelligence.logic.branded_index import get_branded_index_instance
+    from app.ai_ingredient_intelligence.logic.taxonomy_cache import get_taxonomy_cache_instance
+    await get_branded_index_instance().stop_watching()
+    await get_taxonomy_cache_instance().stop_watching()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close shared outbound HTTP clients"""
+    from app.ai_ingredient_intelligence.logic.cas_api import close_http_client
+    from app.ai_ingredient_intelligence.logic.http_scraper import close_scrape_client
+    from app.ai_ingredient_intelligence.logic.llm_gateway import close_llm_client
+    await close_http_client()
+    await close_scrape_client()
+    await close_llm_client()
+
+@app.on_event("shutdown")
+async def close_browser_pool():
+    """Quit pooled scraping browsers"""
+    from app.ai_ingredient_intelligence.logic.browser_pool import close_browser_pool as close_pool
+    await close_pool()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to SkinBB AI Chatbot API. Use POST /api/chat to interact v1."}
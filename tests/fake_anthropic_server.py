@@ -0,0 +1,129 @@
+"""
+Local stand-in for the Anthropic Messages API, for offline prompt-cache tests.
+
+Serves POST /v1/messages on 127.0.0.1 and simulates prompt caching: the
+prefix (model + system blocks + message blocks) up to each block marked with
+cache_control is a cache entry. A request reading a stored prefix reports
+it as cache_read_input_tokens, a new prefix as cache_creation_input_tokens,
+and everything after the last breakpoint as input_tokens - the same usage
+fields the real API returns. Tokens are estimated as characters / 4.
+
+USAGE:
+    with FakeAnthropicServer() as server:
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=server.base_url)
+        ...
+        assert server.requests == 2
+"""
+
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _blocks(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Request content flattened into text blocks, in prompt order"""
+    system = request.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    blocks = list(system)
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        blocks.extend(content or [])
+    return blocks
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server answering /v1/messages with simulated cache usage"""
+
+    def __init__(self, reply: str = '{"ok": true}', min_cache_tokens: int = 0):
+        self.reply = reply
+        self.min_cache_tokens = min_cache_tokens
+        self.requests = 0
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def usage_for(self, request: Dict[str, Any]) -> Dict[str, int]:
+        """Simulated usage block for a request (updates the cache)"""
+        digest = hashlib.sha256(request.get("model", "").encode("utf-8"))
+        tokens = 0
+        breakpoints: List[Tuple[str, int]] = []
+        for block in _blocks(request):
+            digest.update(json.dumps(block.get("text", ""), ensure_ascii=False).encode("utf-8"))
+            tokens += _estimate_tokens(block.get("text", ""))
+            if block.get("cache_control"):
+                breakpoints.append((digest.hexdigest(), tokens))
+
+        read = written = 0
+        with self._lock:
+            for prefix, prefix_tokens in breakpoints:
+                if prefix_tokens < self.min_cache_tokens:
+                    continue
+                if prefix in self._cached_prefixes:
+                    read = prefix_tokens
+                    written = 0
+                else:
+                    self._cached_prefixes.add(prefix)
+                    written = prefix_tokens - read
+        return {
+            "input_tokens": tokens - read - written,
+            "cache_creation_input_tokens": written,
+            "cache_read_input_tokens": read,
+            "output_tokens": _estimate_tokens(self.reply),
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.startswith("/v1/messages"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("content-length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    request_id = server.requests
+                body = json.dumps({
+                    "id": f"msg_fake_{request_id}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": request.get("model", ""),
+                    "content": [{"type": "text", "text": server.reply}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": server.usage_for(request),
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
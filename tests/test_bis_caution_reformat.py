@@ -0,0 +1,67 @@
+"""
+Test batched BIS caution rewording and its per-fragment-set cache
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic import bis_caution_reformat
+from app.ai_ingredient_intelligence.logic.bis_caution_reformat import (
+    build_reformat_prompt,
+    parse_reformat_response,
+    plan_batches,
+    reformat_bis_cautions,
+)
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+
+
+def test_batches_respect_fragment_budget():
+    """Ingredients are packed up to the budget and never split"""
+    items = [("A", ["x"] * 3), ("B", ["x"] * 3), ("C", ["x"] * 5), ("D", ["x"])]
+    batches = plan_batches(items, max_fragments=6)
+    assert [[name for name, _ in batch] for batch in batches] == [["A", "B"], ["C", "D"]]
+    # An ingredient larger than the budget still gets its own batch
+    assert len(plan_batches([("E", ["x"] * 9)], max_fragments=6)) == 1
+    print("[OK] Batch planning test passed")
+
+
+def test_reply_is_mapped_back_by_id():
+    """IDs map sentences to ingredients; short or malformed entries are dropped"""
+    batch = [("Salicylic Acid", ["2 percent rinse-off"]), ("Niacinamide", ["5 % w/w"])]
+    prompt = build_reformat_prompt(batch)
+    assert "ID 1 - INGREDIENT: Salicylic Acid" in prompt and "1. 5 % w/w" in prompt
+    parsed = {"1": ["Maximum 2% in rinse-off products.", "short"], "2": "not a list"}
+    assert parse_reformat_response(batch, parsed) == {"Salicylic Acid": ["Maximum 2% in rinse-off products."]}
+    print("[OK] Reply mapping test passed")
+
+
+def test_one_request_then_cache(monkeypatch):
+    """All ingredients go out in one request; the second report rewords nothing"""
+    monkeypatch.setattr(bis_caution_reformat, "_reworded_cache",
+                        TwoTierCache("bis_caution_cache", namespace="test", ttl_seconds=60, use_mongo=False))
+    requests = []
+
+    async def fake_batch(batch):
+        requests.append([name for name, _ in batch])
+        return {name: [f"{name} is limited to 2% w/w in leave-on products."] for name, _ in batch if name != "Talc"}
+
+    monkeypatch.setattr(bis_caution_reformat, "_reformat_batch", fake_batch)
+    cautions = {"Salicylic Acid": ["2 percent"], "Talc": ["free from asbestos"], "Water": []}
+
+    first = asyncio.run(reformat_bis_cautions(cautions))
+    assert requests == [["Salicylic Acid", "Talc"]]
+    assert first == {
+        "Salicylic Acid": ["Salicylic Acid is limited to 2% w/w in leave-on products."],
+        "Talc": ["free from asbestos"],  # not reworded -> original fragments
+    }
+
+    second = asyncio.run(reformat_bis_cautions(cautions))
+    assert second == first
+    assert requests[1:] == [["Talc"]]  # only the failed ingredient is retried
+    print("[OK] Batched rewording cache test passed")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
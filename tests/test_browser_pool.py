@@ -0,0 +1,129 @@
+"""
+Test the browser pool: reuse, the concurrency cap, health checks and recycling
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.browser_pool import BrowserPool
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for the pool's health check and reset"""
+
+    def __init__(self):
+        self.redirects = {}
+        self.alive = True
+        self.quit_called = False
+        self.current_url = "about:blank"
+        self.cdp = []
+        self.switch_to = self
+
+    @property
+    def window_handles(self):
+        if not self.alive:
+            raise RuntimeError("browser crashed")
+        return ["main"]
+
+    @property
+    def title(self):
+        return ""
+
+    def window(self, handle):
+        pass
+
+    def get(self, url):
+        self.current_url = self.redirects.get(url, url)
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _pool(**kwargs):
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    return BrowserPool(factory=factory, **kwargs), drivers
+
+
+def test_browser_is_reused_and_reset():
+    """Sequential leases share one browser, which is wiped between leases"""
+    async def run():
+        pool, drivers = _pool(size=2)
+        for _ in range(3):
+            async with pool.lease() as driver:
+                driver.get("https://www.nykaa.com/some-product")
+        assert len(drivers) == 1
+        assert drivers[0].current_url == "about:blank"
+        assert ("Storage.clearDataForOrigin", {"origin": "https://www.nykaa.com", "storageTypes": "all"}) in drivers[0].cdp
+        assert pool.get_stats()["reused"] == 2
+    asyncio.run(run())
+    print("[OK] Reuse/reset test passed")
+
+
+def test_storage_wiped_for_every_visited_origin():
+    """Origins left behind by redirects and earlier navigations are wiped too"""
+    async def run():
+        pool, drivers = _pool(size=1)
+        async with pool.lease() as driver:
+            driver.redirects["https://amzn.in/d/abc"] = "https://www.amazon.in/dp/B0"
+            driver.get("https://amzn.in/d/abc")
+            driver.get("https://www.nykaa.com/some-product")
+        cleared = {params["origin"] for cmd, params in drivers[0].cdp if cmd == "Storage.clearDataForOrigin"}
+        assert {"https://amzn.in", "https://www.amazon.in", "https://www.nykaa.com"} <= cleared
+        assert not pool._idle[0].origins
+    asyncio.run(run())
+    print("[OK] Visited-origin wipe test passed")
+
+
+def test_concurrent_scrapes_are_capped():
+    """A burst never runs more than `size` browsers at once"""
+    async def run():
+        pool, drivers = _pool(size=2)
+        active, peak = 0, 0
+
+        async def scrape():
+            nonlocal active, peak
+            async with pool.lease():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*[scrape() for _ in range(6)])
+        assert peak == 2 and len(drivers) == 2
+    asyncio.run(run())
+    print("[OK] Concurrency cap test passed")
+
+
+def test_dead_and_worn_browsers_are_replaced():
+    """A crashed browser fails its health check; a browser is recycled after max_pages"""
+    async def run():
+        pool, drivers = _pool(size=1, max_pages=2)
+        async with pool.lease():
+            pass
+        drivers[0].alive = False
+        async with pool.lease():
+            pass
+        assert len(drivers) == 2 and drivers[0].quit_called
+        async with pool.lease():
+            pass
+        assert drivers[1].quit_called  # second lease on drivers[1] hit max_pages
+        assert pool.get_stats()["recycled"] == 1 and pool.get_stats()["unhealthy"] == 1
+    asyncio.run(run())
+    print("[OK] Health check/recycle test passed")
+
+
+if __name__ == "__main__":
+    test_browser_is_reused_and_reset()
+    test_storage_wiped_for_every_visited_origin()
+    test_concurrent_scrapes_are_capped()
+    test_dead_and_worn_browsers_are_replaced()
+    print("\nAll tests passed!")
@@ -0,0 +1,63 @@
+"""
+Test the in-process cache tier and request coalescing
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.cache_store import LRUCache, TwoTierCache, Coalescer
+
+
+def test_lru_eviction_and_expiry():
+    """Oldest entries are evicted and expired entries miss"""
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == (True, 1)  # "a" is now most recent
+    cache.set("c", 3, 60)
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, 3)
+    cache.set("d", 4, -1)
+    assert cache.get("d") == (False, None)
+    print("[OK] LRU eviction/expiry test passed")
+
+
+def test_negative_results_are_hits():
+    """A cached None (e.g. a CAS 404) is returned as a hit"""
+    async def run():
+        cache = TwoTierCache("test_cache", namespace="name", ttl_seconds=60, use_mongo=False)
+        assert await cache.get("water") == (False, None)
+        await cache.set("water", None)
+        assert await cache.get("water") == (True, None)
+    asyncio.run(run())
+    print("[OK] Negative cache test passed")
+
+
+def test_coalescer_shares_inflight_call():
+    """Concurrent callers for the same key share one computation"""
+    calls = []
+
+    async def run():
+        coalescer = Coalescer()
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["Water", "Aqua"]
+
+        results = await asyncio.gather(*[coalescer.run("water", fetch) for _ in range(5)])
+        assert all(r == ["Water", "Aqua"] for r in results)
+        # A later call runs again (coalescing is not caching)
+        await coalescer.run("water", fetch)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    print("[OK] Coalescer test passed")
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_expiry()
+    test_negative_results_are_hits()
+    test_coalescer_shares_inflight_call()
+    print("\nAll tests passed!")
@@ -0,0 +1,118 @@
+"""
+Test the /compare-products fill rules and the batched missing-field fill
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.compare_pipeline import (
+    CompareLimits,
+    fill_missing_fields,
+    merge_filled_fields,
+    missing_fields,
+)
+
+
+def test_missing_fields():
+    """Null and empty values are missing; False is a value"""
+    product = {
+        "product_name": "Niacinamide 10% + Zinc 1%",
+        "brand_name": None,
+        "price": "₹599",
+        "benefits": [],
+        "claims": ["vegan"],
+        "cruelty_free": False,
+        "sulphate_free": True,
+        "paraben_free": True,
+        "vegan": True,
+        "organic": None,
+        "fragrance_free": True,
+        "non_comedogenic": True,
+        "hypoallergenic": False,
+    }
+    assert missing_fields(product) == ["brand_name", "benefits", "organic"]
+    print("[OK] Missing fields test passed")
+
+
+def test_merge_filled_fields():
+    """Only usable values for the requested fields are merged"""
+    product = {"brand_name": None, "benefits": [], "organic": None, "price": None, "vegan": None}
+    fill = {
+        "brand_name": "The Ordinary",
+        "benefits": [],             # empty list: not usable
+        "organic": False,
+        "price": "null",            # the string "null": not usable
+        "vegan": "unknown",         # not a boolean: not usable
+        "claims": ["not requested"],
+    }
+    filled = merge_filled_fields(product, fill, ["brand_name", "benefits", "organic", "price", "vegan"])
+    assert filled == ["brand_name", "organic"]
+    assert product == {"brand_name": "The Ordinary", "benefits": [], "organic": False, "price": None, "vegan": None}
+    print("[OK] Merge filled fields test passed")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.content = [type("Block", (), {"text": text})()]
+
+
+def test_one_fill_call_for_all_incomplete_products():
+    """Incomplete products share one fill call; each gets only its own missing fields"""
+    complete = {field: "x" for field in ("product_name", "brand_name", "price")}
+    complete.update({"benefits": ["hydration"], "claims": ["vegan"]})
+    complete.update({field: True for field in (
+        "cruelty_free", "sulphate_free", "paraben_free", "vegan",
+        "organic", "fragrance_free", "non_comedogenic", "hypoallergenic")})
+    products = [
+        {**complete, "brand_name": None},
+        dict(complete),
+        {**complete, "price": None, "organic": None},
+    ]
+    contexts = [{"text": "page text", "url_context": None} for _ in products]
+    calls = []
+
+    async def create(**params):
+        calls.append(params)
+        # The model answers for every product and every field; only requested ones may land
+        return FakeResponse('''Here you go: {
+            "product1": {"brand_name": "The Ordinary", "price": "₹1"},
+            "product2": {"brand_name": "Should not apply"},
+            "product3": {"price": "₹599", "organic": false, "brand_name": "Wrong product"}
+        }''')
+
+    filled = asyncio.run(fill_missing_fields(
+        products, contexts, CompareLimits(llm_calls=1), create=create, model="m", max_tokens=100
+    ))
+
+    assert len(calls) == 1
+    prompt = calls[0]["messages"][0]["content"]
+    assert '"product1"' in prompt and '"product3"' in prompt and '"product2"' not in prompt
+    assert filled == {0: ["brand_name"], 2: ["price", "organic"]}
+    assert products[0]["brand_name"] == "The Ordinary" and products[0]["price"] == "x"
+    assert products[1] == complete
+    assert products[2]["price"] == "₹599" and products[2]["organic"] is False
+    assert products[2]["brand_name"] == "x"
+    print("[OK] Batched fill test passed")
+
+
+def test_no_fill_call_when_complete():
+    """Nothing missing means no LLM call at all"""
+    async def create(**params):
+        raise AssertionError("fill call made for complete products")
+
+    product = {"product_name": "x", "brand_name": "x", "price": "x", "benefits": ["a"], "claims": ["b"],
+               "cruelty_free": True, "sulphate_free": True, "paraben_free": True, "vegan": True,
+               "organic": True, "fragrance_free": True, "non_comedogenic": True, "hypoallergenic": True}
+    assert asyncio.run(fill_missing_fields(
+        [product], [{"text": None, "url_context": None}], CompareLimits(), create=create, model="m", max_tokens=100
+    )) == {}
+    print("[OK] No fill call test passed")
+
+
+if __name__ == "__main__":
+    test_missing_fields()
+    test_merge_filled_fields()
+    test_one_fill_call_for_all_incomplete_products()
+    test_no_fill_call_when_complete()
+    print("\nAll tests passed!")
@@ -0,0 +1,76 @@
+"""
+Test rarest-member containment index against the linear Step 1 scan
+"""
+import random
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.containment_index import (
+    ContainmentIndex,
+    linear_contained_in,
+)
+
+
+def _random_catalog(rng, rows=2000, vocab_size=300):
+    vocab = [f"inci {i}" for i in range(vocab_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    catalog = [frozenset(rng.choices(vocab, weights=weights, k=rng.randint(0, 4))) for _ in range(rows)]
+    return vocab, weights, catalog
+
+
+def test_basic_containment():
+    """Only fully contained, non-empty sets are returned, in catalog order"""
+    catalog = [
+        frozenset({"water", "glycerin"}),
+        frozenset(),
+        frozenset({"niacinamide"}),
+        frozenset({"glycerin", "retinol"}),
+        frozenset({"water"}),
+    ]
+    index = ContainmentIndex.build(catalog)
+    assert index.contained_in({"water", "glycerin", "niacinamide"}) == [0, 2, 4]
+    assert index.contained_in(set()) == []
+    print("[OK] Basic containment test passed")
+
+
+def test_matches_linear_scan():
+    """Same results and ordering as the linear scan on random data"""
+    rng = random.Random(7)
+    vocab, weights, catalog = _random_catalog(rng)
+    index = ContainmentIndex.build(catalog)
+    for _ in range(200):
+        product = set(rng.choices(vocab, weights=weights, k=30))
+        assert index.contained_in(product) == linear_contained_in(catalog, product)
+    print("[OK] Linear scan equivalence test passed")
+
+
+def test_incremental_updates():
+    """set/remove keep the index equivalent to the linear scan"""
+    rng = random.Random(11)
+    vocab, weights, catalog = _random_catalog(rng, rows=500)
+    index = ContainmentIndex.build(catalog)
+    sets = list(catalog)
+    for _ in range(300):
+        pos = rng.randrange(len(sets) + 1)
+        if pos < len(sets) and rng.random() < 0.3:
+            index.remove(pos)
+            sets[pos] = frozenset()
+        else:
+            new_set = frozenset(rng.choices(vocab, weights=weights, k=rng.randint(1, 3)))
+            index.set(pos, new_set)
+            if pos == len(sets):
+                sets.append(new_set)
+            else:
+                sets[pos] = new_set
+    for _ in range(100):
+        product = set(rng.choices(vocab, weights=weights, k=30))
+        assert index.contained_in(product) == linear_contained_in(sets, product)
+    print("[OK] Incremental update test passed")
+
+
+if __name__ == "__main__":
+    test_basic_containment()
+    test_matches_linear_scan()
+    test_incremental_updates()
+    print("\nAll tests passed!")
@@ -0,0 +1,71 @@
+"""
+Test the shared embedding provider's request batcher
+"""
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.embeddings import EmbeddingBatcher, get_embedding_model
+
+
+def test_concurrent_requests_are_merged():
+    """Callers arriving together share one encode call and get their own slice"""
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(encode, max_batch=100, wait_seconds=0.2)
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.submit(["x" * i, "y" * (i + 10)])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i in range(1, 5):
+        assert results[i] == [[float(i)], [float(i + 10)]]
+    assert sum(len(c) for c in calls) == 8
+    assert len(calls) < 4
+    print("[OK] Batch merge test passed")
+
+
+def test_errors_reach_every_caller():
+    """An encode failure is raised in the caller, and the worker keeps serving"""
+    def encode(texts):
+        if "bad" in texts:
+            raise ValueError("boom")
+        return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(encode, wait_seconds=0)
+    try:
+        batcher.submit(["bad"])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert batcher.submit(["ok"]) == [[1.0]]
+    assert batcher.submit([]) == []
+    print("[OK] Error propagation test passed")
+
+
+def test_provider_is_a_singleton():
+    """Every caller shares one (lazily loaded) model instance"""
+    model = get_embedding_model()
+    assert model is get_embedding_model()
+    assert not model.loaded
+    print("[OK] Singleton test passed")
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_are_merged()
+    test_errors_reach_every_caller()
+    test_provider_is_a_singleton()
+    print("\nAll tests passed!")
@@ -0,0 +1,79 @@
+"""
+Test the Step 2 fuzzy candidate store
+"""
+import random
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.ai_ingredient_intelligence.logic import fuzzy_store
+from app.ai_ingredient_intelligence.logic.fuzzy_store import FuzzyCandidateStore, trigrams
+
+
+def test_build_deduplicates_first_owner_wins():
+    """Candidates keep first-occurrence order and owner position"""
+    store = FuzzyCandidateStore.build([
+        [" Water", "Glycerin"],
+        None,
+        ["glycerin", "Niacinamide"],
+    ])
+    assert store.candidates == ["water", "glycerin", "niacinamide"]
+    assert store.owners == [0, 0, 2]
+    print("[OK] Build/dedup test passed")
+
+
+def test_trigrams_token_sorted():
+    """Trigrams ignore token order, like token_sort_ratio"""
+    assert trigrams("acid salicylic") == trigrams("salicylic acid")
+    print("[OK] Trigram test passed")
+
+
+def test_matches_extract_one():
+    """Batched lookup returns what extractOne over the full list returned"""
+    rapidfuzz = pytest.importorskip("rapidfuzz")
+    rng = random.Random(3)
+    words = ["sodium", "hyaluronate", "acid", "glyceryl", "stearate", "cetyl", "alcohol",
+             "tocopheryl", "acetate", "niacinamide", "panthenol", "citric", "benzoate"]
+    candidates = list(dict.fromkeys(" ".join(rng.sample(words, rng.randint(1, 3))) for _ in range(300)))
+    store = FuzzyCandidateStore(candidates, list(range(len(candidates))))
+
+    queries = []
+    for candidate in rng.sample(candidates, 40):
+        chars = list(candidate)
+        chars[rng.randrange(len(chars))] = "x"  # OCR-style typo
+        queries.append("".join(chars))
+    exclude = set(rng.sample(candidates, 20))
+
+    results = store.best_matches(queries, exclude)
+    allowed = [c for c in candidates if c not in exclude]
+    for query, result in zip(queries, results):
+        expected = rapidfuzz.process.extractOne(
+            query, allowed, scorer=rapidfuzz.fuzz.token_sort_ratio, score_cutoff=75
+        )
+        if expected is None:
+            assert result is None
+        else:
+            assert result[0] == expected[0]
+            assert result[1] == pytest.approx(expected[1])
+    print("[OK] extractOne equivalence test passed")
+
+
+def test_prefilter_finds_typos(monkeypatch):
+    """With the trigram prefilter enabled, close typos are still found"""
+    pytest.importorskip("rapidfuzz")
+    monkeypatch.setattr(fuzzy_store, "FUZZY_PREFILTER_MIN_CANDIDATES", 1)
+    store = FuzzyCandidateStore.build([["sodium hyaluronate"], ["niacinamide"], ["cetyl alcohol"]])
+    assert store.trigram_postings
+    results = store.best_matches(["sodium hyaluronat", "niacinamde", "zzzz"], exclude=set())
+    assert results[0][0] == "sodium hyaluronate"
+    assert results[1][0] == "niacinamide"
+    assert results[2] is None
+    print("[OK] Prefilter test passed")
+
+
+if __name__ == "__main__":
+    test_build_deduplicates_first_owner_wins()
+    test_trigrams_token_sorted()
+    print("\nAll tests passed!")
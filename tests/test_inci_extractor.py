@@ -0,0 +1,64 @@
+"""
+Test the rule-based INCI extraction that runs before the LLM
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.inci_extractor import extract_inci_from_text, find_ingredient_sections
+
+VOCABULARY = frozenset({
+    "aqua", "water", "glycerin", "niacinamide", "zinc pca", "propanediol", "sodium hyaluronate",
+    "phenoxyethanol", "ethylhexylglycerin", "citric acid", "sodium benzoate", "potassium sorbate",
+    "butylene glycol", "xanthan gum", "tocopherol",
+})
+
+PAGE = """10% Niacinamide Face Serum
+Rs. 599
+Description
+A lightweight serum that visibly reduces blemishes. Suitable for oily skin.
+Key Ingredients: Niacinamide, Zinc PCA
+Full Ingredients List: Water\\Aqua\\Eau, Niacinamide (10%), Propanediol, Zinc PCA (1%), Sodium Hyaluronate, Phenoxyethanol, Ethylhexylglycerin*. *Dermatologically tested.
+How to use
+Apply 2-3 drops in the evening.
+"""
+
+
+def test_clean_ingredients_block_accepted():
+    """A labelled list of known INCI names is accepted without the LLM"""
+    result = extract_inci_from_text(PAGE, VOCABULARY)
+    assert result["accepted"]
+    assert result["ingredients"] == [
+        "Water", "Niacinamide", "Propanediol", "Zinc PCA",
+        "Sodium Hyaluronate", "Phenoxyethanol", "Ethylhexylglycerin",
+    ]
+    assert result["confidence"] == 1.0
+    print("[OK] Clean block test passed")
+
+
+def test_multiline_section_below_heading():
+    """One name per line under an "Ingredients" heading, up to the next section"""
+    text = "Ingredients\nAqua (Water)\nGlycerin\nButylene Glycol\nXanthan Gum\nTocopherol\nCitric Acid\n\nHow to use\nMassage gently."
+    sections = find_ingredient_sections(text)
+    assert sections == ["Aqua (Water)\nGlycerin\nButylene Glycol\nXanthan Gum\nTocopherol\nCitric Acid"]
+    result = extract_inci_from_text(text, VOCABULARY)
+    assert result["accepted"] and result["total"] == 6
+    assert result["ingredients"][0] == "Aqua"
+    print("[OK] Multi-line section test passed")
+
+
+def test_low_confidence_falls_back():
+    """Marketing copy, short lists and a missing vocabulary all leave the work to the LLM"""
+    prose = "Ingredients: hydrating botanicals, skin-loving oils, natural actives, vitamins, minerals, goodness"
+    assert not extract_inci_from_text(prose, VOCABULARY)["accepted"]
+    assert not extract_inci_from_text("Ingredients: Niacinamide, Zinc PCA", VOCABULARY)["accepted"]
+    assert not extract_inci_from_text(PAGE, frozenset())["accepted"]
+    assert extract_inci_from_text("Just a product description.", VOCABULARY) is None
+    print("[OK] Low confidence test passed")
+
+
+if __name__ == "__main__":
+    test_clean_ingredients_block_accepted()
+    test_multiline_section_below_heading()
+    test_low_confidence_falls_back()
+    print("\nAll tests passed!")
@@ -0,0 +1,73 @@
+"""
+Test the inverted ingredient index used by market research
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic.ingredient_index import (
+    ProductIngredientIndex,
+    match_product_actives,
+    product_ingredient_arrays,
+)
+from app.ai_ingredient_intelligence.logic.product_normalizer import is_current, normalized_product_fields
+
+
+def test_product_ingredient_arrays():
+    """Raw strings are parsed once into aligned display / normalized arrays"""
+    parsed, normalized = product_ingredient_arrays(
+        "Brand claims. Full Ingredients List: Water\\\\Aqua\\\\Eau, Niacinamide, Zinc PCA, Sodium Hyaluronate."
+    )
+    assert parsed == ["Water", "Aqua", "Eau", "Niacinamide", "Zinc PCA", "Sodium Hyaluronate."]
+    assert normalized == ["water", "aqua", "eau", "niacinamide", "zinc pca", "sodium hyaluronate"]
+    assert product_ingredient_arrays([" Glycerin ", {"name": "Niacinamide"}, ""]) == (
+        ["Glycerin", "Niacinamide"], ["glycerin", "niacinamide"])
+    print("[OK] Ingredient arrays test passed")
+
+
+def test_expand_uses_old_matching_rules():
+    """Exact terms always match; longer actives also match terms containing them as whole words"""
+    index = ProductIngredientIndex()
+    index.load_terms(["niacinamide", "niacinamide (vitamin b3)", "niacinamides", "zinc", "zinc pca", "tea", "tea tree oil",
+                      "ascorbic acid", "ethyl ascorbic acid", "acid"])
+    assert index.expand("niacinamide") == {"niacinamide", "niacinamide (vitamin b3)"}
+    assert index.expand("zinc") == {"zinc", "zinc pca"}
+    assert index.expand("tea") == {"tea"}  # 3 chars or less: exact only
+    assert index.expand("ascorbic acid") == {"ascorbic acid", "ethyl ascorbic acid"}
+    assert index.expand("retinol") == set()
+    print("[OK] Expansion test passed")
+
+
+def test_product_matching():
+    """Per-product matching uses the expanded terms and keeps display names"""
+    expansions = {"niacinamide": {"niacinamide", "niacinamide (vitamin b3)"}, "zinc pca": {"zinc pca"}}
+    matched_actives, matched_names = match_product_actives(
+        ["niacinamide", "zinc pca"],
+        ["Aqua", "Niacinamide (Vitamin B3)", "Zinc PCA"],
+        ["aqua", "niacinamide (vitamin b3)", "zinc pca"],
+        expansions,
+    )
+    assert matched_actives == ["niacinamide", "zinc pca"]
+    assert matched_names == ["Niacinamide (Vitamin B3)", "Zinc PCA"]
+    print("[OK] Product matching test passed")
+
+
+def test_normalized_product_fields():
+    """Write-time fields: arrays, a stable hash and the product's actives"""
+    raw = "Ingredients: Aqua, Niacinamide, Zinc PCA, Niacinamide"
+    fields = normalized_product_fields(raw, {"niacinamide", "zinc pca", "retinol"})
+    assert fields["ingredients_normalized"] == ["aqua", "niacinamide", "zinc pca", "niacinamide"]
+    assert fields["actives"] == ["niacinamide", "zinc pca"]
+    same = normalized_product_fields(["Aqua", "Niacinamide", "Zinc PCA", "Niacinamide."], {"niacinamide", "zinc pca"})
+    assert same["ingredients_hash"] == fields["ingredients_hash"]
+    assert is_current({**fields}, same)
+    assert not is_current({**fields, "actives": ["niacinamide"]}, same)
+    print("[OK] Normalized fields test passed")
+
+
+if __name__ == "__main__":
+    test_product_ingredient_arrays()
+    test_expand_uses_old_matching_rules()
+    test_product_matching()
+    test_normalized_product_fields()
+    print("\nAll tests passed!")
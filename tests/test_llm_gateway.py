@@ -0,0 +1,104 @@
+"""
+Test the LLM gateway helpers (JSON extraction, concurrency config, retry policy)
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+pytest.importorskip("anthropic")
+
+from app.ai_ingredient_intelligence.logic import llm_gateway
+from app.ai_ingredient_intelligence.logic.llm_gateway import extract_json
+
+
+def test_extract_json_shapes():
+    """Bare, fenced and prose-wrapped JSON are all recovered"""
+    assert extract_json('["Water", "Glycerin"]', expect=list) == ["Water", "Glycerin"]
+    assert extract_json('```json\n{"a": 1}\n```', expect=dict) == {"a": 1}
+    assert extract_json('Here you go: ["Aqua"] hope it helps', expect=list) == ["Aqua"]
+    with pytest.raises(ValueError):
+        extract_json('{"a": 1}', expect=list)
+    print("[OK] JSON extraction test passed")
+
+
+def test_model_concurrency_prefixes(monkeypatch):
+    """The longest configured prefix wins, everything else uses the default"""
+    limits = llm_gateway._parse_model_limits("claude-3-opus:2, claude-3-opus-20240229:1,bad")
+    monkeypatch.setattr(llm_gateway, "MODEL_CONCURRENCY", limits)
+    assert llm_gateway._concurrency_limit("claude-3-opus-20240229") == 1
+    assert llm_gateway._concurrency_limit("claude-3-opus-latest") == 2
+    assert llm_gateway._concurrency_limit("claude-sonnet-4-5") == llm_gateway.LLM_MAX_CONCURRENCY
+    print("[OK] Concurrency config test passed")
+
+
+def test_only_transient_errors_retry():
+    """Non-API errors are raised immediately; backoff stays under the cap"""
+    assert llm_gateway._retry_delay(ValueError("bad json"), 0) is None
+    import anthropic
+    import httpx
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    overloaded = anthropic.InternalServerError(
+        "overloaded", response=httpx.Response(529, request=request), body=None
+    )
+    for attempt in range(6):
+        delay = llm_gateway._retry_delay(overloaded, attempt)
+        assert 0 <= delay <= llm_gateway.LLM_BACKOFF_CAP_SECONDS
+    print("[OK] Retry policy test passed")
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def get_final_message(self):
+        return {"text": "".join(self.chunks)}
+
+
+class FakeMessages:
+    def stream(self, **params):
+        return FakeStream(["a", "b", "c"])
+
+
+class FakeClient:
+    messages = FakeMessages()
+
+
+def test_slow_stream_consumer_does_not_hold_model_slot(monkeypatch):
+    """A reader that stalls mid-stream must not block other calls to the same model"""
+    import asyncio
+    monkeypatch.setattr(llm_gateway, "MODEL_CONCURRENCY", {"fake-model": 1})
+    monkeypatch.setattr(llm_gateway, "_semaphores", {})
+
+    async def run():
+        stalled = llm_gateway.stream_text(model="fake-model", client=FakeClient(), max_tokens=10)
+        assert await stalled.__anext__() == "a"
+        # The first consumer is parked after one delta; a second stream still completes
+        finals = []
+        second = [text async for text in llm_gateway.stream_text(
+            model="fake-model", client=FakeClient(), max_tokens=10, on_final=finals.append
+        )]
+        assert second == ["a", "b", "c"]
+        assert finals == [{"text": "abc"}]
+        await stalled.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    print("[OK] Stream slot release test passed")
+
+
+if __name__ == "__main__":
+    test_extract_json_shapes()
+    test_only_transient_errors_retry()
+    print("\nAll tests passed!")
@@ -0,0 +1,96 @@
+"""
+Test the content-addressed LLM response cache
+"""
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic import llm_response_cache
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+from app.ai_ingredient_intelligence.logic.llm_response_cache import (
+    cached_response_text,
+    response_cache_key,
+    track_llm_cache,
+)
+
+PARAMS = {
+    "model": "claude-3-opus-20240229",
+    "max_tokens": 4096,
+    "temperature": 0.1,
+    "system": "You are FormulationLooker 1.0",
+    "messages": [{"role": "user", "content": "Generate report for this INCI list:\nWater, Glycerin"}],
+}
+
+
+def _enable(monkeypatch):
+    monkeypatch.setattr(llm_response_cache, "LLM_RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_response_cache, "_response_cache",
+                        TwoTierCache("llm_response_cache", namespace="test", ttl_seconds=60, use_mongo=False))
+
+
+def _message(text):
+    return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)])
+
+
+def test_key_covers_every_input():
+    """System as string or cache_control block hashes the same; any other change does not"""
+    blocks = [{"type": "text", "text": PARAMS["system"], "cache_control": {"type": "ephemeral"}}]
+    assert response_cache_key(PARAMS) == response_cache_key({**PARAMS, "system": blocks})
+    assert response_cache_key(PARAMS) != response_cache_key({**PARAMS, "temperature": 0.2})
+    assert response_cache_key(PARAMS) != response_cache_key({**PARAMS, "model": "claude-sonnet-4-5"})
+    assert response_cache_key(PARAMS) != response_cache_key({**PARAMS, "system": "Other"})
+    print("[OK] Cache key test passed")
+
+
+def test_repeat_call_is_served_from_cache(monkeypatch):
+    """The second identical call skips the API and the request scope reports a hit"""
+    _enable(monkeypatch)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return _message("  0) Executive Summary ...  ")
+
+    async def run():
+        first_scope = track_llm_cache()
+        first = await cached_response_text(PARAMS, call)
+        assert first_scope.cache_hit is False
+        second_scope = track_llm_cache()
+        second = await cached_response_text(PARAMS, call)
+        assert second_scope.cache_hit is True
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ("0) Executive Summary ...", False)
+    assert second == ("0) Executive Summary ...", True)
+    assert len(calls) == 1
+    print("[OK] Cache hit test passed")
+
+
+def test_invalid_and_random_responses_are_not_cached(monkeypatch):
+    """Responses failing validation, and high-temperature calls, always reach the API"""
+    _enable(monkeypatch)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return _message("not json")
+
+    async def run():
+        for _ in range(2):
+            await cached_response_text(PARAMS, call, validate=lambda text: text.startswith("{"))
+        scope = track_llm_cache()
+        for _ in range(2):
+            await cached_response_text({**PARAMS, "temperature": 0.9}, call)
+        assert scope.cache_hit is None
+
+    asyncio.run(run())
+    assert len(calls) == 4
+    print("[OK] Uncacheable response test passed")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,124 @@
+"""
+Test market research cursors and page materialization
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.ai_ingredient_intelligence.logic.market_research_pages import (
+    build_product_data,
+    clamp_page_size,
+    decode_cursor,
+    encode_cursor,
+    materialize_page,
+)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.docs:
+                yield doc
+        return iterate()
+
+
+class _Collection:
+    """Just enough of a Motor collection for find({field: {"$in": [...]}, ...})"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        docs = self.docs
+        for field, condition in query.items():
+            if isinstance(condition, dict):
+                docs = [doc for doc in docs if doc.get(field) in condition["$in"]]
+            else:
+                docs = [doc for doc in docs if doc.get(field) == condition]
+        return _Cursor(docs)
+
+
+def _score(product_id):
+    return {"product_id": product_id, "ingredient_overlap": 2, "weighted_jaccard": 0.5}
+
+
+def test_cursor_round_trip():
+    """Cursors are opaque, URL-safe and reject anything else"""
+    cursor = encode_cursor("abc123", 40, 1700000000.25)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == ("abc123", 40, 1700000000.25)
+    for bad in ["", "not-a-cursor", encode_cursor("abc123", -1, 0.0)]:
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+    assert clamp_page_size(None) == 20 and clamp_page_size(0) == 1 and clamp_page_size(10_000) == 100
+    print("[OK] Cursor test passed")
+
+
+def test_build_product_data():
+    """Images, verified actives and description cleaning for one product"""
+    product = {
+        "_id": "p1",
+        "name": "Niacinamide Serum",
+        "ingredients_parsed": ["Aqua", "Niacinamide", "Zinc PCA"],
+        "ingredients_normalized": ["aqua", "niacinamide", "zinc pca"],
+        "image": "https://img/1.jpg",
+        "images": ["https://img/1.jpg", "https://img/2.jpg"],
+        "description": "Brightening serum. Country of Origin: India",
+        "url": "https://shop/p1",
+        "countryOfOrigin": "India",
+    }
+    expansions = {"niacinamide": {"niacinamide"}, "zinc pca": {"zinc pca"}, "retinol": set()}
+    actives = list(expansions)
+    data = build_product_data(product, actives, expansions, _score("p1"), {"niacinamide": "NIACINAMIDE"})
+    assert data["matched_ingredients"] == ["Niacinamide", "Zinc PCA"]
+    assert data["active_ingredients"] == ["NIACINAMIDE"]  # zinc pca is not an Active in ingre_inci
+    assert data["match_percentage"] == 66.67 and data["active_match_count"] == 2
+    assert data["image"] == "https://img/1.jpg" and data["images"] == ["https://img/1.jpg", "https://img/2.jpg"]
+    assert data["description"] == "Brightening serum." and data["url"] == "https://shop/p1"
+    assert "countryOfOrigin" not in data
+    # Failed INCI lookup: every matched ingredient is reported as active
+    assert build_product_data(product, actives, expansions, _score("p1"), None)["active_ingredients"] == \
+        ["Niacinamide", "Zinc PCA"]
+    assert build_product_data(product, ["retinol"], expansions, _score("p1"), {}) is None
+    print("[OK] Product data test passed")
+
+
+def test_materialize_page_batches_lookups():
+    """A page costs one product query and one INCI query, and keeps the ranking order"""
+    products = _Collection([
+        {"_id": pid, "name": pid, "ingredients_parsed": names, "ingredients_normalized": [n.lower() for n in names]}
+        for pid, names in [
+            ("a", ["Aqua", "Niacinamide"]),
+            ("b", ["Aqua", "Retinol", "Niacinamide"]),
+            ("c", ["Aqua", "Retinol"]),
+        ]
+    ])
+    inci = _Collection([
+        {"inciName": "Niacinamide", "inciName_normalized": "niacinamide", "category": "Active"},
+        {"inciName": "Retinol", "inciName_normalized": "retinol", "category": "Active"},
+        {"inciName": "Aqua", "inciName_normalized": "aqua", "category": "Excipient"},
+    ])
+    expansions = {"niacinamide": {"niacinamide"}, "retinol": {"retinol"}}
+    scores = [_score("b"), _score("gone"), _score("c"), _score("a")]
+
+    page = asyncio.run(materialize_page(scores, list(expansions), expansions, products, inci))
+    assert [p["id"] for p in page] == ["b", "c", "a"]  # "gone" was deleted after ranking
+    assert page[0]["active_ingredients"] == ["Niacinamide", "Retinol"]
+    assert len(products.queries) == 1 and len(inci.queries) == 1
+    assert sorted(inci.queries[0]["inciName_normalized"]["$in"]) == ["niacinamide", "retinol"]
+    print("[OK] Page materialization test passed")
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_build_product_data()
+    test_materialize_page_batches_lookups()
+    print("\nAll tests passed!")
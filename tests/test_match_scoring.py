@@ -0,0 +1,100 @@
+"""
+Test the vectorized market research scoring
+"""
+import sys
+import time
+import random
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from app.ai_ingredient_intelligence.logic.match_scoring import IngredientMatrix
+
+CATALOG = {
+    "serum": ["aqua", "niacinamide", "zinc pca", "glycerin", "phenoxyethanol"],
+    "toner": ["aqua", "niacinamide (vitamin b3)", "glycerin"],
+    "cream": ["aqua", "glycerin", "ceramide np", "phenoxyethanol"],
+    "zinc_gel": ["aqua", "zinc pca", "xanthan gum"],
+}
+
+
+def _matrix():
+    return IngredientMatrix(list(CATALOG), list(CATALOG.values()))
+
+
+def test_rank_orders_by_coverage_then_similarity():
+    """Active coverage decides first; the idf-weighted Jaccard breaks ties"""
+    matrix = _matrix()
+    actives = ["niacinamide", "zinc pca"]
+    expansions = matrix.vocabulary.expansions(actives)
+    assert expansions["niacinamide"] == {"niacinamide", "niacinamide (vitamin b3)"}
+    top, total = matrix.rank(expansions, ["aqua", "niacinamide", "zinc pca", "glycerin"], top_k=10)
+    assert total == 3
+    assert [score["product_id"] for score in top] == ["serum", "zinc_gel", "toner"]  # zinc pca is rarer than glycerin
+    assert top[0]["active_match_count"] == 2 and top[0]["active_coverage"] == 100.0
+    assert top[0]["ingredient_overlap"] == 4
+    assert top[1]["weighted_jaccard"] > top[2]["weighted_jaccard"]
+    print("[OK] Ranking order test passed")
+
+
+def test_top_k_matches_full_sort():
+    """argpartition top-k returns the same products as sorting everything"""
+    random.seed(7)
+    vocabulary = [f"inci {i}" for i in range(300)]
+    lists = [random.sample(vocabulary, random.randint(5, 30)) for _ in range(2000)]
+    matrix = IngredientMatrix(range(len(lists)), lists)
+    expansions = matrix.vocabulary.expansions(["inci 1", "inci 2", "inci 3"])
+    query = vocabulary[:25]
+    full, total = matrix.rank(expansions, query, top_k=0)
+    top, total_k = matrix.rank(expansions, query, top_k=15)
+    assert total == total_k == len(full)
+    assert [(s["active_match_count"], s["weighted_jaccard"]) for s in top] == \
+        [(s["active_match_count"], s["weighted_jaccard"]) for s in full[:15]]
+    print("[OK] Top-k test passed")
+
+
+def test_offset_pages_tile_the_ranking():
+    """Pages fetched with offset are consecutive slices of the full ranking, ties included"""
+    random.seed(3)
+    vocabulary = [f"inci {i}" for i in range(40)]
+    # Few distinct lists -> many exact score ties across page boundaries
+    shapes = [random.sample(vocabulary, 8) for _ in range(12)]
+    lists = [random.choice(shapes) for _ in range(600)]
+    matrix = IngredientMatrix(range(len(lists)), lists)
+    expansions = matrix.vocabulary.expansions(["inci 1", "inci 2", "inci 3", "inci 4"])
+    full, total = matrix.rank(expansions, vocabulary[:10], top_k=0)
+    paged = []
+    for offset in range(0, total, 25):
+        page, page_total = matrix.rank(expansions, vocabulary[:10], top_k=25, offset=offset)
+        assert page_total == total
+        paged.extend(page)
+    assert [s["product_id"] for s in paged] == [s["product_id"] for s in full]
+    assert matrix.rank(expansions, vocabulary[:10], top_k=25, offset=total) == ([], total)
+    print("[OK] Offset paging test passed")
+
+
+def test_scoring_large_catalog_is_fast():
+    """Scoring 100k products takes milliseconds once the matrix is built"""
+    random.seed(11)
+    vocabulary = [f"inci {i}" for i in range(5000)]
+    lists = [random.sample(vocabulary, 25) for _ in range(100_000)]
+    matrix = IngredientMatrix(range(len(lists)), lists)
+    expansions = matrix.vocabulary.expansions(["inci 10", "inci 20", "inci 30", "inci 40"])
+    started = time.perf_counter()
+    top, total = matrix.rank(expansions, vocabulary[:30], top_k=20)
+    elapsed = time.perf_counter() - started
+    assert len(top) == 20 and total > 1000
+    assert elapsed < 0.5, f"ranking took {elapsed:.3f}s"
+    print(f"[OK] 100k products ranked in {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    test_rank_orders_by_coverage_then_similarity()
+    test_top_k_matches_full_sort()
+    test_offset_pages_tile_the_ranking()
+    test_scoring_large_catalog_is_fast()
+    print("\nAll tests passed!")
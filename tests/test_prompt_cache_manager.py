@@ -0,0 +1,79 @@
+"""
+Test prompt caching: cache_control system blocks and usage-based cache stats
+"""
+import sys
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from app.ai_ingredient_intelligence.logic.prompt_cache_manager import PromptCacheManager
+from fake_anthropic_server import FakeAnthropicServer
+
+SYSTEM_PROMPT = "You are a cosmetic formulation assistant. " * 200
+
+
+def test_system_prompt_is_sent_as_cacheable_block():
+    """The system prompt becomes one ephemeral cache_control text block"""
+    manager = PromptCacheManager()
+    blocks = manager.system_blocks("ingredient_selection", SYSTEM_PROMPT)
+    assert blocks == [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    assert "ingredient_selection" in manager.get_cache_stats()["cache_types"]
+    print("[OK] Cache block test passed")
+
+
+def test_usage_feeds_cache_stats():
+    """cache read/write tokens from response.usage drive the reported hit rate"""
+    manager = PromptCacheManager()
+    write = SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=50, cache_creation_input_tokens=2000, cache_read_input_tokens=0, output_tokens=300))
+    read = SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=50, cache_creation_input_tokens=0, cache_read_input_tokens=2000, output_tokens=300))
+    manager.record_usage("compliance_check", write)
+    manager.record_usage("compliance_check", read)
+    manager.record_usage("compliance_check", SimpleNamespace())  # no usage reported
+
+    stats = manager.get_cache_stats()["usage"]["compliance_check"]
+    assert stats["calls"] == 3
+    assert stats["cache_hits"] == 1 and stats["cache_writes"] == 1
+    assert stats["cache_read_input_tokens"] == 2000
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    assert stats["cached_token_ratio"] == round(2000 / 4100, 4)
+    print("[OK] Usage stats test passed")
+
+
+def test_fake_server_cache_hits():
+    """Repeated calls with the same system prompt read it from the (simulated) cache"""
+    anthropic = pytest.importorskip("anthropic")
+
+    async def run(server):
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=server.base_url, max_retries=0)
+        manager = PromptCacheManager(claude_client=client)
+        for question in ("Select humectants", "Select emollients", "Select actives"):
+            response = await manager.create_message(
+                prompt_type="ingredient_selection",
+                system_prompt=SYSTEM_PROMPT,
+                model="claude-3-opus-20240229",
+                max_tokens=100,
+                messages=[{"role": "user", "content": question}]
+            )
+            assert response.content[0].text == '{"ok": true}'
+        await client.close()
+        return manager.get_cache_stats()["usage"]["ingredient_selection"]
+
+    with FakeAnthropicServer() as server:
+        stats = asyncio.run(run(server))
+        assert server.requests == 3
+    assert stats["cache_writes"] == 1
+    assert stats["cache_hits"] == 2
+    assert stats["cache_read_input_tokens"] == 2 * (len(SYSTEM_PROMPT) // 4)
+    print("[OK] Fake server cache hit test passed")
+
+
+if __name__ == "__main__":
+    test_system_prompt_is_sent_as_cacheable_block()
+    test_usage_feeds_cache_stats()
+    test_fake_server_cache_hits()
+    print("\nAll tests passed!")
@@ -0,0 +1,77 @@
+"""
+Test canonical product URLs and the cached, coalesced URL extraction
+"""
+import asyncio
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ai_ingredient_intelligence.logic import url_cache
+from app.ai_ingredient_intelligence.logic.cache_store import TwoTierCache
+from app.ai_ingredient_intelligence.logic.url_cache import cached_extraction, canonicalize_url
+
+
+def test_canonical_urls():
+    """Tracking params, slugs and hosts collapse to one URL per product"""
+    assert canonicalize_url(
+        "https://www.amazon.in/Minimalist-Niacinamide-Serum/dp/B08L7J3Z1K/ref=sr_1_3?crid=2X&keywords=serum&qid=1700&sr=8-3"
+    ) == "https://amazon.in/dp/B08L7J3Z1K"
+    assert canonicalize_url("https://m.amazon.in/gp/product/b08l7j3z1k?psc=1") == "https://amazon.in/dp/B08L7J3Z1K"
+    assert canonicalize_url(
+        "https://www.nykaa.com/the-derma-co-1-hyaluronic-sunscreen/p/1048786?productId=1048786&pps=1&skuId=1048786"
+    ) == "https://nykaa.com/p/1048786"
+    assert canonicalize_url(
+        "https://www.flipkart.com/cetaphil-cleanser/p/itm6f7c0b2e4d8a1?pid=SKCFZ3Y&lid=LSTSKC&marketplace=FLIPKART&srno=s_1_2"
+    ) == "https://flipkart.com/p/itm6f7c0b2e4d8a1?pid=SKCFZ3Y"
+    assert canonicalize_url(
+        "https://thedermaco.com/products/niacinamide-serum/?utm_source=ig&variant=4211&fbclid=abc#reviews"
+    ) == "https://thedermaco.com/products/niacinamide-serum?variant=4211"
+    print("[OK] Canonical URL test passed")
+
+
+def test_cache_coalescing_and_refresh(monkeypatch):
+    """Concurrent requests share one scrape, later ones hit the cache, refresh re-scrapes"""
+    monkeypatch.setattr(url_cache, "_extraction_cache",
+                        TwoTierCache("url_extraction_cache", namespace="test", ttl_seconds=60, use_mongo=False))
+    scrapes = []
+
+    async def scrape():
+        scrapes.append(1)
+        await asyncio.sleep(0.01)
+        return {"ingredients": ["Water", "Glycerin"], "platform": "amazon", "product_name": "Serum", "is_estimated": False}
+
+    async def run():
+        urls = ["https://www.amazon.in/dp/B08L7J3Z1K?tag=aff-21", "https://amazon.in/x/dp/B08L7J3Z1K/ref=cm"]
+        first = await asyncio.gather(*[cached_extraction(url, scrape) for url in urls])
+        assert len(scrapes) == 1 and [r["url"] for r in first] == urls
+        again = await cached_extraction("https://amazon.in/dp/B08L7J3Z1K", scrape)
+        assert again["cache_hit"] is True and again["ingredients"] == ["Water", "Glycerin"] and len(scrapes) == 1
+        await cached_extraction(urls[0], scrape, refresh=True)
+        assert len(scrapes) == 2
+
+    asyncio.run(run())
+    print("[OK] Cache/coalescing/refresh test passed")
+
+
+def test_empty_results_not_cached(monkeypatch):
+    """A failed extraction is retried next time"""
+    monkeypatch.setattr(url_cache, "_extraction_cache",
+                        TwoTierCache("url_extraction_cache", namespace="test", ttl_seconds=60, use_mongo=False))
+    scrapes = []
+
+    async def scrape():
+        scrapes.append(1)
+        return {"ingredients": [], "platform": "nykaa"}
+
+    async def run():
+        await cached_extraction("https://www.nykaa.com/x/p/123", scrape)
+        await cached_extraction("https://www.nykaa.com/x/p/123", scrape)
+
+    asyncio.run(run())
+    assert len(scrapes) == 2
+    print("[OK] Empty result test passed")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))